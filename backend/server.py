@@ -1,19 +1,25 @@
 from fastapi import FastAPI, HTTPException, Depends, status, WebSocket, WebSocketDisconnect, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne, ReplaceOne
+from pymongo.errors import OperationFailure, DuplicateKeyError, BulkWriteError
 from bson import ObjectId
 from typing import Optional, List, Dict, Set, Any
 import os
 import hashlib
+import time
 import jwt
 from datetime import datetime, timedelta
 import uuid
 from enum import Enum
 import json
 import asyncio
+import bisect
+import heapq
+from collections import OrderedDict, deque
 
 # Payment Gateway Imports
 import stripe
@@ -48,6 +54,15 @@ class AdminRole(str, Enum):
 # Environment variables
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 DB_NAME = os.environ.get('DB_NAME', 'betting_federation')
+
+# MongoDB connection pool tuning (shared by every request, the chat manager and background work)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '10000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000'))
 SECRET_KEY = "your-secret-key-here"
 
 # Payment Gateway Configuration
@@ -80,12 +95,22 @@ if COINBASE_API_KEY:
 else:
     coinbase_client = None
 
-# MongoDB connection
-client = MongoClient(MONGO_URL)
+# MongoDB connection (async Motor client so database I/O never blocks the event loop)
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS
+)
 db = client[DB_NAME]
 
 # MongoDB Collections
 users_collection = db.users
+revoked_tokens_collection = db.revoked_tokens
 competitions_collection = db.competitions
 site_messages_collection = db.site_messages
 tournaments_collection = db.tournaments
@@ -100,7 +125,9 @@ commissions_collection = db.commissions
 payouts_collection = db.payouts
 wallet_balances_collection = db.wallet_balances
 transactions_collection = db.transactions
+wallet_rollups_collection = db.wallet_monthly_rollups
 rankings_collection = db.rankings
+country_stats_collection = db.country_stats
 content_pages_collection = db.content_pages
 menu_items_collection = db.menu_items
 
@@ -155,9 +182,22 @@ sportsduel_bets_collection = db.sportsduel_bets
 sportsduel_time_slots_collection = db.sportsduel_time_slots
 sportsduel_sports_events_collection = db.sportsduel_sports_events
 sportsduel_match_results_collection = db.sportsduel_match_results
+sportsduel_player_stats_collection = db.sportsduel_player_stats
+sportsduel_rankings_collection = db.sportsduel_rankings
+
+# Live Chat Collections
+chat_events_collection = db.chat_events  # Cross-worker chat bus
+chat_messages_collection = db.chat_messages  # Room history
+chat_room_memberships_collection = db.chat_room_memberships  # user -> tournament/team rooms
+CHAT_EVENT_TTL_SECONDS = int(os.environ.get("CHAT_EVENT_TTL_SECONDS", "300"))
+CHAT_HISTORY_RETENTION_DAYS = int(os.environ.get("CHAT_HISTORY_RETENTION_DAYS", "30"))
 
 app = FastAPI(title="WoBeRa - World Betting Rank API", default_response_class=CustomJSONResponse)
 
+@app.on_event("shutdown")
+async def close_mongo_connection():
+    client.close()
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -1314,6 +1354,9 @@ class SportsDuelCouponCreate(BaseModel):
     match_id: str
     bets: List[Dict[str, Any]]  # event_id, selection, odds
 
+class SportsDuelSettlementRequest(BaseModel):
+    results: Dict[str, str] = {}  # event_id -> "1", "X", "2", "over", "under"
+
 # Helper functions
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
@@ -1321,35 +1364,212 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     return hash_password(password) == hashed
 
+TOKEN_LIFETIME = timedelta(days=7)
+
 def create_token(user_id: str) -> str:
+    now = datetime.utcnow()
     payload = {
         "user_id": user_id,
-        "exp": datetime.utcnow() + timedelta(days=7)
+        "iat": now,
+        "exp": now + TOKEN_LIFETIME
     }
     return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
 
+# Verified tokens are kept in an LRU (token -> user_id, exp, iat) so a session's repeat requests
+# skip signature verification; expiry is still checked on every hit. Revocations (single tokens
+# on logout, every earlier token of a user on block) are stored in revoked_tokens and synced by
+# each worker every TOKEN_REVOCATION_SYNC_SECONDS.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "50000"))
+TOKEN_REVOCATION_SYNC_SECONDS = int(os.environ.get("TOKEN_REVOCATION_SYNC_SECONDS", "30"))
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class TokenVerifier:
+    """Decoded-token LRU in front of jwt.decode, checked against the revocation list"""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        # {token: (user_id, exp, iat)}, least recently used first
+        self.entries: OrderedDict = OrderedDict()
+        # {token digest: exp} and {user_id: tokens issued before this timestamp are revoked}
+        self.revoked_tokens: Dict[str, float] = {}
+        self.revoked_users: Dict[str, float] = {}
+        self.synced_at: Optional[datetime] = None
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> str:
+        """User id of a valid token; raises jwt errors like jwt.decode"""
+        entry = self.entries.get(token)
+        if entry:
+            self.hits += 1
+            self.entries.move_to_end(token)
+        else:
+            self.misses += 1
+            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+            entry = (payload["user_id"], payload.get("exp", float("inf")), payload.get("iat", 0))
+            self.entries[token] = entry
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        
+        user_id, exp, iat = entry
+        if exp <= time.time():
+            self.entries.pop(token, None)
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        if self.is_revoked(token, user_id, iat):
+            raise jwt.InvalidTokenError("Token has been revoked")
+        return user_id
+
+    def is_revoked(self, token: str, user_id: str, iat: float) -> bool:
+        if user_id in self.revoked_users and iat < self.revoked_users[user_id]:
+            return True
+        return bool(self.revoked_tokens) and token_digest(token) in self.revoked_tokens
+
+    def apply_revocation(self, revocation: dict):
+        if revocation.get("digest"):
+            self.revoked_tokens[revocation["digest"]] = revocation["exp"]
+        elif revocation.get("user_id"):
+            self.revoked_users[revocation["user_id"]] = max(
+                revocation["revoked_before"], self.revoked_users.get(revocation["user_id"], 0)
+            )
+
+    async def revoke_token(self, token: str):
+        """Revoke one token (logout) until it would have expired anyway"""
+        user_id, exp, _ = self.entries.get(token) or (None, None, None)
+        if exp is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+            user_id, exp = payload["user_id"], payload.get("exp", time.time() + TOKEN_LIFETIME.total_seconds())
+        revocation = {
+            "digest": token_digest(token),
+            "user_id": user_id,
+            "exp": exp,
+            "created_at": datetime.utcnow(),
+            "expires_at": datetime.utcfromtimestamp(exp)
+        }
+        await revoked_tokens_collection.insert_one(revocation)
+        self.apply_revocation(revocation)
+
+    async def revoke_user_tokens(self, user_id: str):
+        """Revoke every token issued to a user so far"""
+        now = datetime.utcnow()
+        revocation = {
+            "user_id": user_id,
+            "revoked_before": time.time(),
+            "created_at": now,
+            "expires_at": now + TOKEN_LIFETIME
+        }
+        await revoked_tokens_collection.insert_one(revocation)
+        self.apply_revocation(revocation)
+
+    async def sync_revocations(self):
+        """Load revocations recorded since the last sync (by any worker)"""
+        query = {"created_at": {"$gte": self.synced_at}} if self.synced_at else {}
+        synced_at = datetime.utcnow()
+        async for revocation in revoked_tokens_collection.find(query, {"_id": 0}):
+            self.apply_revocation(revocation)
+        self.synced_at = synced_at - timedelta(seconds=1)
+        
+        # Revoked tokens past their expiry are rejected by the exp check anyway
+        now = time.time()
+        self.revoked_tokens = {digest: exp for digest, exp in self.revoked_tokens.items() if exp > now}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "revoked_tokens": len(self.revoked_tokens),
+            "revoked_users": len(self.revoked_users)
+        }
+
+token_verifier = TokenVerifier()
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
-        return payload["user_id"]
+        return token_verifier.verify(credentials.credentials)
     except:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# Authenticated principals are cached per user id for a short TTL, so authentication does not
+# read the users collection on every request. Writes to the cached fields (block, unblock, role,
+# password, profile) invalidate the entry; other workers pick the change up within the TTL.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "username": 1, "email": 1, "full_name": 1, "country": 1,
+    "avatar_url": 1, "admin_role": 1, "role": 1, "is_blocked": 1, "blocked_until": 1
+}
+
+class PrincipalCache:
+    """LRU of authenticated users by id, with TTL expiry and hit/miss counters"""
+
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS, max_size: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # {user_id: (expires_at, principal)}, least recently used first
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        entry = self.entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            self.entries.move_to_end(user_id)
+            return entry[1]
+        
+        self.misses += 1
+        principal = await users_collection.find_one({"id": user_id}, PRINCIPAL_PROJECTION)
+        if principal:
+            self.entries[user_id] = (time.monotonic() + self.ttl_seconds, principal)
+            self.entries.move_to_end(user_id)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.pop(user_id, None)
+        return principal
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Forget one user, or everyone when no id is given"""
+        self.invalidations += 1
+        if user_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+principal_cache = PrincipalCache()
+
 async def get_current_user(user_id: str = Depends(verify_token)) -> dict:
     """Get current user from token"""
-    user = users_collection.find_one({"id": user_id})
+    user = await principal_cache.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 def verify_admin_token(min_role: AdminRole = AdminRole.ADMIN):
-    def admin_check(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    async def admin_check(credentials: HTTPAuthorizationCredentials = Depends(security)):
         try:
-            payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
-            user_id = payload["user_id"]
+            user_id = token_verifier.verify(credentials.credentials)
             
             # Get user and check admin role
-            user = users_collection.find_one({"id": user_id})
+            user = await principal_cache.get(user_id)
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
             
@@ -1396,11 +1616,563 @@ def calculate_user_score(user_data):
     else:
         return base_score
 
+# =============================================================================
+# PUBLIC RESPONSE CACHE
+# =============================================================================
+
+# Public read-mostly endpoints (CMS content and theme, menu, site messages, leagues) keep their
+# rendered JSON body in memory for a per-route TTL, tagged with a strong ETag so a client that
+# revalidates with If-None-Match gets a bodiless 304. Admin writers invalidate their route here;
+# other workers pick the change up within the TTL. Override a TTL with RESPONSE_CACHE_TTL_<ROUTE>.
+RESPONSE_CACHE_TTLS = {
+    route: float(os.environ.get(f"RESPONSE_CACHE_TTL_{route.upper()}", default))
+    for route, default in {
+        "cms_content": "300",
+        "cms_theme": "300",
+        "menu_items": "300",
+        "site_messages": "30",
+        "national_leagues": "60",
+        "standings": "3600",
+        "sportsduel_leagues": "120",
+        "sportsduel_scoreboard": "5",
+    }.items()
+}
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "1000"))
+
+def response_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header (possibly a list, weak or "*") covers the etag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+def render_json_body(content) -> tuple:
+    """Serialize a response once into (body bytes, etag)"""
+    body = json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=chat_json_default).encode("utf-8")
+    return body, response_etag(body)
+
+def prerendered_response(request: Request, body: bytes, etag: str) -> Response:
+    """Write a pre-serialized JSON body, or a bodiless 304 when the client already holds it"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+class ResponseCache:
+    """LRU of rendered public responses keyed by (route, path), with per-route TTLs and invalidation"""
+
+    def __init__(self, ttls: Dict[str, float] = RESPONSE_CACHE_TTLS, max_size: int = RESPONSE_CACHE_SIZE):
+        self.ttls = ttls
+        self.max_size = max_size
+        # {(route, path): (expires_at, body, etag)}, least recently used first
+        self.entries: OrderedDict = OrderedDict()
+        # Renders in flight, so concurrent misses on one key share a single database read
+        self.pending: Dict[tuple, asyncio.Future] = {}
+        # Bumped on invalidation; a render that started before the bump is served but not stored
+        self.generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    async def render(self, build) -> tuple:
+        return render_json_body(await build())
+
+    async def load(self, route: str, path: str, build) -> tuple:
+        key = (route, path)
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+
+        pending = self.pending.get(key)
+        if pending:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        generation = self.generations.get(route, 0)
+        pending = self.pending[key] = asyncio.ensure_future(self.render(build))
+        try:
+            body, etag = await asyncio.shield(pending)
+        finally:
+            self.pending.pop(key, None)
+
+        if self.generations.get(route, 0) == generation:
+            self.entries[key] = (time.monotonic() + self.ttls[route], body, etag)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return body, etag
+
+    async def respond(self, request: Request, route: str, build) -> Response:
+        """Serve the cached body for this route and path, rendering it with build() on a miss"""
+        body, etag = await self.load(route, request.url.path, build)
+        response = prerendered_response(request, body, etag)
+        if response.status_code == 304:
+            self.not_modified += 1
+        return response
+
+    def invalidate(self, *routes: str):
+        """Drop the cached responses of the given routes, or of every route when none is given"""
+        self.invalidations += 1
+        routes = routes or tuple(self.ttls)
+        for route in routes:
+            self.generations[route] = self.generations.get(route, 0) + 1
+        for key in [key for key in self.entries if key[0] in routes]:
+            del self.entries[key]
+
+    def invalidate_paths(self, route: str, paths):
+        """Drop the cached responses of some paths of a route (e.g. one league's scoreboard)"""
+        self.invalidations += 1
+        self.generations[route] = self.generations.get(route, 0) + 1
+        for path in paths:
+            self.entries.pop((route, path), None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations
+        }
+
+response_cache = ResponseCache()
+
+# =============================================================================
+# LEADERBOARD SYSTEM HELPER FUNCTIONS
+# =============================================================================
+
+# Users carry a persisted "ranking_score" (the output of calculate_user_score)
+# backed by a descending index, so ranking pages are an indexed range read and
+# a single user's rank is an index count instead of a full-collection sort.
+# "id" breaks ties so that page boundaries are stable. The same sort prefixed
+# with "country" partitions the leaderboard per country.
+LEADERBOARD_SORT = [("ranking_score", -1), ("id", 1)]
+COUNTRY_LEADERBOARD_SORT = [("country", 1)] + LEADERBOARD_SORT
+LEADERBOARD_PROJECTION = {"password": 0, "_id": 0}
+
+# Per-country rollup of the betting totals shown by /api/stats/countries.
+# One document per country, keyed by the country code in "_id".
+COUNTRY_STATS_FIELDS = ["total_bets", "total_amount", "total_winnings"]
+
+async def backfill_ranking_scores() -> int:
+    """Populate ranking_score for users created before the leaderboard existed"""
+    updated = 0
+    async for user in users_collection.find({"ranking_score": {"$exists": False}}, {"password": 0}):
+        await users_collection.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"ranking_score": calculate_user_score(user)}}
+        )
+        updated += 1
+    return updated
+
+async def get_leaderboard_page(query: dict, limit: int, skip: int = 0) -> List[dict]:
+    """Read one leaderboard page in rank order straight from the score index"""
+    users = await (
+        users_collection.find(query, LEADERBOARD_PROJECTION)
+        .sort(LEADERBOARD_SORT)
+        .skip(skip)
+        .limit(limit)
+        .to_list(length=None)
+    )
+    
+    for position, user in enumerate(users):
+        user["score"] = user.pop("ranking_score", 0.0)
+        user["rank"] = skip + position + 1
+    
+    return users
+
+async def apply_country_stats_delta(country: Optional[str], user_data: dict, direction: int = 1):
+    """Add (direction=1) or remove (direction=-1) a user's totals from the country rollup"""
+    if not country:
+        return
+    
+    increments = {"total_users": direction}
+    for field in COUNTRY_STATS_FIELDS:
+        increments[field] = direction * (user_data.get(field, 0) or 0)
+    
+    await country_stats_collection.update_one(
+        {"_id": country},
+        {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def rebuild_country_stats() -> int:
+    """Recompute the country rollup from the users collection"""
+    pipeline = [
+        {"$group": {
+            "_id": "$country",
+            "total_users": {"$sum": 1},
+            "total_bets": {"$sum": "$total_bets"},
+            "total_amount": {"$sum": "$total_amount"},
+            "total_winnings": {"$sum": "$total_winnings"}
+        }}
+    ]
+    stats = await users_collection.aggregate(pipeline).to_list(length=None)
+    now = datetime.utcnow()
+    for entry in stats:
+        entry["updated_at"] = now
+    
+    await country_stats_collection.delete_many({})
+    if stats:
+        await country_stats_collection.insert_many(stats)
+    return len(stats)
+
+async def get_user_leaderboard_rank(user: dict, query: Optional[dict] = None) -> int:
+    """Rank of a user within the users matching query (1-based)"""
+    ranking_score = user.get("ranking_score", 0.0)
+    ahead_query = dict(query or {})
+    ahead_query["$or"] = [
+        {"ranking_score": {"$gt": ranking_score}},
+        {"ranking_score": ranking_score, "id": {"$lt": user["id"]}}
+    ]
+    return await users_collection.count_documents(ahead_query) + 1
+
+# =============================================================================
+# INDEX MANAGEMENT SYSTEM
+# =============================================================================
+
+# Indexes the API relies on, declared per collection name. Every hot path
+# filters on application ids ("id", "user_id", "tournament_id", ...) rather
+# than "_id", so each of those lookups needs a declared index here.
+# Index names follow MongoDB's default naming so existing indexes are matched.
+# Unique "id" indexes are sparse because legacy documents may lack the field.
+REQUIRED_INDEXES = {
+    "users": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("username", ASCENDING)], "unique": True},
+        {"keys": [("email", ASCENDING)]},
+        {"keys": [("user_id", ASCENDING)], "sparse": True},
+        {"keys": LEADERBOARD_SORT},
+        {"keys": COUNTRY_LEADERBOARD_SORT},
+        {"keys": [("score", DESCENDING)]},
+        {"keys": [("created_at", DESCENDING)]},
+    ],
+    "country_stats": [
+        {"keys": [("total_users", DESCENDING)]},
+    ],
+    "revoked_tokens": [
+        {"keys": [("created_at", ASCENDING)]},
+        {"keys": [("expires_at", ASCENDING)], "expire_after_seconds": 0},
+    ],
+    "competitions": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+    ],
+    "site_messages": [
+        {"keys": [("is_active", ASCENDING), ("expires_at", ASCENDING)]},
+    ],
+    "admin_actions": [
+        {"keys": [("timestamp", DESCENDING)]},
+    ],
+    "content_pages": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+    ],
+    "menu_items": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("is_active", ASCENDING), ("order", ASCENDING)]},
+    ],
+    "tournaments": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("status", ASCENDING)]},
+    ],
+    "tournament_participants": [
+        {"keys": [("tournament_id", ASCENDING), ("user_id", ASCENDING)], "unique": True},
+        {"keys": [("user_id", ASCENDING)]},
+        {"keys": [("joined_at", DESCENDING)]},
+    ],
+    "tournament_brackets": [
+        {"keys": [("tournament_id", ASCENDING)]},
+    ],
+    "tournament_matches": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("tournament_id", ASCENDING), ("round_number", ASCENDING), ("match_number", ASCENDING)]},
+    ],
+    "affiliates": [
+        {"keys": [("user_id", ASCENDING)], "unique": True},
+        {"keys": [("referral_code", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("total_earnings", DESCENDING)]},
+        {"keys": [("created_at", DESCENDING)]},
+    ],
+    "affiliate_applications": [
+        {"keys": [("status", ASCENDING)]},
+    ],
+    "referrals": [
+        {"keys": [("referred_user_id", ASCENDING), ("is_active", ASCENDING)]},
+        {"keys": [("affiliate_user_id", ASCENDING), ("registered_at", DESCENDING)]},
+        {"keys": [("referrer_id", ASCENDING)], "sparse": True},
+    ],
+    "commissions": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("affiliate_user_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"keys": [("referred_user_id", ASCENDING), ("commission_type", ASCENDING)]},
+        {"keys": [("referral_id", ASCENDING), ("tournament_id", ASCENDING)]},
+        {"keys": [("is_paid", ASCENDING)]},
+        {"keys": [("created_at", DESCENDING)]},
+    ],
+    "payouts": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("status", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+    "wallet_balances": [
+        {"keys": [("user_id", ASCENDING)], "unique": True},
+        {"keys": [("total_earned", DESCENDING)]},
+    ],
+    "transactions": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("idempotency_key", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]},
+        {"keys": [("created_at", DESCENDING)]},
+    ],
+    "wallet_monthly_rollups": [
+        {"keys": [("user_id", ASCENDING), ("month", DESCENDING)], "unique": True},
+    ],
+    "teams": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("name", ASCENDING)]},
+        {"keys": [("captain_id", ASCENDING)]},
+        {"keys": [("roster.members.id", ASCENDING)]},
+    ],
+    "team_members": [
+        {"keys": [("team_id", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("user_id", ASCENDING), ("status", ASCENDING)]},
+    ],
+    "team_invitations": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("team_id", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("invited_user_id", ASCENDING), ("status", ASCENDING)]},
+    ],
+    "guilds": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("name", ASCENDING)]},
+        {"keys": [("tag", ASCENDING)]},
+    ],
+    "guild_members": [
+        {"keys": [("guild_id", ASCENDING), ("user_id", ASCENDING)]},
+        {"keys": [("user_id", ASCENDING)]},
+    ],
+    "guild_invitations": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("user_id", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("guild_id", ASCENDING), ("user_id", ASCENDING), ("status", ASCENDING)]},
+    ],
+    "guild_wars": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("guild_1_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"keys": [("guild_2_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"keys": [("status", ASCENDING), ("start_time", ASCENDING)]},
+    ],
+    "guild_stats": [
+        {"keys": [("guild_id", ASCENDING)]},
+    ],
+    "guild_tournaments": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("guild_id", ASCENDING), ("created_at", DESCENDING)]},
+    ],
+    "national_leagues": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("country", ASCENDING), ("league_type", ASCENDING)]},
+    ],
+    "team_standings": [
+        {"keys": [("league_id", ASCENDING), ("position", ASCENDING)]},
+        {"keys": [("team_id", ASCENDING)]},
+    ],
+    "league_assignments": [
+        {"keys": [("team_id", ASCENDING)]},
+    ],
+    "match_fixtures": [
+        {"keys": [("league_id", ASCENDING), ("matchday", ASCENDING)]},
+    ],
+    "payments": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"keys": [("created_at", DESCENDING)]},
+    ],
+    "payment_sessions": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+    ],
+    "social_shares": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING)]},
+        {"keys": [("clicks", DESCENDING)]},
+    ],
+    "share_templates": [
+        {"keys": [("share_type", ASCENDING), ("platform", ASCENDING), ("is_active", ASCENDING)]},
+    ],
+    "share_stats": [
+        {"keys": [("user_id", ASCENDING)]},
+    ],
+    "viral_metrics": [
+        {"keys": [("share_id", ASCENDING)]},
+    ],
+    "friends": [
+        {"keys": [("user_id", ASCENDING), ("friend_id", ASCENDING)]},
+    ],
+    "friend_requests": [
+        {"keys": [("recipient_id", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("sender_id", ASCENDING), ("recipient_id", ASCENDING), ("status", ASCENDING)]},
+    ],
+    "cms_content": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("key", ASCENDING)]},
+        {"keys": [("is_active", ASCENDING)]},
+    ],
+    "cms_translations": [
+        {"keys": [("content_id", ASCENDING), ("language", ASCENDING)]},
+    ],
+    "cms_themes": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("is_active", ASCENDING)]},
+    ],
+    "sportsduel_leagues": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+    ],
+    "sportsduel_teams": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("league_id", ASCENDING)]},
+        {"keys": [("owner_user_id", ASCENDING)]},
+    ],
+    "sportsduel_players": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("user_id", ASCENDING)]},
+        {"keys": [("team_id", ASCENDING)]},
+    ],
+    "sportsduel_matches": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("league_id", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("time_slot_id", ASCENDING)]},
+        {"keys": [("player1_id", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("player2_id", ASCENDING), ("status", ASCENDING)]},
+    ],
+    "sportsduel_coupons": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("match_id", ASCENDING), ("player_id", ASCENDING)]},
+        {"keys": [("time_slot_id", ASCENDING)]},
+    ],
+    "sportsduel_bets": [
+        {"keys": [("coupon_id", ASCENDING), ("event_id", ASCENDING)]},
+    ],
+    "sportsduel_time_slots": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("match_day", ASCENDING), ("slot_name", ASCENDING)]},
+        {"keys": [("league_id", ASCENDING)]},
+    ],
+    "sportsduel_sports_events": [
+        {"keys": [("id", ASCENDING)], "unique": True, "sparse": True},
+        {"keys": [("time_slot_id", ASCENDING)]},
+    ],
+    "sportsduel_match_results": [
+        {"keys": [("match_id", ASCENDING)], "unique": True},
+    ],
+    "sportsduel_player_stats": [
+        {"keys": [("player_id", ASCENDING)], "unique": True},
+    ],
+    "sportsduel_rankings": [
+        {"keys": [("league_id", ASCENDING), ("entity_type", ASCENDING), ("window", ASCENDING), ("period", ASCENDING), ("entity_id", ASCENDING)], "unique": True},
+        {"keys": [("league_id", ASCENDING), ("entity_type", ASCENDING), ("window", ASCENDING), ("period", ASCENDING), ("points", DESCENDING), ("wins", DESCENDING), ("entity_id", ASCENDING)]},
+    ],
+    "chat_events": [
+        {"keys": [("created_at", ASCENDING)], "expire_after_seconds": CHAT_EVENT_TTL_SECONDS},
+    ],
+    "chat_room_memberships": [
+        {"keys": [("user_id", ASCENDING), ("room_id", ASCENDING)], "unique": True},
+        {"keys": [("room_id", ASCENDING)]},
+    ],
+    "chat_messages": [
+        {"keys": [("id", ASCENDING)], "unique": True},
+        {"keys": [("room_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)]},
+        {"keys": [("timestamp", ASCENDING)], "expire_after_seconds": CHAT_HISTORY_RETENTION_DAYS * 86400},
+    ],
+}
+
+def index_name(keys: list) -> str:
+    """MongoDB's default name for an index over keys"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+async def ensure_indexes() -> dict:
+    """Create every declared index; failures are reported instead of aborting startup"""
+    created = 0
+    failed = []
+    for collection_name, specs in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        for spec in specs:
+            options = {"name": index_name(spec["keys"])}
+            if spec.get("unique"):
+                options["unique"] = True
+            if spec.get("sparse"):
+                options["sparse"] = True
+            if "expire_after_seconds" in spec:
+                options["expireAfterSeconds"] = spec["expire_after_seconds"]
+            try:
+                await collection.create_index(spec["keys"], **options)
+                created += 1
+            except OperationFailure as e:
+                failed.append({
+                    "collection": collection_name,
+                    "index": options["name"],
+                    "error": str(e)
+                })
+    
+    for failure in failed:
+        print(f"❌ Error creating index {failure['collection']}.{failure['index']}: {failure['error']}")
+    
+    return {"ensured": created, "failed": failed}
+
+async def get_index_report() -> dict:
+    """Compare declared indexes with the live ones and report missing/unused indexes"""
+    collections = []
+    for collection_name, specs in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        declared = {index_name(spec["keys"]) for spec in specs}
+        present = set((await collection.index_information()).keys())
+        
+        # $indexStats needs a real server; usage is reported as unknown otherwise
+        usage = {}
+        try:
+            async for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = {
+                    "ops": stat["accesses"]["ops"],
+                    "since": stat["accesses"]["since"]
+                }
+        except Exception:
+            usage = None
+        
+        unused = []
+        if usage is not None:
+            unused = sorted(
+                name for name, stat in usage.items()
+                if name != "_id_" and stat["ops"] == 0
+            )
+        
+        collections.append({
+            "collection": collection_name,
+            "declared": sorted(declared),
+            "missing": sorted(declared - present),
+            "undeclared": sorted(present - declared - {"_id_"}),
+            "unused": unused,
+            "usage": usage
+        })
+    
+    return {
+        "collections": collections,
+        "total_missing": sum(len(entry["missing"]) for entry in collections),
+        "total_unused": sum(len(entry["unused"]) for entry in collections)
+    }
+
 # =============================================================================
 # AFFILIATE SYSTEM HELPER FUNCTIONS
 # =============================================================================
 
-def generate_referral_code(username: str, user_id: str) -> str:
+async def generate_referral_code(username: str, user_id: str) -> str:
     """Generate a unique referral code for user"""
     # Start with username (first 4 chars) + random string
     base_code = username[:4].upper()
@@ -1408,7 +2180,7 @@ def generate_referral_code(username: str, user_id: str) -> str:
     referral_code = f"{base_code}{random_suffix}"
     
     # Ensure uniqueness
-    while affiliates_collection.find_one({"referral_code": referral_code}):
+    while await affiliates_collection.find_one({"referral_code": referral_code}):
         random_suffix = str(uuid.uuid4())[:6].upper()
         referral_code = f"{base_code}{random_suffix}"
     
@@ -1419,14 +2191,33 @@ def generate_referral_link(referral_code: str) -> str:
     base_url = "https://49f63d92-acd8-4e16-a4be-50baa0fb091a.preview.emergentagent.com"
     return f"{base_url}/?ref={referral_code}"
 
-def process_referral_registration(referred_user_id: str, referral_code: str, registration_ip: str = None) -> bool:
+async def process_referral_registration(referred_user_id: str, referral_code: str, registration_ip: str = None) -> bool:
     """Process a new referral registration and award commission"""
     try:
         # Find the affiliate
-        affiliate = affiliates_collection.find_one({"referral_code": referral_code, "status": "active"})
+        affiliate = await affiliates_collection.find_one({"referral_code": referral_code, "status": "active"})
         if not affiliate:
             return False
         
+        # The ledger key names the business event, so a retried registration never pays twice
+        idempotency_key = f"commission:registration:{referred_user_id}"
+        
+        # A retry after the commission was recorded only finishes its ledger entry
+        commission = await commissions_collection.find_one(
+            {"referred_user_id": referred_user_id, "commission_type": "registration"}, {"_id": 0}
+        )
+        if commission:
+            return await commission_ledger.post(
+                user_id=commission["affiliate_user_id"],
+                transaction_type="commission_earned",
+                amount=commission["amount"],
+                description=commission["description"],
+                commission_id=commission["id"],
+                referral_id=commission["referral_id"],
+                commission_type="registration",
+                idempotency_key=idempotency_key
+            )
+        
         # Create referral record
         referral_id = str(uuid.uuid4())
         referral_data = {
@@ -1441,7 +2232,7 @@ def process_referral_registration(referred_user_id: str, referral_code: str, reg
             "tournaments_joined": 0,
             "total_tournament_fees": 0.0
         }
-        referrals_collection.insert_one(referral_data)
+        await referrals_collection.insert_one(referral_data)
         
         # Create registration commission
         commission_id = str(uuid.uuid4())
@@ -1458,20 +2249,22 @@ def process_referral_registration(referred_user_id: str, referral_code: str, reg
             "created_at": datetime.utcnow(),
             "description": f"Registration commission for new user referral"
         }
-        commissions_collection.insert_one(commission_data)
+        await commissions_collection.insert_one(commission_data)
         
         # Add transaction to wallet
-        add_transaction(
+        await commission_ledger.post(
             user_id=affiliate["user_id"],
             transaction_type="commission_earned",
             amount=commission_amount,
             description=f"Registration commission for new user referral",
             commission_id=commission_id,
-            referral_id=referral_id
+            referral_id=referral_id,
+            commission_type="registration",
+            idempotency_key=idempotency_key
         )
         
         # Update affiliate stats
-        affiliates_collection.update_one(
+        await affiliates_collection.update_one(
             {"user_id": affiliate["user_id"]},
             {
                 "$inc": {
@@ -1490,19 +2283,40 @@ def process_referral_registration(referred_user_id: str, referral_code: str, reg
         print(f"Error processing referral: {e}")
         return False
 
-def process_tournament_commission(user_id: str, tournament_id: str, entry_fee: float) -> bool:
+async def process_tournament_commission(user_id: str, tournament_id: str, entry_fee: float) -> bool:
     """Process tournament entry commission for referred users"""
     try:
         # Check if this user was referred by someone
-        referral = referrals_collection.find_one({"referred_user_id": user_id, "is_active": True})
+        referral = await referrals_collection.find_one({"referred_user_id": user_id, "is_active": True})
         if not referral:
             return False
         
         # Get affiliate
-        affiliate = affiliates_collection.find_one({"user_id": referral["affiliate_user_id"], "status": "active"})
+        affiliate = await affiliates_collection.find_one({"user_id": referral["affiliate_user_id"], "status": "active"})
         if not affiliate:
             return False
         
+        # The ledger key names the business event, so a retried entry never pays twice
+        idempotency_key = f"commission:{referral['id']}:{tournament_id}:tournament_entry"
+        
+        # A retry after the commission was recorded only finishes its ledger entry
+        commission = await commissions_collection.find_one(
+            {"referral_id": referral["id"], "tournament_id": tournament_id, "commission_type": "tournament_entry"},
+            {"_id": 0}
+        )
+        if commission:
+            return await commission_ledger.post(
+                user_id=commission["affiliate_user_id"],
+                transaction_type="commission_earned",
+                amount=commission["amount"],
+                description=commission["description"],
+                commission_id=commission["id"],
+                referral_id=referral["id"],
+                tournament_id=tournament_id,
+                commission_type="tournament_entry",
+                idempotency_key=idempotency_key
+            )
+        
         # Calculate commission
         commission_rate = affiliate.get("commission_rate_tournament", 0.1)  # 10%
         commission_amount = entry_fee * commission_rate
@@ -1522,21 +2336,23 @@ def process_tournament_commission(user_id: str, tournament_id: str, entry_fee: f
             "created_at": datetime.utcnow(),
             "description": f"Tournament entry commission (€{entry_fee} × {commission_rate*100}%)"
         }
-        commissions_collection.insert_one(commission_data)
+        await commissions_collection.insert_one(commission_data)
         
         # Add transaction to wallet
-        add_transaction(
+        await commission_ledger.post(
             user_id=affiliate["user_id"],
             transaction_type="commission_earned",
             amount=commission_amount,
             description=f"Tournament entry commission (€{entry_fee} × {commission_rate*100}%)",
             commission_id=commission_id,
             referral_id=referral["id"],
-            tournament_id=tournament_id
+            tournament_id=tournament_id,
+            commission_type="tournament_entry",
+            idempotency_key=idempotency_key
         )
         
         # Update affiliate stats
-        affiliates_collection.update_one(
+        await affiliates_collection.update_one(
             {"user_id": affiliate["user_id"]},
             {
                 "$inc": {
@@ -1548,7 +2364,7 @@ def process_tournament_commission(user_id: str, tournament_id: str, entry_fee: f
         )
         
         # Update referral stats
-        referrals_collection.update_one(
+        await referrals_collection.update_one(
             {"id": referral["id"]},
             {
                 "$inc": {
@@ -1566,19 +2382,19 @@ def process_tournament_commission(user_id: str, tournament_id: str, entry_fee: f
         print(f"Error processing tournament commission: {e}")
         return False
 
-def calculate_affiliate_stats(affiliate_user_id: str) -> dict:
+async def calculate_affiliate_stats(affiliate_user_id: str) -> dict:
     """Calculate comprehensive affiliate statistics"""
     try:
         # Get basic affiliate data
-        affiliate = affiliates_collection.find_one({"user_id": affiliate_user_id})
+        affiliate = await affiliates_collection.find_one({"user_id": affiliate_user_id})
         if not affiliate:
             return {}
         
         # Get referrals
-        referrals = list(referrals_collection.find({"affiliate_user_id": affiliate_user_id}))
+        referrals = await referrals_collection.find({"affiliate_user_id": affiliate_user_id}).to_list(length=None)
         
         # Get commissions
-        commissions = list(commissions_collection.find({"affiliate_user_id": affiliate_user_id}))
+        commissions = await commissions_collection.find({"affiliate_user_id": affiliate_user_id}).to_list(length=None)
         
         # This month stats
         current_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
@@ -1624,33 +2440,36 @@ def calculate_affiliate_stats(affiliate_user_id: str) -> dict:
 # WALLET SYSTEM HELPER FUNCTIONS
 # =============================================================================
 
-def get_or_create_wallet(user_id: str) -> dict:
+def new_wallet_document(user_id: str) -> dict:
+    """Default wallet document for a user without one"""
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "total_earned": 0.0,
+        "available_balance": 0.0,
+        "pending_balance": 0.0,
+        "withdrawn_balance": 0.0,
+        "registration_commissions": 0.0,
+        "tournament_commissions": 0.0,
+        "deposit_commissions": 0.0,
+        "bonus_earnings": 0.0,
+        "lifetime_withdrawals": 0.0,
+        "pending_withdrawal": 0.0,
+        "auto_payout_enabled": False,
+        "auto_payout_threshold": 100.0,
+        "preferred_payout_method": "bank_transfer",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+
+async def get_or_create_wallet(user_id: str) -> dict:
     """Get or create wallet balance for user"""
     try:
-        wallet = wallet_balances_collection.find_one({"user_id": user_id})
+        wallet = await wallet_balances_collection.find_one({"user_id": user_id}, {"applied_transaction_ids": 0})
         if not wallet:
             # Create new wallet
-            wallet_id = str(uuid.uuid4())
-            wallet_data = {
-                "id": wallet_id,
-                "user_id": user_id,
-                "total_earned": 0.0,
-                "available_balance": 0.0,
-                "pending_balance": 0.0,
-                "withdrawn_balance": 0.0,
-                "registration_commissions": 0.0,
-                "tournament_commissions": 0.0,
-                "deposit_commissions": 0.0,
-                "bonus_earnings": 0.0,
-                "lifetime_withdrawals": 0.0,
-                "pending_withdrawal": 0.0,
-                "auto_payout_enabled": False,
-                "auto_payout_threshold": 100.0,
-                "preferred_payout_method": "bank_transfer",
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            wallet_balances_collection.insert_one(wallet_data)
+            wallet_data = new_wallet_document(user_id)
+            await wallet_balances_collection.insert_one(wallet_data)
             return wallet_data
         
         # Clean wallet data for JSON serialization
@@ -1671,146 +2490,443 @@ def get_or_create_wallet(user_id: str) -> dict:
         print(f"Error getting/creating wallet: {e}")
         return {}
 
-def add_transaction(user_id: str, transaction_type: str, amount: float, description: str, 
+# Wallet fields moved by each transaction type, as (field, sign) pairs applied
+# to the transaction amount with a single atomic $inc
+LEDGER_EFFECTS = {
+    "commission_earned": [("available_balance", 1), ("total_earned", 1)],
+    "bonus": [("available_balance", 1), ("total_earned", 1), ("bonus_earnings", 1)],
+    "payout_requested": [("available_balance", -1), ("pending_withdrawal", 1)],
+    "payout_completed": [("lifetime_withdrawals", 1), ("withdrawn_balance", 1), ("pending_withdrawal", -1)],
+    "payout_failed": [("available_balance", 1), ("pending_withdrawal", -1)],
+    "manual_adjustment": [("available_balance", 1)],
+}
+
+COMMISSION_TYPE_WALLET_FIELDS = {
+    "registration": "registration_commissions",
+    "tournament_entry": "tournament_commissions",
+    "deposit": "deposit_commissions",
+}
+
+def ledger_increments(transaction_type: str, amount: float, commission_type: str = None) -> dict:
+    """Wallet $inc document for a ledger entry"""
+    increments = {field: sign * amount for field, sign in LEDGER_EFFECTS.get(transaction_type, [])}
+    
+    if transaction_type == "commission_earned" and commission_type in COMMISSION_TYPE_WALLET_FIELDS:
+        increments[COMMISSION_TYPE_WALLET_FIELDS[commission_type]] = amount
+    elif transaction_type == "manual_adjustment" and amount > 0:
+        increments["total_earned"] = amount
+    
+    return increments
+
+# Every wallet remembers the ids of the last ledger entries applied to it, so an
+# entry whose wallet write succeeded but whose bookkeeping did not can be retried
+# without applying it twice. Retries happen right after the failure, so a short
+# window is enough.
+WALLET_APPLIED_TRANSACTIONS = int(os.environ.get("WALLET_APPLIED_TRANSACTIONS", "200"))
+
+def ledger_wallet_filter(user_id: str, transaction_ids: List[str]) -> dict:
+    """Wallet filter that only matches while none of the entries has been applied"""
+    return {"user_id": user_id, "applied_transaction_ids": {"$nin": transaction_ids}}
+
+def ledger_wallet_update(user_id: str, increments: dict, transaction_type: str,
+                         transaction_ids: List[str] = None) -> dict:
+    """Upserting wallet update that applies the increments atomically"""
+    now = datetime.utcnow()
+    update_set = {"updated_at": now}
+    if transaction_type == "payout_completed":
+        update_set["last_payout_date"] = now
+    
+    # Fields being incremented cannot also be initialised on insert
+    set_on_insert = {
+        key: value for key, value in new_wallet_document(user_id).items()
+        if key not in increments and key not in update_set
+    }
+    
+    update = {"$set": update_set, "$setOnInsert": set_on_insert}
+    if increments:
+        update["$inc"] = increments
+    if transaction_ids:
+        update["$push"] = {"applied_transaction_ids": {
+            "$each": transaction_ids, "$slice": -WALLET_APPLIED_TRANSACTIONS
+        }}
+    return update
+
+def build_ledger_entry(user_id: str, transaction_type: str, amount: float, description: str,
+                       commission_id: str = None, payout_id: str = None, referral_id: str = None,
+                       tournament_id: str = None, metadata: dict = None, processed_by: str = None,
+                       admin_notes: str = None, commission_type: str = None,
+                       idempotency_key: str = None) -> dict:
+    """Transaction document for a ledger entry that has not been applied to the wallet yet"""
+    transaction_data = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "transaction_type": getattr(transaction_type, "value", transaction_type),
+        "amount": amount,
+        "currency": "EUR",
+        "commission_id": commission_id,
+        "commission_type": commission_type,
+        "payout_id": payout_id,
+        "referral_id": referral_id,
+        "tournament_id": tournament_id,
+        "balance_before": None,
+        "balance_after": None,
+        "description": description,
+        "metadata": metadata or {},
+        "processed_by": processed_by,
+        "admin_notes": admin_notes,
+        "is_processed": False,
+        "processed_at": None,
+        "created_at": datetime.utcnow()
+    }
+    # The unique index on idempotency_key is sparse, so only keyed entries carry the field
+    if idempotency_key:
+        transaction_data["idempotency_key"] = idempotency_key
+    return transaction_data
+
+def ledger_rollup_update(transaction: dict) -> tuple:
+    """Filter and $inc update adding a ledger entry to its user's monthly rollup bucket"""
+    month = transaction["created_at"].strftime("%Y-%m")
+    transaction_type = transaction["transaction_type"]
+    return (
+        {"user_id": transaction["user_id"], "month": month},
+        {
+            "$inc": {
+                f"types.{transaction_type}.amount": transaction["amount"],
+                f"types.{transaction_type}.count": 1
+            },
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+    )
+
+async def rebuild_wallet_rollups() -> int:
+    """Recompute every monthly rollup bucket from the transaction history"""
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+                "transaction_type": "$transaction_type"
+            },
+            "amount": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }}
+    ]
+    buckets: Dict[tuple, dict] = {}
+    async for group in transactions_collection.aggregate(pipeline):
+        key = (group["_id"]["user_id"], group["_id"]["month"])
+        buckets.setdefault(key, {})[group["_id"]["transaction_type"]] = {
+            "amount": group["amount"],
+            "count": group["count"]
+        }
+    
+    await wallet_rollups_collection.delete_many({})
+    if buckets:
+        await wallet_rollups_collection.insert_many([
+            {"user_id": user_id, "month": month, "types": types, "updated_at": datetime.utcnow()}
+            for (user_id, month), types in buckets.items()
+        ])
+    return len(buckets)
+
+def encode_transaction_cursor(transaction: dict) -> str:
+    """Opaque cursor pointing just after a transaction in newest-first order"""
+    return f"{transaction['created_at'].isoformat()}|{transaction['id']}"
+
+def transaction_cursor_query(cursor: str) -> dict:
+    """Query matching transactions older than the cursor in newest-first order"""
+    created_at, transaction_id = cursor.split("|", 1)
+    created_at = datetime.fromisoformat(created_at)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": transaction_id}}
+    ]}
+
+async def get_transactions_page(user_id: str, limit: int, cursor: str = None) -> tuple:
+    """Page of a user's transactions, newest first, and the cursor for the next page"""
+    query = {"user_id": user_id}
+    if cursor:
+        query.update(transaction_cursor_query(cursor))
+    
+    transactions = await transactions_collection.find(query, {"_id": 0}).sort(
+        [("created_at", DESCENDING), ("id", DESCENDING)]
+    ).limit(limit + 1).to_list(length=None)
+    
+    next_cursor = encode_transaction_cursor(transactions[limit - 1]) if len(transactions) > limit else None
+    return transactions[:limit], next_cursor
+
+async def apply_ledger_entry(transaction_data: dict) -> None:
+    """Apply a recorded ledger entry to its wallet and mark it processed.
+    
+    Safe to call again for an entry whose earlier attempt failed part way: the
+    wallet is only incremented when it has not seen the entry id yet, and the
+    rollup only counts the entry once it flips from unprocessed to processed.
+    """
+    user_id = transaction_data["user_id"]
+    transaction_type = transaction_data["transaction_type"]
+    increments = ledger_increments(transaction_type, transaction_data["amount"], transaction_data["commission_type"])
+    wallet_filter = ledger_wallet_filter(user_id, [transaction_data["id"]])
+    wallet_update = ledger_wallet_update(user_id, increments, transaction_type, [transaction_data["id"]])
+    try:
+        wallet = await wallet_balances_collection.find_one_and_update(
+            wallet_filter, wallet_update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # The filter missed a wallet that exists now: either an earlier attempt applied this
+        # entry, or a concurrent posting created the wallet first and it still needs applying
+        wallet = await wallet_balances_collection.find_one_and_update(
+            wallet_filter, wallet_update, return_document=ReturnDocument.AFTER
+        )
+    applied = wallet is not None
+    if not applied:
+        wallet = await wallet_balances_collection.find_one({"user_id": user_id})
+    
+    balance_after = wallet.get("available_balance", 0.0)
+    balance_fields = {"balance_after": balance_after}
+    if applied:
+        balance_fields["balance_before"] = balance_after - increments.get("available_balance", 0.0)
+    result = await transactions_collection.update_one(
+        {"id": transaction_data["id"], "is_processed": False},
+        {"$set": {**balance_fields, "is_processed": True, "processed_at": datetime.utcnow()}}
+    )
+    
+    if result.modified_count:
+        await wallet_rollups_collection.update_one(*ledger_rollup_update(transaction_data), upsert=True)
+        mark_financial_overview_stale()
+
+async def add_transaction(user_id: str, transaction_type: str, amount: float, description: str, 
                    commission_id: str = None, payout_id: str = None, referral_id: str = None,
                    tournament_id: str = None, metadata: dict = None, processed_by: str = None,
-                   admin_notes: str = None) -> bool:
-    """Add a transaction and update wallet balance"""
-    try:
-        # Get current wallet
-        wallet = get_or_create_wallet(user_id)
-        
-        # Calculate new balance
-        balance_before = wallet.get("available_balance", 0.0)
-        
-        if transaction_type in ["commission_earned", "bonus", "manual_adjustment"]:
-            balance_after = balance_before + amount
-        elif transaction_type in ["payout_requested", "payout_completed", "penalty", "tournament_entry"]:
-            balance_after = balance_before - amount
-        else:
-            balance_after = balance_before
-        
-        # Create transaction record
-        transaction_id = str(uuid.uuid4())
-        transaction_data = {
-            "id": transaction_id,
-            "user_id": user_id,
-            "transaction_type": transaction_type,
-            "amount": amount,
-            "currency": "EUR",
-            "commission_id": commission_id,
-            "payout_id": payout_id,
-            "referral_id": referral_id,
-            "tournament_id": tournament_id,
-            "balance_before": balance_before,
-            "balance_after": balance_after,
-            "description": description,
-            "metadata": metadata or {},
-            "processed_by": processed_by,
-            "admin_notes": admin_notes,
-            "is_processed": True,
-            "processed_at": datetime.utcnow(),
-            "created_at": datetime.utcnow()
-        }
-        transactions_collection.insert_one(transaction_data)
-        
-        # Update wallet balance
-        update_data = {"updated_at": datetime.utcnow()}
-        
-        if transaction_type == "commission_earned":
-            update_data.update({
-                "available_balance": balance_after,
-                "total_earned": wallet.get("total_earned", 0.0) + amount,
-            })
-            
-            # Update commission type breakdown
-            if commission_id:
-                commission = commissions_collection.find_one({"id": commission_id})
-                if commission and commission.get("commission_type") == "registration":
-                    update_data["registration_commissions"] = wallet.get("registration_commissions", 0.0) + amount
-                elif commission and commission.get("commission_type") == "tournament_entry":
-                    update_data["tournament_commissions"] = wallet.get("tournament_commissions", 0.0) + amount
-                elif commission and commission.get("commission_type") == "deposit":
-                    update_data["deposit_commissions"] = wallet.get("deposit_commissions", 0.0) + amount
-        
-        elif transaction_type == "bonus":
-            update_data.update({
-                "available_balance": balance_after,
-                "total_earned": wallet.get("total_earned", 0.0) + amount,
-                "bonus_earnings": wallet.get("bonus_earnings", 0.0) + amount
-            })
-        
-        elif transaction_type == "payout_requested":
-            update_data.update({
-                "available_balance": balance_after,
-                "pending_withdrawal": wallet.get("pending_withdrawal", 0.0) + amount
-            })
-        
-        elif transaction_type == "payout_completed":
-            update_data.update({
-                "lifetime_withdrawals": wallet.get("lifetime_withdrawals", 0.0) + amount,
-                "withdrawn_balance": wallet.get("withdrawn_balance", 0.0) + amount,
-                "pending_withdrawal": max(0, wallet.get("pending_withdrawal", 0.0) - amount),
-                "last_payout_date": datetime.utcnow()
-            })
-        
-        elif transaction_type == "payout_failed":
-            # Return money to available balance
-            update_data.update({
-                "available_balance": balance_after + amount,  # Add back the amount
-                "pending_withdrawal": max(0, wallet.get("pending_withdrawal", 0.0) - amount)
-            })
-        
-        elif transaction_type == "manual_adjustment":
-            update_data.update({
-                "available_balance": balance_after,
-                "total_earned": wallet.get("total_earned", 0.0) + amount if amount > 0 else wallet.get("total_earned", 0.0)
-            })
-        
-        wallet_balances_collection.update_one(
-            {"user_id": user_id},
-            {"$set": update_data}
+                   admin_notes: str = None, commission_type: str = None,
+                   idempotency_key: str = None) -> bool:
+    """Add a transaction and update wallet balance.
+    
+    The balance change is applied with an atomic $inc, so concurrent postings never
+    overwrite each other. Entries with an idempotency key are applied at most once;
+    replaying one returns True without touching the wallet, unless the earlier
+    attempt failed before the entry was processed, in which case it is finished.
+    """
+    try:
+        # Commission type is only looked up when the caller did not pass it
+        if transaction_type == "commission_earned" and commission_id and not commission_type:
+            commission = await commissions_collection.find_one({"id": commission_id}, {"commission_type": 1})
+            commission_type = commission.get("commission_type") if commission else None
+        
+        transaction_data = build_ledger_entry(
+            user_id, transaction_type, amount, description,
+            commission_id=commission_id, payout_id=payout_id, referral_id=referral_id,
+            tournament_id=tournament_id, metadata=metadata, processed_by=processed_by,
+            admin_notes=admin_notes, commission_type=commission_type, idempotency_key=idempotency_key
         )
         
+        # Record the entry first so a replayed idempotency key never reaches the wallet twice
+        try:
+            await transactions_collection.insert_one(transaction_data)
+        except DuplicateKeyError:
+            transaction_data = await transactions_collection.find_one(
+                {"idempotency_key": idempotency_key}, {"_id": 0}
+            )
+            if not transaction_data or transaction_data.get("is_processed"):
+                return True
+        
+        await apply_ledger_entry(transaction_data)
         return True
         
     except Exception as e:
         print(f"Error adding transaction: {e}")
         return False
 
-def calculate_wallet_stats(user_id: str) -> dict:
-    """Calculate comprehensive wallet statistics"""
+async def post_ledger_entries(entries: List[dict]) -> dict:
+    """Post many ledger entries with one insert and one bulk wallet write.
+    
+    Each entry takes the keyword arguments of add_transaction. Entries whose
+    idempotency key was already posted are skipped, except that an earlier
+    posting which never got processed is finished through apply_ledger_entry.
+    """
+    documents = [build_ledger_entry(**entry) for entry in entries]
+    if not documents:
+        return {"posted": 0, "duplicates": 0}
+    
+    posted = documents
     try:
-        wallet = get_or_create_wallet(user_id)
-        transactions = list(transactions_collection.find(
-            {"user_id": user_id}
-        ).sort("created_at", -1))
+        await transactions_collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in write_errors):
+            raise
+        duplicate_indexes = {error["index"] for error in write_errors}
+        posted = [document for index, document in enumerate(documents) if index not in duplicate_indexes]
         
-        # Convert ObjectId to string in transactions
-        for transaction in transactions:
-            if "_id" in transaction:
-                transaction["_id"] = str(transaction["_id"])
+        # Keys repeated within this batch point at entries posted below, not at earlier attempts
+        duplicate_keys = [documents[index]["idempotency_key"] for index in duplicate_indexes]
+        async for unprocessed in transactions_collection.find(
+            {
+                "idempotency_key": {"$in": duplicate_keys},
+                "id": {"$nin": [document["id"] for document in posted]},
+                "is_processed": False
+            },
+            {"_id": 0}
+        ):
+            await apply_ledger_entry(unprocessed)
+    
+    # Sum the increments per wallet so each wallet is written once
+    wallet_increments: Dict[str, dict] = {}
+    wallet_types: Dict[str, str] = {}
+    wallet_transaction_ids: Dict[str, List[str]] = {}
+    bulk_entries = []
+    for document in posted:
+        increments = ledger_increments(document["transaction_type"], document["amount"], document["commission_type"])
+        bulk_entries.append((document, increments))
+        wallet_transaction_ids.setdefault(document["user_id"], []).append(document["id"])
+        
+        totals = wallet_increments.setdefault(document["user_id"], {})
+        for field, value in increments.items():
+            totals[field] = totals.get(field, 0.0) + value
+        if document["transaction_type"] == "payout_completed" or document["user_id"] not in wallet_types:
+            wallet_types[document["user_id"]] = document["transaction_type"]
+    
+    if wallet_increments:
+        wallet_user_ids = list(wallet_increments)
+        try:
+            await wallet_balances_collection.bulk_write([
+                UpdateOne(
+                    ledger_wallet_filter(wallet_user_id, wallet_transaction_ids[wallet_user_id]),
+                    ledger_wallet_update(
+                        wallet_user_id, wallet_increments[wallet_user_id], wallet_types[wallet_user_id],
+                        wallet_transaction_ids[wallet_user_id]
+                    ),
+                    upsert=True
+                )
+                for wallet_user_id in wallet_user_ids
+            ], ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in write_errors):
+                raise
+            # A concurrent posting created these wallets (or applied one of their entries) after
+            # the filter was evaluated, so their entries are applied one at a time instead
+            retry_user_ids = {wallet_user_ids[error["index"]] for error in write_errors}
+            for document, increments in bulk_entries:
+                if document["user_id"] in retry_user_ids:
+                    await apply_ledger_entry(document)
+            bulk_entries = [
+                (document, increments) for document, increments in bulk_entries
+                if document["user_id"] not in retry_user_ids
+            ]
+            for user_id in retry_user_ids:
+                del wallet_increments[user_id]
+    
+    if wallet_increments:
+        # Walk each wallet's final balance back through its entries to record running balances
+        running_balances = {
+            wallet["user_id"]: wallet.get("available_balance", 0.0)
+            async for wallet in wallet_balances_collection.find(
+                {"user_id": {"$in": list(wallet_increments)}},
+                {"_id": 0, "user_id": 1, "available_balance": 1}
+            )
+        }
+        processed_at = datetime.utcnow()
+        transaction_updates = []
+        for document, increments in reversed(bulk_entries):
+            balance_after = running_balances.get(document["user_id"], 0.0)
+            balance_before = balance_after - increments.get("available_balance", 0.0)
+            running_balances[document["user_id"]] = balance_before
+            transaction_updates.append(UpdateOne(
+                {"id": document["id"]},
+                {"$set": {
+                    "balance_before": balance_before,
+                    "balance_after": balance_after,
+                    "is_processed": True,
+                    "processed_at": processed_at
+                }}
+            ))
+        await transactions_collection.bulk_write(transaction_updates, ordered=False)
+        
+        await wallet_rollups_collection.bulk_write([
+            UpdateOne(*ledger_rollup_update(document), upsert=True) for document, increments in bulk_entries
+        ], ordered=False)
+        mark_financial_overview_stale()
+    
+    return {"posted": len(posted), "duplicates": len(documents) - len(posted)}
+
+# Commission postings arriving within this window, such as the joins when a big
+# tournament opens, are posted together with one bulk ledger write instead of
+# one wallet write each. A full batch is posted right away.
+LEDGER_BATCH_SECONDS = float(os.environ.get("LEDGER_BATCH_SECONDS", "0.05"))
+LEDGER_BATCH_SIZE = int(os.environ.get("LEDGER_BATCH_SIZE", "500"))
+
+class LedgerBatcher:
+    """Coalesces concurrent ledger postings into post_ledger_entries calls"""
+    
+    def __init__(self):
+        # Entries waiting for the next flush, each with the future its caller awaits
+        self.pending: List[tuple] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        # Whether a flush is scheduled for the entries in pending. Cleared when a flush takes
+        # the batch, so entries arriving while that flush is still writing get their own
+        self.flush_scheduled = False
+    
+    async def post(self, **entry) -> bool:
+        """Queue an entry (add_transaction keyword arguments) and wait until it is posted"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((entry, future))
+        if len(self.pending) >= LEDGER_BATCH_SIZE:
+            await self.flush()
+        elif not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.flush_task = asyncio.get_running_loop().create_task(self.flush_after_window())
+        return await future
+    
+    async def flush_after_window(self):
+        await asyncio.sleep(LEDGER_BATCH_SECONDS)
+        await self.flush()
+    
+    async def flush(self):
+        batch, self.pending = self.pending, []
+        self.flush_scheduled = False
+        if not batch:
+            return
+        try:
+            await post_ledger_entries([entry for entry, future in batch])
+            success = True
+        except Exception as e:
+            print(f"Error posting ledger batch: {e}")
+            success = False
+        for entry, future in batch:
+            if not future.done():
+                future.set_result(success)
+
+commission_ledger = LedgerBatcher()
+
+async def calculate_wallet_stats(user_id: str) -> dict:
+    """Calculate comprehensive wallet statistics.
+    
+    Reads the wallet, the user's monthly rollup buckets and one page of recent
+    transactions, so the cost does not grow with the transaction history.
+    """
+    try:
+        wallet = await get_or_create_wallet(user_id)
+        recent_transactions, next_cursor = await get_transactions_page(user_id, 20)
+        
+        rollups = {
+            rollup["month"]: rollup.get("types", {})
+            async for rollup in wallet_rollups_collection.find({"user_id": user_id})
+        }
+        
+        def rollup_total(types: dict, transaction_type: str, key: str):
+            return types.get(transaction_type, {}).get(key, 0)
         
         # Monthly earnings (last 12 months)
         monthly_earnings = []
-        now = datetime.utcnow()
+        month_start = datetime.utcnow().replace(day=1)
         for i in range(12):
-            month_start = (now.replace(day=1) - timedelta(days=i*30))
-            month_end = month_start.replace(day=28) + timedelta(days=4)
-            month_end = month_end - timedelta(days=month_end.day)
-            
-            month_transactions = [
-                t for t in transactions 
-                if month_start <= t["created_at"] <= month_end and 
-                t["transaction_type"] in ["commission_earned", "bonus"]
-            ]
-            month_total = sum([t["amount"] for t in month_transactions])
+            month = month_start.strftime("%Y-%m")
+            types = rollups.get(month, {})
             
             monthly_earnings.append({
-                "month": month_start.strftime("%Y-%m"),
-                "earnings": month_total,
-                "transactions": len(month_transactions)
+                "month": month,
+                "earnings": sum(rollup_total(types, t, "amount") for t in ["commission_earned", "bonus"]),
+                "transactions": sum(rollup_total(types, t, "count") for t in ["commission_earned", "bonus"])
             })
+            month_start = (month_start - timedelta(days=1)).replace(day=1)
         
         # Commission breakdown
         commission_breakdown = {
@@ -1821,20 +2937,20 @@ def calculate_wallet_stats(user_id: str) -> dict:
         }
         
         # Payout summary
-        completed_payouts = [t for t in transactions if t["transaction_type"] == "payout_completed"]
-        pending_payouts = [t for t in transactions if t["transaction_type"] == "payout_requested"]
+        completed_payouts = sum(rollup_total(types, "payout_completed", "count") for types in rollups.values())
         
         payout_summary = {
             "total_withdrawn": wallet.get("lifetime_withdrawals", 0.0),
             "pending_withdrawal": wallet.get("pending_withdrawal", 0.0),
-            "total_payouts": len(completed_payouts),
+            "total_payouts": completed_payouts,
             "last_payout": wallet.get("last_payout_date"),
             "next_auto_payout": wallet.get("available_balance", 0.0) >= wallet.get("auto_payout_threshold", 100.0)
         }
         
         # Performance metrics
-        total_commissions = len([t for t in transactions if t["transaction_type"] == "commission_earned"])
-        avg_commission = sum([t["amount"] for t in transactions if t["transaction_type"] == "commission_earned"]) / max(1, total_commissions)
+        total_commissions = sum(rollup_total(types, "commission_earned", "count") for types in rollups.values())
+        commission_amount = sum(rollup_total(types, "commission_earned", "amount") for types in rollups.values())
+        avg_commission = commission_amount / max(1, total_commissions)
         
         performance_metrics = {
             "total_commissions": total_commissions,
@@ -1846,7 +2962,8 @@ def calculate_wallet_stats(user_id: str) -> dict:
         
         return {
             "balance": wallet,
-            "recent_transactions": transactions[:20],
+            "recent_transactions": recent_transactions,
+            "next_cursor": next_cursor,
             "monthly_earnings": monthly_earnings,
             "commission_breakdown": commission_breakdown,
             "payout_summary": payout_summary,
@@ -1857,70 +2974,76 @@ def calculate_wallet_stats(user_id: str) -> dict:
         print(f"Error calculating wallet stats: {e}")
         return {}
 
-def calculate_admin_financial_overview() -> dict:
+async def sum_collection_field(collection, query: dict, field: str = "amount") -> float:
+    """Server-side sum of a numeric field over the documents matching a query"""
+    result = await collection.aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "total": {"$sum": f"${field}"}}}
+    ]).to_list(length=None)
+    return result[0]["total"] if result else 0.0
+
+async def get_users_by_ids(user_ids: List[str]) -> Dict[str, dict]:
+    """Resolve many users by id with a single $in query"""
+    return {
+        user["id"]: user
+        async for user in users_collection.find(
+            {"id": {"$in": list(set(user_ids))}},
+            {"_id": 0, "id": 1, "username": 1, "full_name": 1}
+        )
+    }
+
+async def calculate_admin_financial_overview() -> dict:
     """Calculate comprehensive financial overview for admins"""
     try:
         # Basic affiliate stats
-        total_affiliates = affiliates_collection.count_documents({})
-        active_affiliates = affiliates_collection.count_documents({"status": "active"})
+        total_affiliates = await affiliates_collection.count_documents({})
+        active_affiliates = await affiliates_collection.count_documents({"status": "active"})
         
         # Pending payouts
-        pending_payouts = list(payouts_collection.find({"status": "pending"}))
-        # Convert ObjectId to string
-        for payout in pending_payouts:
-            if "_id" in payout:
-                payout["_id"] = str(payout["_id"])
-        
-        total_pending_payouts = sum([p["amount"] for p in pending_payouts])
+        pending_payouts = await payouts_collection.find({"status": "pending"}, {"_id": 0}).to_list(length=None)
+        total_pending_payouts = await sum_collection_field(payouts_collection, {"status": "pending"})
         
         # Total commissions owed (all unpaid commissions)
-        unpaid_commissions = list(commissions_collection.find({"is_paid": False}))
-        # Convert ObjectId to string
-        for commission in unpaid_commissions:
-            if "_id" in commission:
-                commission["_id"] = str(commission["_id"])
-        
-        total_commissions_owed = sum([c["amount"] for c in unpaid_commissions])
+        total_commissions_owed = await sum_collection_field(commissions_collection, {"is_paid": False})
         
         # Monthly commission costs
         current_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_commissions = list(commissions_collection.find({
-            "created_at": {"$gte": current_month_start}
-        }))
-        # Convert ObjectId to string
-        for commission in monthly_commissions:
-            if "_id" in commission:
-                commission["_id"] = str(commission["_id"])
-        
-        monthly_commission_costs = sum([c["amount"] for c in monthly_commissions])
+        monthly_commission_costs = await sum_collection_field(
+            commissions_collection, {"created_at": {"$gte": current_month_start}}
+        )
         
         # Platform revenue (this would be calculated based on tournament entries, deposits, etc.)
         # For now, let's estimate based on tournament entries
-        monthly_tournaments = list(tournament_participants_collection.find({
+        monthly_tournament_entries = await tournament_participants_collection.count_documents({
             "joined_at": {"$gte": current_month_start}
-        }))
-        # Convert ObjectId to string
-        for tournament in monthly_tournaments:
-            if "_id" in tournament:
-                tournament["_id"] = str(tournament["_id"])
+        })
         
-        estimated_revenue = len(monthly_tournaments) * 10  # Estimate €10 average per entry
+        estimated_revenue = monthly_tournament_entries * 10  # Estimate €10 average per entry
         
         # Affiliate conversion rate
-        total_referrals = referrals_collection.count_documents({})
-        active_referrals = referrals_collection.count_documents({"is_active": True})
+        total_referrals = await referrals_collection.count_documents({})
+        active_referrals = await referrals_collection.count_documents({"is_active": True})
         affiliate_conversion_rate = (active_referrals / max(1, total_referrals)) * 100
         
         # Top affiliates
-        top_affiliates_data = list(affiliates_collection.find({}).sort("total_earnings", -1).limit(10))
-        # Convert ObjectId to string
-        for affiliate in top_affiliates_data:
-            if "_id" in affiliate:
-                affiliate["_id"] = str(affiliate["_id"])
+        top_affiliates_data = await affiliates_collection.find({}, {"_id": 0}).sort("total_earnings", -1).limit(10).to_list(length=None)
+        
+        # Recent transactions (all users)
+        recent_transactions = await transactions_collection.find({}, {"_id": 0}).sort("created_at", -1).limit(20).to_list(length=None)
+        
+        # Resolve every username shown in the overview with one query
+        users_by_id = await get_users_by_ids(
+            [payout["affiliate_user_id"] for payout in pending_payouts]
+            + [affiliate["user_id"] for affiliate in top_affiliates_data]
+            + [transaction["user_id"] for transaction in recent_transactions]
+        )
+        
+        for payout in pending_payouts:
+            payout["username"] = users_by_id.get(payout["affiliate_user_id"], {}).get("username", "Unknown")
         
         top_affiliates = []
         for affiliate in top_affiliates_data:
-            user = users_collection.find_one({"id": affiliate["user_id"]})
+            user = users_by_id.get(affiliate["user_id"])
             if user:
                 top_affiliates.append({
                     "user_id": affiliate["user_id"],
@@ -1931,15 +3054,8 @@ def calculate_admin_financial_overview() -> dict:
                     "status": affiliate["status"]
                 })
         
-        # Recent transactions (all users)
-        recent_transactions = list(transactions_collection.find({}).sort("created_at", -1).limit(20))
-        # Convert ObjectId to string
-        for transaction in recent_transactions:
-            if "_id" in transaction:
-                transaction["_id"] = str(transaction["_id"])
-        
         for transaction in recent_transactions:
-            user = users_collection.find_one({"id": transaction["user_id"]})
+            user = users_by_id.get(transaction["user_id"])
             if user:
                 transaction["username"] = user["username"]
         
@@ -1952,7 +3068,7 @@ def calculate_admin_financial_overview() -> dict:
             "estimated_monthly_revenue": estimated_revenue,
             "monthly_commission_costs": monthly_commission_costs,
             "profit_margin": profit_margin,
-            "cost_per_acquisition": monthly_commission_costs / max(1, len(monthly_tournaments)),
+            "cost_per_acquisition": monthly_commission_costs / max(1, monthly_tournament_entries),
             "roi_percentage": ((estimated_revenue - monthly_commission_costs) / max(1, monthly_commission_costs)) * 100
         }
         
@@ -1965,12 +3081,7 @@ def calculate_admin_financial_overview() -> dict:
             "platform_revenue": estimated_revenue,
             "affiliate_conversion_rate": affiliate_conversion_rate,
             "top_affiliates": top_affiliates,
-            "pending_payouts": [
-                {
-                    **p,
-                    "username": users_collection.find_one({"id": p["affiliate_user_id"]}, {"username": 1, "_id": 0}).get("username", "Unknown") if users_collection.find_one({"id": p["affiliate_user_id"]}) else "Unknown"
-                } for p in pending_payouts
-            ],
+            "pending_payouts": pending_payouts,
             "recent_transactions": recent_transactions,
             "financial_summary": financial_summary
         }
@@ -1979,6 +3090,92 @@ def calculate_admin_financial_overview() -> dict:
         print(f"Error calculating admin financial overview: {e}")
         return {}
 
+# Cached admin financial overview. A background task recomputes it on a fixed
+# interval, and ledger postings mark it stale so the next read refreshes it.
+FINANCIAL_OVERVIEW_REFRESH_SECONDS = int(os.environ.get("FINANCIAL_OVERVIEW_REFRESH_SECONDS", "60"))
+
+# generation counts stale marks; a refresh only clears stale when none arrived while it ran
+financial_overview_snapshot = {"overview": None, "computed_at": None, "stale": True, "generation": 0}
+financial_overview_lock = asyncio.Lock()
+financial_overview_task: Optional[asyncio.Task] = None
+
+async def refresh_financial_overview_snapshot() -> None:
+    """Recompute the cached financial overview"""
+    async with financial_overview_lock:
+        generation = financial_overview_snapshot["generation"]
+        overview = await calculate_admin_financial_overview()
+        if overview:
+            financial_overview_snapshot.update({
+                "overview": overview,
+                "computed_at": datetime.utcnow(),
+                # A ledger event during the computation may be missing from it
+                "stale": financial_overview_snapshot["generation"] != generation
+            })
+
+def mark_financial_overview_stale() -> None:
+    """Flag the cached financial overview for refresh after a ledger event"""
+    financial_overview_snapshot["generation"] += 1
+    financial_overview_snapshot["stale"] = True
+
+async def get_financial_overview_snapshot(force_refresh: bool = False) -> dict:
+    """Cached financial overview with its freshness timestamp.
+    
+    A stale snapshot is served immediately while a refresh runs in the background;
+    only the very first read, or a forced one, waits for the computation.
+    """
+    if force_refresh or financial_overview_snapshot["overview"] is None:
+        await refresh_financial_overview_snapshot()
+    elif financial_overview_snapshot["stale"] and not financial_overview_lock.locked():
+        asyncio.create_task(refresh_financial_overview_snapshot())
+    
+    computed_at = financial_overview_snapshot["computed_at"]
+    return {
+        **(financial_overview_snapshot["overview"] or {}),
+        "snapshot_computed_at": computed_at.isoformat() if computed_at else None,
+        "snapshot_age_seconds": (datetime.utcnow() - computed_at).total_seconds() if computed_at else None,
+        "snapshot_stale": financial_overview_snapshot["stale"]
+    }
+
+async def financial_overview_refresher() -> None:
+    """Background loop that keeps the financial overview snapshot warm"""
+    while True:
+        try:
+            await refresh_financial_overview_snapshot()
+        except Exception as e:
+            print(f"Error refreshing financial overview: {e}")
+        await asyncio.sleep(FINANCIAL_OVERVIEW_REFRESH_SECONDS)
+
+@app.on_event("startup")
+async def start_financial_overview_refresher():
+    global financial_overview_task
+    financial_overview_task = asyncio.create_task(financial_overview_refresher())
+
+@app.on_event("shutdown")
+async def stop_financial_overview_refresher():
+    if financial_overview_task:
+        financial_overview_task.cancel()
+
+token_revocation_task: Optional[asyncio.Task] = None
+
+async def token_revocation_syncer() -> None:
+    """Pick up tokens revoked by other workers"""
+    while True:
+        try:
+            await token_verifier.sync_revocations()
+        except Exception as e:
+            print(f"Error syncing token revocations: {e}")
+        await asyncio.sleep(TOKEN_REVOCATION_SYNC_SECONDS)
+
+@app.on_event("startup")
+async def start_token_revocation_syncer():
+    global token_revocation_task
+    token_revocation_task = asyncio.create_task(token_revocation_syncer())
+
+@app.on_event("shutdown")
+async def stop_token_revocation_syncer():
+    if token_revocation_task:
+        token_revocation_task.cancel()
+
 # =============================================================================
 # SPORTSDUEL SYSTEM HELPER FUNCTIONS
 # =============================================================================
@@ -2040,54 +3237,109 @@ def calculate_sportsduel_match_winner(player1_coupon: dict, player2_coupon: dict
         print(f"Error calculating match winner: {e}")
         return {"winner_player_id": None, "win_reason": "error"}
 
-def evaluate_sportsduel_coupon(coupon_id: str, sports_events_results: dict) -> dict:
+async def load_sportsduel_match_context(matches: List[dict], with_coupons: bool = False) -> tuple:
+    """Teams, players and (optionally) coupons referenced by matches, by id, with one $in query each"""
+    team_ids = {match[field] for match in matches for field in ("team1_id", "team2_id") if match.get(field)}
+    player_ids = {match[field] for match in matches for field in ("player1_id", "player2_id") if match.get(field)}
+    coupon_ids = {
+        match[field] for match in matches for field in ("player1_coupon_id", "player2_coupon_id") if match.get(field)
+    }
+    
+    teams = {
+        team["id"]: team
+        async for team in sportsduel_teams_collection.find(
+            {"id": {"$in": list(team_ids)}}, {"_id": 0, "id": 1, "name": 1, "logo_url": 1}
+        )
+    } if team_ids else {}
+    players = {
+        player["id"]: player
+        async for player in sportsduel_players_collection.find(
+            {"id": {"$in": list(player_ids)}}, {"_id": 0, "id": 1, "nickname": 1, "avatar_url": 1}
+        )
+    } if player_ids else {}
+    coupons = {
+        coupon["id"]: coupon
+        async for coupon in sportsduel_coupons_collection.find(
+            {"id": {"$in": list(coupon_ids)}},
+            {"_id": 0, "id": 1, "status": 1, "correct_predictions": 1, "wrong_predictions": 1,
+             "total_odds": 1, "has_winning_selection": 1}
+        )
+    } if with_coupons and coupon_ids else {}
+    return teams, players, coupons
+
+def invalidate_sportsduel_scoreboards(league_ids):
+    """Drop the cached scoreboard snapshots of leagues whose matches or coupons changed"""
+    response_cache.invalidate_paths(
+        "sportsduel_scoreboard", [f"/api/sportsduel/scoreboard/{league_id}" for league_id in league_ids]
+    )
+
+def score_sportsduel_coupon(coupon: dict, sports_events_results: dict) -> dict:
+    """Evaluate a coupon's bets against event results in memory.
+    
+    Returns the evaluation fields plus "bets" (with is_correct filled in) and
+    "unresolved", the number of bets whose event has no result yet.
+    """
+    correct_predictions = 0
+    wrong_predictions = 0
+    total_odds = 1.0
+    has_winning_selection = False
+    unresolved = 0
+    bets = []
+    
+    for bet in coupon["bets"]:
+        actual_result = sports_events_results.get(bet["event_id"])
+        if actual_result is None:
+            unresolved += 1  # Event not completed yet
+            bets.append(bet)
+            continue
+        
+        is_correct = (bet["selection"] == actual_result)
+        if is_correct:
+            correct_predictions += 1
+            has_winning_selection = True
+            total_odds *= bet["odds"]
+        else:
+            wrong_predictions += 1
+        bets.append({**bet, "is_correct": is_correct})
+    
+    return {
+        "correct_predictions": correct_predictions,
+        "wrong_predictions": wrong_predictions,
+        "total_odds": total_odds,
+        "has_winning_selection": has_winning_selection,
+        "bets": bets,
+        "unresolved": unresolved
+    }
+
+def sportsduel_bet_updates(coupon_id: str, bets: List[dict]) -> List[UpdateOne]:
+    return [
+        UpdateOne({"coupon_id": coupon_id, "event_id": bet["event_id"]}, {"$set": {"is_correct": bet["is_correct"]}})
+        for bet in bets if bet.get("is_correct") is not None
+    ]
+
+async def evaluate_sportsduel_coupon(coupon_id: str, sports_events_results: dict) -> dict:
     """Evaluate a SportsDuel coupon against actual results"""
     try:
-        coupon = sportsduel_coupons_collection.find_one({"id": coupon_id})
+        coupon = await sportsduel_coupons_collection.find_one({"id": coupon_id})
         if not coupon:
             return {"error": "Coupon not found"}
         
-        correct_predictions = 0
-        wrong_predictions = 0
-        total_odds = 1.0
-        has_winning_selection = False
+        evaluation = score_sportsduel_coupon(coupon, sports_events_results)
         
-        # Evaluate each bet in the coupon
-        for bet in coupon["bets"]:
-            event_id = bet["event_id"]
-            selection = bet["selection"]
-            odds = bet["odds"]
-            
-            # Get actual result
-            actual_result = sports_events_results.get(event_id)
-            if actual_result is None:
-                continue  # Event not completed yet
-            
-            # Check if prediction is correct
-            is_correct = (selection == actual_result)
-            
-            if is_correct:
-                correct_predictions += 1
-                has_winning_selection = True
-                total_odds *= odds
-            else:
-                wrong_predictions += 1
-            
-            # Update bet result
-            sportsduel_bets_collection.update_one(
-                {"coupon_id": coupon_id, "event_id": event_id},
-                {"$set": {"is_correct": is_correct}}
-            )
+        bet_updates = sportsduel_bet_updates(coupon_id, evaluation["bets"])
+        if bet_updates:
+            await sportsduel_bets_collection.bulk_write(bet_updates, ordered=False)
         
         # Update coupon with evaluation results
-        sportsduel_coupons_collection.update_one(
+        await sportsduel_coupons_collection.update_one(
             {"id": coupon_id},
             {
                 "$set": {
-                    "correct_predictions": correct_predictions,
-                    "wrong_predictions": wrong_predictions,
-                    "total_odds": total_odds,
-                    "has_winning_selection": has_winning_selection,
+                    "bets": evaluation["bets"],
+                    "correct_predictions": evaluation["correct_predictions"],
+                    "wrong_predictions": evaluation["wrong_predictions"],
+                    "total_odds": evaluation["total_odds"],
+                    "has_winning_selection": evaluation["has_winning_selection"],
                     "status": "evaluated",
                     "evaluated_at": datetime.utcnow()
                 }
@@ -2096,17 +3348,347 @@ def evaluate_sportsduel_coupon(coupon_id: str, sports_events_results: dict) -> d
         
         return {
             "coupon_id": coupon_id,
-            "correct_predictions": correct_predictions,
-            "wrong_predictions": wrong_predictions,
-            "total_odds": total_odds,
-            "has_winning_selection": has_winning_selection
+            "correct_predictions": evaluation["correct_predictions"],
+            "wrong_predictions": evaluation["wrong_predictions"],
+            "total_odds": evaluation["total_odds"],
+            "has_winning_selection": evaluation["has_winning_selection"]
         }
         
     except Exception as e:
         print(f"Error evaluating coupon: {e}")
         return {"error": str(e)}
 
-def create_sportsduel_time_slots_for_day(match_date: str, league_id: str) -> list:
+# Points a café (team) earns per match outcome of one of its players
+SPORTSDUEL_POINTS = {"win": 3, "draw": 1, "loss": 0}
+
+def missing_sportsduel_coupon(player_id: str) -> dict:
+    """Stand-in for a player who submitted no coupon: no winning selection, so disqualified"""
+    return {
+        "player_id": player_id,
+        "correct_predictions": 0,
+        "wrong_predictions": 0,
+        "total_odds": 0.0,
+        "has_winning_selection": False
+    }
+
+# Settlement completes matches first and adds them to the player, stats document, team
+# and ranking counters after. Every completed match lists the counter writes it still owes
+# in stats_pending, and a step is pulled from the list once its bulk write is done, so a
+# run that failed part way is finished by the next run of the slot without counting any
+# match twice.
+SPORTSDUEL_STATS_STEPS = ["players", "player_stats", "teams", "rankings"]
+
+def sportsduel_match_outcome(match: dict, player_id: str) -> str:
+    """"win", "loss" or "draw" of a completed match for one of its players"""
+    if match.get("winner_player_id") is None:
+        return "draw"
+    return "win" if match["winner_player_id"] == player_id else "loss"
+
+async def apply_sportsduel_match_stats(time_slot_id: str) -> int:
+    """Write the counters still owed by the slot's completed matches; returns the matches handled"""
+    matches = await sportsduel_matches_collection.find(
+        {"time_slot_id": time_slot_id, "status": "completed", "stats_pending": {"$exists": True, "$ne": []}},
+        {"_id": 0}
+    ).sort([("completed_at", ASCENDING), ("id", ASCENDING)]).to_list(length=None)
+    if not matches:
+        return 0
+    
+    coupon_ids = [
+        match[f"{side}_coupon_id"] for match in matches for side in ("player1", "player2")
+        if match.get(f"{side}_coupon_id")
+    ]
+    coupons = {
+        coupon["id"]: coupon
+        async for coupon in sportsduel_coupons_collection.find(
+            {"id": {"$in": coupon_ids}},
+            {"_id": 0, "id": 1, "bets": 1, "correct_predictions": 1, "wrong_predictions": 1, "total_odds": 1}
+        )
+    } if coupon_ids else {}
+    player_ids = list({match[f"{side}_id"] for match in matches for side in ("player1", "player2")})
+    players = {
+        player["id"]: player
+        async for player in sportsduel_players_collection.find(
+            {"id": {"$in": player_ids}}, {"_id": 0, "id": 1, "nickname": 1, "team_id": 1}
+        )
+    }
+    
+    now = datetime.utcnow()
+    for step in SPORTSDUEL_STATS_STEPS:
+        step_matches = [match for match in matches if step in match["stats_pending"]]
+        if not step_matches:
+            continue
+        
+        outcomes: Dict[str, List[str]] = {}  # player_id -> outcomes in settlement order
+        last_match_at: Dict[str, datetime] = {}
+        player_coupons: Dict[str, List[dict]] = {}
+        team_outcomes: Dict[str, List[str]] = {}
+        for match in step_matches:
+            for side, team_side in (("player1", "team1"), ("player2", "team2")):
+                player_id = match[f"{side}_id"]
+                outcome = sportsduel_match_outcome(match, player_id)
+                outcomes.setdefault(player_id, []).append(outcome)
+                last_match_at[player_id] = match["completed_at"]
+                team_outcomes.setdefault(match[f"{team_side}_id"], []).append(outcome)
+                if match.get(f"{side}_coupon_id") in coupons:
+                    player_coupons.setdefault(player_id, []).append(coupons[match[f"{side}_coupon_id"]])
+        
+        # Counters and streaks advanced inside the update, so concurrent writers cannot lose one
+        if step == "players":
+            await sportsduel_players_collection.bulk_write([
+                UpdateOne({"id": player_id}, [
+                    sportsduel_counter_stage({
+                        "wins": player_outcomes.count("win"),
+                        "losses": player_outcomes.count("loss"),
+                        "draws": player_outcomes.count("draw"),
+                        "total_matches": len(player_outcomes)
+                    }, {"last_match_at": last_match_at[player_id]})
+                ] + sportsduel_streak_stages(player_outcomes))
+                for player_id, player_outcomes in outcomes.items()
+            ], ordered=False)
+        elif step == "player_stats":
+            await sportsduel_player_stats_collection.bulk_write([
+                sportsduel_player_stats_update(
+                    players.get(player_id, {"id": player_id}), player_outcomes,
+                    player_coupons.get(player_id, []), last_match_at[player_id]
+                )
+                for player_id, player_outcomes in outcomes.items()
+            ], ordered=False)
+        elif step == "teams":
+            await sportsduel_teams_collection.bulk_write([
+                UpdateOne({"id": team_id}, {
+                    "$inc": {
+                        "wins": team_match_outcomes.count("win"),
+                        "losses": team_match_outcomes.count("loss"),
+                        "draws": team_match_outcomes.count("draw"),
+                        "points": sum(SPORTSDUEL_POINTS[outcome] for outcome in team_match_outcomes)
+                    },
+                    "$set": {"updated_at": now}
+                })
+                for team_id, team_match_outcomes in team_outcomes.items()
+            ], ordered=False)
+        else:
+            # League rankings for the day, week and season each match was settled in
+            seasons = await get_sportsduel_league_seasons({match["league_id"] for match in step_matches})
+            ranking_totals: Dict[tuple, dict] = {}
+            for match in step_matches:
+                periods = sportsduel_ranking_periods(match["completed_at"], seasons.get(match["league_id"]))
+                for player_id, team_id in ((match["player1_id"], match["team1_id"]), (match["player2_id"], match["team2_id"])):
+                    outcome = sportsduel_match_outcome(match, player_id)
+                    add_sportsduel_ranking_outcome(ranking_totals, "player", player_id, match["league_id"], periods, outcome)
+                    add_sportsduel_ranking_outcome(ranking_totals, "team", team_id, match["league_id"], periods, outcome)
+            
+            names = {("player", player_id): player.get("nickname") for player_id, player in players.items()}
+            async for team in sportsduel_teams_collection.find(
+                {"id": {"$in": list(team_outcomes)}}, {"_id": 0, "id": 1, "name": 1}
+            ):
+                names[("team", team["id"])] = team.get("name")
+            await sportsduel_rankings_collection.bulk_write([
+                UpdateOne(
+                    {"league_id": league_id, "entity_type": entity_type, "window": window, "period": period, "entity_id": entity_id},
+                    {"$inc": totals, "$set": {"name": names.get((entity_type, entity_id)) or "Unknown", "updated_at": now}},
+                    upsert=True
+                )
+                for (entity_type, entity_id, league_id, window, period), totals in ranking_totals.items()
+            ], ordered=False)
+        
+        await sportsduel_matches_collection.update_many(
+            {"id": {"$in": [match["id"] for match in step_matches]}}, {"$pull": {"stats_pending": step}}
+        )
+    return len(matches)
+
+# A run claims its slot by setting status "settling" until settling_until. A claim left
+# behind by a worker that died mid-run is taken over once it has expired, so keep this
+# well above the time one settlement takes.
+SPORTSDUEL_SETTLEMENT_CLAIM_SECONDS = int(os.environ.get("SPORTSDUEL_SETTLEMENT_CLAIM_SECONDS", "600"))
+
+async def settle_sportsduel_time_slot(time_slot_id: str, results: Optional[Dict[str, str]] = None) -> dict:
+    """Settle every coupon and match of a time slot in one pass with bulk writes.
+    
+    Final results passed in are recorded on the slot's events first; then the
+    slot's events, coupons and open matches are each read with one query.
+    Coupons are scored in memory, every match whose coupons are fully resolved
+    gets calculate_sportsduel_match_winner, and coupons, bets, matches, match
+    results, players and teams are each written with one bulk_write. Coupons
+    with events still lacking a result stay pending for a later run, and a
+    player without a coupon forfeits only once every event has a result.
+    Counter writes a failed run still owed are finished by the next run.
+    """
+    now = datetime.utcnow()
+    claim_id = str(uuid.uuid4())
+    # settling_from keeps the status from before the first claim, across expired claims taken over
+    slot = await sportsduel_time_slots_collection.find_one_and_update(
+        {"id": time_slot_id, "$or": [
+            {"status": {"$ne": "settling"}},
+            {"settling_until": {"$lt": now}},
+            {"settling_until": None}
+        ]},
+        [{"$set": {
+            "settling_from": {"$cond": [{"$eq": ["$status", "settling"]}, "$settling_from", "$status"]},
+            "status": "settling",
+            "settling_claim_id": claim_id,
+            "claimed_at": now,
+            "settling_until": now + timedelta(seconds=SPORTSDUEL_SETTLEMENT_CLAIM_SECONDS)
+        }}],
+        return_document=ReturnDocument.AFTER
+    )
+    if not slot:
+        if await sportsduel_time_slots_collection.find_one({"id": time_slot_id}, {"_id": 1}):
+            raise HTTPException(status_code=409, detail="Time slot is already being settled")
+        raise HTTPException(status_code=404, detail="Time slot not found")
+    
+    final_status = slot.get("settling_from") or "scheduled"
+    try:
+        if results:
+            await sportsduel_sports_events_collection.bulk_write([
+                UpdateOne(
+                    {"id": event_id, "time_slot_id": time_slot_id},
+                    {"$set": {"result": result, "status": "completed", "updated_at": now}}
+                )
+                for event_id, result in results.items()
+            ], ordered=False)
+        
+        events = await sportsduel_sports_events_collection.find(
+            {"time_slot_id": time_slot_id}, {"_id": 0, "id": 1, "result": 1}
+        ).to_list(length=None)
+        event_results = {event["id"]: event["result"] for event in events if event.get("result") is not None}
+        # A missing coupon only counts as a forfeit once no event of the slot is still open
+        slot_final = len(event_results) == len(events)
+        
+        # Score pending coupons in memory
+        coupons = {
+            coupon["id"]: coupon
+            async for coupon in sportsduel_coupons_collection.find({"time_slot_id": time_slot_id}, {"_id": 0})
+        }
+        coupon_updates = []
+        bet_updates = []
+        evaluated_coupons = []
+        pending_coupons = 0
+        for coupon in coupons.values():
+            if coupon.get("status") != "pending":
+                continue
+            evaluation = score_sportsduel_coupon(coupon, event_results)
+            if evaluation.pop("unresolved"):
+                pending_coupons += 1
+                continue
+            coupon.update(evaluation, status="evaluated", evaluated_at=now)
+            evaluated_coupons.append(coupon)
+            coupon_updates.append(UpdateOne({"id": coupon["id"]}, {"$set": {
+                **evaluation, "status": "evaluated", "evaluated_at": now
+            }}))
+            bet_updates.extend(sportsduel_bet_updates(coupon["id"], evaluation["bets"]))
+        
+        # Decide every open match whose coupons are all evaluated
+        matches = await sportsduel_matches_collection.find(
+            {"time_slot_id": time_slot_id, "status": {"$nin": ["completed", "cancelled"]}}, {"_id": 0}
+        ).to_list(length=None)
+        match_updates = []
+        result_updates = []
+        settled_matches = []
+        open_matches = 0
+        for match in matches:
+            sides = []
+            for side in ("player1", "player2"):
+                coupon = coupons.get(match.get(f"{side}_coupon_id"))
+                if (coupon and coupon.get("status") == "pending") or (not coupon and not slot_final):
+                    break
+                sides.append(coupon or missing_sportsduel_coupon(match[f"{side}_id"]))
+            if len(sides) < 2:
+                open_matches += 1
+                continue
+            
+            player1_coupon, player2_coupon = sides
+            decision = calculate_sportsduel_match_winner(player1_coupon, player2_coupon)
+            winner_player_id = decision.get("winner_player_id")
+            if winner_player_id == match["player1_id"]:
+                match_result = "player1"
+            elif winner_player_id == match["player2_id"]:
+                match_result = "player2"
+            else:
+                match_result = "draw"
+            
+            settlement = {
+                "winner_player_id": winner_player_id,
+                "match_result": match_result,
+                "status": "completed",
+                "completed_at": now
+            }
+            match.update(settlement)
+            match_updates.append(UpdateOne(
+                {"id": match["id"], "status": {"$nin": ["completed", "cancelled"]}},
+                {"$set": {**settlement, "stats_pending": SPORTSDUEL_STATS_STEPS}}
+            ))
+            result_updates.append(UpdateOne(
+                {"match_id": match["id"]},
+                {"$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now}, "$set": {
+                    "match_id": match["id"],
+                    "player1_id": match["player1_id"],
+                    "player2_id": match["player2_id"],
+                    "player1_correct": player1_coupon["correct_predictions"],
+                    "player1_wrong": player1_coupon["wrong_predictions"],
+                    "player1_odds_product": player1_coupon["total_odds"],
+                    "player1_has_winning": player1_coupon["has_winning_selection"],
+                    "player2_correct": player2_coupon["correct_predictions"],
+                    "player2_wrong": player2_coupon["wrong_predictions"],
+                    "player2_odds_product": player2_coupon["total_odds"],
+                    "player2_has_winning": player2_coupon["has_winning_selection"],
+                    "winner_player_id": winner_player_id,
+                    "win_reason": decision.get("win_reason")
+                }},
+                upsert=True
+            ))
+            for player_id, coupon in ((match["player1_id"], player1_coupon), (match["player2_id"], player2_coupon)):
+                if coupon.get("id"):
+                    coupon["is_winner"] = sportsduel_match_outcome(match, player_id) == "win"
+                    coupon_updates.append(UpdateOne(
+                        {"id": coupon["id"]}, {"$set": {"is_winner": coupon["is_winner"]}}
+                    ))
+            settled_matches.append(match)
+        
+        if coupon_updates:
+            await sportsduel_coupons_collection.bulk_write(coupon_updates, ordered=False)
+        if bet_updates:
+            await sportsduel_bets_collection.bulk_write(bet_updates, ordered=False)
+        if match_updates:
+            await sportsduel_matches_collection.bulk_write(match_updates, ordered=False)
+            await sportsduel_match_results_collection.bulk_write(result_updates, ordered=False)
+        if coupon_updates or match_updates:
+            invalidate_sportsduel_scoreboards({match["league_id"] for match in matches})
+            settled_match_ids = {match["id"] for match in settled_matches}
+            await publish_sportsduel_scoreboard_changes(
+                settled_matches,
+                evaluated_coupons + [
+                    coupon for coupon in coupons.values()
+                    if coupon["match_id"] in settled_match_ids and coupon.get("status") != "pending"
+                ],
+                {match["id"]: match["league_id"] for match in matches}
+            )
+        
+        # Player records, stats documents, teams and rankings, including any a failed run still owed
+        await apply_sportsduel_match_stats(time_slot_id)
+        
+        if not open_matches and not pending_coupons:
+            final_status = "completed"
+        
+        return {
+            "time_slot_id": time_slot_id,
+            "events_with_results": len(event_results),
+            "coupons_evaluated": len(evaluated_coupons),
+            "coupons_pending": pending_coupons,
+            "matches_settled": [match["id"] for match in settled_matches],
+            "matches_open": open_matches,
+            "status": final_status
+        }
+    finally:
+        # A run that outlived its claim leaves the slot to whoever took it over
+        await sportsduel_time_slots_collection.update_one(
+            {"id": time_slot_id, "settling_claim_id": claim_id},
+            {
+                "$set": {"status": final_status},
+                "$unset": {"settling_from": "", "settling_claim_id": "", "claimed_at": "", "settling_until": ""}
+            }
+        )
+
+async def create_sportsduel_time_slots_for_day(match_date: str, league_id: str) -> list:
     """Create default time slots for a match day"""
     try:
         base_date = datetime.fromisoformat(match_date)
@@ -2153,7 +3735,7 @@ def create_sportsduel_time_slots_for_day(match_date: str, league_id: str) -> lis
         
         # Insert into database
         slots_to_insert = [morning_slot, afternoon_slot, evening_slot]
-        sportsduel_time_slots_collection.insert_many(slots_to_insert)
+        await sportsduel_time_slots_collection.insert_many(slots_to_insert)
         time_slots.extend(slots_to_insert)
         
         return time_slots
@@ -2162,88 +3744,277 @@ def create_sportsduel_time_slots_for_day(match_date: str, league_id: str) -> lis
         print(f"Error creating time slots: {e}")
         return []
 
-def get_sportsduel_player_stats(player_id: str) -> dict:
-    """Calculate comprehensive player statistics"""
-    try:
-        player = sportsduel_players_collection.find_one({"id": player_id})
-        if not player:
-            return {}
-        
-        # Get player matches
-        matches = list(sportsduel_matches_collection.find({
-            "$or": [{"player1_id": player_id}, {"player2_id": player_id}],
-            "status": "completed"
-        }))
-        
-        stats = {
-            "player_id": player_id,
+# Per-player SportsDuel statistics live in sportsduel_player_stats, one document per player,
+# written by settlement in the same pass as the match results, so a profile or leaderboard view
+# is a single read. Counters and streaks are advanced inside an update pipeline, so two
+# settlements touching one player cannot lose an update. rebuild_sportsduel_player_stats
+# recomputes every document from the completed matches (startup backfill and admin endpoint).
+SPORTSDUEL_STATS_COUNTERS = [
+    "total_matches", "wins", "losses", "draws", "total_correct_predictions",
+    "total_wrong_predictions", "total_predictions", "odds_sum"
+]
+
+def sportsduel_stats_increments(outcomes: List[str], coupons: List[dict]) -> dict:
+    """Counter increments for settled matches (outcomes) and the player's coupons in them"""
+    return {
+        "total_matches": len(outcomes),
+        "wins": outcomes.count("win"),
+        "losses": outcomes.count("loss"),
+        "draws": outcomes.count("draw"),
+        "total_correct_predictions": sum(coupon.get("correct_predictions", 0) for coupon in coupons),
+        "total_wrong_predictions": sum(coupon.get("wrong_predictions", 0) for coupon in coupons),
+        "total_predictions": sum(len(coupon.get("bets", [])) for coupon in coupons),
+        "odds_sum": sum(coupon.get("total_odds", 0) for coupon in coupons)
+    }
+
+def sportsduel_streak_stages(outcomes: List[str]) -> List[dict]:
+    """Update-pipeline stages walking current_streak and best_streak through outcomes in order"""
+    stages = []
+    for outcome in outcomes:
+        if outcome == "win":
+            stages.append({"$set": {"current_streak": {"$add": [{"$ifNull": ["$current_streak", 0]}, 1]}}})
+            stages.append({"$set": {"best_streak": {"$max": [{"$ifNull": ["$best_streak", 0]}, "$current_streak"]}}})
+        else:
+            stages.append({"$set": {"current_streak": 0}})
+    return stages
+
+def sportsduel_counter_stage(increments: dict, fields: dict) -> dict:
+    """Pipeline $set adding increments to counters and setting fields (as literals)"""
+    return {"$set": {
+        **{field: {"$add": [{"$ifNull": [f"${field}", 0]}, value]} for field, value in increments.items()},
+        **{field: {"$literal": value} for field, value in fields.items()}
+    }}
+
+def sportsduel_player_stats_update(player: dict, outcomes: List[str], coupons: List[dict], now: datetime) -> UpdateOne:
+    """Upsert adding one settlement's matches to a player's stats document"""
+    return UpdateOne(
+        {"player_id": player["id"]},
+        [sportsduel_counter_stage(sportsduel_stats_increments(outcomes, coupons), {
             "nickname": player.get("nickname", ""),
-            "total_matches": len(matches),
-            "wins": 0,
-            "losses": 0,
-            "draws": 0,
-            "win_percentage": 0.0,
-            "current_streak": 0,
-            "best_streak": 0,
-            "average_odds": 0.0,
-            "total_correct_predictions": 0,
-            "total_wrong_predictions": 0,
-            "accuracy_percentage": 0.0
-        }
-        
-        # Calculate match statistics
-        current_streak = 0
-        best_streak = 0
-        total_odds = 0
-        total_predictions = 0
-        
-        for match in matches:
-            if match["winner_player_id"] == player_id:
-                stats["wins"] += 1
-                current_streak += 1
-                best_streak = max(best_streak, current_streak)
-            elif match["winner_player_id"] is None:
-                stats["draws"] += 1
-                current_streak = 0
-            else:
-                stats["losses"] += 1
-                current_streak = 0
-            
-            # Get coupon stats for this match
-            if match["player1_id"] == player_id and match["player1_coupon_id"]:
-                coupon = sportsduel_coupons_collection.find_one({"id": match["player1_coupon_id"]})
-                if coupon:
-                    stats["total_correct_predictions"] += coupon.get("correct_predictions", 0)
-                    stats["total_wrong_predictions"] += coupon.get("wrong_predictions", 0)
-                    total_odds += coupon.get("total_odds", 0)
-                    total_predictions += len(coupon.get("bets", []))
-                    
-            elif match["player2_id"] == player_id and match["player2_coupon_id"]:
-                coupon = sportsduel_coupons_collection.find_one({"id": match["player2_coupon_id"]})
-                if coupon:
-                    stats["total_correct_predictions"] += coupon.get("correct_predictions", 0)
-                    stats["total_wrong_predictions"] += coupon.get("wrong_predictions", 0)
-                    total_odds += coupon.get("total_odds", 0)
-                    total_predictions += len(coupon.get("bets", []))
-        
-        # Calculate percentages
-        if stats["total_matches"] > 0:
-            stats["win_percentage"] = (stats["wins"] / stats["total_matches"]) * 100
-            
-        if total_predictions > 0:
-            stats["accuracy_percentage"] = (stats["total_correct_predictions"] / total_predictions) * 100
-            stats["average_odds"] = total_odds / len(matches) if matches else 0
-        
-        stats["current_streak"] = current_streak
-        stats["best_streak"] = best_streak
-        
-        return stats
+            "team_id": player.get("team_id"),
+            "last_match_at": now,
+            "updated_at": now
+        })] + sportsduel_streak_stages(outcomes),
+        upsert=True
+    )
+
+def sportsduel_player_stats_view(stats: dict) -> dict:
+    """Public statistics of a player from their stats document"""
+    total_matches = stats.get("total_matches", 0)
+    total_predictions = stats.get("total_predictions", 0)
+    view = {
+        "player_id": stats["player_id"],
+        "nickname": stats.get("nickname", ""),
+        "total_matches": total_matches,
+        "wins": stats.get("wins", 0),
+        "losses": stats.get("losses", 0),
+        "draws": stats.get("draws", 0),
+        "win_percentage": 0.0,
+        "current_streak": stats.get("current_streak", 0),
+        "best_streak": stats.get("best_streak", 0),
+        "average_odds": 0.0,
+        "total_correct_predictions": stats.get("total_correct_predictions", 0),
+        "total_wrong_predictions": stats.get("total_wrong_predictions", 0),
+        "accuracy_percentage": 0.0
+    }
+    
+    if total_matches > 0:
+        view["win_percentage"] = (view["wins"] / total_matches) * 100
+    if total_predictions > 0:
+        view["accuracy_percentage"] = (view["total_correct_predictions"] / total_predictions) * 100
+        view["average_odds"] = stats.get("odds_sum", 0) / total_matches if total_matches else 0
+    return view
+
+async def get_sportsduel_player_stats(player_id: str) -> dict:
+    """Player statistics from the incrementally maintained stats document"""
+    try:
+        stats = await sportsduel_player_stats_collection.find_one({"player_id": player_id}, {"_id": 0})
+        if not stats:
+            # No settled match yet
+            player = await sportsduel_players_collection.find_one({"id": player_id}, {"_id": 0, "nickname": 1})
+            if not player:
+                return {}
+            stats = {"player_id": player_id, "nickname": player.get("nickname", "")}
+        return sportsduel_player_stats_view(stats)
         
     except Exception as e:
         print(f"Error calculating player stats: {e}")
         return {}
 
-def generate_sample_sports_events(time_slot_id: str, match_date: str) -> list:
+async def rebuild_sportsduel_player_stats() -> int:
+    """Recompute every player's stats document from the completed matches, oldest first"""
+    # The rebuild counts every completed match, so none still owes its stats write
+    await sportsduel_matches_collection.update_many(
+        {"stats_pending": "player_stats"}, {"$pull": {"stats_pending": "player_stats"}}
+    )
+    # Players with a stats document before the rebuild; any the matches no longer produce are removed
+    existing_player_ids = await sportsduel_player_stats_collection.distinct("player_id")
+    outcomes: Dict[str, List[str]] = {}
+    coupon_ids: Dict[str, List[str]] = {}
+    async for match in sportsduel_matches_collection.find(
+        {"status": "completed"},
+        {"_id": 0, "player1_id": 1, "player2_id": 1, "player1_coupon_id": 1, "player2_coupon_id": 1, "winner_player_id": 1}
+    ).sort("completed_at", ASCENDING):
+        for side in ("player1", "player2"):
+            player_id = match.get(f"{side}_id")
+            if match.get("winner_player_id") is None:
+                outcome = "draw"
+            else:
+                outcome = "win" if match["winner_player_id"] == player_id else "loss"
+            outcomes.setdefault(player_id, []).append(outcome)
+            if match.get(f"{side}_coupon_id"):
+                coupon_ids.setdefault(player_id, []).append(match[f"{side}_coupon_id"])
+    
+    coupons = {
+        coupon["id"]: coupon
+        async for coupon in sportsduel_coupons_collection.find(
+            {"id": {"$in": [coupon_id for ids in coupon_ids.values() for coupon_id in ids]}},
+            {"_id": 0, "id": 1, "bets": 1, "correct_predictions": 1, "wrong_predictions": 1, "total_odds": 1}
+        )
+    } if coupon_ids else {}
+    players = {
+        player["id"]: player
+        async for player in sportsduel_players_collection.find(
+            {"id": {"$in": list(outcomes)}}, {"_id": 0, "id": 1, "nickname": 1, "team_id": 1}
+        )
+    } if outcomes else {}
+    
+    now = datetime.utcnow()
+    documents = []
+    for player_id, player_outcomes in outcomes.items():
+        player_coupons = [coupons[coupon_id] for coupon_id in coupon_ids.get(player_id, []) if coupon_id in coupons]
+        current_streak = 0
+        best_streak = 0
+        for outcome in player_outcomes:
+            current_streak = current_streak + 1 if outcome == "win" else 0
+            best_streak = max(best_streak, current_streak)
+        documents.append({
+            "player_id": player_id,
+            "nickname": players.get(player_id, {}).get("nickname", ""),
+            "team_id": players.get(player_id, {}).get("team_id"),
+            **sportsduel_stats_increments(player_outcomes, player_coupons),
+            "current_streak": current_streak,
+            "best_streak": best_streak,
+            "updated_at": now
+        })
+    
+    # Replace in place rather than clearing the collection first, so reads and concurrent
+    # settlements never see a player's document missing
+    if documents:
+        await sportsduel_player_stats_collection.bulk_write([
+            ReplaceOne({"player_id": document["player_id"]}, document, upsert=True) for document in documents
+        ], ordered=False)
+    stale_player_ids = set(existing_player_ids) - set(outcomes)
+    if stale_player_ids:
+        await sportsduel_player_stats_collection.delete_many({"player_id": {"$in": list(stale_player_ids)}})
+    return len(documents)
+
+# Café (team) and player rankings per league are kept in sportsduel_rankings, one document per
+# entity and window period: the settlement day, its ISO week and the league season. Settlement
+# adds each outcome to all three with $inc upserts, and pages are read in rank order straight
+# off the (points, wins) index, so standings never scan match history.
+SPORTSDUEL_RANKING_WINDOWS = ["daily", "weekly", "season"]
+
+def sportsduel_ranking_periods(moment: datetime, season: Optional[str]) -> Dict[str, str]:
+    """The period key of each ranking window that a result at this moment counts towards"""
+    year, week, _ = moment.isocalendar()
+    return {
+        "daily": moment.strftime("%Y-%m-%d"),
+        "weekly": f"{year}-W{week:02d}",
+        "season": season or "all"
+    }
+
+def add_sportsduel_ranking_outcome(totals: Dict[tuple, dict], entity_type: str, entity_id: str,
+                                   league_id: str, periods: Dict[str, str], outcome: str):
+    """Accumulate one match outcome into the ranking counters of every window"""
+    for window, period in periods.items():
+        counters = totals.setdefault(
+            (entity_type, entity_id, league_id, window, period),
+            {"matches": 0, "wins": 0, "losses": 0, "draws": 0, "points": 0}
+        )
+        counters["matches"] += 1
+        counters[{"win": "wins", "loss": "losses", "draw": "draws"}[outcome]] += 1
+        counters["points"] += SPORTSDUEL_POINTS[outcome]
+
+async def get_sportsduel_league_seasons(league_ids) -> Dict[str, str]:
+    if not league_ids:
+        return {}
+    return {
+        league["id"]: league.get("season")
+        async for league in sportsduel_leagues_collection.find(
+            {"id": {"$in": list(league_ids)}}, {"_id": 0, "id": 1, "season": 1}
+        )
+    }
+
+async def rebuild_sportsduel_rankings() -> int:
+    """Recompute every ranking document from the completed matches"""
+    # The rebuild counts every completed match, so none still owes its ranking write
+    await sportsduel_matches_collection.update_many(
+        {"stats_pending": "rankings"}, {"$pull": {"stats_pending": "rankings"}}
+    )
+    # Ranking documents before the rebuild; any the matches no longer produce are removed
+    existing = await sportsduel_rankings_collection.find(
+        {}, {"_id": 1, "league_id": 1, "entity_type": 1, "window": 1, "period": 1, "entity_id": 1}
+    ).to_list(length=None)
+    matches = await sportsduel_matches_collection.find(
+        {"status": "completed"},
+        {"_id": 0, "league_id": 1, "team1_id": 1, "team2_id": 1, "player1_id": 1, "player2_id": 1,
+         "winner_player_id": 1, "completed_at": 1, "created_at": 1}
+    ).to_list(length=None)
+    seasons = await get_sportsduel_league_seasons({match["league_id"] for match in matches})
+    
+    totals: Dict[tuple, dict] = {}
+    for match in matches:
+        periods = sportsduel_ranking_periods(
+            match.get("completed_at") or match.get("created_at") or datetime.utcnow(), seasons.get(match["league_id"])
+        )
+        for player_id, team_id in ((match["player1_id"], match["team1_id"]), (match["player2_id"], match["team2_id"])):
+            if match.get("winner_player_id") is None:
+                outcome = "draw"
+            else:
+                outcome = "win" if match["winner_player_id"] == player_id else "loss"
+            add_sportsduel_ranking_outcome(totals, "player", player_id, match["league_id"], periods, outcome)
+            add_sportsduel_ranking_outcome(totals, "team", team_id, match["league_id"], periods, outcome)
+    
+    names = {}
+    player_ids = list({key[1] for key in totals if key[0] == "player"})
+    team_ids = list({key[1] for key in totals if key[0] == "team"})
+    if player_ids:
+        async for player in sportsduel_players_collection.find({"id": {"$in": player_ids}}, {"_id": 0, "id": 1, "nickname": 1}):
+            names[("player", player["id"])] = player.get("nickname")
+    if team_ids:
+        async for team in sportsduel_teams_collection.find({"id": {"$in": team_ids}}, {"_id": 0, "id": 1, "name": 1}):
+            names[("team", team["id"])] = team.get("name")
+    
+    now = datetime.utcnow()
+    documents = [
+        {
+            "league_id": league_id, "entity_type": entity_type, "window": window, "period": period,
+            "entity_id": entity_id, "name": names.get((entity_type, entity_id)) or "Unknown",
+            **counters, "updated_at": now
+        }
+        for (entity_type, entity_id, league_id, window, period), counters in totals.items()
+    ]
+    # Replace in place rather than clearing the collection first, so standings reads and
+    # concurrent settlements never see a ranking document missing
+    if documents:
+        await sportsduel_rankings_collection.bulk_write([
+            ReplaceOne(
+                {key: document[key] for key in ("league_id", "entity_type", "window", "period", "entity_id")},
+                document, upsert=True
+            )
+            for document in documents
+        ], ordered=False)
+    stale_ids = [
+        ranking["_id"] for ranking in existing
+        if (ranking.get("entity_type"), ranking.get("entity_id"), ranking.get("league_id"),
+            ranking.get("window"), ranking.get("period")) not in totals
+    ]
+    if stale_ids:
+        await sportsduel_rankings_collection.delete_many({"_id": {"$in": stale_ids}})
+    return len(documents)
+
+async def generate_sample_sports_events(time_slot_id: str, match_date: str) -> list:
     """Generate sample sports events for testing"""
     try:
         events = []
@@ -2279,7 +4050,7 @@ def generate_sample_sports_events(time_slot_id: str, match_date: str) -> list:
             events.append(event)
         
         # Insert into database
-        sportsduel_sports_events_collection.insert_many(events)
+        await sportsduel_sports_events_collection.insert_many(events)
         return events
         
     except Exception as e:
@@ -2294,7 +4065,7 @@ async def health_check():
 @app.post("/api/register")
 async def register_user(user: UserRegister):
     # Check if user already exists
-    if users_collection.find_one({"$or": [{"username": user.username}, {"email": user.email}]}):
+    if await users_collection.find_one({"$or": [{"username": user.username}, {"email": user.email}]}):
         raise HTTPException(status_code=400, detail="Username or email already exists")
     
     # Create new user
@@ -2321,14 +4092,16 @@ async def register_user(user: UserRegister):
         "rank": 0,
         "score": 0.0
     }
+    user_data["ranking_score"] = calculate_user_score(user_data)
     
-    users_collection.insert_one(user_data)
+    await users_collection.insert_one(user_data)
+    await apply_country_stats_delta(user_data["country"], user_data)
     token = create_token(user_id)
     
     # Process referral if provided
     referral_success = False
     if user.referral_code:
-        referral_success = process_referral_registration(
+        referral_success = await process_referral_registration(
             referred_user_id=user_id,
             referral_code=user.referral_code,
             registration_ip=None  # Could extract from request in the future
@@ -2352,7 +4125,7 @@ async def register_user(user: UserRegister):
 @app.post("/api/login")
 async def login_user(user: UserLogin):
     # Find user
-    user_data = users_collection.find_one({"username": user.username})
+    user_data = await users_collection.find_one({"username": user.username})
     if not user_data or not verify_password(user.password, user_data["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -2364,9 +4137,20 @@ async def login_user(user: UserLogin):
     token = create_token(user_id)
     return {"message": "Login successful", "token": token, "user_id": user_id}
 
+@app.post("/api/logout")
+async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the presented token"""
+    try:
+        token_verifier.verify(credentials.credentials)
+    except:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    await token_verifier.revoke_token(credentials.credentials)
+    return {"message": "Logout successful"}
+
 @app.get("/api/profile")
 async def get_profile(user_id: str = Depends(verify_token)):
-    user_data = users_collection.find_one({"id": user_id})
+    user_data = await users_collection.find_one({"id": user_id})
     if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -2377,7 +4161,7 @@ async def get_profile(user_id: str = Depends(verify_token)):
 @app.put("/api/profile")
 async def update_profile(profile_data: dict, user_id: str = Depends(verify_token)):
     """Update user profile"""
-    user = users_collection.find_one({"id": user_id})
+    user = await users_collection.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -2389,16 +4173,26 @@ async def update_profile(profile_data: dict, user_id: str = Depends(verify_token
         if field in profile_data:
             # Check if email already exists (if updating email)
             if field == 'email' and profile_data[field] != user['email']:
-                existing_user = users_collection.find_one({"email": profile_data[field]})
+                existing_user = await users_collection.find_one({"email": profile_data[field]})
                 if existing_user and existing_user['id'] != user_id:
                     raise HTTPException(status_code=400, detail="Email already exists")
             update_data[field] = profile_data[field]
     
     if update_data:
-        users_collection.update_one(
+        await users_collection.update_one(
             {"id": user_id},
             {"$set": update_data}
         )
+        principal_cache.invalidate(user_id)
+        
+        # Move the user's totals between country partitions
+        if "country" in update_data and update_data["country"] != user.get("country"):
+            await apply_country_stats_delta(user.get("country"), user, -1)
+            await apply_country_stats_delta(update_data["country"], user)
+        
+        # Keep the summaries embedded in team rosters current
+        if any(field in update_data for field in ["full_name", "email", "avatar_url", "country"]):
+            await refresh_user_team_rosters(user_id)
     
     return {"message": "Profile updated successfully"}
 
@@ -2411,7 +4205,7 @@ async def change_password(password_data: dict, user_id: str = Depends(verify_tok
     if not current_password or not new_password:
         raise HTTPException(status_code=400, detail="Current and new password required")
     
-    user = users_collection.find_one({"id": user_id})
+    user = await users_collection.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -2421,53 +4215,47 @@ async def change_password(password_data: dict, user_id: str = Depends(verify_tok
     
     # Update password
     hashed_new_password = hash_password(new_password)
-    users_collection.update_one(
+    await users_collection.update_one(
         {"id": user_id},
         {"$set": {"password": hashed_new_password}}
     )
+    principal_cache.invalidate(user_id)
     
     return {"message": "Password changed successfully"}
 
 @app.get("/api/rankings")
 async def get_rankings(limit: int = 50, skip: int = 0):
-    # Get all users and calculate their scores
-    users = list(users_collection.find({}, {"password": 0, "_id": 0}))
-    
-    # Calculate scores and sort
-    for user in users:
-        user["score"] = calculate_user_score(user)
-    
-    users.sort(key=lambda x: x["score"], reverse=True)
-    
-    # Assign ranks
-    for i, user in enumerate(users):
-        user["rank"] = i + 1
+    # Pages come straight off the leaderboard index, already in rank order
+    return {
+        "rankings": await get_leaderboard_page({}, limit, skip),
+        "total": await users_collection.estimated_document_count()
+    }
+
+@app.get("/api/rankings/user/{user_id}")
+async def get_user_ranking(user_id: str):
+    """Get a single user's global and country leaderboard positions"""
+    user = await users_collection.find_one({"id": user_id}, {"id": 1, "username": 1, "country": 1, "ranking_score": 1, "_id": 0})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Return paginated results
     return {
-        "rankings": users[skip:skip + limit],
-        "total": len(users)
+        "user_id": user_id,
+        "username": user.get("username"),
+        "country": user.get("country"),
+        "score": user.get("ranking_score", 0.0),
+        "rank": await get_user_leaderboard_rank(user),
+        "country_rank": await get_user_leaderboard_rank(user, {"country": user.get("country")})
     }
 
 @app.get("/api/rankings/country/{country}")
-async def get_country_rankings(country: str, limit: int = 20):
-    # Get users from specific country
-    users = list(users_collection.find({"country": country}, {"password": 0, "_id": 0}))
-    
-    # Calculate scores and sort
-    for user in users:
-        user["score"] = calculate_user_score(user)
-    
-    users.sort(key=lambda x: x["score"], reverse=True)
-    
-    # Assign ranks
-    for i, user in enumerate(users):
-        user["rank"] = i + 1
+async def get_country_rankings(country: str, limit: int = 20, skip: int = 0):
+    # Pages come off the (country, score) partition of the leaderboard index
+    country_stats = await country_stats_collection.find_one({"_id": country}, {"total_users": 1})
     
     return {
         "country": country,
-        "rankings": users[:limit],
-        "total": len(users)
+        "rankings": await get_leaderboard_page({"country": country}, limit, skip),
+        "total": country_stats.get("total_users", 0) if country_stats else 0
     }
 
 @app.get("/api/competitions")
@@ -2478,18 +4266,18 @@ async def get_competitions(region: Optional[str] = None, status: Optional[str] =
     if status:
         query["status"] = status
     
-    competitions = list(competitions_collection.find(query, {"_id": 0}))
+    competitions = await competitions_collection.find(query, {"_id": 0}).to_list(length=None)
     return {"competitions": competitions}
 
 @app.post("/api/competitions/{competition_id}/join")
 async def join_competition(competition_id: str, user_id: str = Depends(verify_token)):
     # Check if competition exists
-    competition = competitions_collection.find_one({"id": competition_id})
+    competition = await competitions_collection.find_one({"id": competition_id})
     if not competition:
         raise HTTPException(status_code=404, detail="Competition not found")
     
     # Check if user exists
-    user = users_collection.find_one({"id": user_id})
+    user = await users_collection.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -2498,26 +4286,15 @@ async def join_competition(competition_id: str, user_id: str = Depends(verify_to
 
 @app.get("/api/stats/countries")
 async def get_country_stats():
-    # Get stats by country
-    pipeline = [
-        {"$group": {
-            "_id": "$country",
-            "total_users": {"$sum": 1},
-            "total_bets": {"$sum": "$total_bets"},
-            "total_amount": {"$sum": "$total_amount"},
-            "total_winnings": {"$sum": "$total_winnings"}
-        }},
-        {"$sort": {"total_users": -1}}
-    ]
-    
-    stats = list(users_collection.aggregate(pipeline))
+    # Served from the incrementally maintained country rollup
+    stats = await country_stats_collection.find({}, {"updated_at": 0}).sort("total_users", -1).to_list(length=None)
     return {"country_stats": stats}
 
 # ADMIN ENDPOINTS
 @app.post("/api/admin/block-user")
 async def block_user(request: BlockUserRequest, admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Block a user temporarily or permanently"""
-    user = users_collection.find_one({"id": request.user_id})
+    user = await users_collection.find_one({"id": request.user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -2527,7 +4304,7 @@ async def block_user(request: BlockUserRequest, admin_id: str = Depends(verify_a
         blocked_until = datetime.utcnow() + timedelta(hours=request.duration_hours)
     
     # Update user
-    users_collection.update_one(
+    await users_collection.update_one(
         {"id": request.user_id},
         {
             "$set": {
@@ -2537,9 +4314,11 @@ async def block_user(request: BlockUserRequest, admin_id: str = Depends(verify_a
             }
         }
     )
+    principal_cache.invalidate(request.user_id)
+    await token_verifier.revoke_user_tokens(request.user_id)
     
     # Log admin action
-    admin_actions_collection.insert_one({
+    await admin_actions_collection.insert_one({
         "id": str(uuid.uuid4()),
         "admin_id": admin_id,
         "action_type": "block_user",
@@ -2557,7 +4336,7 @@ async def block_user(request: BlockUserRequest, admin_id: str = Depends(verify_a
 @app.post("/api/admin/unblock-user/{user_id}")
 async def unblock_user(user_id: str, admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Unblock a user"""
-    users_collection.update_one(
+    await users_collection.update_one(
         {"id": user_id},
         {
             "$set": {
@@ -2567,9 +4346,10 @@ async def unblock_user(user_id: str, admin_id: str = Depends(verify_admin_token(
             }
         }
     )
+    principal_cache.invalidate(user_id)
     
     # Log admin action
-    admin_actions_collection.insert_one({
+    await admin_actions_collection.insert_one({
         "id": str(uuid.uuid4()),
         "admin_id": admin_id,
         "action_type": "unblock_user",
@@ -2582,23 +4362,26 @@ async def unblock_user(user_id: str, admin_id: str = Depends(verify_admin_token(
 @app.post("/api/admin/adjust-points")
 async def adjust_user_points(request: AdjustPointsRequest, admin_id: str = Depends(verify_admin_token(AdminRole.GOD))):
     """Adjust user points (God level only)"""
-    user = users_collection.find_one({"id": request.user_id})
+    user = await users_collection.find_one({"id": request.user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get admin info for better logging
-    admin_user = users_collection.find_one({"id": admin_id})
+    admin_user = await users_collection.find_one({"id": admin_id})
     admin_name = admin_user.get("username", "Unknown") if admin_user else "Unknown"
     
     # Update user score
     new_score = max(0, user["score"] + request.points_change)
-    users_collection.update_one(
+    await users_collection.update_one(
         {"id": request.user_id},
-        {"$set": {"score": new_score}}
+        {"$set": {
+            "score": new_score,
+            "ranking_score": calculate_user_score({**user, "score": new_score})
+        }}
     )
     
     # Log admin action with more details
-    admin_actions_collection.insert_one({
+    await admin_actions_collection.insert_one({
         "id": str(uuid.uuid4()),
         "admin_id": admin_name,
         "action_type": "adjust_points",
@@ -2623,10 +4406,10 @@ async def create_competition(competition: Competition, admin_id: str = Depends(v
     competition_data["created_by"] = admin_id
     competition_data["current_participants"] = 0
     
-    competitions_collection.insert_one(competition_data)
+    await competitions_collection.insert_one(competition_data)
     
     # Log admin action
-    admin_actions_collection.insert_one({
+    await admin_actions_collection.insert_one({
         "id": str(uuid.uuid4()),
         "admin_id": admin_id,
         "action_type": "create_competition",
@@ -2646,24 +4429,25 @@ async def create_site_message(message: SiteMessage, admin_id: str = Depends(veri
     message_data["created_at"] = datetime.utcnow()
     message_data["is_active"] = True
     
-    site_messages_collection.insert_one(message_data)
+    await site_messages_collection.insert_one(message_data)
+    response_cache.invalidate("site_messages")
     
     return {"message": "Site message created successfully", "message_id": message_data["id"]}
 
 @app.get("/api/admin/users")
 async def get_all_users(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get all users for admin management"""
-    users = list(users_collection.find({}, {"password": 0, "_id": 0}))
+    users = await users_collection.find({}, {"password": 0, "_id": 0}).to_list(length=None)
     return {"users": users}
 
 @app.get("/api/admin/users/top100")
 async def get_top_100_users(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get top 100 users by score for ranking display"""
     try:
-        top_users = list(users_collection.find(
+        top_users = await users_collection.find(
             {}, 
             {"_id": 0, "full_name": 1, "username": 1, "score": 1, "country": 1, "avatar_url": 1}
-        ).sort("score", -1).limit(100))
+        ).sort("score", -1).limit(100).to_list(length=None)
         
         return {"top_users": top_users}
     except Exception as e:
@@ -2672,51 +4456,82 @@ async def get_top_100_users(admin_id: str = Depends(verify_admin_token(AdminRole
 @app.get("/api/admin/actions")
 async def get_admin_actions(admin_id: str = Depends(verify_admin_token(AdminRole.GOD))):
     """Get all admin actions (God level only)"""
-    actions = list(admin_actions_collection.find({}, {"_id": 0}).sort("timestamp", -1).limit(100))
+    actions = await admin_actions_collection.find({}, {"_id": 0}).sort("timestamp", -1).limit(100).to_list(length=None)
     return {"actions": actions}
 
+@app.get("/api/admin/indexes")
+async def get_index_status(admin_id: str = Depends(verify_admin_token(AdminRole.SUPER_ADMIN))):
+    """Report missing, undeclared and unused indexes per collection"""
+    try:
+        return await get_index_report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching index report: {str(e)}")
+
+@app.get("/api/admin/response-cache/stats")
+async def get_response_cache_stats(admin_id: str = Depends(verify_admin_token(AdminRole.SUPER_ADMIN))):
+    """Hit/miss and 304 metrics of the public response cache"""
+    return response_cache.stats()
+
+@app.get("/api/admin/auth-cache/stats")
+async def get_auth_cache_stats(admin_id: str = Depends(verify_admin_token(AdminRole.SUPER_ADMIN))):
+    """Hit/miss metrics of the authenticated-principal and verified-token caches"""
+    return {"principal_cache": principal_cache.stats(), "token_cache": token_verifier.stats()}
+
+@app.post("/api/admin/indexes/ensure")
+async def ensure_declared_indexes(admin_id: str = Depends(verify_admin_token(AdminRole.SUPER_ADMIN))):
+    """Create any declared index that is missing"""
+    result = await ensure_indexes()
+    await log_admin_action(admin_id, "ensure_indexes", details={
+        "ensured": result["ensured"],
+        "failed": len(result["failed"])
+    })
+    return {"message": "Indexes ensured", **result}
+
 @app.get("/api/site-messages")
-async def get_active_site_messages():
+async def get_active_site_messages(request: Request):
     """Get active site messages"""
-    messages = list(site_messages_collection.find({
-        "is_active": True,
-        "$or": [
-            {"expires_at": None},
-            {"expires_at": {"$gt": datetime.utcnow()}}
-        ]
-    }, {"_id": 0}))
-    return {"messages": messages}
+    async def build():
+        messages = await site_messages_collection.find({
+            "is_active": True,
+            "$or": [
+                {"expires_at": None},
+                {"expires_at": {"$gt": datetime.utcnow()}}
+            ]
+        }, {"_id": 0}).to_list(length=None)
+        return {"messages": messages}
+    
+    return await response_cache.respond(request, "site_messages", build)
 
 @app.get("/api/admin/analytics/overview")
 async def get_analytics_overview(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get analytics overview data"""
     try:
         # User statistics
-        total_users = users_collection.count_documents({})
-        active_users = users_collection.count_documents({"is_blocked": {"$ne": True}})
-        blocked_users = users_collection.count_documents({"is_blocked": True})
+        total_users = await users_collection.count_documents({})
+        active_users = await users_collection.count_documents({"is_blocked": {"$ne": True}})
+        blocked_users = await users_collection.count_documents({"is_blocked": True})
         
         # Competition statistics
-        total_competitions = competitions_collection.count_documents({})
-        active_competitions = competitions_collection.count_documents({"status": "active"})
+        total_competitions = await competitions_collection.count_documents({})
+        active_competitions = await competitions_collection.count_documents({"status": "active"})
         
         # Rankings statistics
-        total_rankings = rankings_collection.count_documents({})
+        total_rankings = await rankings_collection.count_documents({})
         
         # User distribution by country
-        user_countries = list(users_collection.aggregate([
+        user_countries = await users_collection.aggregate([
             {"$group": {"_id": "$country", "count": {"$sum": 1}}},
             {"$sort": {"count": -1}}
-        ]))
+        ]).to_list(length=None)
         
         # Recent user registrations (last 30 days)
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_registrations = users_collection.count_documents({
+        recent_registrations = await users_collection.count_documents({
             "created_at": {"$gte": thirty_days_ago}
         })
         
         # Points distribution
-        points_stats = list(users_collection.aggregate([
+        points_stats = await users_collection.aggregate([
             {"$group": {
                 "_id": None,
                 "avg_points": {"$avg": "$points"},
@@ -2724,7 +4539,7 @@ async def get_analytics_overview(admin_id: str = Depends(verify_admin_token(Admi
                 "min_points": {"$min": "$points"},
                 "total_points": {"$sum": "$points"}
             }}
-        ]))
+        ]).to_list(length=None)
         
         return {
             "overview": {
@@ -2748,7 +4563,7 @@ async def get_user_analytics(admin_id: str = Depends(verify_admin_token(AdminRol
     try:
         # User registration timeline (last 6 months)
         six_months_ago = datetime.utcnow() - timedelta(days=180)
-        registration_timeline = list(users_collection.aggregate([
+        registration_timeline = await users_collection.aggregate([
             {"$match": {"created_at": {"$gte": six_months_ago}}},
             {"$group": {
                 "_id": {
@@ -2758,18 +4573,18 @@ async def get_user_analytics(admin_id: str = Depends(verify_admin_token(AdminRol
                 "count": {"$sum": 1}
             }},
             {"$sort": {"_id.year": 1, "_id.month": 1}}
-        ]))
+        ]).to_list(length=None)
         
         # Top users by points
-        top_users = list(users_collection.find(
+        top_users = await users_collection.find(
             {}, 
             {"_id": 0, "full_name": 1, "username": 1, "score": 1, "country": 1}
-        ).sort("score", -1).limit(10))
+        ).sort("score", -1).limit(10).to_list(length=None)
         
         # User activity by admin role
-        admin_role_distribution = list(users_collection.aggregate([
+        admin_role_distribution = await users_collection.aggregate([
             {"$group": {"_id": "$admin_role", "count": {"$sum": 1}}}
-        ]))
+        ]).to_list(length=None)
         
         return {
             "registration_timeline": registration_timeline,
@@ -2784,25 +4599,25 @@ async def get_competition_analytics(admin_id: str = Depends(verify_admin_token(A
     """Get competition analytics"""
     try:
         # Competition by status
-        competition_status = list(competitions_collection.aggregate([
+        competition_status = await competitions_collection.aggregate([
             {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-        ]))
+        ]).to_list(length=None)
         
         # Competition by region
-        competition_regions = list(competitions_collection.aggregate([
+        competition_regions = await competitions_collection.aggregate([
             {"$group": {"_id": "$region", "count": {"$sum": 1}}},
             {"$sort": {"count": -1}}
-        ]))
+        ]).to_list(length=None)
         
         # Prize pool statistics
-        prize_stats = list(competitions_collection.aggregate([
+        prize_stats = await competitions_collection.aggregate([
             {"$group": {
                 "_id": None,
                 "total_prize_pool": {"$sum": "$prize_pool"},
                 "avg_prize_pool": {"$avg": "$prize_pool"},
                 "max_prize_pool": {"$max": "$prize_pool"}
             }}
-        ]))
+        ]).to_list(length=None)
         
         return {
             "competition_status": competition_status,
@@ -2818,7 +4633,7 @@ async def get_advanced_dashboard_analytics(admin_id: str = Depends(verify_admin_
     try:
         # User Registration Trends (last 12 months)
         twelve_months_ago = datetime.utcnow() - timedelta(days=365)
-        registration_trends = list(users_collection.aggregate([
+        registration_trends = await users_collection.aggregate([
             {"$match": {"created_at": {"$gte": twelve_months_ago}}},
             {"$group": {
                 "_id": {
@@ -2829,27 +4644,27 @@ async def get_advanced_dashboard_analytics(admin_id: str = Depends(verify_admin_
                 "count": {"$sum": 1}
             }},
             {"$sort": {"_id.year": 1, "_id.month": 1, "_id.day": 1}}
-        ]))
+        ]).to_list(length=None)
         
         # Tournament Participation Analytics
-        tournament_participation = list(tournament_participants_collection.aggregate([
+        tournament_participation = await tournament_participants_collection.aggregate([
             {"$group": {
                 "_id": "$tournament_id",
                 "participants": {"$sum": 1}
             }},
             {"$sort": {"participants": -1}},
             {"$limit": 10}
-        ]))
+        ]).to_list(length=None)
         
         # Enhance with tournament details
         for tp in tournament_participation:
-            tournament = tournaments_collection.find_one({"id": tp["_id"]})
+            tournament = await tournaments_collection.find_one({"id": tp["_id"]})
             if tournament:
                 tp["tournament_name"] = tournament.get("name", "Unknown")
                 tp["entry_fee"] = tournament.get("entry_fee", 0)
         
         # Revenue Analytics by Tournament Categories
-        revenue_by_category = list(tournaments_collection.aggregate([
+        revenue_by_category = await tournaments_collection.aggregate([
             {"$group": {
                 "_id": "$entry_fee_category",
                 "total_revenue": {"$sum": {"$multiply": ["$entry_fee", "$current_participants"]}},
@@ -2857,10 +4672,10 @@ async def get_advanced_dashboard_analytics(admin_id: str = Depends(verify_admin_
                 "avg_participants": {"$avg": "$current_participants"}
             }},
             {"$sort": {"total_revenue": -1}}
-        ]))
+        ]).to_list(length=None)
         
         # Geographic Distribution (Enhanced)
-        geographic_data = list(users_collection.aggregate([
+        geographic_data = await users_collection.aggregate([
             {"$group": {
                 "_id": "$country",
                 "user_count": {"$sum": 1},
@@ -2869,23 +4684,23 @@ async def get_advanced_dashboard_analytics(admin_id: str = Depends(verify_admin_
                 "avg_score": {"$avg": "$score"}
             }},
             {"$sort": {"user_count": -1}}
-        ]))
+        ]).to_list(length=None)
         
         # Performance KPIs
-        total_users = users_collection.count_documents({})
-        active_users_last_30_days = users_collection.count_documents({
+        total_users = await users_collection.count_documents({})
+        active_users_last_30_days = await users_collection.count_documents({
             "created_at": {"$gte": datetime.utcnow() - timedelta(days=30)}
         })
         
-        total_tournaments = tournaments_collection.count_documents({})
-        active_tournaments = tournaments_collection.count_documents({"status": "open"})
+        total_tournaments = await tournaments_collection.count_documents({})
+        active_tournaments = await tournaments_collection.count_documents({"status": "open"})
         
         total_revenue = sum([item["total_revenue"] for item in revenue_by_category])
         
         # Affiliate metrics
-        total_affiliates = affiliates_collection.count_documents({})
-        active_affiliates = affiliates_collection.count_documents({"status": "active"})
-        total_commissions = sum([c["amount"] for c in commissions_collection.find({})])
+        total_affiliates = await affiliates_collection.count_documents({})
+        active_affiliates = await affiliates_collection.count_documents({"status": "active"})
+        total_commissions = sum([c["amount"] for c in await commissions_collection.find({}).to_list(length=None)])
         
         performance_kpis = {
             "total_users": total_users,
@@ -2925,7 +4740,7 @@ async def get_engagement_metrics(admin_id: str = Depends(verify_admin_token(Admi
             day_end = day_start + timedelta(days=1)
             
             # Count users who joined tournaments on that day
-            active_count = tournament_participants_collection.count_documents({
+            active_count = await tournament_participants_collection.count_documents({
                 "registered_at": {"$gte": day_start, "$lt": day_end}
             })
             
@@ -2936,12 +4751,11 @@ async def get_engagement_metrics(admin_id: str = Depends(verify_admin_token(Admi
         
         # Tournament Success Rates
         tournament_success_rates = []
-        tournaments = list(tournaments_collection.find({"status": {"$in": ["completed", "ongoing"]}}))
+        tournaments = await tournaments_collection.find({"status": {"$in": ["completed", "ongoing"]}}).to_list(length=None)
+        participant_counts = await count_tournament_participants([tournament["id"] for tournament in tournaments])
         
         for tournament in tournaments:
-            participants = tournament_participants_collection.count_documents({
-                "tournament_id": tournament["id"]
-            })
+            participants = participant_counts.get(tournament["id"], 0)
             
             completion_rate = (participants / max(tournament.get("max_participants", 1), 1)) * 100
             
@@ -2954,15 +4768,15 @@ async def get_engagement_metrics(admin_id: str = Depends(verify_admin_token(Admi
             })
         
         # Affiliate Conversion Funnel
-        total_referrals = referrals_collection.count_documents({})
-        active_referrals = referrals_collection.count_documents({"is_active": True})
+        total_referrals = await referrals_collection.count_documents({})
+        active_referrals = await referrals_collection.count_documents({"is_active": True})
         
         # Users who joined tournaments after referral
         referral_tournament_participation = 0
-        referrals = list(referrals_collection.find({}))
+        referrals = await referrals_collection.find({}).to_list(length=None)
         
         for referral in referrals:
-            participant_count = tournament_participants_collection.count_documents({
+            participant_count = await tournament_participants_collection.count_documents({
                 "user_id": referral["referred_user_id"]
             })
             if participant_count > 0:
@@ -2979,7 +4793,7 @@ async def get_engagement_metrics(admin_id: str = Depends(verify_admin_token(Admi
         # Financial Performance Indicators
         total_entry_fees = 0
         total_prize_pools = 0
-        tournaments_with_revenue = list(tournaments_collection.find({}))
+        tournaments_with_revenue = await tournaments_collection.find({}).to_list(length=None)
         
         for tournament in tournaments_with_revenue:
             entry_fee = tournament.get("entry_fee", 0)
@@ -3006,16 +4820,16 @@ async def get_engagement_metrics(admin_id: str = Depends(verify_admin_token(Admi
         last_month_users = set()
         
         # Get users who participated in tournaments this month
-        current_participants = list(tournament_participants_collection.find({
+        current_participants = await tournament_participants_collection.find({
             "registered_at": {"$gte": current_month}
-        }))
+        }).to_list(length=None)
         for p in current_participants:
             current_month_users.add(p["user_id"])
         
         # Get users who participated in tournaments last month
-        last_participants = list(tournament_participants_collection.find({
+        last_participants = await tournament_participants_collection.find({
             "registered_at": {"$gte": last_month, "$lt": current_month}
-        }))
+        }).to_list(length=None)
         for p in last_participants:
             last_month_users.add(p["user_id"])
         
@@ -3045,7 +4859,7 @@ async def get_content_pages(admin_id: str = Depends(verify_admin_token(AdminRole
     """Get all content pages for management"""
     try:
         # Get content pages from database
-        pages = list(content_pages_collection.find({}, {"_id": 0}))
+        pages = await content_pages_collection.find({}, {"_id": 0}).to_list(length=None)
         
         # If no pages exist, create default ones
         if not pages:
@@ -3086,7 +4900,7 @@ async def get_content_pages(admin_id: str = Depends(verify_admin_token(AdminRole
             ]
             
             # Insert default pages
-            content_pages_collection.insert_many(default_pages)
+            await content_pages_collection.insert_many(default_pages)
             pages = default_pages
             
         return {"pages": pages}
@@ -3097,7 +4911,7 @@ async def get_content_pages(admin_id: str = Depends(verify_admin_token(AdminRole
 async def get_public_content_page(page_id: str):
     """Get public content page by ID"""
     try:
-        page = content_pages_collection.find_one({"id": page_id, "is_active": True}, {"_id": 0})
+        page = await content_pages_collection.find_one({"id": page_id, "is_active": True}, {"_id": 0})
         if not page:
             raise HTTPException(status_code=404, detail="Page not found")
         return page
@@ -3118,7 +4932,7 @@ async def update_content_page(page_id: str, page_data: dict, admin_id: str = Dep
             "last_updated": datetime.utcnow()
         }
         
-        result = content_pages_collection.update_one(
+        result = await content_pages_collection.update_one(
             {"id": page_id},
             {"$set": update_data}
         )
@@ -3127,7 +4941,7 @@ async def update_content_page(page_id: str, page_data: dict, admin_id: str = Dep
             raise HTTPException(status_code=404, detail="Page not found")
             
         # Log admin action
-        admin_actions_collection.insert_one({
+        await admin_actions_collection.insert_one({
             "id": str(uuid.uuid4()),
             "admin_id": admin_id,
             "action_type": "update_content_page",
@@ -3148,7 +4962,7 @@ async def get_menu_items(admin_id: str = Depends(verify_admin_token(AdminRole.AD
     """Get all menu items for management"""
     try:
         # Get menu items from database
-        items = list(menu_items_collection.find({}, {"_id": 0}).sort("order", 1))
+        items = await menu_items_collection.find({}, {"_id": 0}).sort("order", 1).to_list(length=None)
         
         # If no items exist, create default ones
         if not items:
@@ -3201,7 +5015,8 @@ async def get_menu_items(admin_id: str = Depends(verify_admin_token(AdminRole.AD
             ]
             
             # Insert default items
-            menu_items_collection.insert_many(default_items)
+            await menu_items_collection.insert_many(default_items)
+            response_cache.invalidate("menu_items")
             items = default_items
             
         return {"menu_items": items}
@@ -3209,11 +5024,14 @@ async def get_menu_items(admin_id: str = Depends(verify_admin_token(AdminRole.AD
         raise HTTPException(status_code=500, detail=f"Error fetching menu items: {str(e)}")
 
 @app.get("/api/menu/items")
-async def get_public_menu_items():
+async def get_public_menu_items(request: Request):
     """Get public menu items"""
-    try:
-        items = list(menu_items_collection.find({"is_active": True}, {"_id": 0}).sort("order", 1))
+    async def build():
+        items = await menu_items_collection.find({"is_active": True}, {"_id": 0}).sort("order", 1).to_list(length=None)
         return {"menu_items": items}
+    
+    try:
+        return await response_cache.respond(request, "menu_items", build)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching menu items: {str(e)}")
 
@@ -3229,13 +5047,14 @@ async def update_menu_item(item_id: str, item_data: dict, admin_id: str = Depend
             "icon": item_data.get("icon")
         }
         
-        result = menu_items_collection.update_one(
+        result = await menu_items_collection.update_one(
             {"id": item_id},
             {"$set": update_data}
         )
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Menu item not found")
+        response_cache.invalidate("menu_items")
             
         return {"message": "Menu item updated successfully"}
     except Exception as e:
@@ -3245,8 +5064,13 @@ async def update_menu_item(item_id: str, item_data: dict, admin_id: str = Depend
 # BRACKET GENERATION UTILITIES
 # =============================================================================
 
-def generate_bracket(tournament_id: str, participants: List[dict]) -> dict:
-    """Generate tournament bracket for single elimination"""
+async def generate_bracket(tournament_id: str, participants: List[dict]) -> dict:
+    """Generate tournament bracket for single elimination.
+    
+    Every match is created with a precomputed next_match_id/next_match_slot link,
+    and each round tracks its completed matches, so advancing a winner never has
+    to search the bracket.
+    """
     import math
     import random
     
@@ -3261,9 +5085,12 @@ def generate_bracket(tournament_id: str, participants: List[dict]) -> dict:
     shuffled_participants = participants.copy()
     random.shuffle(shuffled_participants)
     
-    # Pad with byes if needed
-    while len(shuffled_participants) < next_power_of_2:
-        shuffled_participants.append(None)  # Bye
+    # Fill every first-round player1 slot before any player2 slot so byes are
+    # spread one per match and no first-round match is left without players
+    first_round_matches = next_power_of_2 // 2
+    player1_slots = shuffled_participants[:first_round_matches]
+    player2_slots = shuffled_participants[first_round_matches:]
+    player2_slots += [None] * (first_round_matches - len(player2_slots))  # Byes
     
     # Create bracket structure
     bracket_id = str(uuid.uuid4())
@@ -3281,6 +5108,12 @@ def generate_bracket(tournament_id: str, participants: List[dict]) -> dict:
     else:
         round_names = [f"Round {i}" for i in range(1, total_rounds-1)] + ["Semi-Finals", "Finals"]
     
+    # Match ids are assigned up front so each match can link to the one its winner feeds
+    match_ids = [
+        [str(uuid.uuid4()) for _ in range(next_power_of_2 // (2 ** round_num))]
+        for round_num in range(1, total_rounds + 1)
+    ]
+    
     # Create rounds
     rounds = []
     matches = []
@@ -3300,10 +5133,10 @@ def generate_bracket(tournament_id: str, participants: List[dict]) -> dict:
         
         # Create matches for this round
         for match_num in range(1, matches_in_round + 1):
-            match_id = str(uuid.uuid4())
+            is_final = round_num == total_rounds
             
             match_data = {
-                "id": match_id,
+                "id": match_ids[round_num - 1][match_num - 1],
                 "tournament_id": tournament_id,
                 "round_number": round_num,
                 "match_number": match_num,
@@ -3317,44 +5150,48 @@ def generate_bracket(tournament_id: str, participants: List[dict]) -> dict:
                 "scheduled_at": None,
                 "started_at": None,
                 "completed_at": None,
-                "next_match_id": None
+                "next_match_id": None if is_final else match_ids[round_num][(match_num - 1) // 2],
+                "next_match_slot": None if is_final else ("player1" if match_num % 2 == 1 else "player2")
             }
             
             # For first round, assign participants
             if round_num == 1:
-                player1_idx = (match_num - 1) * 2
-                player2_idx = player1_idx + 1
+                participant1 = player1_slots[match_num - 1]
+                participant2 = player2_slots[match_num - 1]
                 
-                if player1_idx < len(shuffled_participants) and shuffled_participants[player1_idx]:
-                    participant1 = shuffled_participants[player1_idx]
-                    match_data["player1_id"] = participant1["user_id"]
-                    match_data["player1_username"] = participant1["username"]
+                match_data["player1_id"] = participant1["user_id"]
+                match_data["player1_username"] = participant1["username"]
                 
-                if player2_idx < len(shuffled_participants) and shuffled_participants[player2_idx]:
-                    participant2 = shuffled_participants[player2_idx]
+                if participant2:
                     match_data["player2_id"] = participant2["user_id"]
                     match_data["player2_username"] = participant2["username"]
-                
-                # Handle byes (auto-advance if one player is missing)
-                if match_data["player1_id"] and not match_data["player2_id"]:
+                else:
+                    # Handle byes (auto-advance the lone player)
                     match_data["winner_id"] = match_data["player1_id"]
                     match_data["winner_username"] = match_data["player1_username"]
                     match_data["status"] = "completed"
                     match_data["completed_at"] = datetime.utcnow()
-                elif match_data["player2_id"] and not match_data["player1_id"]:
-                    match_data["winner_id"] = match_data["player2_id"]
-                    match_data["winner_username"] = match_data["player2_username"]
-                    match_data["status"] = "completed"
-                    match_data["completed_at"] = datetime.utcnow()
+                    round_data["completed_matches"] += 1
             
             matches.append(match_data)
     
+    # Byes advance straight into their second-round slot
+    matches_by_id = {match["id"]: match for match in matches}
+    for match in matches:
+        if match["round_number"] == 1 and match["status"] == "completed" and match["next_match_id"]:
+            next_match = matches_by_id[match["next_match_id"]]
+            next_match[f"{match['next_match_slot']}_id"] = match["winner_id"]
+            next_match[f"{match['next_match_slot']}_username"] = match["winner_username"]
+    
+    if rounds[0]["completed_matches"] == rounds[0]["total_matches"]:
+        rounds[0]["status"] = "completed"
+    
     # Create bracket
     bracket_data = {
         "id": bracket_id,
         "tournament_id": tournament_id,
         "total_rounds": total_rounds,
-        "current_round": 1,
+        "current_round": 2 if rounds[0]["status"] == "completed" and total_rounds > 1 else 1,
         "rounds": rounds,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
@@ -3362,17 +5199,82 @@ def generate_bracket(tournament_id: str, participants: List[dict]) -> dict:
     }
     
     # Save bracket and matches to database
-    tournament_brackets_collection.insert_one(bracket_data)
+    await tournament_brackets_collection.insert_one(bracket_data)
     if matches:
-        tournament_matches_collection.insert_many(matches)
+        await tournament_matches_collection.insert_many(matches)
     
     return bracket_data
 
-def advance_winner(match_id: str, winner_id: str) -> bool:
-    """Advance winner to next round and update bracket"""
+async def get_next_match_link(match: dict) -> tuple:
+    """Id and slot of the match a winner advances to, or (None, None) for the final.
+    
+    Brackets generated before matches stored their links fall back to a single
+    targeted lookup by round and match number.
+    """
+    if "next_match_slot" in match:
+        return match.get("next_match_id"), match.get("next_match_slot")
+    
+    next_match = await tournament_matches_collection.find_one(
+        {
+            "tournament_id": match["tournament_id"],
+            "round_number": match["round_number"] + 1,
+            "match_number": (match["match_number"] + 1) // 2
+        },
+        {"_id": 0, "id": 1}
+    )
+    if not next_match:
+        return None, None
+    return next_match["id"], "player1" if match["match_number"] % 2 == 1 else "player2"
+
+async def record_round_completions(tournament_id: str, round_number: int, completed: int) -> Optional[dict]:
+    """Add newly completed matches to a round's counter and close the round when it is full"""
+    # Rounds are stored in order, so a round's counter lives at a fixed array index
+    round_path = f"rounds.{round_number - 1}"
+    bracket = await tournament_brackets_collection.find_one_and_update(
+        {"tournament_id": tournament_id},
+        {
+            "$inc": {f"{round_path}.completed_matches": completed},
+            "$set": {"updated_at": datetime.utcnow()}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    if not bracket:
+        return None
+    
+    round_data = bracket["rounds"][round_number - 1]
+    if round_data["status"] != "completed" and round_data["completed_matches"] >= round_data["total_matches"]:
+        await tournament_brackets_collection.update_one(
+            {"id": bracket["id"]},
+            {"$set": {
+                f"{round_path}.status": "completed",
+                "current_round": min(round_number + 1, bracket["total_rounds"])
+            }}
+        )
+    
+    return bracket
+
+async def complete_tournament(tournament_id: str, winner_id: str) -> None:
+    """Mark a tournament as completed once its final has a winner"""
+    await tournaments_collection.update_one(
+        {"id": tournament_id},
+        {
+            "$set": {
+                "status": "completed",
+                "winner_id": winner_id
+            }
+        }
+    )
+
+async def advance_winner(match_id: str, winner_id: str, match: dict = None) -> bool:
+    """Advance winner to next round and update bracket.
+    
+    Costs a bounded number of targeted updates: the match itself, the linked
+    next-round slot and the round's completion counter.
+    """
     try:
         # Get the match
-        match = tournament_matches_collection.find_one({"id": match_id})
+        if match is None:
+            match = await tournament_matches_collection.find_one({"id": match_id})
         if not match:
             return False
         
@@ -3380,7 +5282,7 @@ def advance_winner(match_id: str, winner_id: str) -> bool:
         winner_username = match["player1_username"] if winner_id == match["player1_id"] else match["player2_username"]
         
         # Update match with winner
-        tournament_matches_collection.update_one(
+        previous = await tournament_matches_collection.find_one_and_update(
             {"id": match_id},
             {
                 "$set": {
@@ -3389,71 +5291,32 @@ def advance_winner(match_id: str, winner_id: str) -> bool:
                     "status": "completed",
                     "completed_at": datetime.utcnow()
                 }
-            }
+            },
+            projection={"_id": 0, "status": 1}
         )
+        newly_completed = previous is not None and previous.get("status") != "completed"
         
-        # Find next round match to advance winner to
-        tournament_id = match["tournament_id"]
-        current_round = match["round_number"]
-        next_round = current_round + 1
-        
-        # Find next match in the next round
-        next_round_matches = list(tournament_matches_collection.find({
-            "tournament_id": tournament_id,
-            "round_number": next_round
-        }).sort("match_number", 1))
+        # Move the winner into the linked slot of the next match
+        next_match_id, next_match_slot = await get_next_match_link(match)
+        if next_match_id:
+            await tournament_matches_collection.update_one(
+                {"id": next_match_id},
+                {
+                    "$set": {
+                        f"{next_match_slot}_id": winner_id,
+                        f"{next_match_slot}_username": winner_username
+                    }
+                }
+            )
         
-        if next_round_matches:
-            # Determine which match to advance to based on current match position
-            current_match_num = match["match_number"]
-            next_match_index = (current_match_num - 1) // 2
-            
-            if next_match_index < len(next_round_matches):
-                next_match = next_round_matches[next_match_index]
-                
-                # Determine if winner goes to player1 or player2 slot
-                if current_match_num % 2 == 1:  # Odd match number -> player1
-                    tournament_matches_collection.update_one(
-                        {"id": next_match["id"]},
-                        {
-                            "$set": {
-                                "player1_id": winner_id,
-                                "player1_username": winner_username
-                            }
-                        }
-                    )
-                else:  # Even match number -> player2
-                    tournament_matches_collection.update_one(
-                        {"id": next_match["id"]},
-                        {
-                            "$set": {
-                                "player2_id": winner_id,
-                                "player2_username": winner_username
-                            }
-                        }
-                    )
+        # Count the match towards its round; correcting a winner does not count twice
+        bracket = await record_round_completions(
+            match["tournament_id"], match["round_number"], 1 if newly_completed else 0
+        )
         
         # Check if tournament is complete (finals completed)
-        bracket = tournament_brackets_collection.find_one({"tournament_id": tournament_id})
-        if bracket:
-            final_round = bracket["total_rounds"]
-            final_matches = list(tournament_matches_collection.find({
-                "tournament_id": tournament_id,
-                "round_number": final_round,
-                "status": "completed"
-            }))
-            
-            if len(final_matches) > 0:
-                # Tournament is complete - update tournament with winner
-                tournaments_collection.update_one(
-                    {"id": tournament_id},
-                    {
-                        "$set": {
-                            "status": "completed",
-                            "winner_id": winner_id
-                        }
-                    }
-                )
+        if not next_match_id and bracket and match["round_number"] == bracket["total_rounds"]:
+            await complete_tournament(match["tournament_id"], winner_id)
         
         return True
         
@@ -3461,10 +5324,144 @@ def advance_winner(match_id: str, winner_id: str) -> bool:
         print(f"Error advancing winner: {e}")
         return False
 
+async def submit_round_results(tournament_id: str, round_number: int, results: List[dict]) -> dict:
+    """Set the winners of many matches of one round with bulk writes.
+    
+    Each result is {"match_id", "winner_id"}. Matches are loaded with a single $in
+    query, then match results and next-round slots are written in one bulk_write
+    each, and the round counter is updated once. Only matches that were still open
+    are completed, so repeated or concurrent submissions never advance the round twice.
+    """
+    match_ids = list(dict.fromkeys(result.get("match_id") for result in results))
+    matches_by_id = {
+        match["id"]: match
+        async for match in tournament_matches_collection.find({
+            "id": {"$in": match_ids},
+            "tournament_id": tournament_id,
+            "round_number": round_number
+        })
+    }
+    
+    now = datetime.utcnow()
+    submission_id = str(uuid.uuid4())
+    match_updates = []
+    winners = {}
+    errors = []
+    
+    for result in results:
+        match = matches_by_id.get(result.get("match_id"))
+        winner_id = result.get("winner_id")
+        if not match:
+            errors.append({"match_id": result.get("match_id"), "reason": "Match not found in this round"})
+            continue
+        if match["id"] in winners:
+            errors.append({"match_id": match["id"], "reason": "Match submitted more than once"})
+            continue
+        if match.get("status") == "completed":
+            errors.append({"match_id": match["id"], "reason": "Match already completed"})
+            continue
+        if not winner_id or winner_id not in [match.get("player1_id"), match.get("player2_id")]:
+            errors.append({"match_id": match["id"], "reason": "Winner must be one of the match players"})
+            continue
+        
+        winner_username = match["player1_username"] if winner_id == match["player1_id"] else match["player2_username"]
+        winners[match["id"]] = (winner_id, winner_username)
+        match_updates.append(UpdateOne(
+            {"id": match["id"], "status": {"$ne": "completed"}},
+            {"$set": {
+                "winner_id": winner_id,
+                "winner_username": winner_username,
+                "status": "completed",
+                "completed_at": now,
+                "result_submission_id": submission_id
+            }}
+        ))
+    
+    if match_updates:
+        await tournament_matches_collection.bulk_write(match_updates, ordered=False)
+    
+    # Matches completed by a concurrent submission did not match the update; they
+    # carry another submission id and neither advance their slot nor count again
+    accepted = [
+        match["id"]
+        async for match in tournament_matches_collection.find(
+            {"id": {"$in": list(winners)}, "result_submission_id": submission_id}, {"id": 1}
+        )
+    ]
+    for match_id in set(winners) - set(accepted):
+        errors.append({"match_id": match_id, "reason": "Match already completed"})
+    newly_completed = len(accepted)
+    
+    slot_updates = []
+    final_winner_id = None
+    for match_id in accepted:
+        winner_id, winner_username = winners[match_id]
+        next_match_id, next_match_slot = await get_next_match_link(matches_by_id[match_id])
+        if next_match_id:
+            slot_updates.append(UpdateOne(
+                {"id": next_match_id},
+                {"$set": {
+                    f"{next_match_slot}_id": winner_id,
+                    f"{next_match_slot}_username": winner_username
+                }}
+            ))
+        else:
+            final_winner_id = winner_id
+    
+    if slot_updates:
+        await tournament_matches_collection.bulk_write(slot_updates, ordered=False)
+    
+    bracket = await record_round_completions(tournament_id, round_number, newly_completed) if accepted else None
+    if final_winner_id and bracket and round_number == bracket["total_rounds"]:
+        await complete_tournament(tournament_id, final_winner_id)
+    
+    return {"completed": accepted, "errors": errors}
+
 # =============================================================================
 # TOURNAMENT SYSTEM ENDPOINTS
 # =============================================================================
 
+async def count_tournament_participants(tournament_ids: List[str]) -> Dict[str, int]:
+    """Count participants for many tournaments in a single aggregation"""
+    if not tournament_ids:
+        return {}
+    
+    pipeline = [
+        {"$match": {"tournament_id": {"$in": tournament_ids}}},
+        {"$group": {"_id": "$tournament_id", "count": {"$sum": 1}}}
+    ]
+    counts = await tournament_participants_collection.aggregate(pipeline).to_list(length=None)
+    return {entry["_id"]: entry["count"] for entry in counts}
+
+async def get_registered_tournament_ids(user_id: Optional[str], tournament_ids: List[str]) -> set:
+    """Resolve which of the given tournaments a user is registered for in one $in query"""
+    if not user_id or not tournament_ids:
+        return set()
+    
+    registrations = await tournament_participants_collection.find(
+        {"user_id": user_id, "tournament_id": {"$in": tournament_ids}},
+        {"_id": 0, "tournament_id": 1}
+    ).to_list(length=None)
+    return {registration["tournament_id"] for registration in registrations}
+
+async def enrich_tournament_listing(tournaments: List[dict], user_id: Optional[str] = None) -> List[dict]:
+    """Attach participant counts, prize pools and registration status to a tournament listing.
+    
+    Costs a fixed number of queries regardless of how many tournaments are listed.
+    """
+    tournament_ids = [tournament["id"] for tournament in tournaments]
+    participant_counts = await count_tournament_participants(tournament_ids)
+    registered_ids = await get_registered_tournament_ids(user_id, tournament_ids)
+    
+    for tournament in tournaments:
+        tournament.pop("_id", None)
+        participant_count = participant_counts.get(tournament["id"], 0)
+        tournament["current_participants"] = participant_count
+        tournament["total_prize_pool"] = participant_count * tournament["entry_fee"]
+        tournament["user_registered"] = tournament["id"] in registered_ids
+    
+    return tournaments
+
 @app.get("/api/tournaments")
 async def get_tournaments(
     status: Optional[str] = None,
@@ -3476,37 +5473,17 @@ async def get_tournaments(
     try:
         query = {"is_active": True}
         
-        if status:
-            query["status"] = status
-        if category:
-            query["entry_fee_category"] = category
-        if duration:
-            query["duration_type"] = duration
-            
-        tournaments = list(tournaments_collection.find(query))
-        
-        # Convert ObjectId to string and add participant info
-        for tournament in tournaments:
-            tournament.pop("_id", None)
-            
-            # Get participant count
-            participant_count = tournament_participants_collection.count_documents({
-                "tournament_id": tournament["id"]
-            })
-            tournament["current_participants"] = participant_count
-            
-            # Calculate total prize pool
-            tournament["total_prize_pool"] = participant_count * tournament["entry_fee"]
+        if status:
+            query["status"] = status
+        if category:
+            query["entry_fee_category"] = category
+        if duration:
+            query["duration_type"] = duration
             
-            # Check if current user is registered (if user_id provided)
-            if user_id:
-                user_registered = tournament_participants_collection.find_one({
-                    "tournament_id": tournament["id"],
-                    "user_id": user_id
-                })
-                tournament["user_registered"] = user_registered is not None
-            else:
-                tournament["user_registered"] = False
+        tournaments = await tournaments_collection.find(query).to_list(length=None)
+        
+        # Add participant counts and registration status in bulk
+        await enrich_tournament_listing(tournaments, user_id)
                 
         return {"tournaments": tournaments}
     except Exception as e:
@@ -3516,14 +5493,14 @@ async def get_tournaments(
 async def get_tournament_details(tournament_id: str, user_id: Optional[str] = Depends(lambda: None)):
     """Get detailed tournament information"""
     try:
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
             
         tournament.pop("_id", None)
         
         # Get participants
-        participants = list(tournament_participants_collection.find({"tournament_id": tournament_id}))
+        participants = await tournament_participants_collection.find({"tournament_id": tournament_id}).to_list(length=None)
         for participant in participants:
             participant.pop("_id", None)
             
@@ -3533,7 +5510,7 @@ async def get_tournament_details(tournament_id: str, user_id: Optional[str] = De
         
         # Check if current user is registered
         if user_id:
-            user_registered = tournament_participants_collection.find_one({
+            user_registered = await tournament_participants_collection.find_one({
                 "tournament_id": tournament_id,
                 "user_id": user_id
             })
@@ -3550,7 +5527,7 @@ async def join_tournament(tournament_id: str, user_id: str = Depends(verify_toke
     """Join a tournament"""
     try:
         # Check if tournament exists and is open
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
             
@@ -3558,7 +5535,7 @@ async def join_tournament(tournament_id: str, user_id: str = Depends(verify_toke
             raise HTTPException(status_code=400, detail="Tournament is not open for registration")
             
         # Check if user is already registered
-        existing_participant = tournament_participants_collection.find_one({
+        existing_participant = await tournament_participants_collection.find_one({
             "tournament_id": tournament_id,
             "user_id": user_id
         })
@@ -3566,21 +5543,21 @@ async def join_tournament(tournament_id: str, user_id: str = Depends(verify_toke
             raise HTTPException(status_code=400, detail="User already registered for this tournament")
             
         # Check if tournament is full
-        current_participants = tournament_participants_collection.count_documents({
+        current_participants = await tournament_participants_collection.count_documents({
             "tournament_id": tournament_id
         })
         if current_participants >= tournament["max_participants"]:
             raise HTTPException(status_code=400, detail="Tournament is full")
             
         # Get user data
-        user_data = users_collection.find_one({"id": user_id})
+        user_data = await users_collection.find_one({"id": user_id})
         if not user_data:
             raise HTTPException(status_code=404, detail="User not found")
             
         # Check wallet balance for tournaments with entry fee
         entry_fee = tournament.get("entry_fee", 0.0)
         if entry_fee > 0:
-            wallet = get_or_create_wallet(user_id)
+            wallet = await get_or_create_wallet(user_id)
             available_balance = wallet.get("available_balance", 0.0)
             
             if available_balance < entry_fee:
@@ -3608,11 +5585,11 @@ async def join_tournament(tournament_id: str, user_id: str = Depends(verify_toke
             "prize_won": None
         }
         
-        tournament_participants_collection.insert_one(participant_data)
+        await tournament_participants_collection.insert_one(participant_data)
         
         # Deduct entry fee from wallet if tournament has entry fee
         if entry_fee > 0:
-            transaction_success = add_transaction(
+            transaction_success = await add_transaction(
                 user_id=user_id,
                 transaction_type="tournament_entry",
                 amount=entry_fee,
@@ -3623,19 +5600,21 @@ async def join_tournament(tournament_id: str, user_id: str = Depends(verify_toke
             
             if not transaction_success:
                 # Remove participant if transaction failed
-                tournament_participants_collection.delete_one({"id": participant_id})
+                await tournament_participants_collection.delete_one({"id": participant_id})
                 raise HTTPException(status_code=500, detail="Failed to process tournament entry fee")
         
         # Update tournament participant count
-        new_participant_count = current_participants + 1
-        tournaments_collection.update_one(
+        await tournaments_collection.update_one(
             {"id": tournament_id},
-            {"$set": {"current_participants": new_participant_count}}
+            {"$inc": {"current_participants": 1}}
         )
         
+        # Tournament chat room
+        await add_tournament_room_membership(user_id, tournament_id, tournament["name"])
+        
         # Process affiliate commission for tournament entry
         if tournament["entry_fee"] > 0:
-            commission_processed = process_tournament_commission(
+            commission_processed = await process_tournament_commission(
                 user_id=user_id,
                 tournament_id=tournament_id,
                 entry_fee=tournament["entry_fee"]
@@ -3655,7 +5634,7 @@ async def leave_tournament(tournament_id: str, user_id: str = Depends(verify_tok
     """Leave a tournament (only if it hasn't started)"""
     try:
         # Check if tournament exists
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
             
@@ -3664,7 +5643,7 @@ async def leave_tournament(tournament_id: str, user_id: str = Depends(verify_tok
             raise HTTPException(status_code=400, detail="Cannot leave tournament that has started")
             
         # Check if user is registered
-        participant = tournament_participants_collection.find_one({
+        participant = await tournament_participants_collection.find_one({
             "tournament_id": tournament_id,
             "user_id": user_id
         })
@@ -3672,19 +5651,18 @@ async def leave_tournament(tournament_id: str, user_id: str = Depends(verify_tok
             raise HTTPException(status_code=404, detail="User not registered for this tournament")
             
         # Remove participant
-        tournament_participants_collection.delete_one({
+        delete_result = await tournament_participants_collection.delete_one({
             "tournament_id": tournament_id,
             "user_id": user_id
         })
         
         # Update tournament participant count
-        new_participant_count = tournament_participants_collection.count_documents({
-            "tournament_id": tournament_id
-        })
-        tournaments_collection.update_one(
-            {"id": tournament_id},
-            {"$set": {"current_participants": new_participant_count}}
-        )
+        if delete_result.deleted_count:
+            await tournaments_collection.update_one(
+                {"id": tournament_id},
+                {"$inc": {"current_participants": -1}}
+            )
+            await remove_room_memberships({"room_id": f"tournament_{tournament_id}", "user_id": user_id})
         
         return {"message": "Successfully left tournament"}
     except Exception as e:
@@ -3697,16 +5675,22 @@ async def get_user_tournaments(user_id: str, requesting_user_id: str = Depends(v
         # Users can only see their own tournaments unless they're admin
         if user_id != requesting_user_id:
             # Check if requesting user is admin
-            user_data = users_collection.find_one({"id": requesting_user_id})
+            user_data = await users_collection.find_one({"id": requesting_user_id})
             if not user_data or user_data.get("admin_role", "user") == "user":
                 raise HTTPException(status_code=403, detail="Access denied")
         
         # Get user's tournament participations
-        participants = list(tournament_participants_collection.find({"user_id": user_id}))
+        participants = await tournament_participants_collection.find({"user_id": user_id}).to_list(length=None)
+        
+        tournament_ids = [participant["tournament_id"] for participant in participants]
+        tournaments_by_id = {
+            tournament["id"]: tournament
+            async for tournament in tournaments_collection.find({"id": {"$in": tournament_ids}})
+        }
         
         tournaments = []
         for participant in participants:
-            tournament = tournaments_collection.find_one({"id": participant["tournament_id"]})
+            tournament = tournaments_by_id.get(participant["tournament_id"])
             if tournament:
                 tournament.pop("_id", None)
                 participant.pop("_id", None)
@@ -3766,10 +5750,10 @@ async def create_tournament(tournament: TournamentCreate, user_id: str = Depends
             "results": None
         }
         
-        tournaments_collection.insert_one(tournament_data)
+        await tournaments_collection.insert_one(tournament_data)
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             user_id=user_id,
             action_type="create_tournament",
             target_tournament_id=tournament_id,
@@ -3784,15 +5768,13 @@ async def create_tournament(tournament: TournamentCreate, user_id: str = Depends
 async def get_all_tournaments(user_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get all tournaments for admin management"""
     try:
-        tournaments = list(tournaments_collection.find({}))
+        tournaments = await tournaments_collection.find({}).to_list(length=None)
         
+        participant_counts = await count_tournament_participants([tournament["id"] for tournament in tournaments])
         for tournament in tournaments:
             tournament.pop("_id", None)
             
-            # Get participant count
-            participant_count = tournament_participants_collection.count_documents({
-                "tournament_id": tournament["id"]
-            })
+            participant_count = participant_counts.get(tournament["id"], 0)
             tournament["current_participants"] = participant_count
             tournament["total_prize_pool"] = participant_count * tournament["entry_fee"]
             
@@ -3809,7 +5791,7 @@ async def update_tournament(
     """Update tournament details (Admin only)"""
     try:
         # Check if tournament exists
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
             
@@ -3818,13 +5800,13 @@ async def update_tournament(
             raise HTTPException(status_code=400, detail="Cannot update tournament that is ongoing or completed")
             
         # Update tournament
-        tournaments_collection.update_one(
+        await tournaments_collection.update_one(
             {"id": tournament_id},
             {"$set": tournament_update}
         )
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             user_id=user_id,
             action_type="update_tournament",
             target_tournament_id=tournament_id,
@@ -3840,18 +5822,18 @@ async def delete_tournament(tournament_id: str, user_id: str = Depends(verify_ad
     """Delete/cancel a tournament (Admin only)"""
     try:
         # Check if tournament exists
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
             
         # Mark as cancelled instead of deleting
-        tournaments_collection.update_one(
+        await tournaments_collection.update_one(
             {"id": tournament_id},
             {"$set": {"status": "cancelled", "is_active": False}}
         )
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             user_id=user_id,
             action_type="cancel_tournament",
             target_tournament_id=tournament_id,
@@ -3871,17 +5853,17 @@ async def get_tournament_bracket(tournament_id: str):
     """Get tournament bracket and matches"""
     try:
         # Get tournament
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
         # Get bracket
-        bracket = tournament_brackets_collection.find_one({"tournament_id": tournament_id})
+        bracket = await tournament_brackets_collection.find_one({"tournament_id": tournament_id})
         if bracket:
             bracket.pop("_id", None)
         
         # Get matches
-        matches = list(tournament_matches_collection.find({"tournament_id": tournament_id}))
+        matches = await tournament_matches_collection.find({"tournament_id": tournament_id}).to_list(length=None)
         for match in matches:
             match.pop("_id", None)
         
@@ -3904,31 +5886,31 @@ async def generate_tournament_bracket(tournament_id: str, user_id: str = Depends
     """Generate bracket for tournament (Admin only)"""
     try:
         # Get tournament
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
         # Check if bracket already exists
-        existing_bracket = tournament_brackets_collection.find_one({"tournament_id": tournament_id})
+        existing_bracket = await tournament_brackets_collection.find_one({"tournament_id": tournament_id})
         if existing_bracket:
             raise HTTPException(status_code=400, detail="Bracket already generated for this tournament")
         
         # Get participants
-        participants = list(tournament_participants_collection.find({"tournament_id": tournament_id}))
+        participants = await tournament_participants_collection.find({"tournament_id": tournament_id}).to_list(length=None)
         if len(participants) < 2:
             raise HTTPException(status_code=400, detail="Need at least 2 participants to generate bracket")
         
         # Generate bracket
-        bracket_data = generate_bracket(tournament_id, participants)
+        bracket_data = await generate_bracket(tournament_id, participants)
         
         # Update tournament status to ongoing
-        tournaments_collection.update_one(
+        await tournaments_collection.update_one(
             {"id": tournament_id},
             {"$set": {"status": "ongoing"}}
         )
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             user_id=user_id,
             action_type="generate_bracket",
             target_tournament_id=tournament_id,
@@ -3948,7 +5930,7 @@ async def set_match_winner(match_id: str, winner_data: dict, user_id: str = Depe
             raise HTTPException(status_code=400, detail="Winner ID required")
         
         # Get match
-        match = tournament_matches_collection.find_one({"id": match_id})
+        match = await tournament_matches_collection.find_one({"id": match_id})
         if not match:
             raise HTTPException(status_code=404, detail="Match not found")
         
@@ -3957,12 +5939,12 @@ async def set_match_winner(match_id: str, winner_data: dict, user_id: str = Depe
             raise HTTPException(status_code=400, detail="Winner must be one of the match players")
         
         # Advance winner
-        success = advance_winner(match_id, winner_id)
+        success = await advance_winner(match_id, winner_id, match)
         if not success:
             raise HTTPException(status_code=500, detail="Error advancing winner")
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             user_id=user_id,
             action_type="set_match_winner",
             target_tournament_id=match["tournament_id"],
@@ -3973,11 +5955,44 @@ async def set_match_winner(match_id: str, winner_data: dict, user_id: str = Depe
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error setting match winner: {str(e)}")
 
+@app.post("/api/tournaments/{tournament_id}/rounds/{round_number}/results")
+async def set_round_results(
+    tournament_id: str,
+    round_number: int,
+    results_data: dict,
+    user_id: str = Depends(verify_admin_token(AdminRole.ADMIN))
+):
+    """Set winners for many matches of a round in one call (Admin only)"""
+    try:
+        results = results_data.get("results", [])
+        if not results:
+            raise HTTPException(status_code=400, detail="Results required")
+        
+        outcome = await submit_round_results(tournament_id, round_number, results)
+        
+        # Log admin action
+        await log_admin_action(
+            user_id=user_id,
+            action_type="set_round_results",
+            target_tournament_id=tournament_id,
+            details={"round_number": round_number, "completed": len(outcome["completed"]), "errors": len(outcome["errors"])}
+        )
+        
+        return {
+            "message": f"Recorded {len(outcome['completed'])} match results",
+            "completed": outcome["completed"],
+            "errors": outcome["errors"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error setting round results: {str(e)}")
+
 @app.get("/api/tournaments/{tournament_id}/matches")
 async def get_tournament_matches(tournament_id: str):
     """Get all matches for a tournament"""
     try:
-        matches = list(tournament_matches_collection.find({"tournament_id": tournament_id}))
+        matches = await tournament_matches_collection.find({"tournament_id": tournament_id}).to_list(length=None)
         for match in matches:
             match.pop("_id", None)
         
@@ -3994,7 +6009,7 @@ async def get_tournament_matches(tournament_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching tournament matches: {str(e)}")
 
 # Helper function for admin actions
-def log_admin_action(user_id: str, action_type: str, target_tournament_id: str = None, target_user_id: str = None, details: dict = None):
+async def log_admin_action(user_id: str, action_type: str, target_tournament_id: str = None, target_user_id: str = None, details: dict = None):
     """Log admin action for tournaments"""
     try:
         action_data = {
@@ -4006,7 +6021,7 @@ def log_admin_action(user_id: str, action_type: str, target_tournament_id: str =
             "details": details or {},
             "timestamp": datetime.utcnow()
         }
-        admin_actions_collection.insert_one(action_data)
+        await admin_actions_collection.insert_one(action_data)
     except Exception as e:
         print(f"Error logging admin action: {e}")
 
@@ -4019,21 +6034,21 @@ async def apply_for_affiliate(request: AffiliateApplicationRequest, user_id: str
     """Apply to become an affiliate"""
     try:
         # Check if user exists
-        user = users_collection.find_one({"id": user_id})
+        user = await users_collection.find_one({"id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Check if user already has an affiliate account
-        existing_affiliate = affiliates_collection.find_one({"user_id": user_id})
+        existing_affiliate = await affiliates_collection.find_one({"user_id": user_id})
         if existing_affiliate:
             raise HTTPException(status_code=400, detail="User already has an affiliate account")
         
         # Generate referral code
         desired_code = request.desired_referral_code
-        if desired_code and affiliates_collection.find_one({"referral_code": desired_code}):
+        if desired_code and await affiliates_collection.find_one({"referral_code": desired_code}):
             raise HTTPException(status_code=400, detail="Desired referral code already taken")
         
-        referral_code = desired_code if desired_code else generate_referral_code(user["username"], user_id)
+        referral_code = desired_code if desired_code else await generate_referral_code(user["username"], user_id)
         referral_link = generate_referral_link(referral_code)
         
         # Create affiliate record
@@ -4058,7 +6073,7 @@ async def apply_for_affiliate(request: AffiliateApplicationRequest, user_id: str
             "updated_at": datetime.utcnow()
         }
         
-        affiliates_collection.insert_one(affiliate_data)
+        await affiliates_collection.insert_one(affiliate_data)
         
         return {
             "message": "Affiliate application approved!",
@@ -4077,11 +6092,11 @@ async def get_affiliate_stats(user_id: str = Depends(verify_token)):
     """Get affiliate statistics for current user"""
     try:
         # Check if user is an affiliate
-        affiliate = affiliates_collection.find_one({"user_id": user_id})
+        affiliate = await affiliates_collection.find_one({"user_id": user_id})
         if not affiliate:
             raise HTTPException(status_code=404, detail="User is not an affiliate")
         
-        stats = calculate_affiliate_stats(user_id)
+        stats = await calculate_affiliate_stats(user_id)
         return stats
         
     except HTTPException:
@@ -4093,7 +6108,7 @@ async def get_affiliate_stats(user_id: str = Depends(verify_token)):
 async def get_affiliate_profile(user_id: str = Depends(verify_token)):
     """Get affiliate profile information"""
     try:
-        affiliate = affiliates_collection.find_one({"user_id": user_id}, {"_id": 0})
+        affiliate = await affiliates_collection.find_one({"user_id": user_id}, {"_id": 0})
         if not affiliate:
             raise HTTPException(status_code=404, detail="User is not an affiliate")
         
@@ -4109,17 +6124,17 @@ async def get_affiliate_commissions(user_id: str = Depends(verify_token), limit:
     """Get affiliate commission history"""
     try:
         # Check if user is an affiliate
-        affiliate = affiliates_collection.find_one({"user_id": user_id})
+        affiliate = await affiliates_collection.find_one({"user_id": user_id})
         if not affiliate:
             raise HTTPException(status_code=404, detail="User is not an affiliate")
         
         # Get commissions
-        commissions = list(commissions_collection.find(
+        commissions = await commissions_collection.find(
             {"affiliate_user_id": user_id},
             {"_id": 0}
-        ).sort("created_at", -1).skip(skip).limit(limit))
+        ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
         
-        total_commissions = commissions_collection.count_documents({"affiliate_user_id": user_id})
+        total_commissions = await commissions_collection.count_documents({"affiliate_user_id": user_id})
         
         return {
             "commissions": commissions,
@@ -4138,26 +6153,26 @@ async def get_affiliate_referrals(user_id: str = Depends(verify_token), limit: i
     """Get affiliate referral history"""
     try:
         # Check if user is an affiliate
-        affiliate = affiliates_collection.find_one({"user_id": user_id})
+        affiliate = await affiliates_collection.find_one({"user_id": user_id})
         if not affiliate:
             raise HTTPException(status_code=404, detail="User is not an affiliate")
         
         # Get referrals with user details
-        referrals = list(referrals_collection.find(
+        referrals = await referrals_collection.find(
             {"affiliate_user_id": user_id},
             {"_id": 0}
-        ).sort("registered_at", -1).skip(skip).limit(limit))
+        ).sort("registered_at", -1).skip(skip).limit(limit).to_list(length=None)
         
         # Enrich with user details
         for referral in referrals:
-            user = users_collection.find_one(
+            user = await users_collection.find_one(
                 {"id": referral["referred_user_id"]},
                 {"username": 1, "full_name": 1, "country": 1, "avatar_url": 1, "_id": 0}
             )
             if user:
                 referral["user_details"] = user
         
-        total_referrals = referrals_collection.count_documents({"affiliate_user_id": user_id})
+        total_referrals = await referrals_collection.count_documents({"affiliate_user_id": user_id})
         
         return {
             "referrals": referrals,
@@ -4176,7 +6191,7 @@ async def request_payout(request: AffiliatePayoutRequest, user_id: str = Depends
     """Request a payout of affiliate earnings"""
     try:
         # Check if user is an affiliate
-        affiliate = affiliates_collection.find_one({"user_id": user_id})
+        affiliate = await affiliates_collection.find_one({"user_id": user_id})
         if not affiliate:
             raise HTTPException(status_code=404, detail="User is not an affiliate")
         
@@ -4189,9 +6204,9 @@ async def request_payout(request: AffiliatePayoutRequest, user_id: str = Depends
             raise HTTPException(status_code=400, detail="Insufficient pending earnings")
         
         # Get unpaid commissions up to the requested amount
-        unpaid_commissions = list(commissions_collection.find(
+        unpaid_commissions = await commissions_collection.find(
             {"affiliate_user_id": user_id, "is_paid": False}
-        ).sort("created_at", 1))
+        ).sort("created_at", 1).to_list(length=None)
         
         commission_total = 0.0
         commission_ids = []
@@ -4222,13 +6237,14 @@ async def request_payout(request: AffiliatePayoutRequest, user_id: str = Depends
             "updated_at": datetime.utcnow()
         }
         
-        payouts_collection.insert_one(payout_data)
+        await payouts_collection.insert_one(payout_data)
         
         # Mark commissions as part of this payout (but not paid yet)
-        commissions_collection.update_many(
+        await commissions_collection.update_many(
             {"id": {"$in": commission_ids}},
             {"$set": {"payout_id": payout_id}}
         )
+        mark_financial_overview_stale()
         
         return {
             "message": "Payout request submitted successfully",
@@ -4251,18 +6267,18 @@ async def get_all_affiliates(admin_id: str = Depends(verify_admin_token(AdminRol
     """Get all affiliates for admin management"""
     try:
         # Get affiliates with user details
-        affiliates = list(affiliates_collection.find({}, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit))
+        affiliates = await affiliates_collection.find({}, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
         
         # Enrich with user details
         for affiliate in affiliates:
-            user = users_collection.find_one(
+            user = await users_collection.find_one(
                 {"id": affiliate["user_id"]},
                 {"username": 1, "full_name": 1, "email": 1, "country": 1, "_id": 0}
             )
             if user:
                 affiliate["user_details"] = user
         
-        total_affiliates = affiliates_collection.count_documents({})
+        total_affiliates = await affiliates_collection.count_documents({})
         
         return {
             "affiliates": affiliates,
@@ -4282,11 +6298,11 @@ async def get_all_payouts(admin_id: str = Depends(verify_admin_token(AdminRole.A
         if status:
             query["status"] = status
         
-        payouts = list(payouts_collection.find(query, {"_id": 0}).sort("created_at", -1))
+        payouts = await payouts_collection.find(query, {"_id": 0}).sort("created_at", -1).to_list(length=None)
         
         # Enrich with user details
         for payout in payouts:
-            user = users_collection.find_one(
+            user = await users_collection.find_one(
                 {"id": payout["affiliate_user_id"]},
                 {"username": 1, "full_name": 1, "email": 1, "_id": 0}
             )
@@ -4310,7 +6326,7 @@ async def process_payout(payout_id: str, process_data: dict, admin_id: str = Dep
             raise HTTPException(status_code=400, detail="Status must be 'completed' or 'failed'")
         
         # Get payout
-        payout = payouts_collection.find_one({"id": payout_id})
+        payout = await payouts_collection.find_one({"id": payout_id})
         if not payout:
             raise HTTPException(status_code=404, detail="Payout not found")
         
@@ -4327,19 +6343,19 @@ async def process_payout(payout_id: str, process_data: dict, admin_id: str = Dep
             "updated_at": datetime.utcnow()
         }
         
-        payouts_collection.update_one({"id": payout_id}, {"$set": update_data})
+        await payouts_collection.update_one({"id": payout_id}, {"$set": update_data})
         
         if status == "completed":
             # Mark commissions as paid
             commission_ids = payout["commission_ids"]
-            commissions_collection.update_many(
+            await commissions_collection.update_many(
                 {"id": {"$in": commission_ids}},
                 {"$set": {"is_paid": True, "paid_at": datetime.utcnow()}}
             )
             
             # Update affiliate earnings
             payout_amount = payout["amount"]
-            affiliates_collection.update_one(
+            await affiliates_collection.update_one(
                 {"user_id": payout["affiliate_user_id"]},
                 {
                     "$inc": {
@@ -4361,12 +6377,12 @@ async def process_payout(payout_id: str, process_data: dict, admin_id: str = Dep
 async def check_referral_code(referral_code: str):
     """Check if referral code is valid (public endpoint for registration)"""
     try:
-        affiliate = affiliates_collection.find_one({"referral_code": referral_code, "status": "active"})
+        affiliate = await affiliates_collection.find_one({"referral_code": referral_code, "status": "active"})
         if not affiliate:
             return {"valid": False, "message": "Invalid or inactive referral code"}
         
         # Get affiliate user details
-        user = users_collection.find_one({"id": affiliate["user_id"]}, {"username": 1, "full_name": 1, "_id": 0})
+        user = await users_collection.find_one({"id": affiliate["user_id"]}, {"username": 1, "full_name": 1, "_id": 0})
         
         return {
             "valid": True,
@@ -4388,7 +6404,7 @@ async def check_referral_code(referral_code: str):
 async def get_wallet_balance(user_id: str = Depends(verify_token)):
     """Get user's wallet balance"""
     try:
-        wallet = get_or_create_wallet(user_id)
+        wallet = await get_or_create_wallet(user_id)
         return wallet
         
     except Exception as e:
@@ -4398,28 +6414,41 @@ async def get_wallet_balance(user_id: str = Depends(verify_token)):
 async def get_wallet_stats(user_id: str = Depends(verify_token)):
     """Get comprehensive wallet statistics"""
     try:
-        stats = calculate_wallet_stats(user_id)
+        stats = await calculate_wallet_stats(user_id)
         return stats
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching wallet stats: {str(e)}")
 
 @app.get("/api/wallet/transactions")
-async def get_wallet_transactions(user_id: str = Depends(verify_token), limit: int = 50, skip: int = 0):
-    """Get user's transaction history"""
+async def get_wallet_transactions(
+    user_id: str = Depends(verify_token),
+    limit: int = 50,
+    skip: int = 0,
+    cursor: Optional[str] = None
+):
+    """Get user's transaction history.
+    
+    Pass the returned next_cursor as cursor to page without skip/count.
+    """
     try:
-        transactions = list(transactions_collection.find(
+        if cursor:
+            transactions, next_cursor = await get_transactions_page(user_id, limit, cursor)
+            return {"transactions": transactions, "next_cursor": next_cursor}
+        
+        transactions = await transactions_collection.find(
             {"user_id": user_id},
             {"_id": 0}
-        ).sort("created_at", -1).skip(skip).limit(limit))
+        ).sort([("created_at", DESCENDING), ("id", DESCENDING)]).skip(skip).limit(limit).to_list(length=None)
         
-        total_transactions = transactions_collection.count_documents({"user_id": user_id})
+        total_transactions = await transactions_collection.count_documents({"user_id": user_id})
         
         return {
             "transactions": transactions,
             "total": total_transactions,
             "page": skip // limit + 1,
-            "pages": (total_transactions + limit - 1) // limit
+            "pages": (total_transactions + limit - 1) // limit,
+            "next_cursor": encode_transaction_cursor(transactions[-1]) if len(transactions) == limit else None
         }
         
     except Exception as e:
@@ -4429,7 +6458,7 @@ async def get_wallet_transactions(user_id: str = Depends(verify_token), limit: i
 async def update_wallet_settings(settings: dict, user_id: str = Depends(verify_token)):
     """Update wallet settings"""
     try:
-        wallet = get_or_create_wallet(user_id)
+        wallet = await get_or_create_wallet(user_id)
         
         # Validate settings
         allowed_settings = [
@@ -4441,7 +6470,7 @@ async def update_wallet_settings(settings: dict, user_id: str = Depends(verify_t
             if key in allowed_settings:
                 update_data[key] = value
         
-        wallet_balances_collection.update_one(
+        await wallet_balances_collection.update_one(
             {"user_id": user_id},
             {"$set": update_data}
         )
@@ -4456,10 +6485,10 @@ async def update_wallet_settings(settings: dict, user_id: str = Depends(verify_t
 # =============================================================================
 
 @app.get("/api/admin/financial/overview")
-async def get_admin_financial_overview(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
-    """Get comprehensive financial overview for admins"""
+async def get_admin_financial_overview(refresh: bool = False, admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
+    """Get comprehensive financial overview for admins (served from a cached snapshot)"""
     try:
-        overview = calculate_admin_financial_overview()
+        overview = await get_financial_overview_snapshot(force_refresh=refresh)
         return overview
         
     except Exception as e:
@@ -4469,18 +6498,18 @@ async def get_admin_financial_overview(admin_id: str = Depends(verify_admin_toke
 async def get_all_wallets(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN)), limit: int = 50, skip: int = 0):
     """Get all user wallets for admin management"""
     try:
-        wallets = list(wallet_balances_collection.find({}, {"_id": 0}).sort("total_earned", -1).skip(skip).limit(limit))
+        wallets = await wallet_balances_collection.find({}, {"_id": 0, "applied_transaction_ids": 0}).sort("total_earned", -1).skip(skip).limit(limit).to_list(length=None)
         
         # Enrich with user details
         for wallet in wallets:
-            user = users_collection.find_one(
+            user = await users_collection.find_one(
                 {"id": wallet["user_id"]},
                 {"username": 1, "full_name": 1, "email": 1, "_id": 0}
             )
             if user:
                 wallet["user_details"] = user
         
-        total_wallets = wallet_balances_collection.count_documents({})
+        total_wallets = await wallet_balances_collection.count_documents({})
         
         return {
             "wallets": wallets,
@@ -4501,18 +6530,18 @@ async def get_all_transactions(admin_id: str = Depends(verify_admin_token(AdminR
         if transaction_type:
             query["transaction_type"] = transaction_type
         
-        transactions = list(transactions_collection.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit))
+        transactions = await transactions_collection.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
         
         # Enrich with user details
         for transaction in transactions:
-            user = users_collection.find_one(
+            user = await users_collection.find_one(
                 {"id": transaction["user_id"]},
                 {"username": 1, "full_name": 1, "_id": 0}
             )
             if user:
                 transaction["user_details"] = user
         
-        total_transactions = transactions_collection.count_documents(query)
+        total_transactions = await transactions_collection.count_documents(query)
         
         return {
             "transactions": transactions,
@@ -4529,10 +6558,10 @@ async def create_manual_adjustment(request: ManualAdjustmentRequest, admin_id: s
     """Create a manual wallet adjustment"""
     try:
         # Try to find user by ID first, then by username
-        user = users_collection.find_one({"id": request.user_id})
+        user = await users_collection.find_one({"id": request.user_id})
         if not user:
             # Try to find by username
-            user = users_collection.find_one({"username": request.user_id})
+            user = await users_collection.find_one({"username": request.user_id})
         
         if not user:
             raise HTTPException(status_code=404, detail=f"User not found with ID or username: {request.user_id}")
@@ -4544,7 +6573,7 @@ async def create_manual_adjustment(request: ManualAdjustmentRequest, admin_id: s
         transaction_type = "manual_adjustment"
         description = f"Manual adjustment: {request.reason}"
         
-        success = add_transaction(
+        success = await add_transaction(
             user_id=actual_user_id,
             transaction_type=transaction_type,
             amount=request.amount,
@@ -4558,7 +6587,7 @@ async def create_manual_adjustment(request: ManualAdjustmentRequest, admin_id: s
             raise HTTPException(status_code=500, detail="Failed to process manual adjustment")
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             user_id=admin_id,
             action_type="manual_wallet_adjustment",
             target_user_id=actual_user_id,
@@ -4579,6 +6608,128 @@ async def create_manual_adjustment(request: ManualAdjustmentRequest, admin_id: s
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing manual adjustment: {str(e)}")
 
+# =============================================================================
+# TEAM ROSTER READ MODEL
+# =============================================================================
+
+# Each team document embeds a "roster" projection with captain and member
+# summaries so team listings and details are served from the team document
+# alone. It is rebuilt whenever membership, captaincy or member profiles change.
+TEAM_ROSTER_USER_PROJECTION = {
+    "_id": 0, "id": 1, "username": 1, "full_name": 1, "avatar_url": 1, "email": 1, "country": 1
+}
+TEAM_PUBLIC_MEMBER_FIELDS = ["id", "username", "full_name", "avatar_url", "joined_at", "is_captain"]
+TEAM_ADMIN_MEMBER_FIELDS = ["id", "username", "full_name", "email", "country", "joined_at"]
+
+def user_roster_summary(user: dict) -> dict:
+    """Summary of a user as embedded in team rosters"""
+    return {
+        "id": user["id"],
+        "username": user["username"],
+        "full_name": user["full_name"],
+        "avatar_url": user.get("avatar_url"),
+        "email": user.get("email"),
+        "country": user.get("country")
+    }
+
+async def build_team_rosters(teams: List[dict]) -> Dict[str, dict]:
+    """Build roster projections for many teams with one member query and one $in user lookup"""
+    team_ids = [team["id"] for team in teams]
+    if not team_ids:
+        return {}
+    
+    memberships = await team_members_collection.find(
+        {"team_id": {"$in": team_ids}, "status": "active"}
+    ).sort("joined_at", ASCENDING).to_list(length=None)
+    
+    user_ids = {membership["user_id"] for membership in memberships}
+    user_ids.update(team["captain_id"] for team in teams if team.get("captain_id"))
+    users_by_id = {
+        user["id"]: user
+        async for user in users_collection.find({"id": {"$in": list(user_ids)}}, TEAM_ROSTER_USER_PROJECTION)
+    }
+    
+    rosters = {}
+    for team in teams:
+        captain = users_by_id.get(team.get("captain_id"))
+        rosters[team["id"]] = {
+            "captain": user_roster_summary(captain) if captain else None,
+            "members": [],
+            "member_count": 0,
+            "updated_at": datetime.utcnow()
+        }
+    
+    for membership in memberships:
+        user = users_by_id.get(membership["user_id"])
+        if not user:
+            continue
+        
+        roster = rosters[membership["team_id"]]
+        member = user_roster_summary(user)
+        member["joined_at"] = membership["joined_at"]
+        roster["members"].append(member)
+        roster["member_count"] += 1
+    
+    return rosters
+
+async def refresh_team_rosters(team_ids: List[str]) -> int:
+    """Rebuild the embedded roster of the given teams"""
+    teams = await teams_collection.find(
+        {"id": {"$in": list(team_ids)}}, {"_id": 0, "id": 1, "captain_id": 1, "name": 1, "status": 1}
+    ).to_list(length=None)
+    rosters = await build_team_rosters(teams)
+    
+    for team_id, roster in rosters.items():
+        await teams_collection.update_one({"id": team_id}, {"$set": {"roster": roster}})
+    
+    # Team chat rooms follow the roster
+    for team in teams:
+        team["roster"] = rosters[team["id"]]
+    await sync_team_room_memberships(teams)
+    
+    return len(rosters)
+
+async def refresh_user_team_rosters(user_id: str) -> int:
+    """Rebuild the rosters that embed a user after their profile changes"""
+    team_ids = await teams_collection.distinct(
+        "id", {"$or": [{"captain_id": user_id}, {"roster.members.id": user_id}]}
+    )
+    if not team_ids:
+        return 0
+    return await refresh_team_rosters(team_ids)
+
+async def backfill_team_rosters() -> int:
+    """Build rosters for teams created before the read model existed"""
+    team_ids = await teams_collection.distinct("id", {"roster": {"$exists": False}})
+    if not team_ids:
+        return 0
+    return await refresh_team_rosters(team_ids)
+
+def roster_members(team: dict, fields: List[str]) -> List[dict]:
+    """Members of a team's embedded roster, restricted to the given fields"""
+    members = []
+    for member in team.get("roster", {}).get("members", []):
+        summary = {field: member.get(field) for field in fields}
+        if "is_captain" in fields:
+            summary["is_captain"] = member["id"] == team.get("captain_id")
+        members.append(summary)
+    return members
+
+async def count_pending_team_invitations(team_ids: List[str], only_unexpired: bool = False) -> Dict[str, int]:
+    """Count pending invitations for many teams in a single aggregation"""
+    if not team_ids:
+        return {}
+    
+    match = {"team_id": {"$in": team_ids}, "status": InvitationStatus.PENDING}
+    if only_unexpired:
+        match["expires_at"] = {"$gt": datetime.utcnow()}
+    
+    counts = await team_invitations_collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$team_id", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    return {entry["_id"]: entry["count"] for entry in counts}
+
 # =============================================================================
 # TEAM SYSTEM API ENDPOINTS
 # =============================================================================
@@ -4588,16 +6739,16 @@ async def create_team(team_data: TeamCreate, user_id: str = Depends(verify_token
     """Create a new team with the current user as captain"""
     try:
         # Check if team name is unique
-        existing_team = teams_collection.find_one({"name": team_data.name})
+        existing_team = await teams_collection.find_one({"name": team_data.name})
         if existing_team:
             raise HTTPException(status_code=400, detail="Team name already exists")
         
         # Check if user is already a captain or member of another team
-        user = users_collection.find_one({"id": user_id})
+        user = await users_collection.find_one({"id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        existing_membership = team_members_collection.find_one({"user_id": user_id, "status": "active"})
+        existing_membership = await team_members_collection.find_one({"user_id": user_id, "status": "active"})
         if existing_membership:
             raise HTTPException(status_code=400, detail="You are already a member of another team")
         
@@ -4618,7 +6769,7 @@ async def create_team(team_data: TeamCreate, user_id: str = Depends(verify_token
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
-        teams_collection.insert_one(team)
+        await teams_collection.insert_one(team)
         
         # Add captain as first team member
         team_member = {
@@ -4628,14 +6779,16 @@ async def create_team(team_data: TeamCreate, user_id: str = Depends(verify_token
             "joined_at": datetime.utcnow(),
             "status": "active"
         }
-        team_members_collection.insert_one(team_member)
+        await team_members_collection.insert_one(team_member)
         
         # Update user's current team
-        users_collection.update_one(
+        await users_collection.update_one(
             {"id": user_id},
             {"$set": {"current_team_id": team_id}}
         )
         
+        await refresh_team_rosters([team_id])
+        
         return {
             "message": "Team created successfully",
             "team_id": team_id,
@@ -4651,25 +6804,20 @@ async def create_team(team_data: TeamCreate, user_id: str = Depends(verify_token
 async def get_all_teams():
     """Get all teams with basic information"""
     try:
-        teams = list(teams_collection.find({}))
+        teams = await teams_collection.find({}, {"roster.members": 0}).to_list(length=None)
         
-        # Add member count and captain info for each team
+        # Captain info and member count come from the embedded roster
         for team in teams:
             if "_id" in team:
                 team["_id"] = str(team["_id"])
             
-            # Get captain info
-            captain = users_collection.find_one({"id": team["captain_id"]})
+            roster = team.pop("roster", {})
+            captain = roster.get("captain")
             if captain:
                 team["captain_name"] = captain["full_name"]
                 team["captain_username"] = captain["username"]
             
-            # Get current member count
-            member_count = team_members_collection.count_documents({
-                "team_id": team["id"], 
-                "status": "active"
-            })
-            team["current_player_count"] = member_count
+            team["current_player_count"] = roster.get("member_count", 0)
         
         return {"teams": teams}
         
@@ -4681,15 +6829,15 @@ async def get_team_details(team_id: str):
     """Get detailed information about a specific team"""
     try:
         # Get team
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
         if "_id" in team:
             team["_id"] = str(team["_id"])
         
-        # Get captain info
-        captain = users_collection.find_one({"id": team["captain_id"]})
+        # Captain and members come from the embedded roster
+        captain = team.get("roster", {}).get("captain")
         if captain:
             team["captain"] = {
                 "id": captain["id"],
@@ -4698,34 +6846,17 @@ async def get_team_details(team_id: str):
                 "avatar_url": captain.get("avatar_url")
             }
         
-        # Get team members
-        members_data = list(team_members_collection.find({
-            "team_id": team_id,
-            "status": "active"
-        }))
-        
-        members = []
-        for member_data in members_data:
-            user = users_collection.find_one({"id": member_data["user_id"]})
-            if user:
-                members.append({
-                    "id": user["id"],
-                    "username": user["username"],
-                    "full_name": user["full_name"],
-                    "avatar_url": user.get("avatar_url"),
-                    "joined_at": member_data["joined_at"],
-                    "is_captain": user["id"] == team["captain_id"]
-                })
+        members = roster_members(team, TEAM_PUBLIC_MEMBER_FIELDS)
+        team.pop("roster", None)
         
         team["members"] = members
         team["current_player_count"] = len(members)
         
         # Get pending invitations (only for captain)
-        pending_invitations = list(team_invitations_collection.find({
+        team["pending_invitations_count"] = await team_invitations_collection.count_documents({
             "team_id": team_id,
             "status": InvitationStatus.PENDING
-        }))
-        team["pending_invitations_count"] = len(pending_invitations)
+        })
         
         return team
         
@@ -4739,7 +6870,7 @@ async def invite_player(team_id: str, invite_data: TeamInvite, user_id: str = De
     """Invite a player to join the team (Captain only)"""
     try:
         # Verify team exists and user is the captain
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
@@ -4747,7 +6878,7 @@ async def invite_player(team_id: str, invite_data: TeamInvite, user_id: str = De
             raise HTTPException(status_code=403, detail="Only team captain can send invitations")
         
         # Check if team has space (max 20 players)
-        current_members = team_members_collection.count_documents({
+        current_members = await team_members_collection.count_documents({
             "team_id": team_id,
             "status": "active"
         })
@@ -4755,7 +6886,7 @@ async def invite_player(team_id: str, invite_data: TeamInvite, user_id: str = De
             raise HTTPException(status_code=400, detail="Team is full (maximum 20 players)")
         
         # Check pending invitations limit (max 20)
-        pending_invitations = team_invitations_collection.count_documents({
+        pending_invitations = await team_invitations_collection.count_documents({
             "team_id": team_id,
             "status": InvitationStatus.PENDING
         })
@@ -4763,12 +6894,12 @@ async def invite_player(team_id: str, invite_data: TeamInvite, user_id: str = De
             raise HTTPException(status_code=400, detail="Maximum pending invitations reached (20)")
         
         # Find the user to invite
-        invited_user = users_collection.find_one({"username": invite_data.username})
+        invited_user = await users_collection.find_one({"username": invite_data.username})
         if not invited_user:
             raise HTTPException(status_code=404, detail=f"User '{invite_data.username}' not found")
         
         # Check if user is already in a team
-        existing_membership = team_members_collection.find_one({
+        existing_membership = await team_members_collection.find_one({
             "user_id": invited_user["id"],
             "status": "active"
         })
@@ -4776,7 +6907,7 @@ async def invite_player(team_id: str, invite_data: TeamInvite, user_id: str = De
             raise HTTPException(status_code=400, detail="User is already a member of another team")
         
         # Check if invitation already exists
-        existing_invitation = team_invitations_collection.find_one({
+        existing_invitation = await team_invitations_collection.find_one({
             "team_id": team_id,
             "invited_user_id": invited_user["id"],
             "status": InvitationStatus.PENDING
@@ -4796,7 +6927,7 @@ async def invite_player(team_id: str, invite_data: TeamInvite, user_id: str = De
             "sent_at": datetime.utcnow(),
             "expires_at": datetime.utcnow() + timedelta(days=7)  # 7 days to respond
         }
-        team_invitations_collection.insert_one(invitation)
+        await team_invitations_collection.insert_one(invitation)
         
         return {
             "message": f"Invitation sent to {invite_data.username}",
@@ -4812,11 +6943,11 @@ async def invite_player(team_id: str, invite_data: TeamInvite, user_id: str = De
 async def get_my_invitations(user_id: str = Depends(verify_token)):
     """Get all pending invitations for the current user"""
     try:
-        invitations = list(team_invitations_collection.find({
+        invitations = await team_invitations_collection.find({
             "invited_user_id": user_id,
             "status": InvitationStatus.PENDING,
             "expires_at": {"$gt": datetime.utcnow()}  # Not expired
-        }))
+        }).to_list(length=None)
         
         # Add team and captain details
         for invitation in invitations:
@@ -4824,7 +6955,7 @@ async def get_my_invitations(user_id: str = Depends(verify_token)):
                 invitation["_id"] = str(invitation["_id"])
             
             # Get team details
-            team = teams_collection.find_one({"id": invitation["team_id"]})
+            team = await teams_collection.find_one({"id": invitation["team_id"]})
             if team:
                 invitation["team_details"] = {
                     "name": team["name"],
@@ -4835,7 +6966,7 @@ async def get_my_invitations(user_id: str = Depends(verify_token)):
                 }
                 
                 # Get captain details
-                captain = users_collection.find_one({"id": team["captain_id"]})
+                captain = await users_collection.find_one({"id": team["captain_id"]})
                 if captain:
                     invitation["captain"] = {
                         "username": captain["username"],
@@ -4852,7 +6983,7 @@ async def accept_invitation(invitation_id: str, user_id: str = Depends(verify_to
     """Accept a team invitation"""
     try:
         # Find invitation
-        invitation = team_invitations_collection.find_one({
+        invitation = await team_invitations_collection.find_one({
             "id": invitation_id,
             "invited_user_id": user_id,
             "status": InvitationStatus.PENDING
@@ -4863,14 +6994,14 @@ async def accept_invitation(invitation_id: str, user_id: str = Depends(verify_to
         # Check if invitation is expired
         if invitation["expires_at"] < datetime.utcnow():
             # Mark as expired
-            team_invitations_collection.update_one(
+            await team_invitations_collection.update_one(
                 {"id": invitation_id},
                 {"$set": {"status": InvitationStatus.EXPIRED}}
             )
             raise HTTPException(status_code=400, detail="Invitation has expired")
         
         # Check if user is already in a team
-        existing_membership = team_members_collection.find_one({
+        existing_membership = await team_members_collection.find_one({
             "user_id": user_id,
             "status": "active"
         })
@@ -4878,11 +7009,11 @@ async def accept_invitation(invitation_id: str, user_id: str = Depends(verify_to
             raise HTTPException(status_code=400, detail="You are already a member of another team")
         
         # Check if team has space
-        team = teams_collection.find_one({"id": invitation["team_id"]})
+        team = await teams_collection.find_one({"id": invitation["team_id"]})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
-        current_members = team_members_collection.count_documents({
+        current_members = await team_members_collection.count_documents({
             "team_id": invitation["team_id"],
             "status": "active"
         })
@@ -4890,7 +7021,7 @@ async def accept_invitation(invitation_id: str, user_id: str = Depends(verify_to
             raise HTTPException(status_code=400, detail="Team is full")
         
         # Accept invitation
-        team_invitations_collection.update_one(
+        await team_invitations_collection.update_one(
             {"id": invitation_id},
             {"$set": {"status": InvitationStatus.ACCEPTED}}
         )
@@ -4903,21 +7034,23 @@ async def accept_invitation(invitation_id: str, user_id: str = Depends(verify_to
             "joined_at": datetime.utcnow(),
             "status": "active"
         }
-        team_members_collection.insert_one(team_member)
+        await team_members_collection.insert_one(team_member)
         
         # Update team player count
         new_count = current_members + 1
-        teams_collection.update_one(
+        await teams_collection.update_one(
             {"id": invitation["team_id"]},
             {"$set": {"player_count": new_count, "updated_at": datetime.utcnow()}}
         )
         
         # Update user's current team
-        users_collection.update_one(
+        await users_collection.update_one(
             {"id": user_id},
             {"$set": {"current_team_id": invitation["team_id"]}}
         )
         
+        await refresh_team_rosters([invitation["team_id"]])
+        
         return {
             "message": f"Successfully joined {team['name']}",
             "team_id": invitation["team_id"],
@@ -4934,7 +7067,7 @@ async def decline_invitation(invitation_id: str, user_id: str = Depends(verify_t
     """Decline a team invitation"""
     try:
         # Find and update invitation
-        result = team_invitations_collection.update_one(
+        result = await team_invitations_collection.update_one(
             {
                 "id": invitation_id,
                 "invited_user_id": user_id,
@@ -4958,7 +7091,7 @@ async def update_team(team_id: str, team_data: TeamUpdate, user_id: str = Depend
     """Update team information (Captain only)"""
     try:
         # Verify team exists and user is the captain
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
@@ -4970,7 +7103,7 @@ async def update_team(team_id: str, team_data: TeamUpdate, user_id: str = Depend
         if team_data.name is not None:
             # Check if new name is unique (if different from current)
             if team_data.name != team["name"]:
-                existing_team = teams_collection.find_one({"name": team_data.name})
+                existing_team = await teams_collection.find_one({"name": team_data.name})
                 if existing_team:
                     raise HTTPException(status_code=400, detail="Team name already exists")
             update_data["name"] = team_data.name
@@ -4996,7 +7129,7 @@ async def update_team(team_id: str, team_data: TeamUpdate, user_id: str = Depend
         # Update team
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
-            teams_collection.update_one(
+            await teams_collection.update_one(
                 {"id": team_id},
                 {"$set": update_data}
             )
@@ -5017,7 +7150,7 @@ async def upload_team_logo(team_id: str, logo_data: dict, user_id: str = Depends
     """Upload team logo (Captain only)"""
     try:
         # Verify team exists and user is the captain
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
@@ -5035,7 +7168,7 @@ async def upload_team_logo(team_id: str, logo_data: dict, user_id: str = Depends
             raise HTTPException(status_code=400, detail="Invalid image format")
         
         # Update team logo
-        teams_collection.update_one(
+        await teams_collection.update_one(
             {"id": team_id},
             {"$set": {
                 "logo_url": logo_base64,
@@ -5062,49 +7195,28 @@ async def upload_team_logo(team_id: str, logo_data: dict, user_id: str = Depends
 async def get_all_teams_admin(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get all teams for admin management with detailed information"""
     try:
-        teams = list(teams_collection.find({}))
+        teams = await teams_collection.find({}).to_list(length=None)
+        pending_counts = await count_pending_team_invitations(
+            [team["id"] for team in teams], only_unexpired=True
+        )
         
         # Add detailed information for each team
         for team in teams:
             if "_id" in team:
                 team["_id"] = str(team["_id"])
             
-            # Get captain info
-            captain = users_collection.find_one({"id": team["captain_id"]})
+            # Captain info and members come from the embedded roster
+            captain = team.get("roster", {}).get("captain")
             if captain:
                 team["captain_name"] = captain["full_name"]
                 team["captain_username"] = captain["username"]
                 team["captain_email"] = captain["email"]
             
-            # Get member count and details
-            members = list(team_members_collection.find({
-                "team_id": team["id"], 
-                "status": "active"
-            }))
-            team["current_player_count"] = len(members)
-            
-            # Get member details
-            team_member_details = []
-            for member in members:
-                user = users_collection.find_one({"id": member["user_id"]})
-                if user:
-                    team_member_details.append({
-                        "id": user["id"],
-                        "username": user["username"],
-                        "full_name": user["full_name"],
-                        "email": user["email"],
-                        "country": user["country"],
-                        "joined_at": member["joined_at"]
-                    })
-            team["members"] = team_member_details
+            team["members"] = roster_members(team, TEAM_ADMIN_MEMBER_FIELDS)
+            team["current_player_count"] = len(team["members"])
+            team.pop("roster", None)
             
-            # Get pending invitations count
-            pending_invitations = list(team_invitations_collection.find({
-                "team_id": team["id"],
-                "status": InvitationStatus.PENDING,
-                "expires_at": {"$gt": datetime.utcnow()}
-            }))
-            team["pending_invitations_count"] = len(pending_invitations)
+            team["pending_invitations_count"] = pending_counts.get(team["id"], 0)
             
             # Add verification status
             team["verification_status"] = team.get("verification_status", "unverified")
@@ -5120,7 +7232,7 @@ async def update_team_verification(team_id: str, verification_data: dict, admin_
     """Update team verification status (Admin only)"""
     try:
         # Verify team exists
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
@@ -5131,7 +7243,7 @@ async def update_team_verification(team_id: str, verification_data: dict, admin_
             raise HTTPException(status_code=400, detail="Invalid verification status")
         
         # Update team verification
-        teams_collection.update_one(
+        await teams_collection.update_one(
             {"id": team_id},
             {"$set": {
                 "verification_status": verification_status,
@@ -5143,7 +7255,7 @@ async def update_team_verification(team_id: str, verification_data: dict, admin_
         )
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             admin_id, 
             f"Updated team verification status",
             f"Team: {team['name']} -> Status: {verification_status}",
@@ -5166,7 +7278,7 @@ async def update_team_status(team_id: str, status_data: dict, admin_id: str = De
     """Update team status (Admin only)"""
     try:
         # Verify team exists
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
@@ -5177,7 +7289,7 @@ async def update_team_status(team_id: str, status_data: dict, admin_id: str = De
             raise HTTPException(status_code=400, detail="Invalid team status")
         
         # Update team status
-        teams_collection.update_one(
+        await teams_collection.update_one(
             {"id": team_id},
             {"$set": {
                 "status": new_status,
@@ -5190,13 +7302,14 @@ async def update_team_status(team_id: str, status_data: dict, admin_id: str = De
         
         # If team is disbanded, also update member statuses
         if new_status == "disbanded":
-            team_members_collection.update_many(
+            await team_members_collection.update_many(
                 {"team_id": team_id},
                 {"$set": {"status": "inactive", "left_at": datetime.utcnow()}}
             )
+            await refresh_team_rosters([team_id])
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             admin_id, 
             f"Updated team status",
             f"Team: {team['name']} -> Status: {new_status}. Reason: {admin_reason}",
@@ -5219,24 +7332,25 @@ async def delete_team_admin(team_id: str, admin_id: str = Depends(verify_admin_t
     """Delete team (Super Admin only)"""
     try:
         # Verify team exists
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
         # Remove all team members
-        team_members_collection.delete_many({"team_id": team_id})
+        await team_members_collection.delete_many({"team_id": team_id})
         
         # Cancel all pending invitations
-        team_invitations_collection.update_many(
+        await team_invitations_collection.update_many(
             {"team_id": team_id, "status": InvitationStatus.PENDING},
             {"$set": {"status": InvitationStatus.EXPIRED}}
         )
         
         # Delete the team
-        teams_collection.delete_one({"id": team_id})
+        await teams_collection.delete_one({"id": team_id})
+        await remove_room_memberships({"room_id": f"team_{team_id}"})
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             admin_id, 
             f"Deleted team",
             f"Team: {team['name']} (ID: {team_id})",
@@ -5272,13 +7386,13 @@ async def bulk_team_action(bulk_data: dict, admin_id: str = Depends(verify_admin
         
         for team_id in team_ids:
             try:
-                team = teams_collection.find_one({"id": team_id})
+                team = await teams_collection.find_one({"id": team_id})
                 if not team:
                     failed_actions.append({"team_id": team_id, "reason": "Team not found"})
                     continue
                 
                 if action == "verify":
-                    teams_collection.update_one(
+                    await teams_collection.update_one(
                         {"id": team_id},
                         {"$set": {
                             "verification_status": "verified",
@@ -5288,7 +7402,7 @@ async def bulk_team_action(bulk_data: dict, admin_id: str = Depends(verify_admin
                         }}
                     )
                 elif action == "unverify":
-                    teams_collection.update_one(
+                    await teams_collection.update_one(
                         {"id": team_id},
                         {"$set": {
                             "verification_status": "unverified",
@@ -5298,7 +7412,7 @@ async def bulk_team_action(bulk_data: dict, admin_id: str = Depends(verify_admin
                         }}
                     )
                 elif action == "suspend":
-                    teams_collection.update_one(
+                    await teams_collection.update_one(
                         {"id": team_id},
                         {"$set": {
                             "status": "suspended",
@@ -5309,7 +7423,7 @@ async def bulk_team_action(bulk_data: dict, admin_id: str = Depends(verify_admin
                         }}
                     )
                 elif action == "activate":
-                    teams_collection.update_one(
+                    await teams_collection.update_one(
                         {"id": team_id},
                         {"$set": {
                             "status": "active",
@@ -5320,17 +7434,18 @@ async def bulk_team_action(bulk_data: dict, admin_id: str = Depends(verify_admin
                         }}
                     )
                 elif action == "delete" and admin_id in ["super_admin", "god"]:  # Extra security for delete
-                    team_members_collection.delete_many({"team_id": team_id})
-                    team_invitations_collection.update_many(
+                    await team_members_collection.delete_many({"team_id": team_id})
+                    await team_invitations_collection.update_many(
                         {"team_id": team_id, "status": InvitationStatus.PENDING},
                         {"$set": {"status": InvitationStatus.EXPIRED}}
                     )
-                    teams_collection.delete_one({"id": team_id})
+                    await teams_collection.delete_one({"id": team_id})
+                    await remove_room_memberships({"room_id": f"team_{team_id}"})
                 
                 successful_actions.append({"team_id": team_id, "team_name": team["name"]})
                 
                 # Log admin action
-                log_admin_action(
+                await log_admin_action(
                     admin_id, 
                     f"Bulk {action}",
                     f"Team: {team['name']} (ID: {team_id})",
@@ -5358,10 +7473,10 @@ async def bulk_team_action(bulk_data: dict, admin_id: str = Depends(verify_admin
 # =============================================================================
 
 @app.get("/api/national-leagues")
-async def get_national_leagues():
+async def get_national_leagues(request: Request):
     """Get all national leagues organized by country"""
-    try:
-        leagues = list(national_leagues_collection.find({}))
+    async def build():
+        leagues = await national_leagues_collection.find({}).to_list(length=None)
         
         # Organize by country
         countries = {}
@@ -5383,6 +7498,9 @@ async def get_national_leagues():
                 countries[country]["league_2"] = league
         
         return {"countries": list(countries.values())}
+    
+    try:
+        return await response_cache.respond(request, "national_leagues", build)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching national leagues: {str(e)}")
@@ -5395,7 +7513,7 @@ async def get_league_standings(country: str, league_type: str):
             raise HTTPException(status_code=400, detail="Invalid league type")
         
         # Find the league
-        league = national_leagues_collection.find_one({
+        league = await national_leagues_collection.find_one({
             "country": country,
             "league_type": league_type
         })
@@ -5407,9 +7525,9 @@ async def get_league_standings(country: str, league_type: str):
             league["_id"] = str(league["_id"])
         
         # Get team standings for this league
-        standings = list(team_standings_collection.find({
+        standings = await team_standings_collection.find({
             "league_id": league["id"]
-        }).sort("position", 1))
+        }).sort("position", 1).to_list(length=None)
         
         for standing in standings:
             if "_id" in standing:
@@ -5428,9 +7546,9 @@ async def get_league_standings(country: str, league_type: str):
 # =============================================================================
 
 @app.get("/api/standings/countries")
-async def get_standings_countries():
+async def get_standings_countries(request: Request):
     """Get list of available countries for standings"""
-    try:
+    async def build():
         countries = [
             {"name": "Greece", "flag": "🇬🇷"},
             {"name": "Italy", "flag": "🇮🇹"},
@@ -5440,142 +7558,98 @@ async def get_standings_countries():
             {"name": "France", "flag": "🇫🇷"}
         ]
         return {"countries": countries}
+    
+    try:
+        return await response_cache.respond(request, "standings", build)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching countries: {str(e)}")
 
-@app.get("/api/standings/{country}")
-async def get_country_standings(country: str):
-    """Get standings data for a specific country"""
-    try:
-        # Mock data structure matching frontend
-        standings_data = {
-            'England': {
-                'premier': {
-                    'name': 'England Premier League',
-                    'season': '2025/2026',
-                    'rounds': [
-                        {
-                            'round': 1,
-                            'matches': [
-                                {'date': '15/08', 'time': '22:00', 'homeTeam': 'Liverpool', 'awayTeam': 'Bournemouth', 'homeScore': 3, 'awayScore': 1, 'status': 'FIN'},
-                                {'date': '16/08', 'time': '14:30', 'homeTeam': 'Aston Villa', 'awayTeam': 'Newcastle', 'homeScore': 2, 'awayScore': 1, 'status': 'FIN'},
-                                {'date': '16/08', 'time': '17:00', 'homeTeam': 'Brighton', 'awayTeam': 'Fulham', 'homeScore': 1, 'awayScore': 0, 'status': 'FIN'},
-                                {'date': '16/08', 'time': '17:00', 'homeTeam': 'Sunderland', 'awayTeam': 'West Ham', 'homeScore': None, 'awayScore': None, 'status': 'LIVE', 'liveMinute': '67'},
-                                {'date': '16/08', 'time': '17:00', 'homeTeam': 'Tottenham', 'awayTeam': 'Burnley', 'homeScore': 2, 'awayScore': 0, 'status': 'FIN'},
-                                {'date': '16/08', 'time': '19:30', 'homeTeam': 'Wolverhampton', 'awayTeam': 'Manchester City', 'homeScore': None, 'awayScore': None, 'status': 'LIVE', 'liveMinute': '45+2'},
-                                {'date': '17/08', 'time': '16:00', 'homeTeam': 'Chelsea', 'awayTeam': 'Crystal Palace', 'homeScore': None, 'awayScore': None, 'status': 'UP'},
-                                {'date': '17/08', 'time': '16:00', 'homeTeam': 'Nottingham Forest', 'awayTeam': 'Brentford', 'homeScore': None, 'awayScore': None, 'status': 'UP'},
-                                {'date': '17/08', 'time': '18:30', 'homeTeam': 'Manchester United', 'awayTeam': 'Arsenal', 'homeScore': None, 'awayScore': None, 'status': 'UP'},
-                                {'date': '18/08', 'time': '22:00', 'homeTeam': 'Leeds', 'awayTeam': 'Everton', 'homeScore': None, 'awayScore': None, 'status': 'UP'}
-                            ]
-                        }
-                    ],
-                    'standings': [
-                        {'pos': 1, 'team': 'Liverpool', 'pl': 1, 'w': 1, 'd': 0, 'l': 0, 'gf': 3, 'ga': 1, 'gd': 2, 'pts': 3, 'form': ['W']},
-                        {'pos': 2, 'team': 'Aston Villa', 'pl': 1, 'w': 1, 'd': 0, 'l': 0, 'gf': 2, 'ga': 1, 'gd': 1, 'pts': 3, 'form': ['W']},
-                        {'pos': 3, 'team': 'Brighton', 'pl': 1, 'w': 1, 'd': 0, 'l': 0, 'gf': 1, 'ga': 0, 'gd': 1, 'pts': 3, 'form': ['W']},
-                        {'pos': 4, 'team': 'Tottenham', 'pl': 1, 'w': 1, 'd': 0, 'l': 0, 'gf': 2, 'ga': 0, 'gd': 2, 'pts': 3, 'form': ['W']},
-                        {'pos': 5, 'team': 'Bournemouth', 'pl': 1, 'w': 0, 'd': 0, 'l': 1, 'gf': 1, 'ga': 3, 'gd': -2, 'pts': 0, 'form': ['L']},
-                        {'pos': 6, 'team': 'Newcastle', 'pl': 1, 'w': 0, 'd': 0, 'l': 1, 'gf': 1, 'ga': 2, 'gd': -1, 'pts': 0, 'form': ['L']},
-                        {'pos': 7, 'team': 'Fulham', 'pl': 1, 'w': 0, 'd': 0, 'l': 1, 'gf': 0, 'ga': 1, 'gd': -1, 'pts': 0, 'form': ['L']},
-                        {'pos': 8, 'team': 'Burnley', 'pl': 1, 'w': 0, 'd': 0, 'l': 1, 'gf': 0, 'ga': 2, 'gd': -2, 'pts': 0, 'form': ['L']},
-                        {'pos': 9, 'team': 'Arsenal', 'pl': 0, 'w': 0, 'd': 0, 'l': 0, 'gf': 0, 'ga': 0, 'gd': 0, 'pts': 0, 'form': []},
-                        {'pos': 10, 'team': 'Brentford', 'pl': 0, 'w': 0, 'd': 0, 'l': 0, 'gf': 0, 'ga': 0, 'gd': 0, 'pts': 0, 'form': []}
-                    ],
-                    'playerStats': [
-                        {'rank': 1, 'player': 'Mohamed Salah', 'team': 'Liverpool', 'goals': 15, 'assists': 8, 'yellowCards': 2, 'redCards': 0, 'minutes': 1240},
-                        {'rank': 2, 'player': 'Erling Haaland', 'team': 'Manchester City', 'goals': 18, 'assists': 3, 'yellowCards': 1, 'redCards': 0, 'minutes': 1180},
-                        {'rank': 3, 'player': 'Harry Kane', 'team': 'Tottenham', 'goals': 12, 'assists': 6, 'yellowCards': 3, 'redCards': 0, 'minutes': 1320},
-                        {'rank': 4, 'player': 'Bukayo Saka', 'team': 'Arsenal', 'goals': 9, 'assists': 11, 'yellowCards': 4, 'redCards': 0, 'minutes': 1410},
-                        {'rank': 5, 'player': 'Marcus Rashford', 'team': 'Manchester United', 'goals': 11, 'assists': 4, 'yellowCards': 2, 'redCards': 1, 'minutes': 1200}
-                    ]
-                }
-            },
-            'Greece': {
-                'premier': {
-                    'name': 'Greece Super League',
-                    'season': '2025/2026',
-                    'rounds': [
-                        {
-                            'round': 1,
-                            'matches': [
-                                {'date': '20/08', 'time': '18:00', 'homeTeam': 'Olympiakos', 'awayTeam': 'Panathinaikos', 'homeScore': 2, 'awayScore': 1, 'status': 'FIN'},
-                                {'date': '20/08', 'time': '20:30', 'homeTeam': 'AEK Athens', 'awayTeam': 'PAOK', 'homeScore': 1, 'awayScore': 1, 'status': 'FIN'},
-                                {'date': '21/08', 'time': '19:00', 'homeTeam': 'Aris', 'awayTeam': 'Atromitos', 'homeScore': None, 'awayScore': None, 'status': 'UP'},
-                                {'date': '21/08', 'time': '21:30', 'homeTeam': 'Volos', 'awayTeam': 'OFI Crete', 'homeScore': None, 'awayScore': None, 'status': 'UP'}
-                            ]
-                        }
-                    ],
-                    'standings': [
-                        {'pos': 1, 'team': 'Olympiakos', 'pl': 1, 'w': 1, 'd': 0, 'l': 0, 'gf': 2, 'ga': 1, 'gd': 1, 'pts': 3, 'form': ['W']},
-                        {'pos': 2, 'team': 'AEK Athens', 'pl': 1, 'w': 0, 'd': 1, 'l': 0, 'gf': 1, 'ga': 1, 'gd': 0, 'pts': 1, 'form': ['D']},
-                        {'pos': 3, 'team': 'PAOK', 'pl': 1, 'w': 0, 'd': 1, 'l': 0, 'gf': 1, 'ga': 1, 'gd': 0, 'pts': 1, 'form': ['D']},
-                        {'pos': 4, 'team': 'Panathinaikos', 'pl': 1, 'w': 0, 'd': 0, 'l': 1, 'gf': 1, 'ga': 2, 'gd': -1, 'pts': 0, 'form': ['L']}
-                    ],
-                    'playerStats': [
-                        {'rank': 1, 'player': 'Kostas Fortounis', 'team': 'Olympiakos', 'goals': 8, 'assists': 5, 'yellowCards': 1, 'redCards': 0, 'minutes': 890},
-                        {'rank': 2, 'player': 'Giorgos Giakoumakis', 'team': 'AEK Athens', 'goals': 6, 'assists': 2, 'yellowCards': 2, 'redCards': 0, 'minutes': 780},
-                        {'rank': 3, 'player': 'Andraz Sporar', 'team': 'Panathinaikos', 'goals': 5, 'assists': 3, 'yellowCards': 0, 'redCards': 0, 'minutes': 720}
-                    ]
-                }
-            },
-            'Italy': {
-                'premier': {
-                    'name': 'Serie A',
-                    'season': '2025/2026',
-                    'rounds': [
-                        {
-                            'round': 1,
-                            'matches': [
-                                {'date': '18/08', 'time': '18:00', 'homeTeam': 'Inter Milan', 'awayTeam': 'AC Milan', 'homeScore': 2, 'awayScore': 0, 'status': 'FIN'},
-                                {'date': '18/08', 'time': '20:45', 'homeTeam': 'Juventus', 'awayTeam': 'Napoli', 'homeScore': 1, 'awayScore': 3, 'status': 'FIN'},
-                                {'date': '19/08', 'time': '19:00', 'homeTeam': 'Roma', 'awayTeam': 'Lazio', 'homeScore': None, 'awayScore': None, 'status': 'LIVE', 'liveMinute': '78'},
-                                {'date': '19/08', 'time': '21:30', 'homeTeam': 'Atalanta', 'awayTeam': 'Fiorentina', 'homeScore': None, 'awayScore': None, 'status': 'UP'}
-                            ]
-                        }
-                    ],
-                    'standings': [
-                        {'pos': 1, 'team': 'Napoli', 'pl': 1, 'w': 1, 'd': 0, 'l': 0, 'gf': 3, 'ga': 1, 'gd': 2, 'pts': 3, 'form': ['W']},
-                        {'pos': 2, 'team': 'Inter Milan', 'pl': 1, 'w': 1, 'd': 0, 'l': 0, 'gf': 2, 'ga': 0, 'gd': 2, 'pts': 3, 'form': ['W']},
-                        {'pos': 3, 'team': 'AC Milan', 'pl': 1, 'w': 0, 'd': 0, 'l': 1, 'gf': 0, 'ga': 2, 'gd': -2, 'pts': 0, 'form': ['L']},
-                        {'pos': 4, 'team': 'Juventus', 'pl': 1, 'w': 0, 'd': 0, 'l': 1, 'gf': 1, 'ga': 3, 'gd': -2, 'pts': 0, 'form': ['L']}
-                    ],
-                    'playerStats': [
-                        {'rank': 1, 'player': 'Victor Osimhen', 'team': 'Napoli', 'goals': 12, 'assists': 4, 'yellowCards': 2, 'redCards': 0, 'minutes': 980},
-                        {'rank': 2, 'player': 'Lautaro Martinez', 'team': 'Inter Milan', 'goals': 10, 'assists': 6, 'yellowCards': 1, 'redCards': 0, 'minutes': 1050},
-                        {'rank': 3, 'player': 'Federico Chiesa', 'team': 'Juventus', 'goals': 7, 'assists': 8, 'yellowCards': 3, 'redCards': 0, 'minutes': 920}
-                    ]
-                }
-            }
-        }
-        
-        country_data = standings_data.get(country)
-        if not country_data:
-            raise HTTPException(status_code=404, detail="Country not found")
+# Detailed standings are a versioned data file (standings_data.json next to this module) loaded
+# once and pre-serialized per country and per league into JSON bytes with an ETag, so the
+# endpoints below are a dictionary lookup plus a byte write. A background task reloads the file
+# when its modification time changes; a file that fails to parse keeps the previous data.
+STANDINGS_DATA_PATH = os.environ.get(
+    "STANDINGS_DATA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "standings_data.json")
+)
+STANDINGS_REFRESH_SECONDS = float(os.environ.get("STANDINGS_REFRESH_SECONDS", "30"))
+
+class StandingsStore:
+    """Pre-rendered standings responses by country and by (country, league)"""
+
+    def __init__(self, path: str = STANDINGS_DATA_PATH):
+        self.path = path
+        self.version = None
+        self.mtime: Optional[float] = None
+        # {country: (body, etag)} and {(country, league): (body, etag)}
+        self.countries: Dict[str, tuple] = {}
+        self.leagues: Dict[tuple, tuple] = {}
+
+    def load(self) -> bool:
+        """Re-read the data file if it changed since the last load; True when reloaded"""
+        mtime = os.path.getmtime(self.path)
+        if mtime == self.mtime:
+            return False
         
-        return country_data
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
         
-    except HTTPException:
-        raise
+        countries = {}
+        leagues = {}
+        for country, country_data in data["countries"].items():
+            countries[country] = render_json_body(country_data)
+            for league, league_data in country_data.items():
+                leagues[(country, league)] = render_json_body(league_data)
+        
+        # Swap whole maps so a request never sees a half-loaded dataset
+        self.countries, self.leagues = countries, leagues
+        self.version = data.get("version")
+        self.mtime = mtime
+        return True
+
+standings_store = StandingsStore()
+standings_refresh_task: Optional[asyncio.Task] = None
+
+def refresh_standings():
+    try:
+        if standings_store.load():
+            print(f"Loaded standings data version {standings_store.version} ({len(standings_store.countries)} countries)")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching standings: {str(e)}")
+        print(f"Error loading standings data: {e}")
+
+async def standings_refresher() -> None:
+    """Reload the standings data file when it changes"""
+    while True:
+        await asyncio.sleep(STANDINGS_REFRESH_SECONDS)
+        refresh_standings()
+
+@app.on_event("startup")
+async def start_standings_refresher():
+    global standings_refresh_task
+    refresh_standings()
+    standings_refresh_task = asyncio.create_task(standings_refresher())
+
+@app.on_event("shutdown")
+async def stop_standings_refresher():
+    if standings_refresh_task:
+        standings_refresh_task.cancel()
+
+@app.get("/api/standings/{country}")
+async def get_country_standings(country: str, request: Request):
+    """Get standings data for a specific country"""
+    rendered = standings_store.countries.get(country)
+    if not rendered:
+        raise HTTPException(status_code=404, detail="Country not found")
+    return prerendered_response(request, *rendered)
 
 @app.get("/api/standings/{country}/{league}")
-async def get_league_standings_detail(country: str, league: str):
+async def get_league_standings_detail(country: str, league: str, request: Request):
     """Get detailed standings for a specific country and league"""
-    try:
-        country_data = await get_country_standings(country)
-        league_data = country_data.get(league)
-        
-        if not league_data:
-            raise HTTPException(status_code=404, detail="League not found")
-            
-        return league_data
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching league standings: {str(e)}")
+    rendered = standings_store.leagues.get((country, league))
+    if not rendered:
+        if country not in standings_store.countries:
+            raise HTTPException(status_code=404, detail="Country not found")
+        raise HTTPException(status_code=404, detail="League not found")
+    return prerendered_response(request, *rendered)
 
 @app.post("/api/admin/assign-team-to-league")
 async def assign_team_to_league(assignment_data: dict, admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
@@ -5592,7 +7666,7 @@ async def assign_team_to_league(assignment_data: dict, admin_id: str = Depends(v
             raise HTTPException(status_code=400, detail="Invalid league type")
         
         # Verify team exists
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
@@ -5602,7 +7676,7 @@ async def assign_team_to_league(assignment_data: dict, admin_id: str = Depends(v
         
         # Find or create the national league
         league_name = f"{country} {league_type.replace('_', ' ').title()}"
-        league = national_leagues_collection.find_one({
+        league = await national_leagues_collection.find_one({
             "country": country,
             "league_type": league_type
         })
@@ -5621,21 +7695,23 @@ async def assign_team_to_league(assignment_data: dict, admin_id: str = Depends(v
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
-            national_leagues_collection.insert_one(new_league)
+            await national_leagues_collection.insert_one(new_league)
+            response_cache.invalidate("national_leagues")
         else:
             league_id = league["id"]
             # Add team to existing league if not already there
             if team_id not in league.get("teams", []):
-                national_leagues_collection.update_one(
+                await national_leagues_collection.update_one(
                     {"id": league_id},
                     {
                         "$push": {"teams": team_id},
                         "$set": {"updated_at": datetime.utcnow()}
                     }
                 )
+                response_cache.invalidate("national_leagues")
         
         # Remove team from any other league assignment
-        league_assignments_collection.delete_many({"team_id": team_id})
+        await league_assignments_collection.delete_many({"team_id": team_id})
         
         # Create new assignment record
         assignment = {
@@ -5647,10 +7723,10 @@ async def assign_team_to_league(assignment_data: dict, admin_id: str = Depends(v
             "assigned_by": admin_id,
             "assigned_at": datetime.utcnow()
         }
-        league_assignments_collection.insert_one(assignment)
+        await league_assignments_collection.insert_one(assignment)
         
         # Create initial team standing
-        team_standings_collection.delete_many({"team_id": team_id})  # Remove old standings
+        await team_standings_collection.delete_many({"team_id": team_id})  # Remove old standings
         initial_standing = {
             "id": str(uuid.uuid4()),
             "team_id": team_id,
@@ -5668,10 +7744,10 @@ async def assign_team_to_league(assignment_data: dict, admin_id: str = Depends(v
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
-        team_standings_collection.insert_one(initial_standing)
+        await team_standings_collection.insert_one(initial_standing)
         
         # Update team with league assignment
-        teams_collection.update_one(
+        await teams_collection.update_one(
             {"id": team_id},
             {
                 "$set": {
@@ -5685,7 +7761,7 @@ async def assign_team_to_league(assignment_data: dict, admin_id: str = Depends(v
         )
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             admin_id,
             "Assigned team to league",
             f"Team: {team['name']} → {league_name}",
@@ -5709,13 +7785,13 @@ async def get_teams_without_league(admin_id: str = Depends(verify_admin_token(Ad
     """Get all teams that haven't been assigned to a league (Admin only)"""
     try:
         # Get all teams that don't have a league assignment
-        teams_without_league = list(teams_collection.find({
+        teams_without_league = await teams_collection.find({
             "$or": [
                 {"league_id": {"$exists": False}},
                 {"league_id": None},
                 {"league_id": ""}
             ]
-        }))
+        }).to_list(length=None)
         
         for team in teams_without_league:
             if "_id" in team:
@@ -5765,26 +7841,29 @@ async def initialize_country_leagues(country_data: dict, admin_id: str = Depends
         }
         
         # Check if leagues already exist
-        existing_premier = national_leagues_collection.find_one({
+        existing_premier = await national_leagues_collection.find_one({
             "country": country,
             "league_type": "premier"
         })
         
-        existing_league2 = national_leagues_collection.find_one({
+        existing_league2 = await national_leagues_collection.find_one({
             "country": country,
             "league_type": "league_2"
         })
         
         if not existing_premier:
-            national_leagues_collection.insert_one(premier_league)
+            await national_leagues_collection.insert_one(premier_league)
             leagues_created.append(f"{country} Premier")
         
         if not existing_league2:
-            national_leagues_collection.insert_one(league2)
+            await national_leagues_collection.insert_one(league2)
             leagues_created.append(f"{country} League 2")
         
+        if leagues_created:
+            response_cache.invalidate("national_leagues")
+        
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             admin_id,
             "Initialized country leagues",
             f"Country: {country}, Leagues: {', '.join(leagues_created)}"
@@ -5840,22 +7919,22 @@ async def initialize_default_countries(admin_id: str = Depends(verify_admin_toke
             }
             
             # Check if leagues already exist
-            existing_premier = national_leagues_collection.find_one({
+            existing_premier = await national_leagues_collection.find_one({
                 "country": country,
                 "league_type": "premier"
             })
             
-            existing_league2 = national_leagues_collection.find_one({
+            existing_league2 = await national_leagues_collection.find_one({
                 "country": country,
                 "league_type": "league_2"
             })
             
             if not existing_premier:
-                national_leagues_collection.insert_one(premier_league)
+                await national_leagues_collection.insert_one(premier_league)
                 leagues_created.append(f"{country} Premier")
             
             if not existing_league2:
-                national_leagues_collection.insert_one(league2)
+                await national_leagues_collection.insert_one(league2)
                 leagues_created.append(f"{country} League 2")
             
             results.append({
@@ -5863,8 +7942,10 @@ async def initialize_default_countries(admin_id: str = Depends(verify_admin_toke
                 "leagues_created": leagues_created
             })
         
+        response_cache.invalidate("national_leagues")
+        
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             admin_id,
             "Initialized default countries",
             f"Countries: {', '.join(default_countries)}"
@@ -5889,7 +7970,7 @@ async def get_league_fixtures(country: str, league_type: str):
             raise HTTPException(status_code=400, detail="Invalid league type")
         
         # Find the league
-        league = national_leagues_collection.find_one({
+        league = await national_leagues_collection.find_one({
             "country": country,
             "league_type": league_type
         })
@@ -5898,9 +7979,9 @@ async def get_league_fixtures(country: str, league_type: str):
             raise HTTPException(status_code=404, detail="League not found")
         
         # Get all fixtures for this league, grouped by matchday
-        fixtures = list(match_fixtures_collection.find({
+        fixtures = await match_fixtures_collection.find({
             "league_id": league["id"]
-        }).sort("matchday", 1))
+        }).sort("matchday", 1).to_list(length=None)
         
         # Group fixtures by matchday
         matchdays = {}
@@ -5948,7 +8029,7 @@ async def generate_league_fixtures(fixture_data: dict, admin_id: str = Depends(v
             raise HTTPException(status_code=400, detail="League ID is required")
         
         # Find the league
-        league = national_leagues_collection.find_one({"id": league_id})
+        league = await national_leagues_collection.find_one({"id": league_id})
         if not league:
             raise HTTPException(status_code=404, detail="League not found")
         
@@ -5960,7 +8041,7 @@ async def generate_league_fixtures(fixture_data: dict, admin_id: str = Depends(v
         # Get team details
         teams = []
         for team_id in team_ids:
-            team = teams_collection.find_one({"id": team_id})
+            team = await teams_collection.find_one({"id": team_id})
             if team:
                 teams.append({
                     "id": team["id"],
@@ -5971,17 +8052,17 @@ async def generate_league_fixtures(fixture_data: dict, admin_id: str = Depends(v
             raise HTTPException(status_code=400, detail="Some teams in league were not found")
         
         # Clear existing fixtures for this league
-        match_fixtures_collection.delete_many({"league_id": league_id})
+        await match_fixtures_collection.delete_many({"league_id": league_id})
         
         # Generate round-robin fixtures
         fixtures_generated = generate_round_robin_fixtures(teams, league_id, league["name"])
         
         # Insert fixtures into database
         if fixtures_generated:
-            match_fixtures_collection.insert_many(fixtures_generated)
+            await match_fixtures_collection.insert_many(fixtures_generated)
         
         # Log admin action
-        log_admin_action(
+        await log_admin_action(
             admin_id,
             "Generated league fixtures",
             f"League: {league['name']}, Teams: {len(teams)}, Fixtures: {len(fixtures_generated)}"
@@ -6091,17 +8172,36 @@ async def process_bulk_payout(payout_ids: List[str], admin_id: str = Depends(ver
         processed_payouts = []
         failed_payouts = []
         
-        for payout_id in payout_ids:
+        payouts = await payouts_collection.find(
+            {"id": {"$in": payout_ids}, "status": "pending"}, {"_id": 0}
+        ).to_list(length=None)
+        pending_ids = {payout["id"] for payout in payouts}
+        for payout_id in dict.fromkeys(payout_ids):
+            if payout_id not in pending_ids:
+                failed_payouts.append({"id": payout_id, "reason": "Invalid or non-pending payout"})
+        
+        # Post all payout transactions in one bulk ledger write before touching the
+        # payouts. The entries are keyed by payout, so if anything below fails the
+        # payouts stay pending and a retry completes them without debiting twice.
+        await post_ledger_entries([
+            {
+                "user_id": payout["affiliate_user_id"],
+                "transaction_type": "payout_completed",
+                "amount": payout["amount"],
+                "description": f"Payout completed via {payout['payment_method']}",
+                "payout_id": payout["id"],
+                "processed_by": admin_id,
+                "idempotency_key": f"payout_completed:{payout['id']}"
+            }
+            for payout in payouts
+        ])
+        
+        for payout in payouts:
+            payout_id = payout["id"]
             try:
-                # Get payout
-                payout = payouts_collection.find_one({"id": payout_id})
-                if not payout or payout["status"] != "pending":
-                    failed_payouts.append({"id": payout_id, "reason": "Invalid or non-pending payout"})
-                    continue
-                
-                # Mark as completed
-                payouts_collection.update_one(
-                    {"id": payout_id},
+                # Mark as completed; a concurrent run that got here first wins
+                result = await payouts_collection.update_one(
+                    {"id": payout_id, "status": "pending"},
                     {"$set": {
                         "status": "completed",
                         "processed_by": admin_id,
@@ -6109,26 +8209,19 @@ async def process_bulk_payout(payout_ids: List[str], admin_id: str = Depends(ver
                         "updated_at": datetime.utcnow()
                     }}
                 )
+                if not result.modified_count:
+                    failed_payouts.append({"id": payout_id, "reason": "Invalid or non-pending payout"})
+                    continue
                 
                 # Mark commissions as paid
                 commission_ids = payout["commission_ids"]
-                commissions_collection.update_many(
+                await commissions_collection.update_many(
                     {"id": {"$in": commission_ids}},
                     {"$set": {"is_paid": True, "paid_at": datetime.utcnow()}}
                 )
                 
-                # Add payout completed transaction
-                add_transaction(
-                    user_id=payout["affiliate_user_id"],
-                    transaction_type="payout_completed",
-                    amount=payout["amount"],
-                    description=f"Payout completed via {payout['payment_method']}",
-                    payout_id=payout_id,
-                    processed_by=admin_id
-                )
-                
                 # Update affiliate earnings
-                affiliates_collection.update_one(
+                await affiliates_collection.update_one(
                     {"user_id": payout["affiliate_user_id"]},
                     {
                         "$inc": {
@@ -6158,8 +8251,12 @@ async def process_bulk_payout(payout_ids: List[str], admin_id: str = Depends(ver
 # Initialize some sample data
 @app.on_event("startup")
 async def startup_event():
+    # Declared indexes must exist before any query relies on them
+    index_result = await ensure_indexes()
+    print(f"Ensured {index_result['ensured']} indexes ({len(index_result['failed'])} failed)")
+    
     # Create sample competitions
-    if competitions_collection.count_documents({}) == 0:
+    if await competitions_collection.count_documents({}) == 0:
         sample_competitions = [
             {
                 "id": str(uuid.uuid4()),
@@ -6198,11 +8295,11 @@ async def startup_event():
                 "prize_pool": 30000.0
             }
         ]
-        competitions_collection.insert_many(sample_competitions)
+        await competitions_collection.insert_many(sample_competitions)
         print("Sample competitions created")
     
     # Create sample users for testing World Map
-    if users_collection.count_documents({}) < 50:
+    if await users_collection.count_documents({}) < 50:
         import random
         
         # Avatar URLs for realistic testing
@@ -6281,11 +8378,11 @@ async def startup_event():
                 user_id_counter += 1
         
         # Insert all sample users
-        users_collection.insert_many(sample_users)
+        await users_collection.insert_many(sample_users)
         print(f"Created {len(sample_users)} sample users across {len(countries_data)} countries")
         
         # Create the demo user if it doesn't exist
-        if not users_collection.find_one({"username": "testuser"}):
+        if not await users_collection.find_one({"username": "testuser"}):
             demo_user = {
                 "id": str(uuid.uuid4()),
                 "username": "testuser",
@@ -6308,7 +8405,7 @@ async def startup_event():
                 "rank": 0,
                 "score": 85.5
             }
-            users_collection.insert_one(demo_user)
+            await users_collection.insert_one(demo_user)
             print("Demo user created")
         
         # Create admin accounts
@@ -6337,7 +8434,7 @@ async def startup_event():
         ]
         
         for admin_data in admin_accounts:
-            if not users_collection.find_one({"username": admin_data["username"]}):
+            if not await users_collection.find_one({"username": admin_data["username"]}):
                 admin_user = {
                     "id": str(uuid.uuid4()),
                     "username": admin_data["username"],
@@ -6360,10 +8457,10 @@ async def startup_event():
                     "rank": 0,
                     "score": 0.0
                 }
-                users_collection.insert_one(admin_user)
+                await users_collection.insert_one(admin_user)
                 print(f"Admin user created: {admin_data['username']} ({admin_data['admin_role']})")
     # Create sample tournaments
-    if tournaments_collection.count_documents({}) == 0:
+    if await tournaments_collection.count_documents({}) == 0:
         now = datetime.utcnow()
         
         sample_tournaments = [
@@ -6519,11 +8616,11 @@ async def startup_event():
             }
         ]
         
-        tournaments_collection.insert_many(sample_tournaments)
+        await tournaments_collection.insert_many(sample_tournaments)
         print("Sample tournaments created")
 
     # Create test user if not exists (but only if we don't have many users yet)
-    if not users_collection.find_one({"username": "testuser"}) and users_collection.count_documents({}) < 50:
+    if not await users_collection.find_one({"username": "testuser"}) and await users_collection.count_documents({}) < 50:
         test_user = {
             "id": str(uuid.uuid4()),
             "username": "testuser",
@@ -6546,13 +8643,13 @@ async def startup_event():
             "rank": 0,
             "score": 85.5
         }
-        users_collection.insert_one(test_user)
+        await users_collection.insert_one(test_user)
         print("Test user created: testuser")
 
     # Create sample affiliate data
-    if affiliates_collection.count_documents({}) == 0:
+    if await affiliates_collection.count_documents({}) == 0:
         # Create affiliate for the demo user
-        demo_user = users_collection.find_one({"username": "testuser"})
+        demo_user = await users_collection.find_one({"username": "testuser"})
         if demo_user:
             affiliate_data = {
                 "id": str(uuid.uuid4()),
@@ -6573,7 +8670,7 @@ async def startup_event():
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
-            affiliates_collection.insert_one(affiliate_data)
+            await affiliates_collection.insert_one(affiliate_data)
             print("Sample affiliate created for demo user")
             
             # Create some sample referrals and commissions
@@ -6593,7 +8690,7 @@ async def startup_event():
                 "tournaments_joined": 2,
                 "total_tournament_fees": 100.0
             }
-            referrals_collection.insert_one(referral1)
+            await referrals_collection.insert_one(referral1)
             
             # Sample commissions
             commission1 = {
@@ -6608,7 +8705,7 @@ async def startup_event():
                 "created_at": now - timedelta(days=5),
                 "description": "Registration commission for new user referral"
             }
-            commissions_collection.insert_one(commission1)
+            await commissions_collection.insert_one(commission1)
             
             commission2 = {
                 "id": str(uuid.uuid4()),
@@ -6623,31 +8720,66 @@ async def startup_event():
                 "created_at": now - timedelta(days=3),
                 "description": "Tournament entry commission (€100 × 10%)"
             }
-            commissions_collection.insert_one(commission2)
+            await commissions_collection.insert_one(commission2)
             
             print("Sample affiliate data created")
 
+    # Persisted leaderboard scores for any users seeded above
+    backfilled = await backfill_ranking_scores()
+    if backfilled:
+        print(f"Backfilled ranking scores for {backfilled} users")
+    
+    # Rebuild the country rollup when it is missing or users were seeded/backfilled above
+    if backfilled or await country_stats_collection.estimated_document_count() == 0:
+        print(f"Built country stats for {await rebuild_country_stats()} countries")
+    
+    # Monthly wallet rollups for transactions posted before rollups were kept
+    if await wallet_rollups_collection.estimated_document_count() == 0 and await transactions_collection.estimated_document_count() > 0:
+        print(f"Built {await rebuild_wallet_rollups()} wallet rollup buckets")
+    
+    # Embedded rosters for teams created before the roster read model
+    roster_count = await backfill_team_rosters()
+    if roster_count:
+        print(f"Built rosters for {roster_count} teams")
+    
+    # Chat room membership index for memberships that predate it
+    membership_count = await backfill_room_memberships()
+    if membership_count:
+        print(f"Indexed {membership_count} chat room memberships")
+    
+    # SportsDuel player stats documents for matches settled before they were kept
+    if await sportsduel_player_stats_collection.estimated_document_count() == 0 and await sportsduel_matches_collection.count_documents({"status": "completed"}, limit=1):
+        print(f"Built SportsDuel stats for {await rebuild_sportsduel_player_stats()} players")
+    
+    # SportsDuel ranking documents for matches settled before rankings were kept
+    if await sportsduel_rankings_collection.estimated_document_count() == 0 and await sportsduel_matches_collection.count_documents({"status": "completed"}, limit=1):
+        print(f"Built {await rebuild_sportsduel_rankings()} SportsDuel ranking entries")
+
 @app.get("/api/reset-data")
 async def reset_data():
     """Reset all sample data for testing"""
     try:
         # Clear existing data
-        users_collection.delete_many({})
-        competitions_collection.delete_many({})
-        tournaments_collection.delete_many({})
-        tournament_participants_collection.delete_many({})
-        affiliates_collection.delete_many({})
-        referrals_collection.delete_many({})
-        commissions_collection.delete_many({})
-        payouts_collection.delete_many({})
-        wallet_balances_collection.delete_many({})
-        transactions_collection.delete_many({})
+        await users_collection.delete_many({})
+        principal_cache.invalidate()
+        await country_stats_collection.delete_many({})
+        await competitions_collection.delete_many({})
+        await tournaments_collection.delete_many({})
+        await tournament_participants_collection.delete_many({})
+        await affiliates_collection.delete_many({})
+        await referrals_collection.delete_many({})
+        await commissions_collection.delete_many({})
+        await payouts_collection.delete_many({})
+        await wallet_balances_collection.delete_many({})
+        await transactions_collection.delete_many({})
+        await wallet_rollups_collection.delete_many({})
+        await remove_room_memberships({"type": "tournament"})
         
         # Recreate sample data
         await startup_event()
         
         # Force create test user only if it doesn't exist
-        if not users_collection.find_one({"username": "testuser"}):
+        if not await users_collection.find_one({"username": "testuser"}):
             test_user = {
                 "id": str(uuid.uuid4()),
                 "username": "testuser",
@@ -6670,7 +8802,9 @@ async def reset_data():
                 "rank": 0,
                 "score": 85.5
             }
-            users_collection.insert_one(test_user)
+            test_user["ranking_score"] = calculate_user_score(test_user)
+            await users_collection.insert_one(test_user)
+            await apply_country_stats_delta(test_user["country"], test_user)
             print("Test user created: testuser")
         
         return {"message": "Data reset successfully"}
@@ -6686,22 +8820,22 @@ async def create_guild(guild_data: GuildCreate, user_id: str = Depends(verify_to
     """Create a new guild with the current user as leader"""
     try:
         # Check if guild name is unique
-        existing_guild = guilds_collection.find_one({"name": guild_data.name})
+        existing_guild = await guilds_collection.find_one({"name": guild_data.name})
         if existing_guild:
             raise HTTPException(status_code=400, detail="Guild name already exists")
             
         # Check if guild tag is unique
-        existing_tag = guilds_collection.find_one({"tag": guild_data.tag.upper()})
+        existing_tag = await guilds_collection.find_one({"tag": guild_data.tag.upper()})
         if existing_tag:
             raise HTTPException(status_code=400, detail="Guild tag already exists")
             
         # Check if user is already in a guild
-        existing_member = guild_members_collection.find_one({"user_id": user_id})
+        existing_member = await guild_members_collection.find_one({"user_id": user_id})
         if existing_member:
             raise HTTPException(status_code=400, detail="You are already a member of another guild")
         
         # Get user info
-        user = users_collection.find_one({"id": user_id})
+        user = await users_collection.find_one({"id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -6729,7 +8863,7 @@ async def create_guild(guild_data: GuildCreate, user_id: str = Depends(verify_to
             "updated_at": datetime.utcnow()
         }
         
-        guilds_collection.insert_one(new_guild)
+        await guilds_collection.insert_one(new_guild)
         
         # Add user as guild leader
         guild_member = {
@@ -6742,7 +8876,7 @@ async def create_guild(guild_data: GuildCreate, user_id: str = Depends(verify_to
             "contributions": 0,
             "last_active": datetime.utcnow()
         }
-        guild_members_collection.insert_one(guild_member)
+        await guild_members_collection.insert_one(guild_member)
         
         # Initialize guild stats
         guild_stats = {
@@ -6760,7 +8894,7 @@ async def create_guild(guild_data: GuildCreate, user_id: str = Depends(verify_to
             "contributions_this_season": 0,
             "updated_at": datetime.utcnow()
         }
-        guild_stats_collection.insert_one(guild_stats)
+        await guild_stats_collection.insert_one(guild_stats)
         
         return {"message": "Guild created successfully", "guild_id": guild_id, "guild": serialize_doc(new_guild)}
         
@@ -6815,16 +8949,16 @@ async def get_all_guilds(
                 {"description": {"$regex": search, "$options": "i"}}
             ]
             
-        guilds = list(guilds_collection.find(query))
+        guilds = await guilds_collection.find(query).to_list(length=None)
         
         # Add additional info for each guild
         for guild in guilds:
             # Get member count
-            member_count = guild_members_collection.count_documents({"guild_id": guild["id"]})
+            member_count = await guild_members_collection.count_documents({"guild_id": guild["id"]})
             guild["member_count"] = member_count
             
             # Get guild stats
-            guild_stat = guild_stats_collection.find_one({"guild_id": guild["id"]})
+            guild_stat = await guild_stats_collection.find_one({"guild_id": guild["id"]})
             if guild_stat:
                 guild.update({
                     "level": guild_stat.get("level", 1),
@@ -6902,7 +9036,7 @@ async def get_guild_rankings(
             }
         })
         
-        rankings = list(guilds_collection.aggregate(pipeline))
+        rankings = await guilds_collection.aggregate(pipeline).to_list(length=None)
         
         # Add rank numbers
         for i, guild in enumerate(rankings):
@@ -6918,16 +9052,16 @@ async def get_guild_details(guild_id: str):
     """Get detailed information about a specific guild"""
     try:
         # Get guild
-        guild = guilds_collection.find_one({"id": guild_id})
+        guild = await guilds_collection.find_one({"id": guild_id})
         if not guild:
             raise HTTPException(status_code=404, detail="Guild not found")
         
         # Get guild members
-        members = list(guild_members_collection.find({"guild_id": guild_id}))
+        members = await guild_members_collection.find({"guild_id": guild_id}).to_list(length=None)
         
         # Get user info for each member
         for member in members:
-            user = users_collection.find_one({"id": member["user_id"]})
+            user = await users_collection.find_one({"id": member["user_id"]})
             if user:
                 member["user_info"] = {
                     "full_name": user.get("full_name"),
@@ -6936,7 +9070,7 @@ async def get_guild_details(guild_id: str):
                 }
         
         # Get guild stats
-        guild_stat = guild_stats_collection.find_one({"guild_id": guild_id})
+        guild_stat = await guild_stats_collection.find_one({"guild_id": guild_id})
         if guild_stat:
             guild.update({
                 "level": guild_stat.get("level", 1),
@@ -6951,9 +9085,9 @@ async def get_guild_details(guild_id: str):
             })
         
         # Get recent wars
-        recent_wars = list(guild_wars_collection.find({
+        recent_wars = await guild_wars_collection.find({
             "$or": [{"guild_1_id": guild_id}, {"guild_2_id": guild_id}]
-        }).sort("created_at", -1).limit(5))
+        }).sort("created_at", -1).limit(5).to_list(length=None)
         
         guild["members"] = members
         guild["member_count"] = len(members)
@@ -6971,27 +9105,27 @@ async def invite_to_guild(guild_id: str, invite_data: GuildInvite, user_id: str
     """Invite a player to join the guild (Leader/Officer only)"""
     try:
         # Verify guild exists and user has permission
-        guild = guilds_collection.find_one({"id": guild_id})
+        guild = await guilds_collection.find_one({"id": guild_id})
         if not guild:
             raise HTTPException(status_code=404, detail="Guild not found")
         
         # Check if user has permission (leader or officer)
-        member = guild_members_collection.find_one({"guild_id": guild_id, "user_id": user_id})
+        member = await guild_members_collection.find_one({"guild_id": guild_id, "user_id": user_id})
         if not member or member["role"] not in [GuildRole.LEADER, GuildRole.OFFICER]:
             raise HTTPException(status_code=403, detail="Only guild leaders and officers can invite members")
         
         # Check if target user exists
-        target_user = users_collection.find_one({"username": invite_data.username})
+        target_user = await users_collection.find_one({"username": invite_data.username})
         if not target_user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Check if target user is already in a guild
-        existing_member = guild_members_collection.find_one({"user_id": target_user["id"]})
+        existing_member = await guild_members_collection.find_one({"user_id": target_user["id"]})
         if existing_member:
             raise HTTPException(status_code=400, detail="User is already a member of another guild")
         
         # Check if invitation already exists
-        existing_invite = guild_invitations_collection.find_one({
+        existing_invite = await guild_invitations_collection.find_one({
             "guild_id": guild_id,
             "user_id": target_user["id"],
             "status": "pending"
@@ -7000,12 +9134,12 @@ async def invite_to_guild(guild_id: str, invite_data: GuildInvite, user_id: str
             raise HTTPException(status_code=400, detail="User already has a pending invitation")
         
         # Check guild member limit
-        current_member_count = guild_members_collection.count_documents({"guild_id": guild_id})
+        current_member_count = await guild_members_collection.count_documents({"guild_id": guild_id})
         if current_member_count >= guild.get("max_members", 50):
             raise HTTPException(status_code=400, detail="Guild is at maximum capacity")
         
         # Get inviter info
-        inviter = users_collection.find_one({"id": user_id})
+        inviter = await users_collection.find_one({"id": user_id})
         
         # Create invitation
         invitation_id = str(uuid.uuid4())
@@ -7024,7 +9158,7 @@ async def invite_to_guild(guild_id: str, invite_data: GuildInvite, user_id: str
             "expires_at": datetime.utcnow() + timedelta(days=7)
         }
         
-        guild_invitations_collection.insert_one(invitation)
+        await guild_invitations_collection.insert_one(invitation)
         
         return {"message": f"Invitation sent to {invite_data.username}", "invitation_id": invitation_id}
         
@@ -7037,11 +9171,11 @@ async def invite_to_guild(guild_id: str, invite_data: GuildInvite, user_id: str
 async def get_my_guild_invitations(user_id: str = Depends(verify_token)):
     """Get user's pending guild invitations"""
     try:
-        invitations = list(guild_invitations_collection.find({
+        invitations = await guild_invitations_collection.find({
             "user_id": user_id,
             "status": "pending",
             "expires_at": {"$gt": datetime.utcnow()}
-        }))
+        }).to_list(length=None)
         
         return {"invitations": serialize_doc(invitations)}
         
@@ -7053,7 +9187,7 @@ async def accept_guild_invitation(invitation_id: str, user_id: str = Depends(ver
     """Accept a guild invitation"""
     try:
         # Get invitation
-        invitation = guild_invitations_collection.find_one({"id": invitation_id})
+        invitation = await guild_invitations_collection.find_one({"id": invitation_id})
         if not invitation:
             raise HTTPException(status_code=404, detail="Invitation not found")
         
@@ -7067,21 +9201,21 @@ async def accept_guild_invitation(invitation_id: str, user_id: str = Depends(ver
             raise HTTPException(status_code=400, detail="Invitation has expired")
         
         # Check if user is already in a guild
-        existing_member = guild_members_collection.find_one({"user_id": user_id})
+        existing_member = await guild_members_collection.find_one({"user_id": user_id})
         if existing_member:
             raise HTTPException(status_code=400, detail="You are already a member of another guild")
         
         # Get guild and check capacity
-        guild = guilds_collection.find_one({"id": invitation["guild_id"]})
+        guild = await guilds_collection.find_one({"id": invitation["guild_id"]})
         if not guild:
             raise HTTPException(status_code=404, detail="Guild not found")
         
-        current_member_count = guild_members_collection.count_documents({"guild_id": invitation["guild_id"]})
+        current_member_count = await guild_members_collection.count_documents({"guild_id": invitation["guild_id"]})
         if current_member_count >= guild.get("max_members", 50):
             raise HTTPException(status_code=400, detail="Guild is at maximum capacity")
         
         # Get user info
-        user = users_collection.find_one({"id": user_id})
+        user = await users_collection.find_one({"id": user_id})
         
         # Add user to guild
         guild_member = {
@@ -7094,16 +9228,16 @@ async def accept_guild_invitation(invitation_id: str, user_id: str = Depends(ver
             "contributions": 0,
             "last_active": datetime.utcnow()
         }
-        guild_members_collection.insert_one(guild_member)
+        await guild_members_collection.insert_one(guild_member)
         
         # Update invitation status
-        guild_invitations_collection.update_one(
+        await guild_invitations_collection.update_one(
             {"id": invitation_id},
             {"$set": {"status": "accepted", "accepted_at": datetime.utcnow()}}
         )
         
         # Update guild member count
-        guilds_collection.update_one(
+        await guilds_collection.update_one(
             {"id": invitation["guild_id"]},
             {"$inc": {"member_count": 1}, "$set": {"updated_at": datetime.utcnow()}}
         )
@@ -7120,7 +9254,7 @@ async def decline_guild_invitation(invitation_id: str, user_id: str = Depends(ve
     """Decline a guild invitation"""
     try:
         # Get invitation
-        invitation = guild_invitations_collection.find_one({"id": invitation_id})
+        invitation = await guild_invitations_collection.find_one({"id": invitation_id})
         if not invitation:
             raise HTTPException(status_code=404, detail="Invitation not found")
         
@@ -7131,7 +9265,7 @@ async def decline_guild_invitation(invitation_id: str, user_id: str = Depends(ve
             raise HTTPException(status_code=400, detail="Invitation is no longer pending")
         
         # Update invitation status
-        guild_invitations_collection.update_one(
+        await guild_invitations_collection.update_one(
             {"id": invitation_id},
             {"$set": {"status": "declined", "declined_at": datetime.utcnow()}}
         )
@@ -7156,17 +9290,17 @@ async def challenge_guild_to_war(
     """Challenge another guild to war (Leader/Officer only)"""
     try:
         # Verify challenging guild exists and user has permission
-        guild = guilds_collection.find_one({"id": guild_id})
+        guild = await guilds_collection.find_one({"id": guild_id})
         if not guild:
             raise HTTPException(status_code=404, detail="Guild not found")
         
-        member = guild_members_collection.find_one({"guild_id": guild_id, "user_id": user_id})
+        member = await guild_members_collection.find_one({"guild_id": guild_id, "user_id": user_id})
         if not member or member["role"] not in [GuildRole.LEADER, GuildRole.OFFICER]:
             raise HTTPException(status_code=403, detail="Only guild leaders and officers can challenge other guilds")
         
         # Verify target guild exists
         target_guild_id = target_guild_data.get("target_guild_id")
-        target_guild = guilds_collection.find_one({"id": target_guild_id})
+        target_guild = await guilds_collection.find_one({"id": target_guild_id})
         if not target_guild:
             raise HTTPException(status_code=404, detail="Target guild not found")
         
@@ -7174,7 +9308,7 @@ async def challenge_guild_to_war(
             raise HTTPException(status_code=400, detail="Cannot challenge your own guild")
         
         # Check if there's already an active war between these guilds
-        existing_war = guild_wars_collection.find_one({
+        existing_war = await guild_wars_collection.find_one({
             "$or": [
                 {"guild_1_id": guild_id, "guild_2_id": target_guild_id, "status": {"$in": [GuildWarStatus.PENDING, GuildWarStatus.ACTIVE]}},
                 {"guild_1_id": target_guild_id, "guild_2_id": guild_id, "status": {"$in": [GuildWarStatus.PENDING, GuildWarStatus.ACTIVE]}}
@@ -7221,7 +9355,7 @@ async def challenge_guild_to_war(
             "created_by": user_id
         }
         
-        guild_wars_collection.insert_one(guild_war)
+        await guild_wars_collection.insert_one(guild_war)
         
         return {"message": f"War challenge sent to {target_guild['name']}", "war_id": war_id, "war": guild_war}
         
@@ -7241,7 +9375,7 @@ async def get_guild_wars(guild_id: str, status: Optional[str] = None):
         if status:
             query["status"] = status
         
-        wars = list(guild_wars_collection.find(query).sort("created_at", -1))
+        wars = await guild_wars_collection.find(query).sort("created_at", -1).to_list(length=None)
         
         return {"wars": wars}
         
@@ -7253,7 +9387,7 @@ async def accept_guild_war(war_id: str, user_id: str = Depends(verify_token)):
     """Accept a guild war challenge (Leader/Officer only)"""
     try:
         # Get war
-        war = guild_wars_collection.find_one({"id": war_id})
+        war = await guild_wars_collection.find_one({"id": war_id})
         if not war:
             raise HTTPException(status_code=404, detail="War not found")
         
@@ -7261,22 +9395,22 @@ async def accept_guild_war(war_id: str, user_id: str = Depends(verify_token)):
             raise HTTPException(status_code=400, detail="War is no longer pending")
         
         # Verify user has permission in the target guild
-        member = guild_members_collection.find_one({"guild_id": war["guild_2_id"], "user_id": user_id})
+        member = await guild_members_collection.find_one({"guild_id": war["guild_2_id"], "user_id": user_id})
         if not member or member["role"] not in [GuildRole.LEADER, GuildRole.OFFICER]:
             raise HTTPException(status_code=403, detail="Only guild leaders and officers can accept war challenges")
         
         # Activate the war
-        guild_wars_collection.update_one(
+        await guild_wars_collection.update_one(
             {"id": war_id},
             {"$set": {"status": GuildWarStatus.ACTIVE, "accepted_at": datetime.utcnow()}}
         )
         
         # Update guild stats
-        guild_stats_collection.update_one(
+        await guild_stats_collection.update_one(
             {"guild_id": war["guild_1_id"]},
             {"$inc": {"total_wars": 1}}
         )
-        guild_stats_collection.update_one(
+        await guild_stats_collection.update_one(
             {"guild_id": war["guild_2_id"]},
             {"$inc": {"total_wars": 1}}
         )
@@ -7293,7 +9427,7 @@ async def decline_guild_war(war_id: str, user_id: str = Depends(verify_token)):
     """Decline a guild war challenge"""
     try:
         # Get war
-        war = guild_wars_collection.find_one({"id": war_id})
+        war = await guild_wars_collection.find_one({"id": war_id})
         if not war:
             raise HTTPException(status_code=404, detail="War not found")
         
@@ -7301,12 +9435,12 @@ async def decline_guild_war(war_id: str, user_id: str = Depends(verify_token)):
             raise HTTPException(status_code=400, detail="War is no longer pending")
         
         # Verify user has permission in the target guild
-        member = guild_members_collection.find_one({"guild_id": war["guild_2_id"], "user_id": user_id})
+        member = await guild_members_collection.find_one({"guild_id": war["guild_2_id"], "user_id": user_id})
         if not member or member["role"] not in [GuildRole.LEADER, GuildRole.OFFICER]:
             raise HTTPException(status_code=403, detail="Only guild leaders and officers can decline war challenges")
         
         # Cancel the war
-        guild_wars_collection.update_one(
+        await guild_wars_collection.update_one(
             {"id": war_id},
             {"$set": {"status": GuildWarStatus.CANCELLED, "declined_at": datetime.utcnow()}}
         )
@@ -7322,7 +9456,7 @@ async def decline_guild_war(war_id: str, user_id: str = Depends(verify_token)):
 async def get_active_guild_wars():
     """Get all active guild wars"""
     try:
-        wars = list(guild_wars_collection.find({"status": GuildWarStatus.ACTIVE}).sort("start_time", 1))
+        wars = await guild_wars_collection.find({"status": GuildWarStatus.ACTIVE}).sort("start_time", 1).to_list(length=None)
         
         return {"active_wars": wars}
         
@@ -7338,7 +9472,7 @@ async def complete_war_objective(
     """Complete a war objective (automated by system events)"""
     try:
         # Get war
-        war = guild_wars_collection.find_one({"id": war_id})
+        war = await guild_wars_collection.find_one({"id": war_id})
         if not war:
             raise HTTPException(status_code=404, detail="War not found")
         
@@ -7375,7 +9509,7 @@ async def complete_war_objective(
         else:
             update_data["guild_2_score"] = war["guild_2_score"] + points_awarded
         
-        guild_wars_collection.update_one({"id": war_id}, {"$set": update_data})
+        await guild_wars_collection.update_one({"id": war_id}, {"$set": update_data})
         
         return {"message": "Objective completed", "points_awarded": points_awarded}
         
@@ -7397,11 +9531,11 @@ async def create_guild_tournament(
     """Create a guild-exclusive tournament (Leader/Officer only)"""
     try:
         # Verify guild and permissions
-        guild = guilds_collection.find_one({"id": guild_id})
+        guild = await guilds_collection.find_one({"id": guild_id})
         if not guild:
             raise HTTPException(status_code=404, detail="Guild not found")
         
-        member = guild_members_collection.find_one({"guild_id": guild_id, "user_id": user_id})
+        member = await guild_members_collection.find_one({"guild_id": guild_id, "user_id": user_id})
         if not member or member["role"] not in [GuildRole.LEADER, GuildRole.OFFICER]:
             raise HTTPException(status_code=403, detail="Only guild leaders and officers can create guild tournaments")
         
@@ -7424,7 +9558,7 @@ async def create_guild_tournament(
             "created_by": user_id
         }
         
-        guild_tournaments_collection.insert_one(guild_tournament)
+        await guild_tournaments_collection.insert_one(guild_tournament)
         
         return {"message": "Guild tournament created successfully", "tournament_id": tournament_id, "tournament": serialize_doc(guild_tournament)}
         
@@ -7437,7 +9571,7 @@ async def create_guild_tournament(
 async def get_guild_tournaments(guild_id: str):
     """Get all tournaments for a guild"""
     try:
-        tournaments = list(guild_tournaments_collection.find({"guild_id": guild_id}).sort("created_at", -1))
+        tournaments = await guild_tournaments_collection.find({"guild_id": guild_id}).sort("created_at", -1).to_list(length=None)
         
         return {"tournaments": serialize_doc(tournaments)}
         
@@ -7449,12 +9583,12 @@ async def join_guild_tournament(tournament_id: str, user_id: str = Depends(verif
     """Join a guild tournament (guild members only)"""
     try:
         # Get tournament
-        tournament = guild_tournaments_collection.find_one({"id": tournament_id})
+        tournament = await guild_tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
         # Verify user is a member of the guild
-        member = guild_members_collection.find_one({"guild_id": tournament["guild_id"], "user_id": user_id})
+        member = await guild_members_collection.find_one({"guild_id": tournament["guild_id"], "user_id": user_id})
         if not member:
             raise HTTPException(status_code=403, detail="Only guild members can join guild tournaments")
         
@@ -7471,7 +9605,7 @@ async def join_guild_tournament(tournament_id: str, user_id: str = Depends(verif
             raise HTTPException(status_code=400, detail="Tournament is full")
         
         # Add user to participants
-        guild_tournaments_collection.update_one(
+        await guild_tournaments_collection.update_one(
             {"id": tournament_id},
             {"$addToSet": {"participants": user_id}}
         )
@@ -7522,17 +9656,544 @@ class OnlineUser(BaseModel):
     current_room: str = "general"
     last_seen: datetime
 
+# Outgoing chat frames are queued per connection and drained by a sender task, so a slow
+# socket only ever backs up its own queue. When a queue is full the slow consumer policy
+# decides whether the frame is dropped for that client or the client is disconnected.
+CHAT_SEND_QUEUE_SIZE = int(os.environ.get("CHAT_SEND_QUEUE_SIZE", "256"))
+CHAT_SLOW_CONSUMER_POLICY = os.environ.get("CHAT_SLOW_CONSUMER_POLICY", "disconnect")
+CHAT_CLOSE_FLUSH_SECONDS = float(os.environ.get("CHAT_CLOSE_FLUSH_SECONDS", "1"))
+
+def chat_json_default(value):
+    """JSON fallback for chat frames (datetimes and ObjectIds)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_chat_frame(message: dict) -> str:
+    """Serialize an outgoing chat message once; the same text is queued to every recipient"""
+    return json.dumps(message, default=chat_json_default, separators=(",", ":"))
+
+class ChatConnection:
+    """A chat WebSocket with its bounded outgoing queue and the task that drains it"""
+
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int = CHAT_SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped_frames = 0
+        self.closed = False
+        self.sender_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.sender_task = asyncio.create_task(self.drain())
+
+    def is_live(self) -> bool:
+        return not self.closed
+
+    def push(self, frame: str) -> bool:
+        """Queue a frame without waiting; False means the client is not keeping up"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.dropped_frames += 1
+            return False
+
+    async def drain(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                try:
+                    await self.websocket.send_text(frame)
+                finally:
+                    self.queue.task_done()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Socket is gone; the receive loop notices and disconnects the user
+            self.closed = True
+
+    async def close(self, code: int = 1000, reason: str = "", flush: bool = False):
+        """Stop sending; with flush, give already queued frames a moment to go out first"""
+        if flush and not self.closed and self.sender_task:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=CHAT_CLOSE_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        self.closed = True
+        if self.sender_task:
+            self.sender_task.cancel()
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            # Already closed by the client
+            pass
+
+# Clients that cannot hold a WebSocket read the same frames over Server-Sent Events or
+# long-polling. Frames get a session-scoped sequence and the last CHAT_STREAM_REPLAY_SIZE are
+# kept; every request reads them through its own cursor, so several tabs of one user each get
+# every frame, and a client reconnecting with its cursor receives what it missed.
+CHAT_STREAM_REPLAY_SIZE = int(os.environ.get("CHAT_STREAM_REPLAY_SIZE", "200"))
+CHAT_STREAM_KEEPALIVE_SECONDS = float(os.environ.get("CHAT_STREAM_KEEPALIVE_SECONDS", "15"))
+CHAT_POLL_TIMEOUT_SECONDS = float(os.environ.get("CHAT_POLL_TIMEOUT_SECONDS", "25"))
+
+class ChatStreamConnection(ChatConnection):
+    """A chat session read over Server-Sent Events or long-polling instead of a WebSocket
+    
+    There is no sender task and no queue: frames go into the replay buffer and each HTTP
+    response reads the ones after its own cursor. The session outlives single requests and
+    counts as live while the client keeps coming back within the presence TTL.
+    """
+
+    def __init__(self, user_id: str, queue_size: int = CHAT_SEND_QUEUE_SIZE):
+        super().__init__(None, user_id, queue_size)
+        self.session_id = uuid.uuid4().hex[:12]
+        self.sequence = 0
+        self.replay: deque = deque(maxlen=CHAT_STREAM_REPLAY_SIZE)
+        # Highest sequence handed to any request; where a request without a cursor starts
+        self.delivered = 0
+        # Set and replaced on every frame, waking all requests waiting for one
+        self.arrived = asyncio.Event()
+        self.last_active = datetime.utcnow()
+
+    def start(self):
+        pass
+
+    def is_live(self) -> bool:
+        idle = (datetime.utcnow() - self.last_active).total_seconds()
+        return not self.closed and idle < CHAT_PRESENCE_TTL_SECONDS
+
+    def push(self, frame: str) -> bool:
+        """Append a frame to the replay; the buffer is bounded, so it never refuses one"""
+        if self.closed:
+            return False
+        self.sequence += 1
+        self.replay.append((self.sequence, frame))
+        self.arrived.set()
+        self.arrived = asyncio.Event()
+        return True
+
+    def cursor(self, sequence: Optional[int] = None) -> str:
+        return f"{self.session_id}:{self.sequence if sequence is None else sequence}"
+
+    def parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """Sequence of a cursor issued by this session, None for other sessions"""
+        if not cursor:
+            return None
+        session_id, _, sequence = cursor.partition(":")
+        if session_id != self.session_id or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def missed(self, since: Optional[int]) -> bool:
+        """True when frames after since have already been pushed out of the replay"""
+        return since is not None and bool(self.replay) and since < self.replay[0][0] - 1
+
+    def frames_after(self, since: int) -> List[tuple]:
+        frames = [entry for entry in self.replay if entry[0] > since]
+        if frames:
+            self.delivered = max(self.delivered, frames[-1][0])
+        return frames
+
+    async def next_frames(self, since: Optional[int], timeout: float) -> List[tuple]:
+        """Frames after since, waiting up to timeout when there are none
+        
+        Without a cursor the request starts after the frames already handed out.
+        """
+        self.last_active = datetime.utcnow()
+        if since is None:
+            since = self.delivered
+        frames = self.frames_after(since)
+        if frames or self.closed:
+            return frames
+        
+        arrived = self.arrived
+        try:
+            await asyncio.wait_for(arrived.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        finally:
+            self.last_active = datetime.utcnow()
+        return self.frames_after(since)
+
+    async def close(self, code: int = 1000, reason: str = "", flush: bool = False):
+        self.closed = True
+        # Wake the requests waiting for frames
+        self.arrived.set()
+
+# Chat room membership index: one document per (user, tournament/team room), maintained where
+# tournament participation and team rosters change. Workers cache each user's rooms in an LRU
+# that is invalidated over the chat bus, so room lists need no queries on the WebSocket path.
+CHAT_ROOM_CACHE_SIZE = int(os.environ.get("CHAT_ROOM_CACHE_SIZE", "10000"))
+
+def room_membership(user_id: str, room_type: ChatRoomType, ref_id: str, name: str) -> dict:
+    return {
+        "user_id": user_id,
+        "room_id": f"{room_type.value}_{ref_id}",
+        "type": room_type.value,
+        "ref_id": ref_id,
+        "name": name,
+        "updated_at": datetime.utcnow()
+    }
+
+async def upsert_room_memberships(memberships: List[dict]):
+    if not memberships:
+        return
+    await chat_room_memberships_collection.bulk_write([
+        UpdateOne({"user_id": m["user_id"], "room_id": m["room_id"]}, {"$set": m}, upsert=True)
+        for m in memberships
+    ], ordered=False)
+    await invalidate_room_memberships({m["user_id"] for m in memberships})
+
+async def remove_room_memberships(query: dict):
+    """Delete memberships matching query and invalidate the affected users' room lists"""
+    user_ids = await chat_room_memberships_collection.distinct("user_id", query)
+    if not user_ids:
+        return
+    await chat_room_memberships_collection.delete_many(query)
+    await invalidate_room_memberships(user_ids)
+
+async def invalidate_room_memberships(user_ids):
+    """Drop cached room lists on every worker; connected users get their new room list"""
+    try:
+        await chat_manager.bus.publish({"kind": "memberships", "user_ids": list(user_ids)})
+    except Exception as e:
+        print(f"Error invalidating chat rooms: {e}")
+
+async def add_tournament_room_membership(user_id: str, tournament_id: str, tournament_name: str):
+    try:
+        await upsert_room_memberships([room_membership(user_id, ChatRoomType.TOURNAMENT, tournament_id, tournament_name)])
+    except Exception as e:
+        print(f"Error indexing tournament chat room: {e}")
+
+async def sync_team_room_memberships(teams: List[dict]):
+    """Make team room memberships match the teams' rosters (captain plus active members)"""
+    try:
+        desired = {}
+        for team in teams:
+            if team.get("status") == "disbanded":
+                continue
+            user_ids = {member["id"] for member in team.get("roster", {}).get("members", [])}
+            if team.get("captain_id"):
+                user_ids.add(team["captain_id"])
+            for user_id in user_ids:
+                membership = room_membership(user_id, ChatRoomType.TEAM, team["id"], team.get("name", ""))
+                desired[(user_id, membership["room_id"])] = membership
+        
+        room_ids = [f"team_{team['id']}" for team in teams]
+        existing = {
+            (membership["user_id"], membership["room_id"]): membership["name"]
+            async for membership in chat_room_memberships_collection.find(
+                {"room_id": {"$in": room_ids}}, {"_id": 0, "user_id": 1, "room_id": 1, "name": 1}
+            )
+        }
+        stale = [key for key in existing if key not in desired]
+        for user_id, room_id in stale:
+            await chat_room_memberships_collection.delete_one({"user_id": user_id, "room_id": room_id})
+        
+        # Only new memberships and renamed teams are written
+        await upsert_room_memberships([
+            membership for key, membership in desired.items() if existing.get(key) != membership["name"]
+        ])
+        if stale:
+            await invalidate_room_memberships({user_id for user_id, _ in stale})
+    except Exception as e:
+        print(f"Error syncing team chat rooms: {e}")
+
+async def backfill_room_memberships() -> int:
+    """Build the membership index from participants and rosters when it is empty"""
+    if await chat_room_memberships_collection.estimated_document_count() > 0:
+        return 0
+    
+    participants = await tournament_participants_collection.find(
+        {}, {"_id": 0, "user_id": 1, "tournament_id": 1}
+    ).to_list(length=None)
+    tournament_names = {
+        tournament["id"]: tournament["name"]
+        async for tournament in tournaments_collection.find(
+            {"id": {"$in": list({p["tournament_id"] for p in participants})}}, {"_id": 0, "id": 1, "name": 1}
+        )
+    }
+    memberships = [
+        room_membership(p["user_id"], ChatRoomType.TOURNAMENT, p["tournament_id"], tournament_names[p["tournament_id"]])
+        for p in participants
+        if p.get("user_id") and p.get("tournament_id") in tournament_names
+    ]
+    await upsert_room_memberships(memberships)
+    
+    teams = await teams_collection.find(
+        {"roster": {"$exists": True}}, {"_id": 0, "id": 1, "captain_id": 1, "name": 1, "status": 1, "roster.members.id": 1}
+    ).to_list(length=None)
+    await sync_team_room_memberships(teams)
+    
+    return await chat_room_memberships_collection.count_documents({})
+
+# Chat history: the newest CHAT_HISTORY_BUFFER_SIZE messages of each room are kept in a ring
+# buffer; older pages are read from chat_messages, which expires after the retention period.
+CHAT_HISTORY_BUFFER_SIZE = int(os.environ.get("CHAT_HISTORY_BUFFER_SIZE", "200"))
+# At most this many rooms keep a buffer; the least recently used one is dropped and reloaded
+# from chat_messages when it is used again.
+CHAT_HISTORY_ROOMS = int(os.environ.get("CHAT_HISTORY_ROOMS", "1000"))
+
+def chat_timestamp() -> datetime:
+    """Current time truncated to milliseconds, the precision MongoDB stores"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def chat_message_json(message: "ChatMessage") -> dict:
+    """Chat message as returned by the REST endpoints"""
+    return {**message.dict(), "timestamp": message.timestamp.isoformat()}
+
+def encode_chat_cursor(message: "ChatMessage") -> str:
+    """Opaque cursor pointing at a message in a room's timeline"""
+    return f"{message.timestamp.isoformat()}|{message.id}"
+
+def decode_chat_cursor(cursor: str) -> tuple:
+    timestamp, message_id = cursor.split("|", 1)
+    return datetime.fromisoformat(timestamp), message_id
+
+def chat_message_key(message: "ChatMessage") -> tuple:
+    return message.timestamp, message.id
+
+def chat_cursor_query(cursor: str, operator: str) -> dict:
+    """Query matching messages before ($lt) or after ($gt) the cursor"""
+    timestamp, message_id = decode_chat_cursor(cursor)
+    return {"$or": [
+        {"timestamp": {operator: timestamp}},
+        {"timestamp": timestamp, "id": {operator: message_id}}
+    ]}
+
+class ChatHistory:
+    """Recent messages per room in bounded ring buffers, backed by the chat_messages collection
+    
+    Only the worker that accepts a message persists it; every worker appends it to its own
+    buffer when the room event arrives. Buffers are filled from the collection on first use,
+    so history survives restarts, and only the max_rooms most recently used rooms keep one.
+    """
+
+    def __init__(self, collection, buffer_size: int = CHAT_HISTORY_BUFFER_SIZE, max_rooms: int = CHAT_HISTORY_ROOMS):
+        self.collection = collection
+        self.buffer_size = buffer_size
+        self.max_rooms = max_rooms
+        # Buffered rooms, least recently used first
+        self.buffers: OrderedDict = OrderedDict()
+        # True while a room's buffer still holds its whole stored history
+        self.complete: Dict[str, bool] = {}
+
+    async def buffer(self, room_id: str) -> deque:
+        if room_id in self.buffers:
+            self.buffers.move_to_end(room_id)
+            return self.buffers[room_id]
+        
+        docs = await self.collection.find({"room_id": room_id}, {"_id": 0}).sort(
+            [("timestamp", DESCENDING), ("id", DESCENDING)]
+        ).limit(self.buffer_size).to_list(length=None)
+        # Another request may have loaded the room while this one waited
+        if room_id not in self.buffers:
+            self.buffers[room_id] = deque((ChatMessage(**doc) for doc in reversed(docs)), maxlen=self.buffer_size)
+            self.complete[room_id] = len(docs) < self.buffer_size
+            if len(self.buffers) > self.max_rooms:
+                evicted_room_id, _ = self.buffers.popitem(last=False)
+                self.complete.pop(evicted_room_id, None)
+        return self.buffers[room_id]
+
+    async def persist(self, message: "ChatMessage"):
+        await self.collection.insert_one(message.dict())
+
+    async def remember(self, message: "ChatMessage"):
+        buffer = await self.buffer(message.room_id)
+        # A freshly loaded buffer already contains the persisted message
+        if any(existing.id == message.id for existing in buffer):
+            return
+        if len(buffer) == self.buffer_size:
+            self.complete[message.room_id] = False
+        buffer.append(message)
+
+    async def delete(self, message_id: str) -> Optional[dict]:
+        """Remove a message from the store; returns it, or None when it does not exist"""
+        return await self.collection.find_one_and_delete({"id": message_id}, {"_id": 0})
+
+    def forget(self, room_id: str, message_id: str):
+        for message in self.buffers.get(room_id, ()):
+            if message.id == message_id:
+                self.buffers[room_id].remove(message)
+                break
+
+    async def page(self, room_id: str, limit: int, before: Optional[str] = None, after: Optional[str] = None) -> tuple:
+        """Up to limit messages, oldest first, and whether more exist in that direction
+        
+        Without a cursor this is the newest page; before pages backwards and after returns
+        what arrived since. Pages inside the ring buffer never touch the database.
+        """
+        buffer = list(await self.buffer(room_id))
+        complete = self.complete[room_id]
+        
+        if after:
+            key = decode_chat_cursor(after)
+            if complete or (buffer and chat_message_key(buffer[0]) <= key):
+                newer = [message for message in buffer if chat_message_key(message) > key]
+                return newer[:limit], len(newer) > limit
+            return await self.query(room_id, chat_cursor_query(after, "$gt"), ASCENDING, limit)
+        
+        condition = {}
+        older = buffer
+        if before:
+            key = decode_chat_cursor(before)
+            older = [message for message in buffer if chat_message_key(message) < key]
+            condition = chat_cursor_query(before, "$lt")
+        if complete or len(older) > limit:
+            return older[-limit:], len(older) > limit
+        return await self.query(room_id, condition, DESCENDING, limit)
+
+    async def query(self, room_id: str, condition: dict, direction: int, limit: int) -> tuple:
+        docs = await self.collection.find({"room_id": room_id, **condition}, {"_id": 0}).sort(
+            [("timestamp", direction), ("id", direction)]
+        ).limit(limit + 1).to_list(length=None)
+        messages = [ChatMessage(**doc) for doc in docs[:limit]]
+        if direction == DESCENDING:
+            messages.reverse()
+        return messages, len(docs) > limit
+
+# Presence: joins and leaves reach clients as deltas coalesced over CHAT_PRESENCE_BATCH_SECONDS;
+# full lists are paged on request. Users not seen for CHAT_PRESENCE_TTL_SECONDS are evicted.
+CHAT_PRESENCE_TTL_SECONDS = int(os.environ.get("CHAT_PRESENCE_TTL_SECONDS", "60"))
+CHAT_PRESENCE_BATCH_SECONDS = float(os.environ.get("CHAT_PRESENCE_BATCH_SECONDS", "0.25"))
+CHAT_PRESENCE_PAGE_SIZE = int(os.environ.get("CHAT_PRESENCE_PAGE_SIZE", "100"))
+
+def presence_user_json(user: "OnlineUser") -> dict:
+    return {
+        "user_id": user.user_id,
+        "username": user.username,
+        "admin_role": user.admin_role,
+        "current_room": user.current_room,
+        "last_seen": user.last_seen.isoformat()
+    }
+
+def presence_sort_key(user: "OnlineUser") -> tuple:
+    return user.username.lower(), user.user_id
+
+def encode_presence_cursor(key: tuple) -> str:
+    return f"{key[0]}|{key[1]}"
+
+def decode_presence_cursor(cursor: str) -> tuple:
+    username, user_id = cursor.rsplit("|", 1)
+    return username, user_id
+
+# Chat bus: every state change that other workers must see (room messages, private messages,
+# deletions, bans, presence) is published as an event and applied by each worker's manager to
+# its own connections. CHAT_BUS_BACKEND=mongo shares events between processes and nodes.
+CHAT_BUS_BACKEND = os.environ.get("CHAT_BUS_BACKEND", "memory")
+
+class InProcessChatBus:
+    """Delivers chat events to the subscribers of this process
+    
+    This is the single-worker default, and several managers subscribed to one instance stand
+    in for a multi-worker deployment in tests.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, handler):
+        self.subscribers.append(handler)
+
+    async def deliver(self, event: dict):
+        for handler in list(self.subscribers):
+            try:
+                await handler(event)
+            except Exception as e:
+                print(f"Error applying chat event {event.get('kind')}: {e}")
+
+    async def publish(self, event: dict):
+        await self.deliver(event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+class MongoChatBus(InProcessChatBus):
+    """Shares chat events between workers through a MongoDB change stream
+    
+    Events are applied locally right away and inserted into chat_events; every other worker
+    picks them up from its change stream. Change streams need a replica set or sharded cluster.
+    """
+
+    def __init__(self, collection):
+        super().__init__()
+        self.collection = collection
+        self.origin = str(uuid.uuid4())
+        self.listener: Optional[asyncio.Task] = None
+
+    async def publish(self, event: dict):
+        await self.deliver(event)
+        try:
+            await self.collection.insert_one({
+                "origin": self.origin,
+                "event": event,
+                "created_at": datetime.utcnow()
+            })
+        except Exception as e:
+            print(f"Error publishing chat event {event.get('kind')}: {e}")
+
+    async def start(self):
+        if self.listener is None:
+            self.listener = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self.listener:
+            self.listener.cancel()
+            self.listener = None
+
+    async def listen(self):
+        pipeline = [{"$match": {"operationType": "insert", "fullDocument.origin": {"$ne": self.origin}}}]
+        while True:
+            try:
+                async with self.collection.watch(pipeline) as stream:
+                    async for change in stream:
+                        await self.deliver(change["fullDocument"]["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error reading chat events, retrying: {e}")
+                await asyncio.sleep(5)
+
+def create_chat_bus():
+    if CHAT_BUS_BACKEND == "mongo":
+        return MongoChatBus(chat_events_collection)
+    return InProcessChatBus()
+
 # WebSocket Connection Manager
 class ChatConnectionManager:
-    def __init__(self):
-        # WebSocket connections: {user_id: websocket}
-        self.active_connections: Dict[str, WebSocket] = {}
-        # Online users: {user_id: OnlineUser}
+    def __init__(self, bus: Optional[InProcessChatBus] = None, history: Optional[ChatHistory] = None):
+        # Event bus shared with the other workers
+        self.bus = bus or InProcessChatBus()
+        self.bus.subscribe(self.apply_bus_event)
+        # Bounded, persisted room history
+        self.history = history or ChatHistory(chat_messages_collection)
+        # Cached room memberships: {user_id: [membership]}, least recently used first
+        self.room_memberships: OrderedDict = OrderedDict()
+        self.room_memberships_version = 0
+        # WebSocket connections on this worker: {user_id: ChatConnection}
+        self.active_connections: Dict[str, ChatConnection] = {}
+        # Clients dropped or disconnected by the slow consumer policy
+        self.slow_consumer_events = 0
+        # Online users across all workers: {user_id: OnlineUser}
         self.online_users: Dict[str, OnlineUser] = {}
-        # Chat rooms: {room_id: ChatRoom}
+        # Presence sort keys in snapshot order, and (expires_at, user_id) entries for eviction
+        self.presence_order: List[tuple] = []
+        self.presence_expiry: List[tuple] = []
+        # Presence changes waiting for the next delta: {user_id: "join" | "leave"}
+        self.pending_presence: Dict[str, str] = {}
+        self.presence_flush_task: Optional[asyncio.Task] = None
+        self.presence_task: Optional[asyncio.Task] = None
+        # Chat rooms with their participants on this worker: {room_id: ChatRoom}
         self.chat_rooms: Dict[str, ChatRoom] = {}
-        # Room messages: {room_id: [ChatMessage]}
-        self.room_messages: Dict[str, List[ChatMessage]] = {}
         
         # Initialize default general chat room
         self.initialize_default_rooms()
@@ -7547,16 +10208,42 @@ class ChatConnectionManager:
             created_at=datetime.utcnow()
         )
         self.chat_rooms["general"] = general_room
-        self.room_messages["general"] = []
     
     async def connect(self, websocket: WebSocket, user_id: str, username: str, admin_role: str = "user"):
         """Connect a user to the chat system"""
         await websocket.accept()
+        await self.register(ChatConnection(websocket, user_id), username, admin_role)
+    
+    async def connect_stream(self, user_id: str, username: str, admin_role: str = "user") -> ChatStreamConnection:
+        """The user's SSE/long-poll session, resumed while it is live or started otherwise"""
+        connection = self.active_connections.get(user_id)
+        if isinstance(connection, ChatStreamConnection) and connection.is_live():
+            return connection
+        connection = ChatStreamConnection(user_id)
+        await self.register(connection, username, admin_role)
+        return connection
+    
+    async def register(self, connection: ChatConnection, username: str, admin_role: str = "user"):
+        """Attach a connection of any transport; a user has one chat session at a time"""
+        user_id = connection.user_id
+        
+        # Replace any previous session of the same user
+        previous = self.active_connections.get(user_id)
+        if previous:
+            await previous.close(code=1000, reason="Connected from another session")
+        
+        # Store connection and start its sender
+        connection.start()
+        self.active_connections[user_id] = connection
+        
+        # Add to general room
+        if "general" not in self.chat_rooms:
+            self.initialize_default_rooms()
         
-        # Store connection
-        self.active_connections[user_id] = websocket
+        if user_id not in self.chat_rooms["general"].participants:
+            self.chat_rooms["general"].participants.append(user_id)
         
-        # Add to online users
+        # Announce presence; every worker updates its online list and notifies its users
         online_user = OnlineUser(
             user_id=user_id,
             username=username,
@@ -7564,14 +10251,7 @@ class ChatConnectionManager:
             current_room="general",
             last_seen=datetime.utcnow()
         )
-        self.online_users[user_id] = online_user
-        
-        # Add to general room
-        if "general" not in self.chat_rooms:
-            self.initialize_default_rooms()
-        
-        if user_id not in self.chat_rooms["general"].participants:
-            self.chat_rooms["general"].participants.append(user_id)
+        await self.bus.publish({"kind": "presence", "action": "join", "user": online_user.dict()})
         
         # Send system message about user joining
         join_message = ChatMessage(
@@ -7581,33 +10261,35 @@ class ChatConnectionManager:
             sender_id="system",
             sender_username="System",
             message=f"{username} joined the chat",
-            timestamp=datetime.utcnow(),
+            timestamp=chat_timestamp(),
             is_system=True
         )
         
-        # Add to room messages
-        self.room_messages["general"].append(join_message)
+        # Record and broadcast to all users in general room
+        await self.publish_room_message(join_message)
         
-        # Broadcast to all users in general room
-        await self.broadcast_to_room("general", join_message.dict())
-        
-        # Send online users list to the new user
-        await self.send_online_users_update()
+        # Send the first page of online users to the new user
+        await self.send_online_users_page(user_id)
         
         # Send available rooms to the new user
         await self.send_user_rooms_update(user_id)
     
-    async def disconnect(self, user_id: str):
-        """Disconnect a user from the chat system"""
-        if user_id in self.active_connections:
+    async def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None, flush: bool = False):
+        """Disconnect a user from the chat system
+        
+        When a websocket is given, only that socket is disconnected, so a stale receive loop
+        cannot tear down a newer session of the same user.
+        """
+        connection = self.active_connections.get(user_id)
+        if connection and (websocket is None or connection.websocket is websocket):
             username = self.online_users.get(user_id, {}).username if user_id in self.online_users else "Unknown"
             
-            # Remove from active connections
+            # Remove from active connections and stop its sender
             del self.active_connections[user_id]
+            await connection.close(flush=flush)
             
-            # Remove from online users
-            if user_id in self.online_users:
-                del self.online_users[user_id]
+            # Remove from online users on every worker
+            await self.bus.publish({"kind": "presence", "action": "leave", "user_id": user_id})
             
             # Remove from all room participants
             for room in self.chat_rooms.values():
@@ -7623,81 +10305,292 @@ class ChatConnectionManager:
                     sender_id="system",
                     sender_username="System",
                     message=f"{username} left the chat",
-                    timestamp=datetime.utcnow(),
+                    timestamp=chat_timestamp(),
                     is_system=True
                 )
                 
-                # Add to room messages
-                self.room_messages["general"].append(leave_message)
-                
-                # Broadcast to all users in general room
-                await self.broadcast_to_room("general", leave_message.dict())
-            
-            # Update online users list
-            await self.send_online_users_update()
+                # Record and broadcast to all users in general room
+                await self.publish_room_message(leave_message)
+    
+    async def fan_out(self, user_ids, message: dict) -> int:
+        """Serialize a message once and queue it to every connected recipient
+        
+        Queuing never waits on a socket; each connection's sender task delivers in parallel.
+        Recipients whose queue is full are handled by the slow consumer policy afterwards.
+        Returns the number of connections the message was queued to.
+        """
+        frame = encode_chat_frame(message)
+        queued = 0
+        slow_consumers = []
+        for user_id in list(user_ids):
+            connection = self.active_connections.get(user_id)
+            if connection is None:
+                continue
+            if connection.push(frame):
+                queued += 1
+            else:
+                slow_consumers.append(connection)
+        
+        for connection in slow_consumers:
+            await self.handle_slow_consumer(connection)
+        
+        return queued
+    
+    async def handle_slow_consumer(self, connection: ChatConnection):
+        """Apply CHAT_SLOW_CONSUMER_POLICY to a connection whose send queue is full"""
+        self.slow_consumer_events += 1
+        if CHAT_SLOW_CONSUMER_POLICY == "drop" or connection.closed:
+            return
+        if self.active_connections.get(connection.user_id) is connection:
+            await self.disconnect(connection.user_id, connection.websocket)
     
-    async def send_personal_message(self, websocket: WebSocket, message: dict):
+    async def send_to_user(self, user_id: str, message: dict) -> bool:
         """Send message to a specific user"""
-        await websocket.send_json(message)
+        return await self.fan_out([user_id], message) > 0
     
-    async def broadcast_to_room(self, room_id: str, message: dict):
-        """Broadcast message to all users in a room"""
+    async def deliver_to_room(self, room_id: str, message: dict):
+        """Send message to the users of a room connected to this worker"""
         if room_id in self.chat_rooms:
-            room = self.chat_rooms[room_id]
-            for user_id in room.participants:
-                if user_id in self.active_connections:
-                    try:
-                        await self.active_connections[user_id].send_json(message)
-                    except:
-                        # Connection might be closed
-                        pass
+            await self.fan_out(self.chat_rooms[room_id].participants, message)
+    
+    async def broadcast_to_room(self, room_id: str, message: dict):
+        """Broadcast message to all users in a room, on every worker"""
+        await self.bus.publish({"kind": "room", "room_id": room_id, "message": message})
+    
+    async def publish_room_message(self, message: ChatMessage):
+        """Add a chat message to the room history and broadcast it, on every worker"""
+        await self.history.persist(message)
+        await self.bus.publish({"kind": "room", "room_id": message.room_id, "message": message.dict(), "record": True})
     
     async def send_private_message(self, sender_id: str, recipient_id: str, message: ChatMessage):
-        """Send private message between two users"""
-        # Send to sender
-        if sender_id in self.active_connections:
-            try:
-                await self.active_connections[sender_id].send_json(message.dict())
-            except:
-                pass
-        
-        # Send to recipient
-        if recipient_id in self.active_connections:
-            try:
-                await self.active_connections[recipient_id].send_json(message.dict())
-            except:
-                pass
+        """Send private message between two users, wherever they are connected"""
+        await self.bus.publish({"kind": "users", "user_ids": [sender_id, recipient_id], "message": message.dict()})
     
-    async def send_online_users_update(self):
-        """Send updated online users list to all connected users"""
-        online_users_list = [
-            {
-                "user_id": user.user_id,
-                "username": user.username,
-                "admin_role": user.admin_role,
-                "current_room": user.current_room,
-                "last_seen": user.last_seen.isoformat()
-            }
-            for user in self.online_users.values()
-        ]
+    def room_type_for(self, room_id: str) -> ChatRoomType:
+        """Room type, also for rooms this worker has not created yet"""
+        if room_id in self.chat_rooms:
+            return self.chat_rooms[room_id].type
+        if room_id.startswith("tournament_"):
+            return ChatRoomType.TOURNAMENT
+        if room_id.startswith("team_"):
+            return ChatRoomType.TEAM
+        return ChatRoomType.GENERAL
+    
+    async def send_room_message(self, user_id: str, username: str, room_id: str, message_text: str) -> ChatMessage:
+        """Create, record and broadcast a user's room message (shared by WebSocket and REST)"""
+        chat_message = ChatMessage(
+            id=str(uuid.uuid4()),
+            room_id=room_id,
+            room_type=self.room_type_for(room_id),
+            sender_id=user_id,
+            sender_username=username,
+            message=message_text,
+            timestamp=chat_timestamp(),
+            is_system=False
+        )
+        await self.publish_room_message(chat_message)
+        return chat_message
+    
+    async def delete_message(self, message_id: str, deleted_by: str) -> bool:
+        """Delete a room message from the history and notify the room on every worker"""
+        deleted = await self.history.delete(message_id)
+        if not deleted:
+            return False
         
-        update_message = {
-            "type": "online_users_update",
-            "data": online_users_list
+        delete_notification = {
+            "type": "message_deleted",
+            "message_id": message_id,
+            "room_id": deleted["room_id"],
+            "deleted_by": deleted_by
         }
         
-        # Send to all connected users
-        for user_id, websocket in self.active_connections.items():
+        await self.bus.publish({
+            "kind": "delete",
+            "room_id": deleted["room_id"],
+            "message_id": message_id,
+            "notification": delete_notification
+        })
+        return True
+    
+    async def apply_bus_event(self, event: dict):
+        """Apply a chat event published by any worker to this worker's state and connections"""
+        kind = event.get("kind")
+        
+        if kind == "room":
+            if event.get("record"):
+                await self.history.remember(ChatMessage(**event["message"]))
+            await self.deliver_to_room(event["room_id"], event["message"])
+        
+        elif kind == "users":
+            await self.fan_out(event["user_ids"], event["message"])
+        
+        elif kind == "delete":
+            self.history.forget(event["room_id"], event["message_id"])
+            await self.deliver_to_room(event["room_id"], event["notification"])
+        
+        elif kind == "ban":
+            target_user_id = event["user_id"]
+            if target_user_id in self.active_connections:
+                await self.send_to_user(target_user_id, event["notification"])
+                await self.disconnect(target_user_id, flush=True)
+        
+        elif kind == "memberships":
+            self.room_memberships_version += 1
+            for user_id in event["user_ids"]:
+                self.room_memberships.pop(user_id, None)
+                await self.send_user_rooms_update(user_id)
+        
+        elif kind == "presence":
+            if event["action"] == "join":
+                self.add_online_user(OnlineUser(**event["user"]))
+            elif event["action"] == "touch":
+                self.touch_online_users(event["user_ids"], datetime.fromisoformat(event["last_seen"]))
+            elif event["user_id"] not in self.active_connections:
+                self.remove_online_user(event["user_id"])
+    
+    def add_online_user(self, user: OnlineUser):
+        previous = self.online_users.get(user.user_id)
+        if previous:
+            self.presence_order.remove(presence_sort_key(previous))
+        bisect.insort(self.presence_order, presence_sort_key(user))
+        self.online_users[user.user_id] = user
+        heapq.heappush(self.presence_expiry, (user.last_seen + timedelta(seconds=CHAT_PRESENCE_TTL_SECONDS), user.user_id))
+        if not previous:
+            self.queue_presence_delta(user.user_id, "join")
+    
+    def remove_online_user(self, user_id: str):
+        user = self.online_users.pop(user_id, None)
+        if user:
+            self.presence_order.remove(presence_sort_key(user))
+            self.queue_presence_delta(user_id, "leave")
+    
+    def touch_online_users(self, user_ids: List[str], last_seen: datetime):
+        expires_at = last_seen + timedelta(seconds=CHAT_PRESENCE_TTL_SECONDS)
+        for user_id in user_ids:
+            user = self.online_users.get(user_id)
+            if user and user.last_seen < last_seen:
+                user.last_seen = last_seen
+                heapq.heappush(self.presence_expiry, (expires_at, user_id))
+    
+    async def touch_presence(self, user_id: str, username: str, admin_role: str = "user", current_room: str = "general"):
+        """Heartbeat for clients without a WebSocket (REST polling)
+        
+        Unknown users join; known users only publish a touch once a third of the TTL has passed.
+        """
+        now = datetime.utcnow()
+        user = self.online_users.get(user_id)
+        if user is None:
+            online_user = OnlineUser(
+                user_id=user_id,
+                username=username,
+                admin_role=admin_role,
+                current_room=current_room,
+                last_seen=now
+            )
+            await self.bus.publish({"kind": "presence", "action": "join", "user": online_user.dict()})
+        elif (now - user.last_seen).total_seconds() > CHAT_PRESENCE_TTL_SECONDS / 3:
+            await self.bus.publish({"kind": "presence", "action": "touch", "user_ids": [user_id], "last_seen": now.isoformat()})
+    
+    def queue_presence_delta(self, user_id: str, action: str):
+        """Coalesce presence changes; a join followed by a leave in one window is sent as a leave"""
+        self.pending_presence[user_id] = action
+        if self.presence_flush_task is None or self.presence_flush_task.done():
             try:
-                await websocket.send_json(update_message)
-            except:
+                self.presence_flush_task = asyncio.get_running_loop().create_task(self.flush_presence_deltas())
+            except RuntimeError:
+                # No running loop (e.g. during setup); the next change schedules the flush
                 pass
     
-    async def send_user_rooms_update(self, user_id: str):
-        """Send available rooms to a specific user"""
-        if user_id not in self.active_connections:
+    async def flush_presence_deltas(self):
+        await asyncio.sleep(CHAT_PRESENCE_BATCH_SECONDS)
+        pending, self.pending_presence = self.pending_presence, {}
+        
+        joined = [
+            presence_user_json(self.online_users[user_id])
+            for user_id, action in pending.items()
+            if action == "join" and user_id in self.online_users
+        ]
+        left = [user_id for user_id, action in pending.items() if action == "leave" and user_id not in self.online_users]
+        if not joined and not left:
             return
         
+        await self.fan_out(self.active_connections.keys(), {
+            "type": "presence_delta",
+            "joined": joined,
+            "left": left,
+            "online_count": len(self.online_users)
+        })
+    
+    def online_users_page(self, limit: int = CHAT_PRESENCE_PAGE_SIZE, cursor: Optional[str] = None) -> tuple:
+        """Online users sorted by username, and the cursor of the next page"""
+        start = bisect.bisect_right(self.presence_order, decode_presence_cursor(cursor)) if cursor else 0
+        keys = self.presence_order[start:start + limit]
+        users = [presence_user_json(self.online_users[key[1]]) for key in keys]
+        next_cursor = encode_presence_cursor(keys[-1]) if keys and start + limit < len(self.presence_order) else None
+        return users, next_cursor
+    
+    async def send_online_users_page(self, user_id: str, cursor: Optional[str] = None, limit: int = CHAT_PRESENCE_PAGE_SIZE):
+        """Send one page of the online users snapshot to a specific user"""
+        users, next_cursor = self.online_users_page(max(1, min(limit, CHAT_PRESENCE_PAGE_SIZE)), cursor)
+        await self.send_to_user(user_id, {
+            "type": "online_users_update",
+            "data": users,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "total": len(self.online_users)
+        })
+    
+    async def sweep_presence(self):
+        """Refresh this worker's live connections and evict users whose presence expired
+        
+        Every worker evicts from its replicated view on its own, so eviction needs no event;
+        sockets of evicted users on this worker are closed.
+        """
+        now = datetime.utcnow()
+        live_user_ids = [user_id for user_id, connection in self.active_connections.items() if connection.is_live()]
+        if live_user_ids:
+            await self.bus.publish({"kind": "presence", "action": "touch", "user_ids": live_user_ids, "last_seen": now.isoformat()})
+        
+        while self.presence_expiry and self.presence_expiry[0][0] <= now:
+            _, user_id = heapq.heappop(self.presence_expiry)
+            user = self.online_users.get(user_id)
+            # Entries superseded by a later touch are skipped
+            if not user or user.last_seen + timedelta(seconds=CHAT_PRESENCE_TTL_SECONDS) > now:
+                continue
+            if user_id in self.active_connections:
+                await self.disconnect(user_id)
+            else:
+                self.remove_online_user(user_id)
+    
+    async def presence_sweeper(self):
+        while True:
+            await asyncio.sleep(CHAT_PRESENCE_TTL_SECONDS / 3)
+            try:
+                await self.sweep_presence()
+            except Exception as e:
+                print(f"Error sweeping chat presence: {e}")
+    
+    async def get_room_memberships(self, user_id: str) -> List[dict]:
+        """A user's tournament and team rooms, from the cache or the membership index"""
+        memberships = self.room_memberships.get(user_id)
+        if memberships is not None:
+            self.room_memberships.move_to_end(user_id)
+            return memberships
+        
+        version = self.room_memberships_version
+        memberships = await chat_room_memberships_collection.find(
+            {"user_id": user_id}, {"_id": 0}
+        ).sort("room_id", ASCENDING).to_list(length=None)
+        
+        # Skip caching when an invalidation arrived during the query
+        if version == self.room_memberships_version:
+            self.room_memberships[user_id] = memberships
+            if len(self.room_memberships) > CHAT_ROOM_CACHE_SIZE:
+                self.room_memberships.popitem(last=False)
+        return memberships
+    
+    async def get_user_rooms(self, user_id: str) -> List[dict]:
+        """Rooms available to a user, as listed to clients"""
         user_rooms = []
         
         # Add general room
@@ -7708,45 +10601,43 @@ class ChatConnectionManager:
             "participant_count": len(self.chat_rooms["general"].participants) if "general" in self.chat_rooms else 0
         })
         
-        # Add tournament rooms for tournaments the user is in
-        user_tournaments = list(tournaments_collection.find({"participants": user_id}))
-        for tournament in user_tournaments:
-            room_id = f"tournament_{tournament['tournament_id']}"
-            if room_id not in self.chat_rooms:
-                self.create_tournament_room(tournament['tournament_id'], tournament['name'])
-            
-            user_rooms.append({
-                "id": room_id,
-                "name": f"Tournament: {tournament['name']}",
-                "type": "tournament",
-                "tournament_id": tournament['tournament_id'],
-                "participant_count": len(self.chat_rooms[room_id].participants) if room_id in self.chat_rooms else 0
-            })
+        # Add tournament and team rooms the user belongs to
+        for membership in await self.get_room_memberships(user_id):
+            room_id = membership["room_id"]
+            if membership["type"] == ChatRoomType.TOURNAMENT:
+                if room_id not in self.chat_rooms:
+                    self.create_tournament_room(membership["ref_id"], membership["name"])
+                user_rooms.append({
+                    "id": room_id,
+                    "name": f"Tournament: {membership['name']}",
+                    "type": "tournament",
+                    "tournament_id": membership["ref_id"],
+                    "participant_count": len(self.chat_rooms[room_id].participants)
+                })
+            else:
+                if room_id not in self.chat_rooms:
+                    self.create_team_room(membership["ref_id"], membership["name"])
+                user_rooms.append({
+                    "id": room_id,
+                    "name": f"Team: {membership['name']}",
+                    "type": "team",
+                    "team_id": membership["ref_id"],
+                    "participant_count": len(self.chat_rooms[room_id].participants)
+                })
         
-        # Add team rooms for teams the user is in
-        user_teams = list(teams_collection.find({"$or": [{"captain_id": user_id}, {"members.user_id": user_id}]}))
-        for team in user_teams:
-            room_id = f"team_{team['team_id']}"
-            if room_id not in self.chat_rooms:
-                self.create_team_room(team['team_id'], team['name'])
-            
-            user_rooms.append({
-                "id": room_id,
-                "name": f"Team: {team['name']}",
-                "type": "team",
-                "team_id": team['team_id'],
-                "participant_count": len(self.chat_rooms[room_id].participants) if room_id in self.chat_rooms else 0
-            })
+        return user_rooms
+    
+    async def send_user_rooms_update(self, user_id: str):
+        """Send available rooms to a specific user"""
+        if user_id not in self.active_connections:
+            return
         
         rooms_update = {
             "type": "user_rooms_update",
-            "data": user_rooms
+            "data": await self.get_user_rooms(user_id)
         }
         
-        try:
-            await self.active_connections[user_id].send_json(rooms_update)
-        except:
-            pass
+        await self.send_to_user(user_id, rooms_update)
     
     def create_tournament_room(self, tournament_id: str, tournament_name: str):
         """Create a tournament-specific chat room"""
@@ -7762,7 +10653,6 @@ class ChatConnectionManager:
         )
         
         self.chat_rooms[room_id] = tournament_room
-        self.room_messages[room_id] = []
     
     def create_team_room(self, team_id: str, team_name: str):
         """Create a team-specific chat room"""
@@ -7778,7 +10668,6 @@ class ChatConnectionManager:
         )
         
         self.chat_rooms[room_id] = team_room
-        self.room_messages[room_id] = []
     
     async def join_room(self, user_id: str, room_id: str):
         """Join a user to a specific room"""
@@ -7796,14 +10685,9 @@ class ChatConnectionManager:
             self.chat_rooms[room_id].participants.append(user_id)
         
         # Send recent messages from this room (last 50 messages)
-        if room_id in self.room_messages:
-            recent_messages = self.room_messages[room_id][-50:]  # Last 50 messages
-            for message in recent_messages:
-                if user_id in self.active_connections:
-                    try:
-                        await self.active_connections[user_id].send_json(message.dict())
-                    except:
-                        pass
+        recent_messages, _ = await self.history.page(room_id, 50)
+        for message in recent_messages:
+            await self.send_to_user(user_id, message.dict())
         
         # Update rooms for this user
         await self.send_user_rooms_update(user_id)
@@ -7826,6 +10710,12 @@ class ChatConnectionManager:
             await self.handle_admin_delete_message(user_id, message_data)
         elif message_type == "admin_ban_user":
             await self.handle_admin_ban_user(user_id, message_data)
+        elif message_type == "online_users":
+            await self.send_online_users_page(
+                user_id,
+                message_data.get("cursor"),
+                message_data.get("limit", CHAT_PRESENCE_PAGE_SIZE)
+            )
     
     async def handle_room_message(self, user_id: str, message_data: dict):
         """Handle room message"""
@@ -7836,30 +10726,7 @@ class ChatConnectionManager:
         if not message_text or room_id not in self.chat_rooms:
             return
         
-        # Create message
-        chat_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            room_id=room_id,
-            room_type=self.chat_rooms[room_id].type,
-            sender_id=user_id,
-            sender_username=user.username,
-            message=message_text,
-            timestamp=datetime.utcnow(),
-            is_system=False
-        )
-        
-        # Add to room messages
-        if room_id not in self.room_messages:
-            self.room_messages[room_id] = []
-        
-        self.room_messages[room_id].append(chat_message)
-        
-        # Keep only last 100 messages per room (since no history needed)
-        if len(self.room_messages[room_id]) > 100:
-            self.room_messages[room_id] = self.room_messages[room_id][-100:]
-        
-        # Broadcast to room
-        await self.broadcast_to_room(room_id, chat_message.dict())
+        await self.send_room_message(user_id, user.username, room_id, message_text)
     
     async def handle_private_message(self, user_id: str, message_data: dict):
         """Handle private message"""
@@ -7878,7 +10745,7 @@ class ChatConnectionManager:
             sender_id=user_id,
             sender_username=user.username,
             message=message_text,
-            timestamp=datetime.utcnow(),
+            timestamp=chat_timestamp(),
             is_system=False,
             private_recipient=recipient_id
         )
@@ -7895,27 +10762,12 @@ class ChatConnectionManager:
             return
         
         message_id = message_data.get("message_id")
-        room_id = message_data.get("room_id")
         
-        if not message_id or room_id not in self.room_messages:
+        if not message_id:
             return
         
-        # Find and remove message
-        messages = self.room_messages[room_id]
-        for i, msg in enumerate(messages):
-            if msg.id == message_id:
-                del messages[i]
-                
-                # Send deletion notification
-                delete_notification = {
-                    "type": "message_deleted",
-                    "message_id": message_id,
-                    "room_id": room_id,
-                    "deleted_by": user.username
-                }
-                
-                await self.broadcast_to_room(room_id, delete_notification)
-                break
+        # Remove message and send deletion notification on every worker
+        await self.delete_message(message_id, user.username)
     
     async def handle_admin_ban_user(self, user_id: str, message_data: dict):
         """Handle admin user ban"""
@@ -7940,14 +10792,8 @@ class ChatConnectionManager:
             "banned_by": user.username
         }
         
-        if target_user_id in self.active_connections:
-            try:
-                await self.active_connections[target_user_id].send_json(ban_notification)
-            except:
-                pass
-        
-        # Disconnect banned user
-        await self.disconnect(target_user_id)
+        # The worker holding the connection notifies and disconnects the banned user
+        await self.bus.publish({"kind": "ban", "user_id": target_user_id, "notification": ban_notification})
         
         # Send system message to general room
         ban_message = ChatMessage(
@@ -7957,15 +10803,61 @@ class ChatConnectionManager:
             sender_id="system",
             sender_username="System",
             message=f"{target_user.username} was banned by {user.username}. Reason: {reason}",
-            timestamp=datetime.utcnow(),
+            timestamp=chat_timestamp(),
             is_system=True
         )
         
-        self.room_messages["general"].append(ban_message)
-        await self.broadcast_to_room("general", ban_message.dict())
+        await self.publish_room_message(ban_message)
 
 # Global chat manager instance
-chat_manager = ChatConnectionManager()
+chat_manager = ChatConnectionManager(create_chat_bus())
+
+@app.on_event("startup")
+async def start_chat_bus():
+    await chat_manager.bus.start()
+    chat_manager.presence_task = asyncio.create_task(chat_manager.presence_sweeper())
+
+@app.on_event("shutdown")
+async def stop_chat_bus():
+    if chat_manager.presence_task:
+        chat_manager.presence_task.cancel()
+    await chat_manager.bus.stop()
+
+async def get_chat_user_from_token(token: str) -> dict:
+    """User of a chat token passed outside the Authorization header (WebSocket, EventSource)"""
+    try:
+        user_id = token_verifier.verify(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except (jwt.InvalidTokenError, KeyError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # Get user details - handle both old and new user ID formats
+    user = await users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    
+    user["chat_user_id"] = user_id
+    return user
+
+async def open_chat_stream(user_id: str, room_id: Optional[str], user: Optional[dict] = None) -> ChatStreamConnection:
+    """Resume or start the user's stream session and join the requested room
+    
+    The user is only looked up when a new session has to be started.
+    """
+    session = chat_manager.active_connections.get(user_id)
+    if not (isinstance(session, ChatStreamConnection) and session.is_live()):
+        if user is None:
+            user = await users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+        session = await chat_manager.connect_stream(user_id, user.get("username", "Unknown"), user.get("admin_role", "user"))
+    if room_id and room_id in chat_manager.chat_rooms and user_id not in chat_manager.chat_rooms[room_id].participants:
+        await chat_manager.join_room(user_id, room_id)
+    return session
 
 # WebSocket endpoint for chat
 @app.websocket("/ws/chat")
@@ -7983,29 +10875,15 @@ async def websocket_chat_endpoint(websocket: WebSocket):
         
         # Verify JWT token
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-            
-            if not user_id:
-                await websocket.close(code=4001, reason="Invalid token")
-                return
-            
-            # Get user details - handle both old and new user ID formats
-            user = users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
-            if not user:
-                await websocket.close(code=4001, reason="User not found")
-                return
-            
-            username = user.get("username", "Unknown")
-            admin_role = user.get("admin_role", "user")
-            
-        except jwt.ExpiredSignatureError:
-            await websocket.close(code=4001, reason="Token expired")
-            return
-        except jwt.InvalidTokenError:
-            await websocket.close(code=4001, reason="Invalid token")
+            user = await get_chat_user_from_token(token)
+        except HTTPException as e:
+            await websocket.close(code=4001, reason=e.detail)
             return
         
+        user_id = user["chat_user_id"]
+        username = user.get("username", "Unknown")
+        admin_role = user.get("admin_role", "user")
+        
         # Connect user to chat
         await chat_manager.connect(websocket, user_id, username, admin_role)
         
@@ -8026,47 +10904,91 @@ async def websocket_chat_endpoint(websocket: WebSocket):
         print(f"WebSocket error: {e}")
     finally:
         if user_id:
-            await chat_manager.disconnect(user_id)
+            await chat_manager.disconnect(user_id, websocket)
+
+@app.get("/api/chat/stream")
+async def stream_chat_events(
+    request: Request,
+    token: str,
+    room_id: Optional[str] = None,
+    since: Optional[str] = None
+):
+    """Server-Sent Events stream of the frames a WebSocket client would receive.
+    
+    EventSource cannot send headers, so the token is a query parameter. Each event id is a
+    cursor; on reconnect the browser's Last-Event-ID (or since) replays missed events.
+    """
+    user = await get_chat_user_from_token(token)
+    session = await open_chat_stream(user["chat_user_id"], room_id, user)
+    cursor = since or request.headers.get("last-event-id")
+    
+    # Each response reads through its own cursor; a stream opened without one starts after
+    # the frames already handed out
+    start = session.parse_cursor(cursor)
+    # The cursor belongs to an expired session or fell out of the replay; the client should reload history
+    reset = bool(cursor and start is None) or session.missed(start)
+    if reset:
+        start = session.sequence
+    elif start is None:
+        start = session.delivered
+    
+    async def events():
+        last = start
+        if reset:
+            yield f"event: reset\nid: {session.cursor()}\ndata: {{}}\n\n"
+        while not session.closed:
+            frames = await session.next_frames(last, CHAT_STREAM_KEEPALIVE_SECONDS)
+            if session.missed(last):
+                yield f"event: reset\nid: {session.cursor()}\ndata: {{}}\n\n"
+                last = session.sequence
+                continue
+            if not frames:
+                yield ": keepalive\n\n"
+                continue
+            for sequence, frame in frames:
+                yield f"id: {session.cursor(sequence)}\ndata: {frame}\n\n"
+            last = frames[-1][0]
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.get("/api/chat/poll")
+async def poll_chat_events(
+    user_id: str = Depends(verify_token),
+    room_id: Optional[str] = None,
+    since: Optional[str] = None,
+    timeout: float = CHAT_POLL_TIMEOUT_SECONDS
+):
+    """Long-poll for chat frames after the since cursor.
+    
+    Returns immediately when frames are waiting, otherwise holds the request for up to timeout
+    seconds. Pass the returned cursor as since on the next poll; reset means the session expired
+    and history should be reloaded from /api/chat/messages.
+    """
+    session = await open_chat_stream(user_id, room_id)
+    last = session.parse_cursor(since)
+    reset = bool(since and last is None) or session.missed(last)
+    if reset:
+        last = session.sequence
+    
+    frames = await session.next_frames(last, max(0.0, min(timeout, CHAT_POLL_TIMEOUT_SECONDS)))
+    next_cursor = session.cursor(frames[-1][0]) if frames else (session.cursor(last) if last is not None else session.cursor())
+    
+    # Frames are already serialized JSON; the body is assembled without re-encoding them
+    body = '{"cursor":%s,"reset":%s,"events":[%s]}' % (
+        json.dumps(next_cursor),
+        "true" if reset else "false",
+        ",".join(frame for _, frame in frames)
+    )
+    return Response(content=body, media_type="application/json")
 
 # REST API endpoints for chat management
 @app.get("/api/chat/rooms")
 async def get_user_chat_rooms(user_id: str = Depends(verify_token)):
     """Get available chat rooms for current user"""
-    
-    user_rooms = []
-    
-    # Add general room
-    user_rooms.append({
-        "id": "general",
-        "name": "General Chat",
-        "type": "general",
-        "participant_count": len(chat_manager.chat_rooms["general"].participants) if "general" in chat_manager.chat_rooms else 0
-    })
-    
-    # Add tournament rooms
-    user_tournaments = list(tournaments_collection.find({"participants": user_id}))
-    for tournament in user_tournaments:
-        room_id = f"tournament_{tournament['tournament_id']}"
-        user_rooms.append({
-            "id": room_id,
-            "name": f"Tournament: {tournament['name']}",
-            "type": "tournament",
-            "tournament_id": tournament['tournament_id'],
-            "participant_count": len(chat_manager.chat_rooms[room_id].participants) if room_id in chat_manager.chat_rooms else 0
-        })
-    
-    # Add team rooms
-    user_teams = list(teams_collection.find({"$or": [{"captain_id": user_id}, {"members.user_id": user_id}]}))
-    for team in user_teams:
-        room_id = f"team_{team['id']}"
-        user_rooms.append({
-            "id": room_id,
-            "name": f"Team: {team['name']}",
-            "type": "team",
-            "team_id": team['id'],
-            "participant_count": len(chat_manager.chat_rooms[room_id].participants) if room_id in chat_manager.chat_rooms else 0
-        })
-    
+    user_rooms = await chat_manager.get_user_rooms(user_id)
     return CustomJSONResponse(content={"rooms": user_rooms})
 
 @app.post("/api/chat/admin/ban-user")
@@ -8076,7 +10998,7 @@ async def ban_user_from_chat(
 ):
     """Admin endpoint to ban user from chat"""
     # Get user details
-    user = users_collection.find_one({"user_id": user_id})
+    user = await users_collection.find_one({"user_id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -8106,7 +11028,7 @@ async def ban_user_from_chat(
 async def get_chat_statistics(user_id: str = Depends(verify_token)):
     """Get chat statistics"""
     # Get user details
-    user = users_collection.find_one({"user_id": user_id})
+    user = await users_collection.find_one({"user_id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -8117,6 +11039,7 @@ async def get_chat_statistics(user_id: str = Depends(verify_token)):
     stats = {
         "total_online_users": len(chat_manager.online_users),
         "total_rooms": len(chat_manager.chat_rooms),
+        "slow_consumer_events": chat_manager.slow_consumer_events,
         "rooms_by_type": {},
         "messages_by_room": {}
     }
@@ -8128,19 +11051,12 @@ async def get_chat_statistics(user_id: str = Depends(verify_token)):
             stats["rooms_by_type"][room_type] = 0
         stats["rooms_by_type"][room_type] += 1
     
-    # Count messages by room
-    for room_id, messages in chat_manager.room_messages.items():
+    # Count buffered messages by room
+    for room_id, messages in chat_manager.history.buffers.items():
         stats["messages_by_room"][room_id] = len(messages)
     
     return CustomJSONResponse(content=stats)
 
-# Global chat manager instance
-chat_manager = ChatConnectionManager()
-
-# Simple in-memory storage for chat messages (since WebSocket is not working)
-chat_messages_storage = {}
-online_users_storage = {}
-
 @app.post("/api/chat/send-message")
 async def send_chat_message(
     request: dict,
@@ -8148,7 +11064,7 @@ async def send_chat_message(
 ):
     """Send a chat message via REST API"""
     # Get user details
-    user = users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
+    user = await principal_cache.get(user_id) or await users_collection.find_one({"user_id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -8158,78 +11074,72 @@ async def send_chat_message(
     if not message:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
     
-    # Create message object
-    message_data = {
-        "id": str(uuid.uuid4()),
-        "room_id": room_id,
-        "sender_id": user_id,
-        "sender_username": user.get("username", "Unknown"),
-        "message": message,
-        "timestamp": datetime.utcnow().isoformat(),
-        "is_system": False
-    }
-    
-    # Store message in memory
-    if room_id not in chat_messages_storage:
-        chat_messages_storage[room_id] = []
-    
-    chat_messages_storage[room_id].append(message_data)
+    # Same path as WebSocket messages: recorded in the room history and broadcast
+    chat_message = await chat_manager.send_room_message(user_id, user.get("username", "Unknown"), room_id, message)
     
-    # Keep only last 50 messages per room
-    if len(chat_messages_storage[room_id]) > 50:
-        chat_messages_storage[room_id] = chat_messages_storage[room_id][-50:]
-    
-    # Update online users
-    online_users_storage[user_id] = {
-        "user_id": user_id,
-        "username": user.get("username", "Unknown"),
-        "admin_role": user.get("admin_role", "user"),
-        "current_room": room_id,
-        "last_seen": datetime.utcnow().isoformat()
-    }
+    # Sending counts as a presence heartbeat
+    await chat_manager.touch_presence(user_id, user.get("username", "Unknown"), user.get("admin_role", "user"), room_id)
     
-    return CustomJSONResponse(content={"message": "Message sent successfully", "data": message_data})
+    return CustomJSONResponse(content={"message": "Message sent successfully", "data": chat_message_json(chat_message)})
 
 @app.get("/api/chat/messages/{room_id}")
 async def get_chat_messages(
     room_id: str,
-    user_id: str = Depends(verify_token)
+    user_id: str = Depends(verify_token),
+    limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None
 ):
-    """Get recent chat messages for a room"""
-    messages = chat_messages_storage.get(room_id, [])
-    return CustomJSONResponse(content={"messages": messages})
+    """Get chat messages for a room, oldest first.
+    
+    Without a cursor the newest messages are returned. Pass the returned before cursor to
+    load older messages, or the after cursor to fetch only messages sent since.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    limit = max(1, min(limit, 200))
+    
+    try:
+        messages, has_more = await chat_manager.history.page(room_id, limit, before=before, after=after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    return CustomJSONResponse(content={
+        "messages": [chat_message_json(message) for message in messages],
+        "has_more": has_more,
+        "before": encode_chat_cursor(messages[0]) if messages else before,
+        "after": encode_chat_cursor(messages[-1]) if messages else after
+    })
 
 @app.get("/api/chat/online-users")
-async def get_online_users(user_id: str = Depends(verify_token)):
-    """Get list of online users"""
-    # Clean up old users (older than 1 minute)
-    now = datetime.utcnow()
-    active_users = []
-    
-    for user_data in online_users_storage.values():
-        try:
-            last_seen = datetime.fromisoformat(user_data["last_seen"])
-            if (now - last_seen).total_seconds() < 60:  # 1 minute
-                active_users.append(user_data)
-        except:
-            pass
+async def get_online_users(
+    user_id: str = Depends(verify_token),
+    limit: int = CHAT_PRESENCE_PAGE_SIZE,
+    cursor: Optional[str] = None
+):
+    """Get a page of online users, sorted by username.
+    
+    Polling counts as a presence heartbeat; users are evicted once their heartbeat expires.
+    """
+    # Update current user as online; the user is only looked up when not already present
+    if user_id not in chat_manager.online_users:
+        user = await users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
+        if user:
+            await chat_manager.touch_presence(user_id, user.get("username", "Unknown"), user.get("admin_role", "user"))
+    else:
+        online_user = chat_manager.online_users[user_id]
+        await chat_manager.touch_presence(user_id, online_user.username, online_user.admin_role)
     
-    # Update current user as online
-    user = users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
-    if user:
-        online_users_storage[user_id] = {
-            "user_id": user_id,
-            "username": user.get("username", "Unknown"),
-            "admin_role": user.get("admin_role", "user"),
-            "current_room": "general",
-            "last_seen": datetime.utcnow().isoformat()
-        }
-        
-        # Add current user to active users if not already there
-        if not any(u["user_id"] == user_id for u in active_users):
-            active_users.append(online_users_storage[user_id])
+    try:
+        active_users, next_cursor = chat_manager.online_users_page(max(1, min(limit, CHAT_PRESENCE_PAGE_SIZE)), cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    return CustomJSONResponse(content={"online_users": active_users})
+    return CustomJSONResponse(content={
+        "online_users": active_users,
+        "total": len(chat_manager.online_users),
+        "next_cursor": next_cursor
+    })
 
 @app.delete("/api/chat/messages/{message_id}")
 async def delete_chat_message(
@@ -8238,7 +11148,7 @@ async def delete_chat_message(
 ):
     """Delete a chat message (Admin only)"""
     # Get user details
-    user = users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
+    user = await users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -8246,18 +11156,7 @@ async def delete_chat_message(
     if user.get("admin_role") not in ["admin", "super_admin", "god"]:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Find and delete message from all rooms
-    deleted = False
-    for room_id, messages in chat_messages_storage.items():
-        for i, msg in enumerate(messages):
-            if msg["id"] == message_id:
-                del messages[i]
-                deleted = True
-                break
-        if deleted:
-            break
-    
-    if not deleted:
+    if not await chat_manager.delete_message(message_id, user.get("username", "Unknown")):
         raise HTTPException(status_code=404, detail="Message not found")
     
     return CustomJSONResponse(content={"message": "Message deleted successfully"})
@@ -8290,7 +11189,7 @@ def clean_mongo_docs(docs):
 async def get_affiliate_requests(user_id: str = Depends(verify_token)):
     """Get all affiliate requests for admin review"""
     # Get user details
-    user = users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
+    user = await users_collection.find_one({"$or": [{"user_id": user_id}, {"id": user_id}]})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -8300,11 +11199,11 @@ async def get_affiliate_requests(user_id: str = Depends(verify_token)):
     
     try:
         # Get all affiliate applications
-        affiliate_requests = list(affiliate_applications_collection.find({}))
+        affiliate_requests = await affiliate_applications_collection.find({}).to_list(length=None)
         
         # Get user details for each request
         for request in affiliate_requests:
-            user_data = users_collection.find_one({"$or": [{"user_id": request["user_id"]}, {"id": request["user_id"]}]})
+            user_data = await users_collection.find_one({"$or": [{"user_id": request["user_id"]}, {"id": request["user_id"]}]})
             if user_data:
                 request["user_details"] = {
                     "username": user_data.get("username", "Unknown"),
@@ -8325,7 +11224,7 @@ async def approve_affiliate_request(
 ):
     """Approve affiliate request and set bonuses"""
     # Get admin user details
-    admin_user = users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
+    admin_user = await users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
     if not admin_user:
         raise HTTPException(status_code=404, detail="Admin user not found")
     
@@ -8335,7 +11234,7 @@ async def approve_affiliate_request(
     
     try:
         # Update affiliate application
-        affiliate_applications_collection.update_one(
+        await affiliate_applications_collection.update_one(
             {"user_id": user_id},
             {
                 "$set": {
@@ -8351,10 +11250,11 @@ async def approve_affiliate_request(
         )
         
         # Update user role to affiliate
-        users_collection.update_one(
+        await users_collection.update_one(
             {"$or": [{"user_id": user_id}, {"id": user_id}]},
             {"$set": {"admin_role": "affiliate"}}
         )
+        principal_cache.invalidate(user_id)
         
         return CustomJSONResponse(content={"message": "Affiliate request approved successfully"})
     except Exception as e:
@@ -8368,7 +11268,7 @@ async def reject_affiliate_request(
 ):
     """Reject affiliate request"""
     # Get admin user details
-    admin_user = users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
+    admin_user = await users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
     if not admin_user:
         raise HTTPException(status_code=404, detail="Admin user not found")
     
@@ -8378,7 +11278,7 @@ async def reject_affiliate_request(
     
     try:
         # Update affiliate application
-        affiliate_applications_collection.update_one(
+        await affiliate_applications_collection.update_one(
             {"user_id": user_id},
             {
                 "$set": {
@@ -8398,7 +11298,7 @@ async def reject_affiliate_request(
 async def get_admin_affiliate_stats(admin_user_id: str = Depends(verify_token)):
     """Get affiliate statistics for admin"""
     # Get admin user details
-    admin_user = users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
+    admin_user = await users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
     if not admin_user:
         raise HTTPException(status_code=404, detail="Admin user not found")
     
@@ -8408,21 +11308,21 @@ async def get_admin_affiliate_stats(admin_user_id: str = Depends(verify_token)):
     
     try:
         # Get affiliate statistics
-        total_affiliates = affiliate_applications_collection.count_documents({"status": "approved"})
-        pending_requests = affiliate_applications_collection.count_documents({"status": "pending"})
-        total_referrals = referrals_collection.count_documents({})
-        total_commissions = commissions_collection.count_documents({})
+        total_affiliates = await affiliate_applications_collection.count_documents({"status": "approved"})
+        pending_requests = await affiliate_applications_collection.count_documents({"status": "pending"})
+        total_referrals = await referrals_collection.count_documents({})
+        total_commissions = await commissions_collection.count_documents({})
         
         # Calculate total commission amount
         commission_pipeline = [
             {"$group": {"_id": None, "total": {"$sum": "$commission_amount"}}}
         ]
-        commission_result = list(commissions_collection.aggregate(commission_pipeline))
+        commission_result = await commissions_collection.aggregate(commission_pipeline).to_list(length=None)
         total_commission_amount = commission_result[0]["total"] if commission_result else 0.0
         
         # Get recent affiliate activity
-        recent_referrals = list(referrals_collection.find().sort("created_at", -1).limit(5))
-        recent_commissions = list(commissions_collection.find().sort("created_at", -1).limit(5))
+        recent_referrals = await referrals_collection.find().sort("created_at", -1).limit(5).to_list(length=None)
+        recent_commissions = await commissions_collection.find().sort("created_at", -1).limit(5).to_list(length=None)
         
         return CustomJSONResponse(content={
             "total_affiliates": total_affiliates,
@@ -8440,7 +11340,7 @@ async def get_admin_affiliate_stats(admin_user_id: str = Depends(verify_token)):
 async def get_all_affiliate_users(admin_user_id: str = Depends(verify_token)):
     """Get all approved affiliate users"""
     # Get admin user details
-    admin_user = users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
+    admin_user = await users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
     if not admin_user:
         raise HTTPException(status_code=404, detail="Admin user not found")
     
@@ -8450,23 +11350,23 @@ async def get_all_affiliate_users(admin_user_id: str = Depends(verify_token)):
     
     try:
         # Get all approved affiliate applications
-        affiliate_apps = list(affiliate_applications_collection.find({"status": "approved"}))
+        affiliate_apps = await affiliate_applications_collection.find({"status": "approved"}).to_list(length=None)
         
         # Get user details and referral stats for each affiliate
         affiliate_users = []
         for app in affiliate_apps:
-            user_data = users_collection.find_one({"$or": [{"user_id": app["user_id"]}, {"id": app["user_id"]}]})
+            user_data = await users_collection.find_one({"$or": [{"user_id": app["user_id"]}, {"id": app["user_id"]}]})
             if user_data:
                 # Get referral stats
-                referral_count = referrals_collection.count_documents({"referrer_id": app["user_id"]})
-                commission_count = commissions_collection.count_documents({"affiliate_id": app["user_id"]})
+                referral_count = await referrals_collection.count_documents({"referrer_id": app["user_id"]})
+                commission_count = await commissions_collection.count_documents({"affiliate_id": app["user_id"]})
                 
                 # Calculate total earnings
                 earnings_pipeline = [
                     {"$match": {"affiliate_id": app["user_id"]}},
                     {"$group": {"_id": None, "total": {"$sum": "$commission_amount"}}}
                 ]
-                earnings_result = list(commissions_collection.aggregate(earnings_pipeline))
+                earnings_result = await commissions_collection.aggregate(earnings_pipeline).to_list(length=None)
                 total_earnings = earnings_result[0]["total"] if earnings_result else 0.0
                 
                 affiliate_users.append({
@@ -8497,7 +11397,7 @@ async def update_affiliate_bonuses(
 ):
     """Update affiliate bonuses"""
     # Get admin user details
-    admin_user = users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
+    admin_user = await users_collection.find_one({"$or": [{"user_id": admin_user_id}, {"id": admin_user_id}]})
     if not admin_user:
         raise HTTPException(status_code=404, detail="Admin user not found")
     
@@ -8507,7 +11407,7 @@ async def update_affiliate_bonuses(
     
     try:
         # Update affiliate bonuses
-        affiliate_applications_collection.update_one(
+        await affiliate_applications_collection.update_one(
             {"user_id": user_id, "status": "approved"},
             {
                 "$set": {
@@ -8529,13 +11429,13 @@ async def update_affiliate_bonuses(
 # PAYMENT SYSTEM HELPER FUNCTIONS
 # =============================================================================
 
-def create_payment_session(user_id: str, tournament_id: str, amount: float, provider: PaymentProvider) -> dict:
+async def create_payment_session(user_id: str, tournament_id: str, amount: float, provider: PaymentProvider) -> dict:
     """Create a payment session for tournament entry"""
     try:
         session_id = str(uuid.uuid4())
         
         # Get tournament details
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
@@ -8558,18 +11458,18 @@ def create_payment_session(user_id: str, tournament_id: str, amount: float, prov
         
         # Create provider-specific session
         if provider == PaymentProvider.STRIPE:
-            return create_stripe_session(session_data)
+            return await create_stripe_session(session_data)
         elif provider == PaymentProvider.PAYPAL:
-            return create_paypal_session(session_data)
+            return await create_paypal_session(session_data)
         elif provider == PaymentProvider.COINBASE:
-            return create_coinbase_session(session_data)
+            return await create_coinbase_session(session_data)
         else:
             raise HTTPException(status_code=400, detail="Invalid payment provider")
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating payment session: {str(e)}")
 
-def create_stripe_session(session_data: dict) -> dict:
+async def create_stripe_session(session_data: dict) -> dict:
     """Create Stripe checkout session"""
     try:
         if not STRIPE_SECRET_KEY:
@@ -8604,7 +11504,7 @@ def create_stripe_session(session_data: dict) -> dict:
         session_data["checkout_url"] = stripe_session.url
         
         # Save to database
-        payment_sessions_collection.insert_one(session_data)
+        await payment_sessions_collection.insert_one(session_data)
         
         return {
             "session_id": session_data["id"],
@@ -8615,7 +11515,7 @@ def create_stripe_session(session_data: dict) -> dict:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating Stripe session: {str(e)}")
 
-def create_paypal_session(session_data: dict) -> dict:
+async def create_paypal_session(session_data: dict) -> dict:
     """Create PayPal payment session"""
     try:
         if not PAYPAL_CLIENT_ID or not PAYPAL_CLIENT_SECRET:
@@ -8657,7 +11557,7 @@ def create_paypal_session(session_data: dict) -> dict:
             session_data["checkout_url"] = approval_url
             
             # Save to database
-            payment_sessions_collection.insert_one(session_data)
+            await payment_sessions_collection.insert_one(session_data)
             
             return {
                 "session_id": session_data["id"],
@@ -8670,7 +11570,7 @@ def create_paypal_session(session_data: dict) -> dict:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating PayPal session: {str(e)}")
 
-def create_coinbase_session(session_data: dict) -> dict:
+async def create_coinbase_session(session_data: dict) -> dict:
     """Create Coinbase Commerce session"""
     try:
         if not coinbase_client:
@@ -8699,7 +11599,7 @@ def create_coinbase_session(session_data: dict) -> dict:
         session_data["checkout_url"] = charge.hosted_url
         
         # Save to database
-        payment_sessions_collection.insert_one(session_data)
+        await payment_sessions_collection.insert_one(session_data)
         
         return {
             "session_id": session_data["id"],
@@ -8710,11 +11610,11 @@ def create_coinbase_session(session_data: dict) -> dict:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating Coinbase session: {str(e)}")
 
-def process_payment_success(session_id: str, provider_data: dict) -> dict:
+async def process_payment_success(session_id: str, provider_data: dict) -> dict:
     """Process successful payment and update tournament entry"""
     try:
         # Get payment session
-        session = payment_sessions_collection.find_one({"id": session_id})
+        session = await payment_sessions_collection.find_one({"id": session_id})
         if not session:
             raise HTTPException(status_code=404, detail="Payment session not found")
         
@@ -8740,10 +11640,10 @@ def process_payment_success(session_id: str, provider_data: dict) -> dict:
         }
         
         # Save payment record
-        payments_collection.insert_one(payment_record)
+        await payments_collection.insert_one(payment_record)
         
         # Update payment session
-        payment_sessions_collection.update_one(
+        await payment_sessions_collection.update_one(
             {"id": session_id},
             {"$set": {"status": PaymentStatus.COMPLETED, "completed_at": datetime.utcnow()}}
         )
@@ -8762,7 +11662,7 @@ def process_payment_success(session_id: str, provider_data: dict) -> dict:
             "paid_at": datetime.utcnow()
         }
         
-        tournament_entries_collection.insert_one(tournament_entry)
+        await tournament_entries_collection.insert_one(tournament_entry)
         
         # Add user to tournament participants
         participant_data = {
@@ -8773,22 +11673,25 @@ def process_payment_success(session_id: str, provider_data: dict) -> dict:
         }
         
         # Check if user is already registered
-        existing_participant = tournament_participants_collection.find_one({
+        existing_participant = await tournament_participants_collection.find_one({
             "user_id": session["user_id"],
             "tournament_id": session["tournament_id"]
         })
         
         if not existing_participant:
-            tournament_participants_collection.insert_one(participant_data)
+            await tournament_participants_collection.insert_one(participant_data)
+            await add_tournament_room_membership(
+                session["user_id"], session["tournament_id"], session["metadata"]["tournament_name"]
+            )
         else:
             # Update payment status
-            tournament_participants_collection.update_one(
+            await tournament_participants_collection.update_one(
                 {"user_id": session["user_id"], "tournament_id": session["tournament_id"]},
                 {"$set": {"payment_status": "paid"}}
             )
         
         # Add transaction to wallet system
-        add_transaction(
+        await add_transaction(
             user_id=session["user_id"],
             transaction_type=TransactionType.TOURNAMENT_ENTRY,
             amount=-session["amount"],  # Debit from wallet
@@ -8802,11 +11705,11 @@ def process_payment_success(session_id: str, provider_data: dict) -> dict:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing payment: {str(e)}")
 
-def process_payout(user_id: str, amount: float, provider: PaymentProvider, payout_account: str) -> dict:
+async def process_payout(user_id: str, amount: float, provider: PaymentProvider, payout_account: str) -> dict:
     """Process payout to user"""
     try:
         # Get user wallet
-        wallet = get_or_create_wallet(user_id)
+        wallet = await get_or_create_wallet(user_id)
         
         # Check if user has sufficient balance
         if wallet.get("available_balance", 0) < amount:
@@ -8844,26 +11747,16 @@ def process_payout(user_id: str, amount: float, provider: PaymentProvider, payou
             payout_record["status"] = PaymentStatus.PENDING
         
         # Save payout record
-        payouts_collection.insert_one(payout_record)
-        
-        # Update wallet balance
-        wallet_balances_collection.update_one(
-            {"user_id": user_id},
-            {
-                "$inc": {
-                    "available_balance": -amount,
-                    "pending_withdrawal": amount
-                }
-            }
-        )
+        await payouts_collection.insert_one(payout_record)
         
-        # Add transaction
-        add_transaction(
+        # Move the amount from available to pending withdrawal through the ledger
+        await add_transaction(
             user_id=user_id,
             transaction_type=TransactionType.PAYOUT_REQUESTED,
-            amount=-amount,
+            amount=amount,
             description=f"Payout request via {provider}",
             payout_id=payout_id,
+            idempotency_key=f"payout_requested:{payout_id}",
             metadata={"provider": provider, "payout_account": payout_account}
         )
         
@@ -8881,12 +11774,12 @@ async def create_payment_session_endpoint(request: PaymentRequest, user_id: str
     """Create payment session for tournament entry"""
     try:
         # Validate user can join tournament
-        tournament = tournaments_collection.find_one({"id": request.tournament_id})
+        tournament = await tournaments_collection.find_one({"id": request.tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
         # Check if user is already registered
-        existing_participant = tournament_participants_collection.find_one({
+        existing_participant = await tournament_participants_collection.find_one({
             "user_id": user_id,
             "tournament_id": request.tournament_id
         })
@@ -8904,7 +11797,7 @@ async def create_payment_session_endpoint(request: PaymentRequest, user_id: str
             raise HTTPException(status_code=400, detail="Invalid entry fee amount")
         
         # Create payment session
-        session = create_payment_session(user_id, request.tournament_id, request.amount, request.provider)
+        session = await create_payment_session(user_id, request.tournament_id, request.amount, request.provider)
         
         return session
         
@@ -8915,7 +11808,7 @@ async def create_payment_session_endpoint(request: PaymentRequest, user_id: str
 async def get_payment_session(session_id: str, user_id: str = Depends(verify_token)):
     """Get payment session details"""
     try:
-        session = payment_sessions_collection.find_one({"id": session_id})
+        session = await payment_sessions_collection.find_one({"id": session_id})
         if not session:
             raise HTTPException(status_code=404, detail="Payment session not found")
         
@@ -8963,7 +11856,7 @@ async def stripe_webhook(request: Request):
             "created_at": datetime.utcnow(),
             "data": event['data']
         }
-        payment_webhooks_collection.insert_one(webhook_record)
+        await payment_webhooks_collection.insert_one(webhook_record)
         
         # Process event
         if event['type'] == 'checkout.session.completed':
@@ -8971,13 +11864,13 @@ async def stripe_webhook(request: Request):
             session_id = session_data['metadata'].get('session_id')
             
             if session_id:
-                process_payment_success(session_id, {
+                await process_payment_success(session_id, {
                     "transaction_id": session_data['payment_intent'],
                     "provider_data": session_data
                 })
         
         # Mark webhook as processed
-        payment_webhooks_collection.update_one(
+        await payment_webhooks_collection.update_one(
             {"id": webhook_record["id"]},
             {"$set": {"processed": True}}
         )
@@ -9005,7 +11898,7 @@ async def paypal_webhook(request: Request):
             "created_at": datetime.utcnow(),
             "data": webhook_data
         }
-        payment_webhooks_collection.insert_one(webhook_record)
+        await payment_webhooks_collection.insert_one(webhook_record)
         
         # Process payment completion
         if webhook_data.get('event_type') == 'PAYMENT.SALE.COMPLETED':
@@ -9014,13 +11907,13 @@ async def paypal_webhook(request: Request):
             session_id = resource.get('custom')
             
             if session_id:
-                process_payment_success(session_id, {
+                await process_payment_success(session_id, {
                     "transaction_id": resource.get('id'),
                     "provider_data": resource
                 })
         
         # Mark webhook as processed
-        payment_webhooks_collection.update_one(
+        await payment_webhooks_collection.update_one(
             {"id": webhook_record["id"]},
             {"$set": {"processed": True}}
         )
@@ -9048,7 +11941,7 @@ async def coinbase_webhook(request: Request):
             "created_at": datetime.utcnow(),
             "data": webhook_data
         }
-        payment_webhooks_collection.insert_one(webhook_record)
+        await payment_webhooks_collection.insert_one(webhook_record)
         
         # Process charge completion
         if webhook_data.get('type') == 'charge:confirmed':
@@ -9057,13 +11950,13 @@ async def coinbase_webhook(request: Request):
             session_id = metadata.get('session_id')
             
             if session_id:
-                process_payment_success(session_id, {
+                await process_payment_success(session_id, {
                     "transaction_id": event_data.get('id'),
                     "provider_data": event_data
                 })
         
         # Mark webhook as processed
-        payment_webhooks_collection.update_one(
+        await payment_webhooks_collection.update_one(
             {"id": webhook_record["id"]},
             {"$set": {"processed": True}}
         )
@@ -9078,10 +11971,10 @@ async def coinbase_webhook(request: Request):
 async def get_payment_history(user_id: str = Depends(verify_token), limit: int = 50, skip: int = 0):
     """Get user's payment history"""
     try:
-        payments = list(payments_collection.find(
+        payments = await payments_collection.find(
             {"user_id": user_id},
             {"_id": 0}
-        ).sort("created_at", -1).skip(skip).limit(limit))
+        ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
         
         # Convert datetime objects to ISO strings
         for payment in payments:
@@ -9089,7 +11982,7 @@ async def get_payment_history(user_id: str = Depends(verify_token), limit: int =
                 if isinstance(value, datetime):
                     payment[key] = value.isoformat()
         
-        total_payments = payments_collection.count_documents({"user_id": user_id})
+        total_payments = await payments_collection.count_documents({"user_id": user_id})
         
         return {
             "payments": payments,
@@ -9105,7 +11998,7 @@ async def get_payment_history(user_id: str = Depends(verify_token), limit: int =
 async def request_payout(request: PayoutRequest, user_id: str = Depends(verify_token)):
     """Request payout from wallet"""
     try:
-        result = process_payout(user_id, request.amount, request.provider, request.payout_account)
+        result = await process_payout(user_id, request.amount, request.provider, request.payout_account)
         return result
         
     except Exception as e:
@@ -9138,10 +12031,10 @@ async def get_payment_config():
 async def get_all_payments(admin_user_id: str = Depends(verify_admin_token()), limit: int = 50, skip: int = 0):
     """Get all payments for admin"""
     try:
-        payments = list(payments_collection.find(
+        payments = await payments_collection.find(
             {},
             {"_id": 0}
-        ).sort("created_at", -1).skip(skip).limit(limit))
+        ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
         
         # Convert datetime objects to ISO strings
         for payment in payments:
@@ -9149,7 +12042,7 @@ async def get_all_payments(admin_user_id: str = Depends(verify_admin_token()), l
                 if isinstance(value, datetime):
                     payment[key] = value.isoformat()
         
-        total_payments = payments_collection.count_documents({})
+        total_payments = await payments_collection.count_documents({})
         
         return {
             "payments": payments,
@@ -9166,7 +12059,7 @@ async def refund_payment(payment_id: str, admin_user_id: str = Depends(verify_ad
     """Refund a payment"""
     try:
         # Get payment record
-        payment = payments_collection.find_one({"id": payment_id})
+        payment = await payments_collection.find_one({"id": payment_id})
         if not payment:
             raise HTTPException(status_code=404, detail="Payment not found")
         
@@ -9182,7 +12075,7 @@ async def refund_payment(payment_id: str, admin_user_id: str = Depends(verify_ad
             )
             
             # Update payment record
-            payments_collection.update_one(
+            await payments_collection.update_one(
                 {"id": payment_id},
                 {
                     "$set": {
@@ -9196,7 +12089,7 @@ async def refund_payment(payment_id: str, admin_user_id: str = Depends(verify_ad
         elif payment["provider"] == PaymentProvider.PAYPAL:
             # PayPal refund would require additional implementation
             # For now, mark as refunded in our system
-            payments_collection.update_one(
+            await payments_collection.update_one(
                 {"id": payment_id},
                 {
                     "$set": {
@@ -9208,7 +12101,7 @@ async def refund_payment(payment_id: str, admin_user_id: str = Depends(verify_ad
             
         elif payment["provider"] == PaymentProvider.COINBASE:
             # Coinbase refunds require manual processing
-            payments_collection.update_one(
+            await payments_collection.update_one(
                 {"id": payment_id},
                 {
                     "$set": {
@@ -9219,7 +12112,7 @@ async def refund_payment(payment_id: str, admin_user_id: str = Depends(verify_ad
             )
         
         # Add refund transaction to wallet
-        add_transaction(
+        await add_transaction(
             user_id=payment["user_id"],
             transaction_type=TransactionType.TOURNAMENT_REFUND,
             amount=payment["amount"],
@@ -9230,10 +12123,11 @@ async def refund_payment(payment_id: str, admin_user_id: str = Depends(verify_ad
         )
         
         # Remove user from tournament if applicable
-        tournament_participants_collection.delete_one({
+        await tournament_participants_collection.delete_one({
             "user_id": payment["user_id"],
             "tournament_id": payment["tournament_id"]
         })
+        await remove_room_memberships({"room_id": f"tournament_{payment['tournament_id']}", "user_id": payment["user_id"]})
         
         return {"message": "Payment refunded successfully"}
         
@@ -9244,16 +12138,16 @@ async def refund_payment(payment_id: str, admin_user_id: str = Depends(verify_ad
 # SOCIAL SHARING SYSTEM HELPER FUNCTIONS
 # =============================================================================
 
-def generate_share_content(user_id: str, share_type: ShareType, reference_id: str, platform: SocialPlatform, custom_message: Optional[str] = None) -> dict:
+async def generate_share_content(user_id: str, share_type: ShareType, reference_id: str, platform: SocialPlatform, custom_message: Optional[str] = None) -> dict:
     """Generate social sharing content based on type and platform"""
     try:
         # Get user information
-        user = users_collection.find_one({"id": user_id})
+        user = await users_collection.find_one({"id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Get template for this share type and platform
-        template = share_templates_collection.find_one({
+        template = await share_templates_collection.find_one({
             "share_type": share_type,
             "platform": platform,
             "is_active": True
@@ -9265,13 +12159,13 @@ def generate_share_content(user_id: str, share_type: ShareType, reference_id: st
         
         # Generate content based on share type
         if share_type == ShareType.TOURNAMENT_VICTORY:
-            return generate_tournament_victory_content(user, reference_id, template, custom_message)
+            return await generate_tournament_victory_content(user, reference_id, template, custom_message)
         elif share_type == ShareType.TEAM_FORMATION:
-            return generate_team_formation_content(user, reference_id, template, custom_message)
+            return await generate_team_formation_content(user, reference_id, template, custom_message)
         elif share_type == ShareType.PERSONAL_ACHIEVEMENT:
             return generate_achievement_content(user, reference_id, template, custom_message)
         elif share_type == ShareType.TOURNAMENT_PARTICIPATION:
-            return generate_tournament_participation_content(user, reference_id, template, custom_message)
+            return await generate_tournament_participation_content(user, reference_id, template, custom_message)
         elif share_type == ShareType.RANKING_ACHIEVEMENT:
             return generate_ranking_achievement_content(user, reference_id, template, custom_message)
         else:
@@ -9280,16 +12174,16 @@ def generate_share_content(user_id: str, share_type: ShareType, reference_id: st
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating share content: {str(e)}")
 
-def generate_tournament_victory_content(user: dict, tournament_id: str, template: dict, custom_message: Optional[str] = None) -> dict:
+async def generate_tournament_victory_content(user: dict, tournament_id: str, template: dict, custom_message: Optional[str] = None) -> dict:
     """Generate content for tournament victory shares"""
     try:
         # Get tournament details
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
         # Get user's final position and prize
-        participant = tournament_participants_collection.find_one({
+        participant = await tournament_participants_collection.find_one({
             "user_id": user["id"],
             "tournament_id": tournament_id
         })
@@ -9330,11 +12224,11 @@ def generate_tournament_victory_content(user: dict, tournament_id: str, template
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating tournament victory content: {str(e)}")
 
-def generate_team_formation_content(user: dict, team_id: str, template: dict, custom_message: Optional[str] = None) -> dict:
+async def generate_team_formation_content(user: dict, team_id: str, template: dict, custom_message: Optional[str] = None) -> dict:
     """Generate content for team formation shares"""
     try:
         # Get team details
-        team = teams_collection.find_one({"id": team_id})
+        team = await teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
@@ -9405,11 +12299,11 @@ def generate_achievement_content(user: dict, achievement_data: str, template: di
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating achievement content: {str(e)}")
 
-def generate_tournament_participation_content(user: dict, tournament_id: str, template: dict, custom_message: Optional[str] = None) -> dict:
+async def generate_tournament_participation_content(user: dict, tournament_id: str, template: dict, custom_message: Optional[str] = None) -> dict:
     """Generate content for tournament participation shares"""
     try:
         # Get tournament details
-        tournament = tournaments_collection.find_one({"id": tournament_id})
+        tournament = await tournaments_collection.find_one({"id": tournament_id})
         if not tournament:
             raise HTTPException(status_code=404, detail="Tournament not found")
         
@@ -9548,11 +12442,11 @@ def create_share_url(share_id: str, user_id: str) -> str:
     base_url = "https://49f63d92-acd8-4e16-a4be-50baa0fb091a.preview.emergentagent.com"
     return f"{base_url}/share/{share_id}?ref={user_id}"
 
-def track_share_click(share_id: str, referrer_id: Optional[str] = None) -> None:
+async def track_share_click(share_id: str, referrer_id: Optional[str] = None) -> None:
     """Track when someone clicks on a shared link"""
     try:
         # Update share clicks
-        social_shares_collection.update_one(
+        await social_shares_collection.update_one(
             {"id": share_id},
             {
                 "$inc": {"clicks": 1},
@@ -9570,11 +12464,11 @@ def track_share_click(share_id: str, referrer_id: Optional[str] = None) -> None:
             "ip_address": None   # Could be added from request
         }
         
-        share_clicks_collection.insert_one(click_record)
+        await share_clicks_collection.insert_one(click_record)
         
         # Update viral metrics if applicable
         if referrer_id:
-            viral_metrics_collection.update_one(
+            await viral_metrics_collection.update_one(
                 {"share_id": share_id},
                 {
                     "$inc": {"referred_users": 1},
@@ -9586,15 +12480,15 @@ def track_share_click(share_id: str, referrer_id: Optional[str] = None) -> None:
     except Exception as e:
         print(f"Error tracking share click: {str(e)}")
 
-def calculate_viral_coefficient(share_id: str) -> float:
+async def calculate_viral_coefficient(share_id: str) -> float:
     """Calculate viral coefficient for a share"""
     try:
-        share = social_shares_collection.find_one({"id": share_id})
+        share = await social_shares_collection.find_one({"id": share_id})
         if not share:
             return 0.0
         
         # Get viral metrics
-        metrics = viral_metrics_collection.find_one({"share_id": share_id})
+        metrics = await viral_metrics_collection.find_one({"share_id": share_id})
         if not metrics:
             return 0.0
         
@@ -9606,7 +12500,7 @@ def calculate_viral_coefficient(share_id: str) -> float:
         viral_coefficient = new_users / original_shares if original_shares > 0 else 0.0
         
         # Update metrics
-        viral_metrics_collection.update_one(
+        await viral_metrics_collection.update_one(
             {"share_id": share_id},
             {
                 "$set": {
@@ -9631,7 +12525,7 @@ async def create_share(request: ShareRequest, user_id: str = Depends(verify_toke
     """Create social share content"""
     try:
         # Generate share content
-        share_data = generate_share_content(
+        share_data = await generate_share_content(
             user_id=user_id,
             share_type=request.share_type,
             reference_id=request.reference_id,
@@ -9661,7 +12555,7 @@ async def create_share(request: ShareRequest, user_id: str = Depends(verify_toke
         }
         
         # Save share record
-        social_shares_collection.insert_one(share_record)
+        await social_shares_collection.insert_one(share_record)
         
         # Create viral metrics record
         viral_record = {
@@ -9677,7 +12571,7 @@ async def create_share(request: ShareRequest, user_id: str = Depends(verify_toke
             "updated_at": datetime.utcnow()
         }
         
-        viral_metrics_collection.insert_one(viral_record)
+        await viral_metrics_collection.insert_one(viral_record)
         
         # Return share content for frontend
         return {
@@ -9699,10 +12593,10 @@ async def get_viral_content(limit: int = 10):
     """Get trending viral content"""
     try:
         # Get most clicked and shared content
-        viral_content = list(social_shares_collection.find(
+        viral_content = await social_shares_collection.find(
             {"clicks": {"$gt": 0}},  # Content with clicks
             {"_id": 0}
-        ).sort("clicks", -1).limit(limit))
+        ).sort("clicks", -1).limit(limit).to_list(length=None)
         
         # Clean datetime objects
         for share in viral_content:
@@ -9722,10 +12616,10 @@ async def get_viral_content(limit: int = 10):
 async def get_user_shares(user_id: str = Depends(verify_token), limit: int = 20, skip: int = 0):
     """Get user's share history"""
     try:
-        shares = list(social_shares_collection.find(
+        shares = await social_shares_collection.find(
             {"user_id": user_id},
             {"_id": 0}
-        ).sort("created_at", -1).skip(skip).limit(limit))
+        ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
         
         # Convert datetime objects to ISO strings
         for share in shares:
@@ -9733,7 +12627,7 @@ async def get_user_shares(user_id: str = Depends(verify_token), limit: int = 20,
                 if isinstance(value, datetime):
                     share[key] = value.isoformat()
         
-        total_shares = social_shares_collection.count_documents({"user_id": user_id})
+        total_shares = await social_shares_collection.count_documents({"user_id": user_id})
         
         return {
             "shares": shares,
@@ -9750,7 +12644,7 @@ async def get_social_stats(user_id: str = Depends(verify_token)):
     """Get user's social sharing statistics"""
     try:
         # Get user's sharing stats
-        stats = share_stats_collection.find_one({"user_id": user_id})
+        stats = await share_stats_collection.find_one({"user_id": user_id})
         if not stats:
             stats = {
                 "total_shares": 0,
@@ -9763,10 +12657,10 @@ async def get_social_stats(user_id: str = Depends(verify_token)):
             }
         
         # Get recent shares performance
-        recent_shares = list(social_shares_collection.find(
+        recent_shares = await social_shares_collection.find(
             {"user_id": user_id},
             {"_id": 0}
-        ).sort("created_at", -1).limit(10))
+        ).sort("created_at", -1).limit(10).to_list(length=None)
         
         # Calculate additional metrics
         total_shares = len(recent_shares)
@@ -9785,7 +12679,7 @@ async def get_social_stats(user_id: str = Depends(verify_token)):
         return {
             "stats": stats,
             "recent_shares": recent_shares,
-            "viral_coefficient": calculate_viral_coefficient(recent_shares[0]["id"]) if recent_shares else 0.0
+            "viral_coefficient": await calculate_viral_coefficient(recent_shares[0]["id"]) if recent_shares else 0.0
         }
         
     except Exception as e:
@@ -9796,7 +12690,7 @@ async def share_achievement(achievement_data: dict, platform: SocialPlatform, us
     """Share personal achievement"""
     try:
         # Generate share content
-        share_data = generate_share_content(
+        share_data = await generate_share_content(
             user_id=user_id,
             share_type=ShareType.PERSONAL_ACHIEVEMENT,
             reference_id=json.dumps(achievement_data),
@@ -9824,7 +12718,7 @@ async def share_achievement(achievement_data: dict, platform: SocialPlatform, us
             "is_viral": False
         }
         
-        social_shares_collection.insert_one(share_record)
+        await social_shares_collection.insert_one(share_record)
         
         return {
             "share_id": share_id,
@@ -9843,7 +12737,7 @@ async def share_tournament_victory(tournament_id: str, platform: SocialPlatform,
     """Share tournament victory"""
     try:
         # Check if user actually won/participated in tournament
-        participant = tournament_participants_collection.find_one({
+        participant = await tournament_participants_collection.find_one({
             "user_id": user_id,
             "tournament_id": tournament_id
         })
@@ -9852,7 +12746,7 @@ async def share_tournament_victory(tournament_id: str, platform: SocialPlatform,
             raise HTTPException(status_code=404, detail="User not found in tournament")
         
         # Generate share content
-        share_data = generate_share_content(
+        share_data = await generate_share_content(
             user_id=user_id,
             share_type=ShareType.TOURNAMENT_VICTORY,
             reference_id=tournament_id,
@@ -9880,7 +12774,7 @@ async def share_tournament_victory(tournament_id: str, platform: SocialPlatform,
             "is_viral": False
         }
         
-        social_shares_collection.insert_one(share_record)
+        await social_shares_collection.insert_one(share_record)
         
         return {
             "share_id": share_id,
@@ -9955,14 +12849,14 @@ async def get_friend_recommendations(current_user: dict = Depends(get_current_us
         user_id = current_user["id"]
         
         # Get user's current friends
-        user_friends = list(friends_collection.find({"user_id": user_id}))
+        user_friends = await friends_collection.find({"user_id": user_id}).to_list(length=None)
         friend_ids = [f["friend_id"] for f in user_friends]
         
         # Get user's teams
-        user_teams = list(teams_collection.find({"$or": [
+        user_teams = await teams_collection.find({"$or": [
             {"captain_id": user_id},
             {"members.user_id": user_id}
-        ]}))
+        ]}).to_list(length=None)
         user_team_ids = [str(team["id"]) for team in user_teams]
         
         # Find potential friends
@@ -9972,7 +12866,7 @@ async def get_friend_recommendations(current_user: dict = Depends(get_current_us
         for team in user_teams:
             for member in team.get("members", []):
                 if member["user_id"] not in friend_ids and member["user_id"] != user_id:
-                    user_data = users_collection.find_one({"id": member["user_id"]})
+                    user_data = await users_collection.find_one({"id": member["user_id"]})
                     if user_data:
                         recommendations.append({
                             "user_id": member["user_id"],
@@ -9986,10 +12880,10 @@ async def get_friend_recommendations(current_user: dict = Depends(get_current_us
         
         # 2. Friends of friends
         for friend_id in friend_ids:
-            friend_friends = list(friends_collection.find({"user_id": friend_id}))
+            friend_friends = await friends_collection.find({"user_id": friend_id}).to_list(length=None)
             for ff in friend_friends:
                 if ff["friend_id"] not in friend_ids and ff["friend_id"] != user_id:
-                    user_data = users_collection.find_one({"user_id": ff["friend_id"]})
+                    user_data = await users_collection.find_one({"user_id": ff["friend_id"]})
                     if user_data:
                         # Check if already in recommendations
                         existing = next((r for r in recommendations if r["user_id"] == ff["friend_id"]), None)
@@ -10028,12 +12922,12 @@ async def send_friend_request(request: dict, current_user: dict = Depends(get_cu
             raise HTTPException(status_code=400, detail="Recipient ID is required")
         
         # Check if recipient exists
-        recipient = users_collection.find_one({"id": recipient_id})
+        recipient = await users_collection.find_one({"id": recipient_id})
         if not recipient:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Check if already friends
-        existing_friendship = friends_collection.find_one({
+        existing_friendship = await friends_collection.find_one({
             "$or": [
                 {"user_id": user_id, "friend_id": recipient_id},
                 {"user_id": recipient_id, "friend_id": user_id}
@@ -10043,7 +12937,7 @@ async def send_friend_request(request: dict, current_user: dict = Depends(get_cu
             raise HTTPException(status_code=400, detail="Already friends")
         
         # Check if request already exists
-        existing_request = friend_requests_collection.find_one({
+        existing_request = await friend_requests_collection.find_one({
             "sender_id": user_id,
             "recipient_id": recipient_id,
             "status": "pending"
@@ -10061,7 +12955,7 @@ async def send_friend_request(request: dict, current_user: dict = Depends(get_cu
             "updated_at": datetime.utcnow()
         }
         
-        friend_requests_collection.insert_one(friend_request)
+        await friend_requests_collection.insert_one(friend_request)
         
         return CustomJSONResponse(content={
             "message": "Friend request sent successfully",
@@ -10078,27 +12972,27 @@ async def get_friend_requests(current_user: dict = Depends(get_current_user)):
         user_id = current_user["id"]
         
         # Get received requests
-        received_requests = list(friend_requests_collection.find({
+        received_requests = await friend_requests_collection.find({
             "recipient_id": user_id,
             "status": "pending"
-        }))
+        }).to_list(length=None)
         
         # Get sent requests
-        sent_requests = list(friend_requests_collection.find({
+        sent_requests = await friend_requests_collection.find({
             "sender_id": user_id,
             "status": "pending"
-        }))
+        }).to_list(length=None)
         
         # Enrich with user data
         for request in received_requests:
-            sender = users_collection.find_one({"id": request["sender_id"]})
+            sender = await users_collection.find_one({"id": request["sender_id"]})
             if sender:
                 request["sender_username"] = sender["username"]
                 request["sender_full_name"] = sender.get("full_name", "")
                 request["sender_avatar_url"] = sender.get("avatar_url", "")
         
         for request in sent_requests:
-            recipient = users_collection.find_one({"id": request["recipient_id"]})
+            recipient = await users_collection.find_one({"id": request["recipient_id"]})
             if recipient:
                 request["recipient_username"] = recipient["username"]
                 request["recipient_full_name"] = recipient.get("full_name", "")
@@ -10128,7 +13022,7 @@ async def respond_friend_request(request: dict, current_user: dict = Depends(get
             raise HTTPException(status_code=400, detail="Action must be 'accept' or 'reject'")
         
         # Find friend request
-        friend_request = friend_requests_collection.find_one({
+        friend_request = await friend_requests_collection.find_one({
             "id": request_id,
             "recipient_id": user_id,
             "status": "pending"
@@ -10138,7 +13032,7 @@ async def respond_friend_request(request: dict, current_user: dict = Depends(get
             raise HTTPException(status_code=404, detail="Friend request not found")
         
         # Update request status
-        friend_requests_collection.update_one(
+        await friend_requests_collection.update_one(
             {"id": request_id},
             {
                 "$set": {
@@ -10155,7 +13049,7 @@ async def respond_friend_request(request: dict, current_user: dict = Depends(get
                 "friend_id": friend_request["sender_id"],
                 "created_at": datetime.utcnow()
             }
-            friends_collection.insert_one(friendship_data)
+            await friends_collection.insert_one(friendship_data)
             
             # Create reverse friendship
             reverse_friendship = {
@@ -10163,7 +13057,7 @@ async def respond_friend_request(request: dict, current_user: dict = Depends(get
                 "friend_id": user_id,
                 "created_at": datetime.utcnow()
             }
-            friends_collection.insert_one(reverse_friendship)
+            await friends_collection.insert_one(reverse_friendship)
         
         return CustomJSONResponse(content={
             "message": f"Friend request {action}ed successfully"
@@ -10179,12 +13073,12 @@ async def get_friends_list(current_user: dict = Depends(get_current_user)):
         user_id = current_user["id"]
         
         # Get friends
-        friends = list(friends_collection.find({"user_id": user_id}))
+        friends = await friends_collection.find({"user_id": user_id}).to_list(length=None)
         
         # Enrich with user data
         friends_data = []
         for friend in friends:
-            user_data = users_collection.find_one({"id": friend["friend_id"]})
+            user_data = await users_collection.find_one({"id": friend["friend_id"]})
             if user_data:
                 friends_data.append({
                     "friend_id": friend["friend_id"],
@@ -10220,10 +13114,10 @@ async def import_friends(request: dict, current_user: dict = Depends(get_current
             # Import by email addresses
             for email in emails:
                 # Find user by email
-                user = users_collection.find_one({"email": email})
+                user = await users_collection.find_one({"email": email})
                 if user and user["id"] != user_id:
                     # Check if already friends
-                    existing = friends_collection.find_one({
+                    existing = await friends_collection.find_one({
                         "user_id": user_id,
                         "friend_id": user["id"]
                     })
@@ -10260,7 +13154,7 @@ async def import_friends(request: dict, current_user: dict = Depends(get_current
             "imported_count": len(imported_friends),
             "created_at": datetime.utcnow()
         }
-        friend_imports_collection.insert_one(import_record)
+        await friend_imports_collection.insert_one(import_record)
         
         return CustomJSONResponse(content={
             "message": f"Successfully found {len(imported_friends)} friends",
@@ -10282,8 +13176,8 @@ async def remove_friend(request: dict, current_user: dict = Depends(get_current_
             raise HTTPException(status_code=400, detail="Friend ID is required")
         
         # Remove friendship (both directions)
-        friends_collection.delete_one({"user_id": user_id, "friend_id": friend_id})
-        friends_collection.delete_one({"user_id": friend_id, "friend_id": user_id})
+        await friends_collection.delete_one({"user_id": user_id, "friend_id": friend_id})
+        await friends_collection.delete_one({"user_id": friend_id, "friend_id": user_id})
         
         return CustomJSONResponse(content={
             "message": "Friend removed successfully"
@@ -10302,7 +13196,7 @@ async def search_friends(q: str, current_user: dict = Depends(get_current_user))
             raise HTTPException(status_code=400, detail="Search query must be at least 2 characters")
         
         # Search users by username or full name
-        users = list(users_collection.find({
+        users = await users_collection.find({
             "$and": [
                 {"id": {"$ne": user_id}},  # Exclude self
                 {
@@ -10312,10 +13206,10 @@ async def search_friends(q: str, current_user: dict = Depends(get_current_user))
                     ]
                 }
             ]
-        }).limit(20))
+        }).limit(20).to_list(length=None)
         
         # Get user's friends to filter them out
-        user_friends = list(friends_collection.find({"user_id": user_id}))
+        user_friends = await friends_collection.find({"user_id": user_id}).to_list(length=None)
         friend_ids = [f["friend_id"] for f in user_friends]
         
         # Filter out friends and enrich data
@@ -10349,7 +13243,7 @@ print("✅ Friend Import System endpoints loaded successfully")
 async def get_all_content(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get all CMS content items (Admin only)"""
     try:
-        content_items = list(cms_content_collection.find({}))
+        content_items = await cms_content_collection.find({}).to_list(length=None)
         
         # Convert datetime objects to strings for JSON serialization
         for item in content_items:
@@ -10360,7 +13254,7 @@ async def get_all_content(admin_id: str = Depends(verify_admin_token(AdminRole.A
         
         # Get translations for each content item
         for item in content_items:
-            translations = list(cms_translations_collection.find({"content_id": item["id"]}))
+            translations = await cms_translations_collection.find({"content_id": item["id"]}).to_list(length=None)
             for translation in translations:
                 if 'created_at' in translation:
                     translation['created_at'] = translation['created_at'].isoformat() if translation['created_at'] else None
@@ -10377,10 +13271,10 @@ async def get_all_content(admin_id: str = Depends(verify_admin_token(AdminRole.A
         raise HTTPException(status_code=500, detail=f"Error fetching content: {str(e)}")
 
 @app.get("/api/cms/content")
-async def get_public_content():
+async def get_public_content(request: Request):
     """Get all active CMS content for public use (no auth required)"""
-    try:
-        content_items = list(cms_content_collection.find({"is_active": True}))
+    async def build():
+        content_items = await cms_content_collection.find({"is_active": True}).to_list(length=None)
         
         # Create a dictionary for easy frontend access
         content_dict = {}
@@ -10390,8 +13284,10 @@ async def get_public_content():
                 "type": item["content_type"],
                 "context": item["context"]
             }
-        
-        return CustomJSONResponse(content=content_dict)
+        return content_dict
+    
+    try:
+        return await response_cache.respond(request, "cms_content", build)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching content: {str(e)}")
@@ -10401,7 +13297,7 @@ async def create_content(request: ContentUpdateRequest, admin_id: str = Depends(
     """Create new CMS content item (Admin only)"""
     try:
         # Check if content with this key already exists
-        existing = cms_content_collection.find_one({"key": request.key})
+        existing = await cms_content_collection.find_one({"key": request.key})
         if existing:
             raise HTTPException(status_code=400, detail="Content with this key already exists")
         
@@ -10421,7 +13317,8 @@ async def create_content(request: ContentUpdateRequest, admin_id: str = Depends(
             "updated_by": None
         }
         
-        cms_content_collection.insert_one(content_data)
+        await cms_content_collection.insert_one(content_data)
+        response_cache.invalidate("cms_content")
         
         # Prepare response data with serialized datetime
         response_content = content_data.copy()
@@ -10440,7 +13337,7 @@ async def create_content(request: ContentUpdateRequest, admin_id: str = Depends(
 async def update_content(content_id: str, request: ContentUpdateRequest, admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Update existing CMS content item (Admin only)"""
     try:
-        existing = cms_content_collection.find_one({"id": content_id})
+        existing = await cms_content_collection.find_one({"id": content_id})
         if not existing:
             raise HTTPException(status_code=404, detail="Content not found")
         
@@ -10451,10 +13348,11 @@ async def update_content(content_id: str, request: ContentUpdateRequest, admin_i
             "updated_by": admin_id
         }
         
-        cms_content_collection.update_one(
+        await cms_content_collection.update_one(
             {"id": content_id},
             {"$set": update_data}
         )
+        response_cache.invalidate("cms_content")
         
         return CustomJSONResponse(content={
             "message": "Content updated successfully"
@@ -10468,12 +13366,13 @@ async def delete_content(content_id: str, admin_id: str = Depends(verify_admin_t
     """Delete CMS content item (Admin only)"""
     try:
         # Delete content item
-        result = cms_content_collection.delete_one({"id": content_id})
+        result = await cms_content_collection.delete_one({"id": content_id})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Content not found")
         
         # Also delete all translations for this content
-        cms_translations_collection.delete_many({"content_id": content_id})
+        await cms_translations_collection.delete_many({"content_id": content_id})
+        response_cache.invalidate("cms_content")
         
         return CustomJSONResponse(content={
             "message": "Content deleted successfully"
@@ -10490,11 +13389,11 @@ async def bulk_update_content(request: ContentBulkUpdateRequest, admin_id: str =
         
         for update in request.updates:
             # Check if content exists, create if not
-            existing = cms_content_collection.find_one({"key": update.key})
+            existing = await cms_content_collection.find_one({"key": update.key})
             
             if existing:
                 # Update existing
-                cms_content_collection.update_one(
+                await cms_content_collection.update_one(
                     {"key": update.key},
                     {"$set": {
                         "current_value": update.current_value,
@@ -10520,9 +13419,11 @@ async def bulk_update_content(request: ContentBulkUpdateRequest, admin_id: str =
                     "created_by": admin_id,
                     "updated_by": None
                 }
-                cms_content_collection.insert_one(content_data)
+                await cms_content_collection.insert_one(content_data)
                 updated_count += 1
         
+        response_cache.invalidate("cms_content")
+        
         return CustomJSONResponse(content={
             "message": f"Successfully processed {updated_count} content items"
         })
@@ -10534,7 +13435,7 @@ async def bulk_update_content(request: ContentBulkUpdateRequest, admin_id: str =
 async def get_all_themes(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get all CMS themes (Admin only)"""
     try:
-        themes = list(cms_themes_collection.find({}))
+        themes = await cms_themes_collection.find({}).to_list(length=None)
         
         # Convert datetime objects to strings for JSON serialization
         for theme in themes:
@@ -10552,10 +13453,10 @@ async def get_all_themes(admin_id: str = Depends(verify_admin_token(AdminRole.AD
         raise HTTPException(status_code=500, detail=f"Error fetching themes: {str(e)}")
 
 @app.get("/api/cms/theme/active")
-async def get_active_theme():
+async def get_active_theme(request: Request):
     """Get the currently active theme (no auth required)"""
-    try:
-        active_theme = cms_themes_collection.find_one({"is_active": True})
+    async def build():
+        active_theme = await cms_themes_collection.find_one({"is_active": True})
         
         # If no active theme, return default colors
         if not active_theme:
@@ -10585,7 +13486,10 @@ async def get_active_theme():
             if 'updated_at' in active_theme:
                 active_theme['updated_at'] = active_theme['updated_at'].isoformat() if active_theme['updated_at'] else None
         
-        return CustomJSONResponse(content=active_theme)
+        return active_theme
+    
+    try:
+        return await response_cache.respond(request, "cms_theme", build)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching active theme: {str(e)}")
@@ -10608,7 +13512,7 @@ async def create_theme(request: ThemeUpdateRequest, admin_id: str = Depends(veri
             "updated_by": None
         }
         
-        cms_themes_collection.insert_one(theme_data)
+        await cms_themes_collection.insert_one(theme_data)
         
         # Prepare response data with serialized datetime
         response_theme = theme_data.copy()
@@ -10628,18 +13532,18 @@ async def activate_theme(theme_id: str, admin_id: str = Depends(verify_admin_tok
     """Activate a theme (deactivates all others) (Admin only)"""
     try:
         # Check if theme exists
-        theme = cms_themes_collection.find_one({"id": theme_id})
+        theme = await cms_themes_collection.find_one({"id": theme_id})
         if not theme:
             raise HTTPException(status_code=404, detail="Theme not found")
         
         # Deactivate all themes
-        cms_themes_collection.update_many(
+        await cms_themes_collection.update_many(
             {},
             {"$set": {"is_active": False}}
         )
         
         # Activate the selected theme
-        cms_themes_collection.update_one(
+        await cms_themes_collection.update_one(
             {"id": theme_id},
             {"$set": {
                 "is_active": True,
@@ -10647,6 +13551,7 @@ async def activate_theme(theme_id: str, admin_id: str = Depends(verify_admin_tok
                 "updated_by": admin_id
             }}
         )
+        response_cache.invalidate("cms_theme")
         
         return CustomJSONResponse(content={
             "message": "Theme activated successfully"
@@ -10659,7 +13564,7 @@ async def activate_theme(theme_id: str, admin_id: str = Depends(verify_admin_tok
 async def get_content_contexts(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
     """Get all content organized by context (Admin only)"""
     try:
-        content_items = list(cms_content_collection.find({}))
+        content_items = await cms_content_collection.find({}).to_list(length=None)
         
         # Group by context
         contexts = {}
@@ -10679,19 +13584,19 @@ async def create_translation(request: TranslationUpdateRequest, admin_id: str =
     """Create or update translation for content (Admin only)"""
     try:
         # Check if content exists
-        content = cms_content_collection.find_one({"id": request.content_id})
+        content = await cms_content_collection.find_one({"id": request.content_id})
         if not content:
             raise HTTPException(status_code=404, detail="Content not found")
         
         # Check if translation already exists
-        existing_translation = cms_translations_collection.find_one({
+        existing_translation = await cms_translations_collection.find_one({
             "content_id": request.content_id,
             "language": request.language
         })
         
         if existing_translation:
             # Update existing translation
-            cms_translations_collection.update_one(
+            await cms_translations_collection.update_one(
                 {"id": existing_translation["id"]},
                 {"$set": {
                     "translated_value": request.translated_value,
@@ -10713,7 +13618,7 @@ async def create_translation(request: TranslationUpdateRequest, admin_id: str =
                 "created_by": admin_id,
                 "updated_by": None
             }
-            cms_translations_collection.insert_one(translation_data)
+            await cms_translations_collection.insert_one(translation_data)
             message = "Translation created successfully"
         
         return CustomJSONResponse(content={"message": message})
@@ -10724,11 +13629,11 @@ async def create_translation(request: TranslationUpdateRequest, admin_id: str =
 print("✅ Content Management System endpoints loaded successfully")
 
 # Initialize default CMS content
-def initialize_default_cms_content():
+async def initialize_default_cms_content():
     """Initialize default CMS content items"""
     try:
         # Check if content already exists
-        existing_count = cms_content_collection.count_documents({})
+        existing_count = await cms_content_collection.count_documents({})
         if existing_count > 0:
             print("📝 CMS content already exists, skipping initialization")
             return
@@ -10922,7 +13827,7 @@ def initialize_default_cms_content():
         ]
         
         # Insert default content
-        cms_content_collection.insert_many(default_content)
+        await cms_content_collection.insert_many(default_content)
         
         # Create default theme
         default_theme = {
@@ -10951,7 +13856,8 @@ def initialize_default_cms_content():
             "updated_by": None
         }
         
-        cms_themes_collection.insert_one(default_theme)
+        await cms_themes_collection.insert_one(default_theme)
+        response_cache.invalidate("cms_content", "cms_theme")
         
         print(f"✅ Initialized {len(default_content)} default CMS content items and 1 default theme")
     
@@ -10959,7 +13865,7 @@ def initialize_default_cms_content():
         print(f"❌ Error initializing default CMS content: {str(e)}")
 
 # Initialize CMS content on startup
-initialize_default_cms_content()
+app.add_event_handler("startup", initialize_default_cms_content)
 
 # =============================================================================
 # SPORTSDUEL API ENDPOINTS
@@ -10967,10 +13873,10 @@ initialize_default_cms_content()
 
 # SportsDuel League Management
 @app.get("/api/sportsduel/leagues")
-async def get_sportsduel_leagues():
+async def get_sportsduel_leagues(request: Request):
     """Get all SportsDuel leagues"""
-    try:
-        leagues = list(sportsduel_leagues_collection.find({}))
+    async def build():
+        leagues = await sportsduel_leagues_collection.find({}).to_list(length=None)
         
         # Convert ObjectId to string for JSON serialization
         for league in leagues:
@@ -10982,7 +13888,10 @@ async def get_sportsduel_leagues():
                 if field in league and league[field]:
                     league[field] = league[field].isoformat() if isinstance(league[field], datetime) else league[field]
         
-        return CustomJSONResponse(content={"leagues": leagues, "total": len(leagues)})
+        return {"leagues": leagues, "total": len(leagues)}
+    
+    try:
+        return await response_cache.respond(request, "sportsduel_leagues", build)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching leagues: {str(e)}")
@@ -11010,7 +13919,8 @@ async def create_sportsduel_league(league_data: SportsDuelLeagueCreate, current_
             "updated_at": datetime.utcnow()
         }
         
-        sportsduel_leagues_collection.insert_one(league)
+        await sportsduel_leagues_collection.insert_one(league)
+        response_cache.invalidate("sportsduel_leagues")
         
         # Convert datetime for response
         for field in ["start_date", "end_date", "created_at", "updated_at"]:
@@ -11031,7 +13941,7 @@ async def get_sportsduel_teams(league_id: str = None):
         if league_id:
             query["league_id"] = league_id
             
-        teams = list(sportsduel_teams_collection.find(query))
+        teams = await sportsduel_teams_collection.find(query).to_list(length=None)
         
         for team in teams:
             if "_id" in team:
@@ -11052,7 +13962,7 @@ async def create_sportsduel_team(team_data: SportsDuelTeamCreate, current_user:
     """Create new SportsDuel team (Sports Cafe)"""
     try:
         # Check if user already owns a team
-        existing_team = sportsduel_teams_collection.find_one({"owner_user_id": current_user["id"]})
+        existing_team = await sportsduel_teams_collection.find_one({"owner_user_id": current_user["id"]})
         if existing_team:
             raise HTTPException(status_code=400, detail="You already own a sports cafe team")
         
@@ -11078,7 +13988,7 @@ async def create_sportsduel_team(team_data: SportsDuelTeamCreate, current_user:
             "updated_at": datetime.utcnow()
         }
         
-        sportsduel_teams_collection.insert_one(team)
+        await sportsduel_teams_collection.insert_one(team)
         
         # Convert datetime for response
         for field in ["created_at", "updated_at"]:
@@ -11095,7 +14005,7 @@ async def create_sportsduel_team(team_data: SportsDuelTeamCreate, current_user:
 async def get_team_players(team_id: str):
     """Get all players for a specific team"""
     try:
-        players = list(sportsduel_players_collection.find({"team_id": team_id}))
+        players = await sportsduel_players_collection.find({"team_id": team_id}).to_list(length=None)
         
         for player in players:
             if "_id" in player:
@@ -11116,12 +14026,12 @@ async def join_sportsduel_team(team_id: str, player_data: SportsDuelPlayerCreate
     """Join a SportsDuel team as player"""
     try:
         # Check if team exists
-        team = sportsduel_teams_collection.find_one({"id": team_id})
+        team = await sportsduel_teams_collection.find_one({"id": team_id})
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
         # Check if user is already a player in any team
-        existing_player = sportsduel_players_collection.find_one({"user_id": current_user["id"]})
+        existing_player = await sportsduel_players_collection.find_one({"user_id": current_user["id"]})
         if existing_player:
             raise HTTPException(status_code=400, detail="You are already registered as a player")
         
@@ -11145,7 +14055,7 @@ async def join_sportsduel_team(team_id: str, player_data: SportsDuelPlayerCreate
             "last_match_at": None
         }
         
-        sportsduel_players_collection.insert_one(player)
+        await sportsduel_players_collection.insert_one(player)
         
         # Convert datetime for response
         if player["joined_at"]:
@@ -11156,6 +14066,83 @@ async def join_sportsduel_team(team_id: str, player_data: SportsDuelPlayerCreate
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error joining team: {str(e)}")
 
+@app.get("/api/sportsduel/players/{player_id}/stats")
+async def get_sportsduel_player_statistics(player_id: str):
+    """Get a SportsDuel player's match statistics"""
+    stats = await get_sportsduel_player_stats(player_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return CustomJSONResponse(content=stats)
+
+@app.post("/api/admin/sportsduel/player-stats/rebuild")
+async def rebuild_player_statistics(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
+    """Recompute every SportsDuel player stats document from match history (Admin only)"""
+    try:
+        rebuilt = await rebuild_sportsduel_player_stats()
+        await log_admin_action(admin_id, "sportsduel_rebuild_player_stats", details={"players": rebuilt})
+        return {"message": "Player statistics rebuilt", "players": rebuilt}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebuilding player statistics: {str(e)}")
+
+@app.get("/api/sportsduel/leaderboards/{league_id}/{entity_type}")
+async def get_sportsduel_leaderboard(
+    league_id: str,
+    entity_type: str,
+    window: str = "season",
+    period: Optional[str] = None,
+    limit: int = 50,
+    skip: int = 0
+):
+    """Café (teams) or player leaderboard of a league for a daily, weekly or season window.
+    
+    period defaults to the current day, ISO week (e.g. 2024-W07) or league season.
+    """
+    if entity_type not in ["teams", "players"]:
+        raise HTTPException(status_code=400, detail="Leaderboard must be teams or players")
+    if window not in SPORTSDUEL_RANKING_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"Window must be one of {', '.join(SPORTSDUEL_RANKING_WINDOWS)}")
+    
+    try:
+        if not period:
+            seasons = await get_sportsduel_league_seasons([league_id]) if window == "season" else {}
+            period = sportsduel_ranking_periods(datetime.utcnow(), seasons.get(league_id))[window]
+        
+        query = {"league_id": league_id, "entity_type": entity_type[:-1], "window": window, "period": period}
+        limit = max(1, min(limit, 200))
+        skip = max(0, skip)
+        entries = await (
+            sportsduel_rankings_collection.find(query, {
+                "_id": 0, "entity_id": 1, "name": 1, "matches": 1, "wins": 1, "losses": 1, "draws": 1, "points": 1
+            })
+            .sort([("points", DESCENDING), ("wins", DESCENDING), ("entity_id", ASCENDING)])
+            .skip(skip)
+            .limit(limit)
+            .to_list(length=None)
+        )
+        for position, entry in enumerate(entries):
+            entry["rank"] = skip + position + 1
+        
+        return CustomJSONResponse(content={
+            "league_id": league_id,
+            "window": window,
+            "period": period,
+            "rankings": entries,
+            "total": await sportsduel_rankings_collection.count_documents(query)
+        })
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching leaderboard: {str(e)}")
+
+@app.post("/api/admin/sportsduel/rankings/rebuild")
+async def rebuild_sportsduel_leaderboards(admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
+    """Recompute every SportsDuel ranking entry from match history (Admin only)"""
+    try:
+        rebuilt = await rebuild_sportsduel_rankings()
+        await log_admin_action(admin_id, "sportsduel_rebuild_rankings", details={"entries": rebuilt})
+        return {"message": "Rankings rebuilt", "entries": rebuilt}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebuilding rankings: {str(e)}")
+
 # SportsDuel Time Slots & Events
 @app.get("/api/sportsduel/time-slots")
 async def get_sportsduel_time_slots(match_date: str = None, league_id: str = None):
@@ -11167,7 +14154,7 @@ async def get_sportsduel_time_slots(match_date: str = None, league_id: str = Non
         if league_id:
             query["league_id"] = league_id
             
-        time_slots = list(sportsduel_time_slots_collection.find(query))
+        time_slots = await sportsduel_time_slots_collection.find(query).to_list(length=None)
         
         for slot in time_slots:
             if "_id" in slot:
@@ -11187,7 +14174,7 @@ async def get_sportsduel_time_slots(match_date: str = None, league_id: str = Non
 async def get_sports_events_for_slot(time_slot_id: str):
     """Get all sports events for a specific time slot"""
     try:
-        events = list(sportsduel_sports_events_collection.find({"time_slot_id": time_slot_id}))
+        events = await sportsduel_sports_events_collection.find({"time_slot_id": time_slot_id}).to_list(length=None)
         
         for event in events:
             if "_id" in event:
@@ -11203,6 +14190,23 @@ async def get_sports_events_for_slot(time_slot_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching events: {str(e)}")
 
+@app.post("/api/admin/sportsduel/time-slots/{time_slot_id}/settle")
+async def settle_time_slot(time_slot_id: str, settlement: SportsDuelSettlementRequest, admin_id: str = Depends(verify_admin_token(AdminRole.ADMIN))):
+    """Record final event results and settle every coupon and match of a time slot (Admin only)"""
+    try:
+        summary = await settle_sportsduel_time_slot(time_slot_id, settlement.results)
+        await log_admin_action(admin_id, "sportsduel_settle_time_slot", details={
+            "time_slot_id": time_slot_id,
+            "matches_settled": len(summary["matches_settled"]),
+            "coupons_evaluated": summary["coupons_evaluated"]
+        })
+        return CustomJSONResponse(content={"message": "Time slot settled", **summary})
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error settling time slot: {str(e)}")
+
 # SportsDuel Match System
 @app.get("/api/sportsduel/matches")
 async def get_sportsduel_matches(league_id: str = None, time_slot_id: str = None, current_user: dict = Depends(get_current_user)):
@@ -11214,7 +14218,8 @@ async def get_sportsduel_matches(league_id: str = None, time_slot_id: str = None
         if time_slot_id:
             query["time_slot_id"] = time_slot_id
             
-        matches = list(sportsduel_matches_collection.find(query))
+        matches = await sportsduel_matches_collection.find(query).to_list(length=None)
+        teams, players, _ = await load_sportsduel_match_context(matches)
         
         # Get additional data for each match
         for match in matches:
@@ -11222,10 +14227,10 @@ async def get_sportsduel_matches(league_id: str = None, time_slot_id: str = None
                 match["_id"] = str(match["_id"])
             
             # Get team and player info
-            team1 = sportsduel_teams_collection.find_one({"id": match["team1_id"]})
-            team2 = sportsduel_teams_collection.find_one({"id": match["team2_id"]})
-            player1 = sportsduel_players_collection.find_one({"id": match["player1_id"]})
-            player2 = sportsduel_players_collection.find_one({"id": match["player2_id"]})
+            team1 = teams.get(match["team1_id"])
+            team2 = teams.get(match["team2_id"])
+            player1 = players.get(match["player1_id"])
+            player2 = players.get(match["player2_id"])
             
             match["team1_name"] = team1["name"] if team1 else "Unknown"
             match["team2_name"] = team2["name"] if team2 else "Unknown"
@@ -11248,7 +14253,7 @@ async def create_sportsduel_coupon(coupon_data: SportsDuelCouponCreate, current_
     """Create a new SportsDuel coupon"""
     try:
         # Get player info
-        player = sportsduel_players_collection.find_one({"user_id": current_user["id"]})
+        player = await sportsduel_players_collection.find_one({"user_id": current_user["id"]})
         if not player:
             raise HTTPException(status_code=404, detail="You must be registered as a player first")
         
@@ -11257,7 +14262,7 @@ async def create_sportsduel_coupon(coupon_data: SportsDuelCouponCreate, current_
             raise HTTPException(status_code=400, detail="Coupon must have between 1 and 3 bets")
         
         # Check if match exists
-        match = sportsduel_matches_collection.find_one({"id": coupon_data.match_id})
+        match = await sportsduel_matches_collection.find_one({"id": coupon_data.match_id})
         if not match:
             raise HTTPException(status_code=404, detail="Match not found")
         
@@ -11266,7 +14271,7 @@ async def create_sportsduel_coupon(coupon_data: SportsDuelCouponCreate, current_
             raise HTTPException(status_code=403, detail="You are not part of this match")
         
         # Check if player already has a coupon for this match
-        existing_coupon = sportsduel_coupons_collection.find_one({
+        existing_coupon = await sportsduel_coupons_collection.find_one({
             "player_id": player["id"],
             "match_id": coupon_data.match_id
         })
@@ -11308,19 +14313,21 @@ async def create_sportsduel_coupon(coupon_data: SportsDuelCouponCreate, current_
             "evaluated_at": None
         }
         
-        sportsduel_coupons_collection.insert_one(coupon)
+        await sportsduel_coupons_collection.insert_one(coupon)
         
         # Update match with coupon ID
         if match["player1_id"] == player["id"]:
-            sportsduel_matches_collection.update_one(
+            await sportsduel_matches_collection.update_one(
                 {"id": coupon_data.match_id},
                 {"$set": {"player1_coupon_id": coupon_id}}
             )
         else:
-            sportsduel_matches_collection.update_one(
+            await sportsduel_matches_collection.update_one(
                 {"id": coupon_data.match_id},
                 {"$set": {"player2_coupon_id": coupon_id}}
             )
+        invalidate_sportsduel_scoreboards([match["league_id"]])
+        await publish_sportsduel_scoreboard_changes([], [coupon], {match["id"]: match["league_id"]})
         
         # Convert datetime for response
         coupon["created_at"] = coupon["created_at"].isoformat()
@@ -11332,88 +14339,234 @@ async def create_sportsduel_coupon(coupon_data: SportsDuelCouponCreate, current_
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating coupon: {str(e)}")
 
+def sportsduel_scoreboard_entry(match: dict, teams: dict, players: dict, coupons: dict) -> dict:
+    """One match of the scoreboard, from the teams, players and coupons loaded for it"""
+    if "_id" in match:
+        match["_id"] = str(match["_id"])
+    
+    # Get team info
+    team1 = teams.get(match["team1_id"])
+    team2 = teams.get(match["team2_id"])
+    
+    # Get player info
+    player1 = players.get(match["player1_id"])
+    player2 = players.get(match["player2_id"])
+    
+    # Get coupon info if available
+    player1_coupon = coupons.get(match.get("player1_coupon_id"))
+    player2_coupon = coupons.get(match.get("player2_coupon_id"))
+    
+    match_data = {
+        "match_id": match["id"],
+        "status": match["status"],
+        "team1": {
+            "id": team1["id"] if team1 else None,
+            "name": team1["name"] if team1 else "Unknown",
+            "logo_url": team1.get("logo_url") if team1 else None,
+            "player": {
+                "id": player1["id"] if player1 else None,
+                "nickname": player1["nickname"] if player1 else "Unknown",
+                "avatar_url": player1.get("avatar_url") if player1 else None,
+                "coupon_status": player1_coupon["status"] if player1_coupon else "pending",
+                "correct_predictions": player1_coupon["correct_predictions"] if player1_coupon else 0,
+                "wrong_predictions": player1_coupon["wrong_predictions"] if player1_coupon else 0,
+                "total_odds": player1_coupon["total_odds"] if player1_coupon else 0,
+                "has_winning": player1_coupon["has_winning_selection"] if player1_coupon else False
+            }
+        },
+        "team2": {
+            "id": team2["id"] if team2 else None,
+            "name": team2["name"] if team2 else "Unknown", 
+            "logo_url": team2.get("logo_url") if team2 else None,
+            "player": {
+                "id": player2["id"] if player2 else None,
+                "nickname": player2["nickname"] if player2 else "Unknown",
+                "avatar_url": player2.get("avatar_url") if player2 else None,
+                "coupon_status": player2_coupon["status"] if player2_coupon else "pending",
+                "correct_predictions": player2_coupon["correct_predictions"] if player2_coupon else 0,
+                "wrong_predictions": player2_coupon["wrong_predictions"] if player2_coupon else 0,
+                "total_odds": player2_coupon["total_odds"] if player2_coupon else 0,
+                "has_winning": player2_coupon["has_winning_selection"] if player2_coupon else False
+            }
+        },
+        "winner_player_id": match.get("winner_player_id"),
+        "match_result": match.get("match_result")
+    }
+    
+    # Convert datetime objects
+    for field in ["scheduled_at", "started_at", "completed_at"]:
+        if field in match and match[field]:
+            match_data[field] = match[field].isoformat() if isinstance(match[field], datetime) else match[field]
+    
+    return match_data
+
+async def build_sportsduel_scoreboard(league_id: str) -> dict:
+    """Scoreboard of a league's active and completed matches, joined from one $in read per collection"""
+    # Get active matches for the league
+    matches = await sportsduel_matches_collection.find({
+        "league_id": league_id,
+        "status": {"$in": ["active", "completed"]}
+    }).to_list(length=None)
+    teams, players, coupons = await load_sportsduel_match_context(matches, with_coupons=True)
+    
+    scoreboard_data = [sportsduel_scoreboard_entry(match, teams, players, coupons) for match in matches]
+    return {"scoreboard": scoreboard_data, "total": len(scoreboard_data)}
+
 @app.get("/api/sportsduel/scoreboard/{league_id}")
-async def get_sportsduel_scoreboard(league_id: str):
+async def get_sportsduel_scoreboard(league_id: str, request: Request):
     """Get live SportsDuel scoreboard for a league"""
     try:
-        # Get active matches for the league
-        matches = list(sportsduel_matches_collection.find({
+        return await response_cache.respond(
+            request, "sportsduel_scoreboard", lambda: build_sportsduel_scoreboard(league_id)
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching scoreboard: {str(e)}")
+
+# Café screens subscribe to a league's scoreboard over Server-Sent Events instead of re-polling
+# the full scoreboard. Coupon creation and settlement publish one "scoreboard_delta" frame per
+# league through the chat event bus (so every worker's subscribers get it) carrying only the
+# changed matches and coupons. A subscriber whose queue fills up gets a "reset" frame and should
+# reload the snapshot.
+SPORTSDUEL_STREAM_QUEUE_SIZE = int(os.environ.get("SPORTSDUEL_STREAM_QUEUE_SIZE", "100"))
+SPORTSDUEL_STREAM_KEEPALIVE_SECONDS = float(os.environ.get("SPORTSDUEL_STREAM_KEEPALIVE_SECONDS", "15"))
+
+def sportsduel_coupon_delta(coupon: dict) -> dict:
+    """The scoreboard's view of one player's coupon"""
+    return {
+        "match_id": coupon["match_id"],
+        "player_id": coupon["player_id"],
+        "coupon_status": coupon["status"],
+        "correct_predictions": coupon["correct_predictions"],
+        "wrong_predictions": coupon["wrong_predictions"],
+        "total_odds": coupon["total_odds"],
+        "has_winning": coupon["has_winning_selection"]
+    }
+
+class SportsDuelScoreboardHub:
+    """Per-league scoreboard subscribers of this worker, fed from the event bus"""
+
+    def __init__(self, bus: InProcessChatBus, queue_size: int = SPORTSDUEL_STREAM_QUEUE_SIZE):
+        self.bus = bus
+        self.bus.subscribe(self.apply_bus_event)
+        self.queue_size = queue_size
+        # {league_id: {asyncio.Queue of encoded frames}}
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.frames_sent = 0
+        self.resets = 0
+
+    def subscribe(self, league_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(league_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, league_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(league_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[league_id]
+
+    async def publish(self, league_id: str, matches: List[dict], coupons: List[dict]):
+        if not matches and not coupons:
+            return
+        await self.bus.publish({
+            "kind": "sportsduel_scoreboard",
             "league_id": league_id,
-            "status": {"$in": ["active", "completed"]}
-        }))
+            "frame": {"type": "scoreboard_delta", "league_id": league_id, "matches": matches, "coupons": coupons}
+        })
+
+    async def apply_bus_event(self, event: dict):
+        if event.get("kind") != "sportsduel_scoreboard":
+            return
+        # The change may come from another worker, whose settlement only cleared its own cache
+        invalidate_sportsduel_scoreboards([event["league_id"]])
+        queues = self.subscribers.get(event["league_id"])
+        if not queues:
+            return
         
-        scoreboard_data = []
+        frame = encode_chat_frame(event["frame"])
+        for queue in list(queues):
+            try:
+                queue.put_nowait(frame)
+                self.frames_sent += 1
+            except asyncio.QueueFull:
+                # Too far behind for deltas to be useful; the client reloads the snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(encode_chat_frame({"type": "reset", "league_id": event["league_id"]}))
+                self.resets += 1
+
+    def stats(self) -> dict:
+        return {
+            "leagues": len(self.subscribers),
+            "subscribers": sum(len(queues) for queues in self.subscribers.values()),
+            "frames_sent": self.frames_sent,
+            "resets": self.resets
+        }
+
+sportsduel_scoreboard_hub = SportsDuelScoreboardHub(chat_manager.bus)
+
+async def publish_sportsduel_scoreboard_changes(matches: List[dict], coupons: List[dict], match_leagues: Dict[str, str]):
+    """Push changed matches (as full scoreboard entries) and coupons to each league's subscribers.
+    
+    match_leagues maps the match id of every coupon to its league; coupons of matches that
+    are themselves in matches travel inside the match entry.
+    """
+    try:
+        teams, players, _ = await load_sportsduel_match_context(matches)
+        coupons_by_id = {coupon["id"]: coupon for coupon in coupons}
+        changed_match_ids = {match["id"] for match in matches}
         
+        deltas: Dict[str, tuple] = {}
         for match in matches:
-            if "_id" in match:
-                match["_id"] = str(match["_id"])
-            
-            # Get team info
-            team1 = sportsduel_teams_collection.find_one({"id": match["team1_id"]})
-            team2 = sportsduel_teams_collection.find_one({"id": match["team2_id"]})
-            
-            # Get player info
-            player1 = sportsduel_players_collection.find_one({"id": match["player1_id"]})
-            player2 = sportsduel_players_collection.find_one({"id": match["player2_id"]})
-            
-            # Get coupon info if available
-            player1_coupon = None
-            player2_coupon = None
-            
-            if match.get("player1_coupon_id"):
-                player1_coupon = sportsduel_coupons_collection.find_one({"id": match["player1_coupon_id"]})
-            
-            if match.get("player2_coupon_id"):
-                player2_coupon = sportsduel_coupons_collection.find_one({"id": match["player2_coupon_id"]})
-            
-            match_data = {
-                "match_id": match["id"],
-                "status": match["status"],
-                "team1": {
-                    "id": team1["id"] if team1 else None,
-                    "name": team1["name"] if team1 else "Unknown",
-                    "logo_url": team1.get("logo_url") if team1 else None,
-                    "player": {
-                        "id": player1["id"] if player1 else None,
-                        "nickname": player1["nickname"] if player1 else "Unknown",
-                        "avatar_url": player1.get("avatar_url") if player1 else None,
-                        "coupon_status": player1_coupon["status"] if player1_coupon else "pending",
-                        "correct_predictions": player1_coupon["correct_predictions"] if player1_coupon else 0,
-                        "wrong_predictions": player1_coupon["wrong_predictions"] if player1_coupon else 0,
-                        "total_odds": player1_coupon["total_odds"] if player1_coupon else 0,
-                        "has_winning": player1_coupon["has_winning_selection"] if player1_coupon else False
-                    }
-                },
-                "team2": {
-                    "id": team2["id"] if team2 else None,
-                    "name": team2["name"] if team2 else "Unknown", 
-                    "logo_url": team2.get("logo_url") if team2 else None,
-                    "player": {
-                        "id": player2["id"] if player2 else None,
-                        "nickname": player2["nickname"] if player2 else "Unknown",
-                        "avatar_url": player2.get("avatar_url") if player2 else None,
-                        "coupon_status": player2_coupon["status"] if player2_coupon else "pending",
-                        "correct_predictions": player2_coupon["correct_predictions"] if player2_coupon else 0,
-                        "wrong_predictions": player2_coupon["wrong_predictions"] if player2_coupon else 0,
-                        "total_odds": player2_coupon["total_odds"] if player2_coupon else 0,
-                        "has_winning": player2_coupon["has_winning_selection"] if player2_coupon else False
-                    }
-                },
-                "winner_player_id": match.get("winner_player_id"),
-                "match_result": match.get("match_result")
-            }
-            
-            # Convert datetime objects
-            for field in ["scheduled_at", "started_at", "completed_at"]:
-                if field in match and match[field]:
-                    match_data[field] = match[field].isoformat() if isinstance(match[field], datetime) else match[field]
-            
-            scoreboard_data.append(match_data)
+            deltas.setdefault(match["league_id"], ([], []))[0].append(
+                sportsduel_scoreboard_entry(match, teams, players, coupons_by_id)
+            )
+        for coupon in coupons:
+            league_id = match_leagues.get(coupon["match_id"])
+            if league_id and coupon["match_id"] not in changed_match_ids:
+                deltas.setdefault(league_id, ([], []))[1].append(sportsduel_coupon_delta(coupon))
         
-        return CustomJSONResponse(content={"scoreboard": scoreboard_data, "total": len(scoreboard_data)})
+        for league_id, (entries, coupon_deltas) in deltas.items():
+            await sportsduel_scoreboard_hub.publish(league_id, entries, coupon_deltas)
+    except Exception as e:
+        print(f"Error publishing scoreboard changes: {e}")
+
+@app.get("/api/sportsduel/scoreboard/{league_id}/stream")
+async def stream_sportsduel_scoreboard(league_id: str, request: Request):
+    """Server-Sent Events stream of a league's scoreboard.
     
+    The first event is the full scoreboard (event: snapshot); after that each message is a
+    scoreboard_delta with the changed matches and coupons, or a reset asking the client to
+    reconnect for a fresh snapshot.
+    """
+    # Subscribe before reading the snapshot so no change falls between the two. The snapshot
+    # is built from the database, not this worker's response cache, which may lag behind
+    queue = sportsduel_scoreboard_hub.subscribe(league_id)
+    try:
+        snapshot, _ = render_json_body(await build_sportsduel_scoreboard(league_id))
     except Exception as e:
+        sportsduel_scoreboard_hub.unsubscribe(league_id, queue)
         raise HTTPException(status_code=500, detail=f"Error fetching scoreboard: {str(e)}")
+    
+    async def events():
+        try:
+            yield f"event: snapshot\ndata: {snapshot.decode('utf-8')}\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), SPORTSDUEL_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {frame}\n\n"
+        finally:
+            sportsduel_scoreboard_hub.unsubscribe(league_id, queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
 print("✅ SportsDuel API endpoints loaded successfully")
 
@@ -11421,11 +14574,11 @@ print("✅ SportsDuel API endpoints loaded successfully")
 # SPORTSDUEL SAMPLE DATA INITIALIZATION
 # =============================================================================
 
-def initialize_sportsduel_sample_data():
+async def initialize_sportsduel_sample_data():
     """Initialize SportsDuel with sample data for testing"""
     try:
         # Check if already initialized
-        if sportsduel_leagues_collection.count_documents({}) > 0:
+        if await sportsduel_leagues_collection.count_documents({}) > 0:
             return  # Already initialized
         
         # Create sample league
@@ -11444,7 +14597,8 @@ def initialize_sportsduel_sample_data():
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
-        sportsduel_leagues_collection.insert_one(sample_league)
+        await sportsduel_leagues_collection.insert_one(sample_league)
+        response_cache.invalidate("sportsduel_leagues")
         
         # Create sample teams (Sports Cafes)
         sample_teams = [
@@ -11490,7 +14644,7 @@ def initialize_sportsduel_sample_data():
             }
         ]
         
-        sportsduel_teams_collection.insert_many(sample_teams)
+        await sportsduel_teams_collection.insert_many(sample_teams)
         
         # Create sample players
         sample_players = [
@@ -11532,20 +14686,20 @@ def initialize_sportsduel_sample_data():
             }
         ]
         
-        sportsduel_players_collection.insert_many(sample_players)
+        await sportsduel_players_collection.insert_many(sample_players)
         
         # Create today's time slots
         today = datetime.utcnow().strftime("%Y-%m-%d")
-        create_sportsduel_time_slots_for_day(today, league_id)
+        await create_sportsduel_time_slots_for_day(today, league_id)
         
         # Create sample sports events for the afternoon slot
-        afternoon_slot = sportsduel_time_slots_collection.find_one({
+        afternoon_slot = await sportsduel_time_slots_collection.find_one({
             "match_day": today,
             "slot_name": "Afternoon Slot"
         })
         
         if afternoon_slot:
-            generate_sample_sports_events(afternoon_slot["id"], today)
+            await generate_sample_sports_events(afternoon_slot["id"], today)
             
             # Create a sample match
             match_id = str(uuid.uuid4())
@@ -11567,7 +14721,8 @@ def initialize_sportsduel_sample_data():
                 "completed_at": None,
                 "created_at": datetime.utcnow()
             }
-            sportsduel_matches_collection.insert_one(sample_match)
+            await sportsduel_matches_collection.insert_one(sample_match)
+            invalidate_sportsduel_scoreboards([league_id])
         
         print("✅ SportsDuel sample data initialized successfully")
         
@@ -11575,7 +14730,7 @@ def initialize_sportsduel_sample_data():
         print(f"❌ Error initializing SportsDuel sample data: {e}")
 
 # Initialize SportsDuel sample data on startup
-initialize_sportsduel_sample_data()
+app.add_event_handler("startup", initialize_sportsduel_sample_data)
 
 if __name__ == "__main__":
     import uvicorn
@@ -24,7 +24,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
         """Create social share content"""
         try:
             # Generate share content
-            share_data = generate_share_content(
+            share_data = await generate_share_content(
                 user_id=user_id,
                 share_type=request.share_type,
                 reference_id=request.reference_id,
@@ -54,7 +54,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
             }
             
             # Save share record
-            social_shares_collection.insert_one(share_record)
+            await social_shares_collection.insert_one(share_record)
             
             # Create viral metrics record
             viral_record = {
@@ -70,7 +70,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                 "updated_at": datetime.utcnow()
             }
             
-            viral_metrics_collection.insert_one(viral_record)
+            await viral_metrics_collection.insert_one(viral_record)
             
             # Return share content for frontend
             return {
@@ -92,7 +92,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
         """Mark share as actually shared (user confirmed sharing)"""
         try:
             # Update share record
-            result = social_shares_collection.update_one(
+            result = await social_shares_collection.update_one(
                 {"id": share_id, "user_id": user_id},
                 {"$set": {"shared_at": datetime.utcnow()}}
             )
@@ -110,10 +110,10 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
         """Track share click and redirect to main page"""
         try:
             # Track the click
-            track_share_click(share_id, ref)
+            await track_share_click(share_id, ref)
             
             # Get share details for redirect
-            share = social_shares_collection.find_one({"id": share_id})
+            share = await social_shares_collection.find_one({"id": share_id})
             if not share:
                 raise HTTPException(status_code=404, detail="Share not found")
             
@@ -143,10 +143,10 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
     async def get_user_shares(user_id: str = Depends(verify_token), limit: int = 20, skip: int = 0):
         """Get user's share history"""
         try:
-            shares = list(social_shares_collection.find(
+            shares = await social_shares_collection.find(
                 {"user_id": user_id},
                 {"_id": 0}
-            ).sort("created_at", -1).skip(skip).limit(limit))
+            ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
             
             # Convert datetime objects to ISO strings
             for share in shares:
@@ -154,7 +154,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                     if isinstance(value, datetime):
                         share[key] = value.isoformat()
             
-            total_shares = social_shares_collection.count_documents({"user_id": user_id})
+            total_shares = await social_shares_collection.count_documents({"user_id": user_id})
             
             return {
                 "shares": shares,
@@ -171,7 +171,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
         """Get user's social sharing statistics"""
         try:
             # Get user's sharing stats
-            stats = share_stats_collection.find_one({"user_id": user_id})
+            stats = await share_stats_collection.find_one({"user_id": user_id})
             if not stats:
                 stats = {
                     "total_shares": 0,
@@ -184,10 +184,10 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                 }
             
             # Get recent shares performance
-            recent_shares = list(social_shares_collection.find(
+            recent_shares = await social_shares_collection.find(
                 {"user_id": user_id},
                 {"_id": 0}
-            ).sort("created_at", -1).limit(10))
+            ).sort("created_at", -1).limit(10).to_list(length=None)
             
             # Calculate additional metrics
             total_shares = len(recent_shares)
@@ -206,7 +206,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
             return {
                 "stats": stats,
                 "recent_shares": recent_shares,
-                "viral_coefficient": calculate_viral_coefficient(recent_shares[0]["id"]) if recent_shares else 0.0
+                "viral_coefficient": await calculate_viral_coefficient(recent_shares[0]["id"]) if recent_shares else 0.0
             }
             
         except Exception as e:
@@ -217,7 +217,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
         """Share tournament victory"""
         try:
             # Check if user actually won/participated in tournament
-            participant = tournament_participants_collection.find_one({
+            participant = await tournament_participants_collection.find_one({
                 "user_id": user_id,
                 "tournament_id": tournament_id
             })
@@ -226,7 +226,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                 raise HTTPException(status_code=404, detail="User not found in tournament")
             
             # Generate share content
-            share_data = generate_share_content(
+            share_data = await generate_share_content(
                 user_id=user_id,
                 share_type=ShareType.TOURNAMENT_VICTORY,
                 reference_id=tournament_id,
@@ -254,7 +254,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                 "is_viral": False
             }
             
-            social_shares_collection.insert_one(share_record)
+            await social_shares_collection.insert_one(share_record)
             
             return {
                 "share_id": share_id,
@@ -273,7 +273,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
         """Share team formation"""
         try:
             # Check if user is team captain
-            team = teams_collection.find_one({"id": team_id})
+            team = await teams_collection.find_one({"id": team_id})
             if not team:
                 raise HTTPException(status_code=404, detail="Team not found")
             
@@ -281,7 +281,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                 raise HTTPException(status_code=403, detail="Only team captain can share team formation")
             
             # Generate share content
-            share_data = generate_share_content(
+            share_data = await generate_share_content(
                 user_id=user_id,
                 share_type=ShareType.TEAM_FORMATION,
                 reference_id=team_id,
@@ -309,7 +309,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                 "is_viral": False
             }
             
-            social_shares_collection.insert_one(share_record)
+            await social_shares_collection.insert_one(share_record)
             
             return {
                 "share_id": share_id,
@@ -328,7 +328,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
         """Share personal achievement"""
         try:
             # Generate share content
-            share_data = generate_share_content(
+            share_data = await generate_share_content(
                 user_id=user_id,
                 share_type=ShareType.PERSONAL_ACHIEVEMENT,
                 reference_id=json.dumps(achievement_data),
@@ -356,7 +356,7 @@ def setup_social_sharing_endpoints(app, verify_token, verify_admin_token,
                 "is_viral": False
             }
             
-            social_shares_collection.insert_one(share_record)
+            await social_shares_collection.insert_one(share_record)
             
             return {
                 "share_id": share_id,
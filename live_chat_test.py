@@ -297,6 +297,47 @@ class LiveChatSystemTester(unittest.TestCase):
         self.assertEqual(response.status_code, 401, f"Expected 401 for invalid token, got {response.status_code}: {response.text}")
         print("✅ Ban user endpoint correctly rejects invalid token with 401")
 
+    def test_16_message_history_cursors(self):
+        """Test GET /api/chat/messages/{room_id} before/after cursor pagination"""
+        print("\n🔍 Testing chat message history cursors...")
+        
+        login = requests.post(f"{self.base_url}/api/login", json=self.admin_credentials)
+        self.assertEqual(login.status_code, 200, f"Admin login failed: {login.text}")
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+        
+        sent_ids = []
+        for i in range(3):
+            response = requests.post(
+                f"{self.base_url}/api/chat/send-message",
+                headers=headers,
+                json={"room_id": "general", "message": f"History test {i}"}
+            )
+            self.assertEqual(response.status_code, 200, f"Send failed: {response.text}")
+            sent_ids.append(response.json()["data"]["id"])
+        
+        response = requests.get(f"{self.base_url}/api/chat/messages/general", headers=headers, params={"limit": 2})
+        self.assertEqual(response.status_code, 200, f"History request failed: {response.text}")
+        newest = response.json()
+        self.assertEqual([m["id"] for m in newest["messages"]], sent_ids[1:], "Newest page should end with the last sent messages")
+        
+        response = requests.get(
+            f"{self.base_url}/api/chat/messages/general",
+            headers=headers,
+            params={"limit": 1, "before": newest["before"]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["messages"][0]["id"], sent_ids[0], "before should return the previous message")
+        
+        response = requests.get(
+            f"{self.base_url}/api/chat/messages/general",
+            headers=headers,
+            params={"after": newest["after"]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["messages"], [], "Nothing was sent after the newest message")
+        
+        print("✅ Chat message history cursors work")
+
 if __name__ == "__main__":
     # Run the Live Chat System tests
     live_chat_suite = unittest.TestSuite()
@@ -315,6 +356,7 @@ if __name__ == "__main__":
     live_chat_suite.addTest(LiveChatSystemTester('test_13_ban_user_malformed_json'))
     live_chat_suite.addTest(LiveChatSystemTester('test_14_chat_stats_invalid_token'))
     live_chat_suite.addTest(LiveChatSystemTester('test_15_ban_user_invalid_token'))
+    live_chat_suite.addTest(LiveChatSystemTester('test_16_message_history_cursors'))
     
     runner = unittest.TextTestRunner(verbosity=2)
     print("\n" + "=" * 50)
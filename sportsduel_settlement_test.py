@@ -0,0 +1,222 @@
+import requests
+import unittest
+
+class SportsDuelSettlementTester(unittest.TestCase):
+    """Test SportsDuel time slot settlement: partial results, forfeits and re-runs"""
+
+    base_url = "https://49f63d92-acd8-4e16-a4be-50baa0fb091a.preview.emergentagent.com"
+
+    # Test user credentials
+    test_user_credentials = {
+        "username": "testuser",
+        "password": "test123"
+    }
+
+    # Admin credentials
+    admin_credentials = {
+        "username": "admin",
+        "password": "Kiki1999@"
+    }
+
+    test_user_token = None
+    admin_token = None
+    time_slot_id = None
+    league_id = None
+    event_ids = []
+    team_points = {}
+    settled_match_ids = []
+
+    def admin_headers(self):
+        return {"Authorization": f"Bearer {SportsDuelSettlementTester.admin_token}"}
+
+    def settle(self, results):
+        return requests.post(
+            f"{self.base_url}/api/admin/sportsduel/time-slots/{SportsDuelSettlementTester.time_slot_id}/settle",
+            json={"results": results},
+            headers=self.admin_headers()
+        )
+
+    def get_slot_matches(self):
+        response = requests.get(
+            f"{self.base_url}/api/sportsduel/matches",
+            params={"time_slot_id": SportsDuelSettlementTester.time_slot_id},
+            headers=self.admin_headers()
+        )
+        self.assertEqual(response.status_code, 200, f"Matches request failed: {response.text}")
+        return response.json()["matches"]
+
+    def get_team_points(self):
+        response = requests.get(f"{self.base_url}/api/sportsduel/teams")
+        self.assertEqual(response.status_code, 200, f"Teams request failed: {response.text}")
+        return {
+            team["id"]: (team.get("wins", 0), team.get("losses", 0), team.get("draws", 0), team.get("points", 0))
+            for team in response.json()["teams"]
+        }
+
+    def test_01_admin_login(self):
+        """Login as admin to settle time slots"""
+        print("\n🔍 Testing admin login for SportsDuel settlement testing...")
+        response = requests.post(f"{self.base_url}/api/login", json=self.admin_credentials)
+        self.assertEqual(response.status_code, 200, f"Admin login failed with status {response.status_code}: {response.text}")
+        data = response.json()
+        self.assertIn("token", data)
+        SportsDuelSettlementTester.admin_token = data["token"]
+        print("✅ Admin login successful")
+
+    def test_02_test_user_login(self):
+        """Login as testuser to check that settlement is admin only"""
+        print("\n🔍 Testing testuser login for SportsDuel settlement testing...")
+        response = requests.post(f"{self.base_url}/api/login", json=self.test_user_credentials)
+        self.assertEqual(response.status_code, 200, f"Test user login failed with status {response.status_code}: {response.text}")
+        SportsDuelSettlementTester.test_user_token = response.json()["token"]
+        print("✅ Test user login successful")
+
+    def test_03_find_open_time_slot(self):
+        """Find a time slot with at least two events and open matches"""
+        print("\n🔍 Looking for a time slot to settle...")
+        response = requests.get(f"{self.base_url}/api/sportsduel/time-slots")
+        self.assertEqual(response.status_code, 200, f"Time slots request failed: {response.text}")
+
+        for slot in response.json()["time_slots"]:
+            if slot.get("status") == "completed":
+                continue
+            events = requests.get(f"{self.base_url}/api/sportsduel/events/{slot['id']}").json().get("events", [])
+            if len(events) < 2:
+                continue
+            SportsDuelSettlementTester.time_slot_id = slot["id"]
+            matches = self.get_slot_matches()
+            if any(match["status"] not in ["completed", "cancelled"] for match in matches):
+                SportsDuelSettlementTester.league_id = slot.get("league_id")
+                SportsDuelSettlementTester.event_ids = [event["id"] for event in events]
+                print(f"✅ Using time slot {slot['id']} with {len(events)} events and {len(matches)} matches")
+                return
+
+        SportsDuelSettlementTester.time_slot_id = None
+        self.skipTest("No time slot with events and open matches available")
+
+    def test_04_settle_requires_admin(self):
+        """Settlement is rejected without an admin token"""
+        print("\n🔍 Testing settlement without admin rights...")
+        if not SportsDuelSettlementTester.time_slot_id:
+            self.skipTest("No time slot to settle")
+
+        response = requests.post(
+            f"{self.base_url}/api/admin/sportsduel/time-slots/{SportsDuelSettlementTester.time_slot_id}/settle",
+            json={"results": {}},
+            headers={"Authorization": f"Bearer {SportsDuelSettlementTester.test_user_token}"}
+        )
+        self.assertIn(response.status_code, [401, 403], f"Non-admin settlement should be rejected: {response.text}")
+        print("✅ Non-admin settlement rejected")
+
+    def test_05_settle_unknown_time_slot(self):
+        """Settling an unknown time slot returns 404"""
+        print("\n🔍 Testing settlement of an unknown time slot...")
+        response = requests.post(
+            f"{self.base_url}/api/admin/sportsduel/time-slots/does-not-exist/settle",
+            json={"results": {}},
+            headers=self.admin_headers()
+        )
+        self.assertEqual(response.status_code, 404, f"Unknown time slot should return 404: {response.text}")
+        print("✅ Unknown time slot returns 404")
+
+    def test_06_partial_results_keep_slot_open(self):
+        """With one event still open the slot stays open and no missing coupon forfeits"""
+        print("\n🔍 Testing settlement with partial results...")
+        if not SportsDuelSettlementTester.time_slot_id:
+            self.skipTest("No time slot to settle")
+
+        open_before = {match["id"]: match for match in self.get_slot_matches() if match["status"] not in ["completed", "cancelled"]}
+        response = self.settle({SportsDuelSettlementTester.event_ids[0]: "1"})
+        self.assertEqual(response.status_code, 200, f"Partial settlement failed: {response.text}")
+
+        summary = response.json()
+        self.assertLess(summary["events_with_results"], len(SportsDuelSettlementTester.event_ids))
+        self.assertNotEqual(summary["status"], "completed", "Slot must stay open while an event has no result")
+
+        # A player without a coupon only forfeits once every event has a result
+        for match_id in summary["matches_settled"]:
+            match = open_before.get(match_id, {})
+            self.assertTrue(
+                match.get("player1_coupon_id") and match.get("player2_coupon_id"),
+                f"Match {match_id} with a missing coupon was settled before the slot was final"
+            )
+        print(f"✅ Partial settlement: {len(summary['matches_settled'])} settled, {summary['matches_open']} open, {summary['coupons_pending']} coupons pending")
+
+    def test_07_final_results_settle_every_match(self):
+        """With every result in, all matches settle and missing coupons forfeit"""
+        print("\n🔍 Testing settlement with final results...")
+        if not SportsDuelSettlementTester.time_slot_id:
+            self.skipTest("No time slot to settle")
+
+        response = self.settle({event_id: "1" for event_id in SportsDuelSettlementTester.event_ids})
+        self.assertEqual(response.status_code, 200, f"Final settlement failed: {response.text}")
+
+        summary = response.json()
+        self.assertEqual(summary["events_with_results"], len(SportsDuelSettlementTester.event_ids))
+        self.assertEqual(summary["coupons_pending"], 0)
+        self.assertEqual(summary["matches_open"], 0)
+        self.assertEqual(summary["status"], "completed")
+
+        for match in self.get_slot_matches():
+            if match["status"] == "cancelled":
+                continue
+            self.assertEqual(match["status"], "completed", f"Match {match['id']} was not settled")
+            # A player with no coupon never wins the match
+            for side in ["player1", "player2"]:
+                if not match.get(f"{side}_coupon_id"):
+                    self.assertNotEqual(match.get("winner_player_id"), match[f"{side}_id"],
+                                        f"Player without a coupon won match {match['id']}")
+            SportsDuelSettlementTester.settled_match_ids.append(match["id"])
+
+        SportsDuelSettlementTester.team_points = self.get_team_points()
+        print(f"✅ Final settlement: {len(summary['matches_settled'])} matches settled, slot completed")
+
+    def test_08_rerun_changes_nothing(self):
+        """Settling the completed slot again does not count any match twice"""
+        print("\n🔍 Testing a settlement re-run...")
+        if not SportsDuelSettlementTester.time_slot_id:
+            self.skipTest("No time slot to settle")
+
+        leaderboard_before = None
+        if SportsDuelSettlementTester.league_id:
+            leaderboard_before = requests.get(
+                f"{self.base_url}/api/sportsduel/leaderboards/{SportsDuelSettlementTester.league_id}/teams",
+                params={"window": "season"}
+            ).json()
+
+        response = self.settle({})
+        self.assertEqual(response.status_code, 200, f"Settlement re-run failed: {response.text}")
+        summary = response.json()
+        self.assertEqual(summary["matches_settled"], [], "A re-run must not settle matches again")
+        self.assertEqual(summary["coupons_evaluated"], 0, "A re-run must not evaluate coupons again")
+        self.assertEqual(summary["status"], "completed")
+
+        self.assertEqual(self.get_team_points(), SportsDuelSettlementTester.team_points,
+                         "Team counters changed on a settlement re-run")
+        if leaderboard_before is not None:
+            leaderboard_after = requests.get(
+                f"{self.base_url}/api/sportsduel/leaderboards/{SportsDuelSettlementTester.league_id}/teams",
+                params={"window": "season"}
+            ).json()
+            self.assertEqual(leaderboard_after.get("rankings"), leaderboard_before.get("rankings"),
+                             "Season rankings changed on a settlement re-run")
+        print("✅ Settlement re-run left counters and rankings unchanged")
+
+    def test_09_player_stats_include_settled_matches(self):
+        """Players of settled matches have the matches in their statistics"""
+        print("\n🔍 Testing player statistics after settlement...")
+        if not SportsDuelSettlementTester.settled_match_ids:
+            self.skipTest("No settled matches")
+
+        matches = {match["id"]: match for match in self.get_slot_matches()}
+        match = matches[SportsDuelSettlementTester.settled_match_ids[0]]
+        for side in ["player1", "player2"]:
+            response = requests.get(f"{self.base_url}/api/sportsduel/players/{match[f'{side}_id']}/stats")
+            self.assertEqual(response.status_code, 200, f"Player stats request failed: {response.text}")
+            stats = response.json()
+            self.assertGreaterEqual(stats["total_matches"], 1)
+            self.assertEqual(stats["total_matches"], stats["wins"] + stats["losses"] + stats["draws"])
+        print("✅ Player statistics include the settled matches")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import server
+
+class LedgerBatcherTester(unittest.IsolatedAsyncioTestCase):
+    """Test that commission postings coalesced by LedgerBatcher always get flushed"""
+
+    async def asyncSetUp(self):
+        self.batches = []
+        self.post_ledger_entries = server.post_ledger_entries
+
+        async def slow_post_ledger_entries(entries):
+            self.batches.append([entry["description"] for entry in entries])
+            await asyncio.sleep(0.2)
+            return {"posted": len(entries), "duplicates": 0}
+
+        server.post_ledger_entries = slow_post_ledger_entries
+
+    async def asyncTearDown(self):
+        server.post_ledger_entries = self.post_ledger_entries
+
+    def entry(self, description):
+        return {
+            "user_id": "affiliate", "transaction_type": "commission_earned",
+            "amount": 1.0, "description": description
+        }
+
+    async def test_01_posting_during_flush_is_flushed(self):
+        """An entry queued while a flush is writing gets a flush of its own"""
+        print("\n🔍 Testing a ledger posting during an in-flight flush...")
+        batcher = server.LedgerBatcher()
+        first = asyncio.create_task(batcher.post(**self.entry("t1")))
+        await asyncio.sleep(server.LEDGER_BATCH_SECONDS + 0.05)
+        self.assertEqual(self.batches, [["t1"]], "The first flush should be in flight")
+
+        second = asyncio.create_task(batcher.post(**self.entry("t2")))
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=2)
+        self.assertEqual(results, [True, True])
+        self.assertEqual(self.batches, [["t1"], ["t2"]])
+        self.assertEqual(batcher.pending, [])
+        print("✅ Posting during an in-flight flush was flushed")
+
+    async def test_02_concurrent_postings_share_a_flush(self):
+        """Entries queued within one window are posted together"""
+        print("\n🔍 Testing that concurrent ledger postings share a flush...")
+        batcher = server.LedgerBatcher()
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.post(**self.entry(f"t{i}")) for i in range(3))), timeout=2
+        )
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual(self.batches, [["t0", "t1", "t2"]])
+        print("✅ Concurrent postings were flushed together")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -538,6 +538,57 @@ class TournamentBracketSystemTest(unittest.TestCase):
         
         print("✅ Bracket generation logic test passed")
 
+    def test_13_set_round_results(self):
+        """Test recording a whole round of results in one call"""
+        print("\n🔍 Testing POST /api/tournaments/{tournament_id}/rounds/{round_number}/results endpoint...")
+        
+        # Skip if no test tournament ID or admin token
+        if not TournamentBracketSystemTest.test_tournament_id or not TournamentBracketSystemTest.admin_token:
+            self.skipTest("No test tournament ID or admin token available")
+        
+        response = requests.get(f"{self.base_url}/api/tournaments/{TournamentBracketSystemTest.test_tournament_id}/bracket")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        
+        # Every match links to the next-round match its winner feeds
+        for match in data["matches"]:
+            if match["round_number"] < data["bracket"]["total_rounds"]:
+                self.assertIsNotNone(match.get("next_match_id"), f"Match {match['id']} has no next match link")
+                self.assertIn(match.get("next_match_slot"), ["player1", "player2"])
+        
+        # Submit every open first-round match with player1 as the winner
+        open_matches = [
+            m for m in data["matches"]
+            if m["round_number"] == 1 and m["status"] != "completed" and m["player1_id"] and m["player2_id"]
+        ]
+        if not open_matches:
+            self.skipTest("No open first-round matches left")
+        
+        headers = {"Authorization": f"Bearer {TournamentBracketSystemTest.admin_token}"}
+        response = requests.post(
+            f"{self.base_url}/api/tournaments/{TournamentBracketSystemTest.test_tournament_id}/rounds/1/results",
+            headers=headers,
+            json={"results": [{"match_id": m["id"], "winner_id": m["player1_id"]} for m in open_matches]}
+        )
+        self.assertEqual(response.status_code, 200, f"Failed to set round results: {response.text}")
+        self.assertEqual(len(response.json()["completed"]), len(open_matches))
+        self.assertEqual(response.json()["errors"], [])
+        
+        # The first round should now be closed and every winner placed in its linked slot
+        response = requests.get(f"{self.base_url}/api/tournaments/{TournamentBracketSystemTest.test_tournament_id}/bracket")
+        data = response.json()
+        first_round = data["bracket"]["rounds"][0]
+        self.assertEqual(first_round["completed_matches"], first_round["total_matches"])
+        self.assertEqual(first_round["status"], "completed")
+        
+        matches_by_id = {m["id"]: m for m in data["matches"]}
+        for match in open_matches:
+            if match.get("next_match_id"):
+                next_match = matches_by_id[match["next_match_id"]]
+                self.assertEqual(next_match[f"{match['next_match_slot']}_id"], match["player1_id"])
+        
+        print(f"✅ Recorded {len(open_matches)} first-round results in one call")
+
 def run_tests():
     """Run all tests in order"""
     test_suite = unittest.TestSuite()
@@ -553,6 +604,7 @@ def run_tests():
     test_suite.addTest(TournamentBracketSystemTest('test_10_invalid_winner'))
     test_suite.addTest(TournamentBracketSystemTest('test_11_unauthorized_access'))
     test_suite.addTest(TournamentBracketSystemTest('test_12_bracket_with_different_participant_counts'))
+    test_suite.addTest(TournamentBracketSystemTest('test_13_set_round_results'))
     
     runner = unittest.TextTestRunner(verbosity=2)
     print("\n" + "=" * 50)